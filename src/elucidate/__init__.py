@@ -6,37 +6,57 @@ from .version import VERSION as __version__  # noqa
 
 __author__ = "Kaden Bilyeu (Bikatr7) <Bikatr7@proton.me>"
 
-## EasyTL things
-from easytl import Message
+## built-in imports
+import typing
+import importlib
 
-from easytl import MODEL_COSTS, ALLOWED_GEMINI_MODELS, ALLOWED_OPENAI_MODELS, ALLOWED_ANTHROPIC_MODELS, VALID_JSON_OPENAI_MODELS, VALID_JSON_GEMINI_MODELS, VALID_JSON_ANTHROPIC_MODELS, MODEL_MAX_TOKENS
+## the public names are imported on first access, so importing elucidate (or only the utilities that don't need a provider) doesn't pay for every provider sdk up front
+## the real imports are kept here for type checkers and editors
+if(typing.TYPE_CHECKING):
+    ## EasyTL things
+    from easytl import Message
 
-## google generic exception
-from easytl import GoogleAPIError
+    from easytl import MODEL_COSTS, ALLOWED_GEMINI_MODELS, ALLOWED_OPENAI_MODELS, ALLOWED_ANTHROPIC_MODELS, VALID_JSON_OPENAI_MODELS, VALID_JSON_GEMINI_MODELS, VALID_JSON_ANTHROPIC_MODELS, MODEL_MAX_TOKENS
 
-## openai generic exception
-from easytl import OpenAIError
+    ## google generic exception
+    from easytl import GoogleAPIError
 
-## anthropic generic exception
-from easytl import AnthropicError
+    ## openai generic exception
+    from easytl import OpenAIError
 
-## service specific exceptions
-from easytl import OpenAIAPIError, OpenAIConflictError, OpenAINotFoundError, OpenAIAPIStatusError, OpenAIRateLimitError, OpenAIAPITimeoutError, OpenAIBadRequestError, OpenAIAPIConnectionError, OpenAIAuthenticationError, OpenAIInternalServerError, OpenAIPermissionDeniedError, OpenAIUnprocessableEntityError, OpenAIAPIResponseValidationError
-from easytl import AnthropicAPIError, AnthropicConflictError, AnthropicNotFoundError, AnthropicAPIStatusError, AnthropicRateLimitError, AnthropicAPITimeoutError, AnthropicBadRequestError, AnthropicAPIConnectionError, AnthropicAuthenticationError, AnthropicInternalServerError, AnthropicPermissionDeniedError, AnthropicUnprocessableEntityError, AnthropicAPIResponseValidationError
+    ## anthropic generic exception
+    from easytl import AnthropicError
 
-## Elucidate things
-from .elucidate import Elucidate
+    ## service specific exceptions
+    from easytl import OpenAIAPIError, OpenAIConflictError, OpenAINotFoundError, OpenAIAPIStatusError, OpenAIRateLimitError, OpenAIAPITimeoutError, OpenAIBadRequestError, OpenAIAPIConnectionError, OpenAIAuthenticationError, OpenAIInternalServerError, OpenAIPermissionDeniedError, OpenAIUnprocessableEntityError, OpenAIAPIResponseValidationError
+    from easytl import AnthropicAPIError, AnthropicConflictError, AnthropicNotFoundError, AnthropicAPIStatusError, AnthropicRateLimitError, AnthropicAPITimeoutError, AnthropicBadRequestError, AnthropicAPIConnectionError, AnthropicAuthenticationError, AnthropicInternalServerError, AnthropicPermissionDeniedError, AnthropicUnprocessableEntityError, AnthropicAPIResponseValidationError
 
-from .util.classes import SystemTranslationMessage, ModelTranslationMessage
-from .util.classes import ChatCompletion
-from .util.classes import GenerateContentResponse, AsyncGenerateContentResponse, GenerationConfig
-from .util.classes import AnthropicMessage, AnthropicTextBlock, AnthropicToolUseBlock
-from .util.classes import NOT_GIVEN, NotGiven
+    ## Elucidate things
+    from .elucidate import Elucidate
+    from .client import ElucidateClient
 
-from .exceptions import ElucidateException, InvalidElucidateSettingsException
+    from .util.response_cache import ResponseCache
+    from .util.journal import EvaluationJournal
+    from .util.concurrency import AdaptiveConcurrency
+    from .util.batching import BatchResults
+    from .util.failover import FailoverPolicy, CircuitBreaker
+    from .util.metrics import Metrics, MetricsSink
+    from .util.cassette import Cassette
+    from .util.token_counting import TokenCounter
+    from .util.streaming import EvaluationStream
+    from .util.transport import TransportOptions
+
+    from .util.classes import SystemTranslationMessage, ModelTranslationMessage
+    from .util.classes import ChatCompletion
+    from .util.classes import GenerateContentResponse, AsyncGenerateContentResponse, GenerationConfig
+    from .util.classes import AnthropicMessage, AnthropicTextBlock, AnthropicToolUseBlock
+    from .util.classes import NOT_GIVEN, NotGiven
+
+    from .exceptions import ElucidateException, InvalidElucidateSettingsException, CircuitOpenException, CassetteMissException
 
 __all__ = [
-    "Elucidate",
+    "Elucidate", "ElucidateClient",
+    "ResponseCache", "EvaluationJournal", "AdaptiveConcurrency", "BatchResults", "FailoverPolicy", "CircuitBreaker", "Metrics", "MetricsSink", "Cassette", "TokenCounter", "EvaluationStream", "TransportOptions",
     "Message", "SystemTranslationMessage", "ModelTranslationMessage",
     "ChatCompletion",
     "GenerateContentResponse", "AsyncGenerateContentResponse", "GenerationConfig",
@@ -48,5 +68,64 @@ __all__ = [
     "AnthropicError",
     "OpenAIAPIError", "OpenAIConflictError", "OpenAINotFoundError", "OpenAIAPIStatusError", "OpenAIRateLimitError", "OpenAIAPITimeoutError", "OpenAIBadRequestError", "OpenAIAPIConnectionError", "OpenAIAuthenticationError", "OpenAIInternalServerError", "OpenAIPermissionDeniedError", "OpenAIUnprocessableEntityError", "OpenAIAPIResponseValidationError",
     "AnthropicAPIError", "AnthropicConflictError", "AnthropicNotFoundError", "AnthropicAPIStatusError", "AnthropicRateLimitError", "AnthropicAPITimeoutError", "AnthropicBadRequestError", "AnthropicAPIConnectionError", "AnthropicAuthenticationError", "AnthropicInternalServerError", "AnthropicPermissionDeniedError", "AnthropicUnprocessableEntityError", "AnthropicAPIResponseValidationError",
-    "ElucidateException", "InvalidElucidateSettingsException"
-]
\ No newline at end of file
+    "ElucidateException", "InvalidElucidateSettingsException", "CircuitOpenException", "CassetteMissException"
+]
+
+##-------------------start-of-attributes---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+## where each public name is imported from
+_lazy_attributes:typing.Dict[str, str] = {
+    **dict.fromkeys(["Message",
+                     "MODEL_COSTS", "ALLOWED_GEMINI_MODELS", "ALLOWED_OPENAI_MODELS", "ALLOWED_ANTHROPIC_MODELS", "VALID_JSON_OPENAI_MODELS", "VALID_JSON_GEMINI_MODELS", "VALID_JSON_ANTHROPIC_MODELS", "MODEL_MAX_TOKENS",
+                     "GoogleAPIError", "OpenAIError", "AnthropicError",
+                     "OpenAIAPIError", "OpenAIConflictError", "OpenAINotFoundError", "OpenAIAPIStatusError", "OpenAIRateLimitError", "OpenAIAPITimeoutError", "OpenAIBadRequestError", "OpenAIAPIConnectionError", "OpenAIAuthenticationError", "OpenAIInternalServerError", "OpenAIPermissionDeniedError", "OpenAIUnprocessableEntityError", "OpenAIAPIResponseValidationError",
+                     "AnthropicAPIError", "AnthropicConflictError", "AnthropicNotFoundError", "AnthropicAPIStatusError", "AnthropicRateLimitError", "AnthropicAPITimeoutError", "AnthropicBadRequestError", "AnthropicAPIConnectionError", "AnthropicAuthenticationError", "AnthropicInternalServerError", "AnthropicPermissionDeniedError", "AnthropicUnprocessableEntityError", "AnthropicAPIResponseValidationError"], "easytl"),
+    "Elucidate": ".elucidate",
+    "ElucidateClient": ".client",
+    "ResponseCache": ".util.response_cache",
+    "EvaluationJournal": ".util.journal",
+    "AdaptiveConcurrency": ".util.concurrency",
+    "BatchResults": ".util.batching",
+    "FailoverPolicy": ".util.failover",
+    "CircuitBreaker": ".util.failover",
+    "Metrics": ".util.metrics",
+    "MetricsSink": ".util.metrics",
+    "Cassette": ".util.cassette",
+    "TokenCounter": ".util.token_counting",
+    "EvaluationStream": ".util.streaming",
+    "TransportOptions": ".util.transport",
+    **dict.fromkeys(["SystemTranslationMessage", "ModelTranslationMessage",
+                     "ChatCompletion",
+                     "GenerateContentResponse", "AsyncGenerateContentResponse", "GenerationConfig",
+                     "AnthropicMessage", "AnthropicTextBlock", "AnthropicToolUseBlock",
+                     "NOT_GIVEN", "NotGiven"], ".util.classes"),
+    "ElucidateException": ".exceptions",
+    "InvalidElucidateSettingsException": ".exceptions",
+    "CircuitOpenException": ".exceptions",
+    "CassetteMissException": ".exceptions",
+}
+
+##-------------------start-of-__getattr__()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+def __getattr__(name:str) -> typing.Any:
+
+    """
+
+    Imports a public name the first time it's accessed, then keeps it in the module so later accesses are plain lookups.
+
+    """
+
+    if(name not in _lazy_attributes):
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    _value = getattr(importlib.import_module(_lazy_attributes[name], __name__), name)
+
+    globals()[name] = _value
+
+    return _value
+
+##-------------------start-of-__dir__()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+def __dir__() -> typing.List[str]:
+
+    return sorted(set(globals()) | set(_lazy_attributes))
@@ -0,0 +1,446 @@
+## Copyright 2024 Kakusui LLC (https://kakusui.org) (https://github.com/Kakusui) (https://github.com/Kakusui/Elucidate)
+## Use of this source code is governed by an GNU Lesser General Public License v2.1
+## license that can be found in the LICENSE file.
+
+## built-in imports
+import typing
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+import queue
+import threading
+
+## custom modules
+from .util.journal import EvaluationJournal
+
+##-------------------start-of-attributes---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+_api_key_environment_variables = {"openai": "OPENAI_API_KEY", "gemini": "GEMINI_API_KEY", "anthropic": "ANTHROPIC_API_KEY"}
+
+_default_template = "Original text:\n{source}\n\nTranslated text:\n{target}"
+
+## lines read per trip to the reader thread
+_read_block_size = 256
+
+class _BackgroundWriter:
+
+    """
+
+    Writes JSONL records on a thread of its own, so writing to disk never blocks the event loop.
+
+    """
+
+##-------------------start-of-__init__()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def __init__(self, path:str, append:bool = False) -> None:
+
+        """
+
+        Parameters:
+        path (string) : The file to write to, '-' for stdout.
+        append (bool) : Whether to append to the file instead of replacing it.
+
+        """
+
+        self._file = sys.stdout if path == "-" else open(path, "a" if append else "w", encoding="utf-8")
+        self._queue:queue.Queue[str | None] = queue.Queue()
+
+        self._thread = threading.Thread(target=self._run, name="elucidate-writer", daemon=True)
+        self._thread.start()
+
+##-------------------start-of-write()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def write(self, record:typing.Mapping[str, typing.Any]) -> None:
+
+        self._queue.put(json.dumps(record, ensure_ascii=False, default=str))
+
+##-------------------start-of-_run()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def _run(self) -> None:
+
+        while((_line := self._queue.get()) is not None):
+
+            self._file.write(_line + "\n")
+
+            ## flushed whenever it catches up, so a crash loses at most what was still queued
+            if(self._queue.empty()):
+                self._file.flush()
+
+##-------------------start-of-close()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def close(self) -> None:
+
+        self._queue.put(None)
+        self._thread.join()
+
+        self._file.flush()
+
+        if(self._file is not sys.stdout):
+            self._file.close()
+
+class _Progress:
+
+    """
+
+    Prints throughput and ETA to stderr, at most once per interval.
+
+    """
+
+##-------------------start-of-__init__()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def __init__(self, total:int | None, interval:float = 1.0) -> None:
+
+        self.total = total
+        self.done = 0
+        self.failed = 0
+
+        self._started_at = time.monotonic()
+        self._last_report = 0.0
+
+        ## redrawn in place on a terminal, one line per report otherwise
+        self._interactive = sys.stderr.isatty()
+        self._interval = interval if self._interactive else max(interval, 10.0)
+
+##-------------------start-of-update()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def update(self, failed:bool = False) -> None:
+
+        self.done += 1
+        self.failed += failed
+
+        if(time.monotonic() - self._last_report >= self._interval):
+            self.report()
+
+##-------------------start-of-report()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def report(self, final:bool = False) -> None:
+
+        self._last_report = time.monotonic()
+
+        _elapsed = self._last_report - self._started_at
+        _rate = self.done / _elapsed if _elapsed > 0 else 0.0
+
+        _line = f"{self.done}{f'/{self.total}' if self.total is not None else ''} evaluated, {self.failed} failed, {_rate:.1f}/s"
+
+        if(self.total is not None and _rate > 0 and not final):
+            _line += f", ETA {_format_duration((self.total - self.done) / _rate)}"
+
+        if(final):
+            _line += f", {_format_duration(_elapsed)} total"
+
+        print(("\r" + _line + "\033[K") if self._interactive else _line, end="\n" if final or not self._interactive else "", file=sys.stderr, flush=True)
+
+##-------------------start-of-_format_duration()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+def _format_duration(seconds:float) -> str:
+
+    _minutes, _seconds = divmod(int(seconds), 60)
+    _hours, _minutes = divmod(_minutes, 60)
+
+    return f"{_hours}h{_minutes:02d}m{_seconds:02d}s" if _hours else f"{_minutes}m{_seconds:02d}s"
+
+##-------------------start-of-_read_block()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+def _read_block(file:typing.TextIO) -> typing.List[str]:
+
+    _lines = []
+
+    for _ in range(_read_block_size):
+
+        _line = file.readline()
+
+        if(not _line):
+            break
+
+        _lines.append(_line.rstrip("\r\n"))
+
+    return _lines
+
+##-------------------start-of-_count_records()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+def _count_records(path:str, skip_blank:bool) -> int:
+
+    """
+
+    Counts the lines of path that are read as records, all of them for parallel files, those that aren't blank otherwise.
+
+    """
+
+    with open(path, "rb") as _file:
+        return sum(1 for _line in _file if not skip_blank or _line.strip())
+
+##-------------------start-of-_parse_record()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+def _parse_record(line:str, line_number:int, arguments:argparse.Namespace) -> typing.Tuple[typing.Any, str | ValueError] | None:
+
+    """
+
+    Turns an input line into an id and the text to evaluate, None for blank lines. A malformed line gets a ValueError in place of its text, so it can be reported without stopping the run.
+
+    """
+
+    if(not line.strip()):
+        return None
+
+    if(arguments.format == "tsv"):
+
+        _columns = line.split("\t")
+
+        if(len(_columns) >= 3):
+            return _columns[0], arguments.template.format(source=_columns[1], target=_columns[2])
+
+        if(len(_columns) == 2):
+            return line_number, arguments.template.format(source=_columns[0], target=_columns[1])
+
+        return line_number, _columns[0]
+
+    try:
+        _record = json.loads(line)
+
+    except ValueError as _e:
+        return line_number, ValueError(f"Line {line_number} isn't valid JSON: {_e}")
+
+    if(not isinstance(_record, dict)):
+        return line_number, ValueError(f"Line {line_number} isn't a JSON object.")
+
+    _id = _record.get(arguments.id_field, line_number)
+
+    if(arguments.text_field in _record):
+
+        if(not isinstance(_record[arguments.text_field], str)):
+            return _id, ValueError(f"Line {line_number}'s {arguments.text_field} field isn't a string.")
+
+        return _id, _record[arguments.text_field]
+
+    _missing = [_field for _field in [arguments.source_field, arguments.target_field] if _field not in _record]
+
+    if(_missing):
+        return _id, ValueError(f"Line {line_number} has no {arguments.text_field} field, and no {' or '.join(_missing)} field.")
+
+    return _id, arguments.template.format(source=_record[arguments.source_field], target=_record[arguments.target_field])
+
+##-------------------start-of-_read_records()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+async def _read_records(arguments:argparse.Namespace) -> typing.AsyncIterator[typing.Tuple[typing.Any, str | ValueError]]:
+
+    """
+
+    Reads (id, text) pairs from the input a block at a time, on a thread, so the whole file is never in memory and reading doesn't block the event loop. Malformed lines come with a ValueError in place of their text.
+
+    """
+
+    with open(arguments.input, "r", encoding="utf-8") as _file, (open(arguments.target, "r", encoding="utf-8") if arguments.format == "parallel" else open(os.devnull, "r")) as _target_file:
+
+        _line_number = 0
+
+        while(_lines := await asyncio.to_thread(_read_block, _file)):
+
+            if(arguments.format == "parallel"):
+                _targets = await asyncio.to_thread(_read_block, _target_file)
+
+                assert len(_targets) == len(_lines), ValueError(f"{arguments.input} and {arguments.target} don't have the same number of lines.")
+
+            for _offset, _line in enumerate(_lines):
+
+                _line_number += 1
+
+                if(arguments.format == "parallel"):
+                    yield _line_number, arguments.template.format(source=_line, target=_targets[_offset])
+                    continue
+
+                _parsed = _parse_record(_line, _line_number, arguments)
+
+                if(_parsed is not None):
+                    yield _parsed
+
+##-------------------start-of-_run()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+async def _run(arguments:argparse.Namespace) -> int:
+
+    ## imported here so --help and argument errors don't wait on the provider sdks
+    from .client import ElucidateClient
+    from .util.cassette import Cassette
+
+    _client = ElucidateClient(**{f"{arguments.provider}_api_key": arguments.api_key or os.environ.get(_api_key_environment_variables[arguments.provider])})
+
+    if(arguments.requests_per_minute is not None or arguments.tokens_per_minute is not None):
+        _client.set_rate_limits(arguments.provider, requests_per_minute=arguments.requests_per_minute, tokens_per_minute=arguments.tokens_per_minute)
+
+    if(arguments.adaptive):
+        _client.enable_adaptive_concurrency(arguments.provider, initial_limit=arguments.concurrency)
+
+    _kwargs:typing.Dict[str, typing.Any] = {"semaphore": arguments.concurrency,
+                                            "response_type": arguments.response_type}
+
+    if(arguments.model is not None):
+        _kwargs["model"] = arguments.model
+
+    if(arguments.instructions_file is not None):
+        with open(arguments.instructions_file, "r", encoding="utf-8") as _file:
+            _kwargs["evaluation_instructions"] = _file.read()
+
+    if(arguments.journal is not None):
+        _kwargs["journal"] = EvaluationJournal(arguments.journal)
+
+    if(arguments.record is not None or arguments.replay is not None):
+        _client.set_cassette(Cassette(arguments.record or arguments.replay, mode="record" if arguments.record is not None else "replay", speed=arguments.replay_speed or None))
+
+    _progress = _Progress(await asyncio.to_thread(_count_records, arguments.input, arguments.format != "parallel") if not arguments.no_count else None)
+    _writer = _BackgroundWriter(arguments.output)
+
+    ## ids of the texts in flight, by their position in the stream
+    _ids:typing.Dict[int, typing.Any] = {}
+
+    ## malformed lines, never sent, by the position in the stream of the next text after them, so --ordered writes them in their place
+    _skipped:typing.Dict[int, typing.List[typing.Dict[str, typing.Any]]] = {}
+
+    def _write_skipped(_before:int | None = None) -> None:
+
+        for _position in sorted(_position for _position in _skipped if _before is None or _position <= _before):
+
+            for _record in _skipped.pop(_position):
+                _writer.write(_record)
+                _progress.update(failed=True)
+
+    async def _texts() -> typing.AsyncIterator[str]:
+
+        _index = 0
+
+        async for _id, _text in _read_records(arguments):
+
+            if(isinstance(_text, ValueError)):
+                _skipped.setdefault(_index, []).append({"id": _id, "error": f"{type(_text).__name__}: {_text}"})
+
+                if(not arguments.ordered):
+                    _write_skipped()
+
+                continue
+
+            _ids[_index] = _id
+            _index += 1
+            yield _text
+
+    try:
+
+        async for _index, _result in _client.evaluate_stream(_texts(), arguments.provider, ordered=arguments.ordered, return_exceptions=True, **_kwargs):
+
+            _id = _ids.pop(_index)
+
+            _write_skipped(_index)
+
+            if(isinstance(_result, Exception)):
+                _writer.write({"id": _id, "error": f"{type(_result).__name__}: {_result}"})
+
+            else:
+                _writer.write({"id": _id, "evaluation": _result})
+
+            _progress.update(failed=isinstance(_result, Exception))
+
+        ## those after the last text
+        _write_skipped()
+
+    finally:
+        _writer.close()
+        _progress.report(final=True)
+
+        if(arguments.journal is not None):
+            _kwargs["journal"].close()
+
+        if(_client._openai_service._cassette is not None):
+            _client._openai_service._cassette.close()
+
+        if(arguments.metrics is not None):
+            _client.get_metrics().write_prometheus(arguments.metrics) # type: ignore
+
+        ## closed while the loop is still running, otherwise the client's connections are cleaned up after it's gone
+        _async_client = getattr(_client._get_service(arguments.provider), "_async_client", None)
+
+        if(asyncio.iscoroutinefunction(getattr(_async_client, "close", None))):
+            await _async_client.close() # type: ignore
+
+    return 1 if _progress.failed else 0
+
+##-------------------start-of-_build_parser()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+def _build_parser() -> argparse.ArgumentParser:
+
+    _parser = argparse.ArgumentParser(prog="elucidate", description="Smarter Translations through LLM Self-Evaluation")
+    _subparsers = _parser.add_subparsers(dest="command", required=True)
+
+    _run_parser = _subparsers.add_parser("run", help="Evaluate a file of translations, streaming results to a JSONL file.")
+
+    _run_parser.add_argument("input", help="The input file. JSONL, TSV, or the source side of a pair of parallel files.")
+    _run_parser.add_argument("-o", "--output", default="-", help="The JSONL file results are written to, one {\"id\", \"evaluation\"} or {\"id\", \"error\"} per line. Defaults to stdout.")
+    _run_parser.add_argument("--target", help="The target side of a pair of parallel files, line by line with the input.")
+    _run_parser.add_argument("--format", choices=["jsonl", "tsv", "parallel"], help="The input format. Inferred from --target and the file extension if not given.")
+
+    _run_parser.add_argument("--provider", choices=["openai", "gemini", "anthropic"], default="openai")
+    _run_parser.add_argument("--model", help="The model to use. Defaults to the provider's default.")
+    _run_parser.add_argument("--api-key", help="The API key. Defaults to OPENAI_API_KEY, GEMINI_API_KEY or ANTHROPIC_API_KEY.")
+    _run_parser.add_argument("--instructions-file", help="A file holding the evaluation instructions.")
+    _run_parser.add_argument("--response-type", choices=["text", "json"], default="text")
+
+    _run_parser.add_argument("--concurrency", type=int, default=5, help="The number of requests in flight.")
+    _run_parser.add_argument("--adaptive", action="store_true", help="Learn the concurrency limit with AIMD, starting at --concurrency.")
+    _run_parser.add_argument("--requests-per-minute", "--rpm", type=float, help="The provider's requests per minute limit.")
+    _run_parser.add_argument("--tokens-per-minute", "--tpm", type=float, help="The provider's tokens per minute limit.")
+    _run_parser.add_argument("--ordered", action="store_true", help="Write results in input order instead of as they complete.")
+    _run_parser.add_argument("--journal", help="A file every result is recorded to as it lands. Rerunning with the same journal only sends what didn't finish.")
+    _cassette_group = _run_parser.add_mutually_exclusive_group()
+    _cassette_group.add_argument("--record", help="A cassette file every response is recorded to, with its latency, so the run can be replayed with --replay.")
+    _cassette_group.add_argument("--replay", help="A cassette file recorded with --record. Responses are served from it instead of the provider.")
+    _run_parser.add_argument("--replay-speed", type=float, default=1.0, help="How fast --replay serves responses, relative to their recorded latencies. 0 serves them right away.")
+    _run_parser.add_argument("--metrics", help="A file the run's latency, queue wait, token, retry and error metrics are written to when it ends, in the Prometheus text format.")
+    _run_parser.add_argument("--no-count", action="store_true", help="Don't count the input's lines up front. No ETA is shown.")
+
+    _run_parser.add_argument("--id-field", default="id", help="JSONL: the field holding the id. Defaults to the line number if missing.")
+    _run_parser.add_argument("--text-field", default="text", help="JSONL: the field holding the text to evaluate.")
+    _run_parser.add_argument("--source-field", default="source", help="JSONL: the field holding the source, used if there's no text field.")
+    _run_parser.add_argument("--target-field", default="target", help="JSONL: the field holding the translation, used if there's no text field.")
+    _run_parser.add_argument("--template", default=_default_template, help="How a source and its translation are combined into the text to evaluate. Uses {source} and {target}.")
+
+    return _parser
+
+##-------------------start-of-main()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+def main(argv:typing.Sequence[str] | None = None) -> int:
+
+    """
+
+    Entry point of the elucidate command.
+
+    Parameters:
+    argv (sequence[string] or None) : The arguments, sys.argv[1:] if None.
+
+    Returns:
+    exit_code (int) : 0 if every text was evaluated, 1 if some failed.
+
+    """
+
+    _arguments = _build_parser().parse_args(argv)
+
+    if(_arguments.format is None):
+        _arguments.format = "parallel" if _arguments.target is not None else "tsv" if _arguments.input.endswith(".tsv") else "jsonl"
+
+    if(_arguments.format == "parallel" and _arguments.target is None):
+        _build_parser().error("--format parallel needs --target.")
+
+    ## checked up front, it's the same for every line
+    try:
+        _arguments.template.format(source="", target="")
+
+    except (KeyError, IndexError, ValueError) as _e:
+        _build_parser().error(f"--template can only use {{source}} and {{target}}: {_e!r}")
+
+    try:
+        return asyncio.run(_run(_arguments))
+
+    except KeyboardInterrupt:
+        print("Interrupted.", file=sys.stderr)
+        return 130
+
+if(__name__ == "__main__"):
+    sys.exit(main())
@@ -0,0 +1,2653 @@
+## Copyright 2024 Kakusui LLC (https://kakusui.org) (https://github.com/Kakusui) (https://github.com/Kakusui/Elucidate)
+## Use of this source code is governed by an GNU Lesser General Public License v2.1
+## license that can be found in the LICENSE file.
+
+## built-in libraries
+import typing
+import asyncio
+import os
+import time
+import itertools
+import copy
+
+## third-party imports
+from google.generativeai import client as genai_client
+
+## custom modules 
+from .protocols.openai_service_protocol import OpenAIServiceProtocol
+from .protocols.gemini_service_protocol import GeminiServiceProtocol
+from .protocols.anthropic_service_protocol import AnthropicServiceProtocol
+
+from .monkeystrapper import monkeystrap, bind_openai_evaluators, bind_gemini_evaluators, bind_anthropic_evaluators
+
+## monkeystrapping new functions to EasyTL
+monkeystrap()
+
+## finally importing EasyTL with modified classes
+from easytl import EasyTL
+
+from .util.classes import ModelTranslationMessage, SystemTranslationMessage, ChatCompletion, NOT_GIVEN, NotGiven, GenerateContentResponse, AsyncGenerateContentResponse, AnthropicMessage, AnthropicTextBlock, AnthropicToolUseBlock
+from .util.attributes import VALID_JSON_OPENAI_MODELS, VALID_JSON_GEMINI_MODELS, VALID_JSON_ANTHROPIC_MODELS, _return_curated_openai_settings, _validate_stop_sequences, _is_iterable_of_strings, _validate_response_schema, _return_curated_gemini_settings, _return_curated_anthropic_settings
+from .util.llm_helper.validators import _validate_elucidate_llm_translation_settings
+from .util.credentials import CredentialCache
+from .util.response_cache import ResponseCache
+from .util.journal import EvaluationJournal
+from .util.failover import FailoverPolicy
+from .util.rate_limiter import RateLimiter
+from .util.concurrency import AdaptiveConcurrency
+from .util.batching import BatchResults
+from .util.usage import TokenUsage, _call_usage, _with_call_usage, _start_call_usage, _get_call_usage
+from .util.metrics import Metrics, MetricsSink, _attempt_latency
+from .util.cassette import Cassette
+from .util.token_counting import TokenCounter, _validate_text_length, _cost_per_token
+from .util.chunking import _chunk_sides, _model_chunk_limit, _chunk_budget, _stitch_evaluations
+from .util.packing import _pack_segments, _build_packed_prompt, _parse_packed_response, _packing_instructions, _packed_response_schema
+from .util.streaming import EvaluationStream
+from .util.transport import TransportOptions, _close_connections, _aclose_connections
+from .util.scheduling import _iterate_as_completed, _is_lazy_iterable, _admit_lazily, _collect_by_index, _map_in_threads
+
+from .evaluators.openai_evaluator import _openai_request_key
+from .evaluators.gemini_evaluator import _gemini_request_key
+from .evaluators.anthropic_evaluator import _anthropic_request_key
+
+from .evaluators.openai_batch_evaluator import _openai_build_batch_file, _openai_submit_batch, _openai_wait_for_batch, _openai_collect_batch_results, _openai_finish_batch_results
+from .evaluators.anthropic_batch_evaluator import _anthropic_build_batch_requests, _anthropic_submit_batches, _anthropic_wait_for_batch, _anthropic_collect_batch_results, _anthropic_finish_batch_results
+
+from .services.openai_service import ScopedOpenAIService
+from .services.gemini_service import ScopedGeminiService
+from .services.anthropic_service import ScopedAnthropicService
+
+from .exceptions import InvalidResponseFormatException, InvalidTextInputException, ElucidateException, InvalidAPITypeException, InvalidAPIKeyException, CircuitOpenException
+
+##-------------------start-of-attributes---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+## This is a dictionary mapping the service names to their respective environment variables.
+_environment_map = {
+    "gemini": "GEMINI_API_KEY",
+    "openai": "OPENAI_API_KEY",
+    "anthropic": "ANTHROPIC_API_KEY",
+}
+
+class ElucidateClient:
+
+    """
+
+    Elucidate client.
+
+    Owns its own clients, settings, semaphores and credential cache, so several differently configured clients can evaluate concurrently in one event loop without interfering with each other.
+
+    The Elucidate global client is a facade over a default ElucidateClient that uses EasyTL's services.
+
+    Note that override_previous_settings=True still changes the client's own settings, so use one client per configuration if calls with different settings run at the same time.
+
+    """
+
+##-------------------start-of-__init__()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def __init__(self,
+                 openai_api_key:str | None = None,
+                 gemini_api_key:str | None = None,
+                 anthropic_api_key:str | None = None,
+                 credential_cache_ttl:float | None = CredentialCache._default_ttl,
+                 _openai_service:OpenAIServiceProtocol | None = None,
+                 _gemini_service:GeminiServiceProtocol | None = None,
+                 _anthropic_service:AnthropicServiceProtocol | None = None,
+                 _credential_cache:CredentialCache | None = None,
+                 response_cache:ResponseCache | None = None,
+                 metrics:MetricsSink | None = None,
+                 cassette:Cassette | None = None,
+                 token_counter:TokenCounter | None = None,
+                 transport:TransportOptions | None = None
+                 ) -> None:
+
+        """
+
+        Parameters:
+        openai_api_key (string or None) : The OpenAI API key. If None, OPENAI_API_KEY is used if set, otherwise use set_credentials() later.
+        gemini_api_key (string or None) : The Gemini API key. If None, GEMINI_API_KEY is used if set, otherwise use set_credentials() later.
+        anthropic_api_key (string or None) : The Anthropic API key. If None, ANTHROPIC_API_KEY is used if set, otherwise use set_credentials() later.
+        credential_cache_ttl (float or None) : How long a successful credential check is trusted. See set_credential_cache_ttl().
+        response_cache (ResponseCache or None) : The cache to answer repeated requests from. See set_response_cache().
+        metrics (MetricsSink or None) : Where request metrics are recorded. If None, an in-memory Metrics is used. See set_metrics().
+        cassette (Cassette or None) : Records every response, or answers every request from a recording. See set_cassette().
+        token_counter (TokenCounter or None) : Counts tokens for validating text length and calculating costs. If None, one with the default settings is used. See set_token_counter().
+        transport (TransportOptions or None) : How the OpenAI and Anthropic clients connect. If None, the SDK defaults are used. See set_transport().
+
+        """
+
+        self._openai_service:OpenAIServiceProtocol = _openai_service or typing.cast(OpenAIServiceProtocol, ScopedOpenAIService(openai_api_key or os.environ.get(_environment_map["openai"])))
+        self._gemini_service:GeminiServiceProtocol = _gemini_service or typing.cast(GeminiServiceProtocol, ScopedGeminiService(gemini_api_key or os.environ.get(_environment_map["gemini"])))
+        self._anthropic_service:AnthropicServiceProtocol = _anthropic_service or typing.cast(AnthropicServiceProtocol, ScopedAnthropicService(anthropic_api_key or os.environ.get(_environment_map["anthropic"])))
+
+        self._credential_cache = _credential_cache or CredentialCache(credential_cache_ttl)
+
+        if(response_cache is not None):
+            self.set_response_cache(response_cache)
+
+        self.set_metrics(metrics if metrics is not None else Metrics())
+
+        if(cassette is not None):
+            self.set_cassette(cassette)
+
+        self.set_token_counter(token_counter if token_counter is not None else TokenCounter())
+
+        self._transports:typing.Dict[str, TransportOptions | None] = {}
+
+        ## clients replaced while requests may still be in flight on them, closed by aclose()
+        self._retired_clients:typing.List[typing.Tuple[typing.Any, typing.Any]] = []
+
+        if(transport is not None):
+            self.set_transport("openai", transport)
+            self.set_transport("anthropic", transport)
+
+##-------------------start-of-_get_service()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def _get_service(self, api_type:typing.Literal["gemini", "openai", "anthropic"]) -> typing.Any:
+
+        assert api_type in ["openai", "gemini", "anthropic"], InvalidAPITypeException("Invalid API type specified. Must be 'openai', 'gemini' or 'anthropic'.")
+
+        return {"openai": self._openai_service, "gemini": self._gemini_service, "anthropic": self._anthropic_service}[api_type]
+
+##-------------------start-of-_copy_service()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def _copy_service(self, api_type:typing.Literal["gemini", "openai", "anthropic"]) -> typing.Any:
+
+        """
+
+        Returns a copy of the service for api_type with settings of its own, sharing its clients, cache, rate limiters, metrics and cassette. Its evaluation functions are bound to the copy.
+
+        """
+
+        _service = self._get_service(api_type)
+
+        ## EasyTL's services are classes whose settings every caller shares, there's nothing to copy
+        assert not isinstance(_service, type), ElucidateException(f"The Elucidate class's {api_type} service is shared by every caller, so it can't be given a second set of settings. Use an ElucidateClient instead.")
+
+        _copy = copy.copy(_service)
+
+        {"openai": bind_openai_evaluators, "gemini": bind_gemini_evaluators, "anthropic": bind_anthropic_evaluators}[api_type](_copy)
+
+        return _copy
+    
+##-------------------start-of-_default_ingestion_window()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    @staticmethod
+    def _default_ingestion_window(service:typing.Any) -> int:
+
+        """
+
+        Returns how many texts are admitted at a time when ingesting lazily, enough to fill every slot the service can have in flight.
+
+        """
+
+        if(service._adaptive_concurrency is not None):
+            return int(service._adaptive_concurrency.max_limit)
+
+        return service._semaphore_value
+    
+##-------------------start-of-_default_max_workers()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    @staticmethod
+    def _default_max_workers(service:typing.Any, max_workers:int) -> int:
+
+        """
+
+        Caps the thread pool of a sync evaluation at the adaptive concurrency limit, so sync and async calls share the same ceiling.
+
+        """
+
+        _adaptive_concurrency = getattr(service, "_adaptive_concurrency", None)
+
+        return max(1, min(max_workers, _adaptive_concurrency.limit)) if _adaptive_concurrency is not None else max_workers
+
+##-------------------start-of-openai_evaluate()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def openai_evaluate(self, text:typing.Union[str, typing.Iterable[str], ModelTranslationMessage, typing.Iterable[ModelTranslationMessage]],
+                        override_previous_settings:bool = True,
+                        decorator:typing.Callable | None = None,
+                        logging_directory:str | None = None,
+                        response_type:typing.Literal["text", "raw", "json", "raw_json"] | None = "text",
+                        evaluation_delay:float | None = None,
+                        evaluation_instructions:str | SystemTranslationMessage | None = None,
+                        model:str="gpt-4",
+                        temperature:float | None | NotGiven = NOT_GIVEN,
+                        top_p:float | None | NotGiven = NOT_GIVEN,
+                        stop:typing.List[str] | None | NotGiven = NOT_GIVEN,
+                        max_tokens:int | None | NotGiven = NOT_GIVEN,
+                        presence_penalty:float | None | NotGiven = NOT_GIVEN,
+                        frequency_penalty:float | None | NotGiven = NOT_GIVEN,
+                        max_workers:int | None = None,
+                        _protocol:OpenAIServiceProtocol | None = None
+                        ) -> typing.Union[typing.List[str], str, typing.List[ChatCompletion], ChatCompletion]:
+        
+        """
+
+        Performs an evaluation on already translated text using the original untranslated text with OpenAI. Your text attribute should contain both.
+
+        This function assumes that the API key has already been set.
+
+        Evaluation instructions default to 'Please suggest a revised of the given text given it's original text and it's evaluation.' if not specified.
+
+        Due to how OpenAI's API works, NOT_GIVEN is treated differently than None. If a parameter is set to NOT_GIVEN, it is not passed to the API. If it is set to None, it is passed to the API as None.
+        
+        This function is not for use for real-time evaluation, nor for generating multiple response candidates. Another function may be implemented for this given demand.
+
+        Parameters:
+        text (string | ModelTranslationMessage | iterable[str] | iterable[ModelTranslationMessage]) : The text to evaluate.  This should be the original untranslated text along with the translated text.
+        override_previous_settings (bool) : Whether to override the previous settings that were used during the last call to an OpenAI evaluation function.
+        decorator (callable or None) : The decorator to use when evaluating. Typically for exponential backoff retrying. If this is None, OpenAI will retry the request twice if it fails.
+        logging_directory (string or None) : The directory to log to. If None, no logging is done. This'll append the text result and some function information to a file in the specified directory. File is created if it doesn't exist.
+        response_type (literal["text", "raw", "json", "raw_json"]) : The type of response to return. 'text' returns the evaluated text, 'raw' returns the raw response, a ChatCompletion object, 'json' returns a json-parseable string. 'raw_json' returns the raw response, a ChatCompletion object, but with the content as a json-parseable string.
+        evaluation_delay (float or None) : If text is an iterable, the delay between each evaluation. Default is none. This is more important for asynchronous evaluations where a semaphore alone may not be sufficient.
+        evaluation_instructions (string or SystemTranslationMessage or None) : The evaluation instructions to use. If None, the default system message is used. If you plan on using the json response type, you must specify that you want a json output and it's format in the instructions. The default system message will ask for a generic json if the response type is json.
+        model (string) : The model to use. (E.g. 'gpt-4', 'gpt-3.5-turbo-0125', 'gpt-4o', etc.)
+        temperature (float) : The temperature to use. The higher the temperature, the more creative the output. Lower temperatures are typically better for evaluation and evaluation.
+        top_p (float) : The nucleus sampling probability. The higher the value, the more words are considered for the next token. Generally, alter this or temperature, not both.
+        stop (list or None) : String sequences that will cause the model to stop evaluation if encountered, generally useless.
+        max_tokens (int or None) : The maximum number of tokens to output.
+        presence_penalty (float) : The presence penalty to use. This penalizes the model from repeating the same content in the output.
+        frequency_penalty (float) : The frequency penalty to use. This penalizes the model from using the same words too frequently in the output.
+        max_workers (int or None) : If set, texts are evaluated on a thread pool of this many threads instead of one at a time, capped at the learned limit if adaptive concurrency is enabled. Order is preserved and rate limits set with set_rate_limits() still apply. A failing text doesn't stop the others, a BatchResults is returned with failed texts set to None and their errors in result.errors.
+
+        Returns:
+        result (string or list - string or ChatCompletion or list - ChatCompletion) : The evaluation result. A list of strings if the input was an iterable, a string otherwise. A list of ChatCompletion objects if the response type is 'raw' and input was an iterable, a ChatCompletion object otherwise.
+
+        """
+        
+        assert response_type in ["text", "raw", "json", "raw_json"], InvalidResponseFormatException("Invalid response type specified. Must be 'text', 'raw', 'json' or 'raw_json'.")
+
+        _protocol = _protocol or self._openai_service
+        
+        if(logging_directory is not None):
+            print("Logging directory has been deprecated for openai_evaluate().")
+
+        _settings = _return_curated_openai_settings(locals())
+
+        _validate_elucidate_llm_translation_settings(_settings, "openai")
+
+        _validate_stop_sequences(stop)
+
+        _validate_text_length(text, model, service="openai", counter=self._token_counter)
+
+        ## Should be done after validating the settings to reduce cost to the user, cached so it isn't a request per call
+        self._credential_cache.verify("openai", self.test_credentials)
+
+        json_mode = True if response_type in ["json", "raw_json"] else False
+        
+        if(override_previous_settings == True):
+            _protocol._set_attributes(model=model,
+                                        temperature=temperature,
+                                        logit_bias=None,
+                                        top_p=top_p,
+                                        n=1,
+                                        stop=stop,
+                                        max_tokens=max_tokens,
+                                        presence_penalty=presence_penalty,
+                                        frequency_penalty=frequency_penalty,
+                                        decorator=decorator,
+                                        semaphore=None,
+                                        rate_limit_delay=evaluation_delay,
+                                        json_mode=json_mode)
+
+            ## Done afterwards, cause default evaluation instructions can change based on set_attributes()
+            evaluation_instructions = evaluation_instructions or _protocol._default_evaluation_instructions
+        
+        else:
+            evaluation_instructions = _protocol._system_message
+
+        assert isinstance(text, str) or _is_iterable_of_strings(text) or isinstance(text, ModelTranslationMessage) or _is_iterable_of_strings(text), InvalidTextInputException("text must be a string, an iterable of strings, a ModelTranslationMessage or an iterable of ModelTranslationMessages.")
+
+        evaluation_batches = _protocol._build_evaluation_batches(text, evaluation_instructions)
+
+        if(max_workers is not None and not isinstance(text, (str, ModelTranslationMessage))):
+
+            def _evaluate(_batch:typing.Tuple[ModelTranslationMessage, SystemTranslationMessage]) -> typing.Union[str, ChatCompletion, None]:
+                _result = _protocol._evaluate_translation(_batch[1], _batch[0])
+                return _result if response_type in ["raw", "raw_json"] else _result.choices[0].message.content
+
+            return _map_in_threads(_evaluate, evaluation_batches, self._default_max_workers(_protocol, max_workers))
+        
+        evaluations = []
+        
+        for _text, _evaluation_instructions in evaluation_batches:
+
+            _result = _protocol._evaluate_translation(_evaluation_instructions, _text)
+
+            evaluation = _result if response_type in ["raw", "raw_json"] else _result.choices[0].message.content
+            
+            evaluations.append(evaluation)
+        
+        ## If originally a single text was provided, return a single evaluation instead of a list
+        result = evaluations if isinstance(text, typing.Iterable) and not isinstance(text, str) else evaluations[0]
+        
+        return result
+    
+##-------------------start-of-openai_evaluate_async()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    async def openai_evaluate_async(self, text:typing.Union[str, typing.Iterable[str], ModelTranslationMessage, typing.Iterable[ModelTranslationMessage]],
+                        override_previous_settings:bool = True,
+                        decorator:typing.Callable | None = None,
+                        logging_directory:str | None = None,
+                        response_type:typing.Literal["text", "raw", "json", "raw_json"] | None = "text",
+                        semaphore:int | None = 5,
+                        evaluation_delay:float | None = None,
+                        evaluation_instructions:str | SystemTranslationMessage | None = None,
+                        model:str="gpt-4",
+                        temperature:float | None | NotGiven = NOT_GIVEN,
+                        top_p:float | None | NotGiven = NOT_GIVEN,
+                        stop:typing.List[str] | None | NotGiven = NOT_GIVEN,
+                        max_tokens:int | None | NotGiven = NOT_GIVEN,
+                        presence_penalty:float | None | NotGiven = NOT_GIVEN,
+                        frequency_penalty:float | None | NotGiven = NOT_GIVEN,
+                        ingestion_window:int | None = None,
+                        journal:EvaluationJournal | None = None,
+                        _protocol:OpenAIServiceProtocol | None = None,
+                        _as_completed:typing.Literal["unordered", "ordered"] | None = None,
+                        _return_exceptions:bool = False,
+                        _token_stream:EvaluationStream | None = None
+                        ) -> typing.Union[typing.List[str], str, typing.List[ChatCompletion], ChatCompletion]:
+        
+        """
+
+        Asynchronous version of openai_evaluate(). 
+        Will generally be faster for iterables. Order is preserved.
+
+        Performs an evaluation on already translated text using the original untranslated text with OpenAI. Your text attribute should contain both.
+
+        This function assumes that the API key has already been set.
+
+        Evaluation instructions default to 'Please suggest a revised of the given text given it's original text and it's evaluation.' if not specified.
+
+        Due to how OpenAI's API works, NOT_GIVEN is treated differently than None. If a parameter is set to NOT_GIVEN, it is not passed to the API. If it is set to None, it is passed to the API as None.
+        
+        This function is not for use for real-time evaluation, nor for generating multiple response candidates. Another function may be implemented for this given demand.
+
+        Parameters:
+        text (string | ModelTranslationMessage | iterable[str] | iterable[ModelTranslationMessage]) : The text to evaluate.  This should be the original untranslated text along with the translated text.        override_previous_settings (bool) : Whether to override the previous settings that were used during the last call to an OpenAI evaluation function.
+        override_previous_settings (bool) : Whether to override the previous settings that were used during the last call to an OpenAI evaluation function.
+        decorator (callable or None) : The decorator to use when evaluating. Typically for exponential backoff retrying. If this is None, OpenAI will retry the request twice if it fails.
+        logging_directory (string or None) : The directory to log to. If None, no logging is done. This'll append the text result and some function information to a file in the specified directory. File is created if it doesn't exist.
+        response_type (literal["text", "raw", "json", "raw_json"]) : The type of response to return. 'text' returns the evaluated text, 'raw' returns the raw response, a ChatCompletion object, 'json' returns a json-parseable string. 'raw_json' returns the raw response, a ChatCompletion object, but with the content as a json-parseable string.
+        semaphore (int) : The number of concurrent requests to make. Default is 5.
+        evaluation_delay (float or None) : If text is an iterable, the delay between each evaluation. Default is none. This is more important for asynchronous evaluations where a semaphore alone may not be sufficient. Ignored for models with a rate limit set through set_rate_limits(), which paces requests without holding a semaphore slot.
+        evaluation_instructions (string or SystemTranslationMessage or None) : The evaluation instructions to use. If None, the default system message is used. If you plan on using the json response type, you must specify that you want a json output and it's format in the instructions. The default system message will ask for a generic json if the response type is json.
+        model (string) : The model to use. (E.g. 'gpt-4', 'gpt-3.5-turbo-0125', 'gpt-4o', etc.)
+        temperature (float) : The temperature to use. The higher the temperature, the more creative the output. Lower temperatures are typically better for evaluation and evaluation.
+        top_p (float) : The nucleus sampling probability. The higher the value, the more words are considered for the next token. Generally, alter this or temperature, not both.
+        stop (list or None) : String sequences that will cause the model to stop evaluation if encountered, generally useless.
+        max_tokens (int or None) : The maximum number of tokens to output.
+        presence_penalty (float) : The presence penalty to use. This penalizes the model from repeating the same content in the output.
+        frequency_penalty (float) : The frequency penalty to use. This penalizes the model from using the same words too frequently in the output.
+        ingestion_window (int or None) : The maximum number of texts admitted at a time. Texts are read, validated and built only as they're admitted, so memory stays O(window) and the first request goes out right away. Used automatically if text is an iterator or async iterable (e.g. a generator, a file or a DB cursor), defaulting to the semaphore. If given for a list, the list is ingested lazily too. Results are returned as a list.
+        journal (EvaluationJournal or None) : Records every response as it lands, so a job that dies partway through can be rerun with the same journal and only sends what didn't finish. See EvaluationJournal.
+
+        Returns:
+        result (string or list - string or ChatCompletion or list - ChatCompletion) : The evaluation result. A list of strings if the input was an iterable, a string otherwise. A list of ChatCompletion objects if the response type is 'raw' and input was an iterable, a ChatCompletion object otherwise.
+
+        """
+                
+        assert response_type in ["text", "raw", "json", "raw_json"], InvalidResponseFormatException("Invalid response type specified. Must be 'text', 'raw', 'json' or 'raw_json'.")
+
+        _protocol = _protocol or self._openai_service
+
+        if(logging_directory is not None):
+            print("Logging directory has been deprecated for openai_evaluate_async().")
+        
+        _settings = _return_curated_openai_settings(locals())
+
+        _validate_elucidate_llm_translation_settings(_settings, "openai")
+
+        _validate_stop_sequences(stop)
+
+        _lazy = not isinstance(text, (str, ModelTranslationMessage)) and (ingestion_window is not None or _is_lazy_iterable(text))
+
+        ## lazy inputs are validated per text as they're admitted
+        if(not _lazy):
+            _validate_text_length(text, model, service="openai", counter=self._token_counter)
+
+        ## Should be done after validating the settings to reduce cost to the user, cached so it isn't a request per call
+        self._credential_cache.verify("openai", self.test_credentials)
+
+        json_mode = True if response_type in ["json", "raw_json"] else False
+        
+        if(override_previous_settings == True):
+            _protocol._set_attributes(model=model,
+                                        temperature=temperature,
+                                        logit_bias=None,
+                                        top_p=top_p,
+                                        n=1,
+                                        stop=stop,
+                                        max_tokens=max_tokens,
+                                        presence_penalty=presence_penalty,
+                                        frequency_penalty=frequency_penalty,
+                                        decorator=decorator,
+                                        semaphore=semaphore,
+                                        rate_limit_delay=evaluation_delay,
+                                        json_mode=json_mode)
+
+            ## Done afterwards, cause default evaluation instructions can change based on set_attributes()
+            evaluation_instructions = evaluation_instructions or _protocol._default_evaluation_instructions
+        
+        else:
+            evaluation_instructions = _protocol._system_message
+
+        ## a single text, streamed for evaluate_token_stream()
+        if(_token_stream is not None):
+            _message, _evaluation_instructions = _protocol._build_evaluation_batches(text, evaluation_instructions)[0]
+            return await _protocol._evaluate_translation_stream(_evaluation_instructions, _message, _token_stream) # type: ignore
+
+        def _extract(_result:ChatCompletion) -> typing.Union[str, ChatCompletion, None]:
+            assert hasattr(_result, "choices"), ElucidateException("Malformed response received. Please try again.")
+            return _result if response_type in ["raw","raw_json"] else _result.choices[0].message.content
+
+        def _request(_index:int, _evaluation_instructions:SystemTranslationMessage, _message:ModelTranslationMessage) -> typing.Awaitable[ChatCompletion]:
+
+            if(journal is None):
+                return _protocol._evaluate_translation_async(_evaluation_instructions, _message)
+
+            return journal._run(str(_index), _openai_request_key(_evaluation_instructions, _message, _protocol), lambda: _protocol._evaluate_translation_async(_evaluation_instructions, _message))
+
+        if(_lazy):
+
+            _indices = itertools.count()
+
+            def _admit(_text:str | ModelTranslationMessage) -> typing.Awaitable[ChatCompletion]:
+                ## taken first, so a text that fails validation still keeps the journal's positions in step with the stream's
+                _index = next(_indices)
+                _validate_text_length(_text, model, service="openai", counter=self._token_counter)
+                _message, _evaluation_instructions = _protocol._build_evaluation_batches(_text, evaluation_instructions)[0]
+                return _request(_index, _evaluation_instructions, _message)
+
+            _stream = _iterate_as_completed(_admit_lazily(text, _admit), _extract, ordered=_as_completed == "ordered", window=ingestion_window or self._default_ingestion_window(_protocol), return_exceptions=_return_exceptions, on_close=journal.flush if journal is not None else None)
+
+            return _stream if _as_completed is not None else await _collect_by_index(_stream) # type: ignore
+
+        assert isinstance(text, str) or _is_iterable_of_strings(text) or isinstance(text, ModelTranslationMessage) or _is_iterable_of_strings(text), InvalidTextInputException("text must be a string, an iterable of strings, a ModelTranslationMessage or an iterable of ModelTranslationMessages.")
+
+        _evaluation_batches = _protocol._build_evaluation_batches(text, evaluation_instructions)
+
+        _evaluation_tasks = []
+
+        for _index, (_text, _evaluation_instructions) in enumerate(_evaluation_batches):
+            _task = _request(_index, _evaluation_instructions, _text)
+            _evaluation_tasks.append(_task)
+
+        if(_as_completed is not None):
+            return _iterate_as_completed(_evaluation_tasks, _extract, ordered=_as_completed == "ordered", return_exceptions=_return_exceptions, on_close=journal.flush if journal is not None else None) # type: ignore
+
+        _results = await asyncio.gather(*_evaluation_tasks)
+
+        if(journal is not None):
+            journal.flush()
+
+        _results:typing.List[ChatCompletion] = _results
+
+        assert all([hasattr(_r, "choices") for _r in _results]), ElucidateException("Malformed response received. Please try again.")
+
+        evaluation = _results if response_type in ["raw","raw_json"] else [result.choices[0].message.content for result in _results if result.choices[0].message.content is not None]
+
+        result = evaluation if isinstance(text, typing.Iterable) and not isinstance(text, str) else evaluation[0]
+
+        return result
+    
+##-------------------start-of-openai_evaluate_batch()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def openai_evaluate_batch(self, text:typing.Union[str, typing.Iterable[str], ModelTranslationMessage, typing.Iterable[ModelTranslationMessage]],
+                              override_previous_settings:bool = True,
+                              response_type:typing.Literal["text", "raw", "json", "raw_json"] | None = "text",
+                              evaluation_instructions:str | SystemTranslationMessage | None = None,
+                              model:str="gpt-4",
+                              temperature:float | None | NotGiven = NOT_GIVEN,
+                              top_p:float | None | NotGiven = NOT_GIVEN,
+                              stop:typing.List[str] | None | NotGiven = NOT_GIVEN,
+                              max_tokens:int | None | NotGiven = NOT_GIVEN,
+                              presence_penalty:float | None | NotGiven = NOT_GIVEN,
+                              frequency_penalty:float | None | NotGiven = NOT_GIVEN,
+                              wait:bool = True,
+                              poll_interval:float = 10.0,
+                              max_poll_interval:float = 300.0,
+                              timeout:float | None = None,
+                              _protocol:OpenAIServiceProtocol | None = None
+                              ) -> typing.Union[BatchResults, str]:
+        
+        """
+
+        Batch API version of openai_evaluate(). For bulk evaluations that don't need answers right away, the Batch API has much higher throughput limits and costs less, but can take up to 24 hours.
+
+        The requests are the same ones openai_evaluate() would send. They're uploaded as a JSONL file and submitted as a single batch.
+
+        Submitting and collecting are separable, so a batch survives process restarts. Pass wait=False to only submit and get the batch id, check on it with openai_batch_status() and collect the results with openai_resume_batch().
+
+        With a recording cassette (see set_cassette()) the results are recorded if wait is True. Results collected later with openai_resume_batch() aren't, the requests aren't known there. With a replaying cassette nothing is submitted, the recorded results are returned right away whatever wait is.
+
+        Parameters:
+        text (string | ModelTranslationMessage | iterable[str] | iterable[ModelTranslationMessage]) : The text to evaluate. This should be the original untranslated text along with the translated text.
+        override_previous_settings (bool) : Whether to override the previous settings that were used during the last call to an OpenAI evaluation function.
+        response_type (literal["text", "raw", "json", "raw_json"]) : The type of response to return. 'text' returns the evaluated text, 'raw' returns the raw response, a ChatCompletion object, 'json' returns a json-parseable string. 'raw_json' returns the raw response, a ChatCompletion object, but with the content as a json-parseable string.
+        evaluation_instructions (string or SystemTranslationMessage or None) : The evaluation instructions to use. If None, the default system message is used.
+        model (string) : The model to use. (E.g. 'gpt-4', 'gpt-3.5-turbo-0125', 'gpt-4o', etc.)
+        temperature (float) : The temperature to use.
+        top_p (float) : The nucleus sampling probability.
+        stop (list or None) : String sequences that will cause the model to stop evaluation if encountered.
+        max_tokens (int or None) : The maximum number of tokens to output.
+        presence_penalty (float) : The presence penalty to use.
+        frequency_penalty (float) : The frequency penalty to use.
+        wait (bool) : Whether to wait for the batch to finish and return the results. If False, the batch id is returned right after submitting.
+        poll_interval (float) : The first wait between status checks, in seconds. Each wait is 1.5 times longer than the last.
+        max_poll_interval (float) : The longest wait between status checks, in seconds.
+        timeout (float or None) : How long to wait before raising. The batch keeps running and can be resumed with openai_resume_batch(). None waits forever.
+
+        Returns:
+        result (BatchResults or string) : If wait is True, the evaluations in input order, a list of strings or ChatCompletion objects depending on response_type. Items that failed are None and their errors are in result.errors. If wait is False, the batch id.
+
+        """
+        
+        assert response_type in ["text", "raw", "json", "raw_json"], InvalidResponseFormatException("Invalid response type specified. Must be 'text', 'raw', 'json' or 'raw_json'.")
+
+        _protocol = _protocol or self._openai_service
+
+        _settings = _return_curated_openai_settings(locals())
+
+        _validate_elucidate_llm_translation_settings(_settings, "openai")
+
+        _validate_stop_sequences(stop)
+
+        _validate_text_length(text, model, service="openai", counter=self._token_counter)
+
+        ## Should be done after validating the settings to reduce cost to the user, cached so it isn't a request per call
+        self._credential_cache.verify("openai", self.test_credentials)
+
+        json_mode = True if response_type in ["json", "raw_json"] else False
+        
+        if(override_previous_settings == True):
+            _protocol._set_attributes(model=model,
+                                        temperature=temperature,
+                                        logit_bias=None,
+                                        top_p=top_p,
+                                        n=1,
+                                        stop=stop,
+                                        max_tokens=max_tokens,
+                                        presence_penalty=presence_penalty,
+                                        frequency_penalty=frequency_penalty,
+                                        decorator=None,
+                                        semaphore=None,
+                                        rate_limit_delay=None,
+                                        json_mode=json_mode)
+
+            ## Done afterwards, cause default evaluation instructions can change based on set_attributes()
+            evaluation_instructions = evaluation_instructions or _protocol._default_evaluation_instructions
+        
+        else:
+            evaluation_instructions = _protocol._system_message
+
+        assert isinstance(text, str) or _is_iterable_of_strings(text) or isinstance(text, ModelTranslationMessage) or _is_iterable_of_strings(text), InvalidTextInputException("text must be a string, an iterable of strings, a ModelTranslationMessage or an iterable of ModelTranslationMessages.")
+
+        _evaluation_batches = _protocol._build_evaluation_batches(text, evaluation_instructions)
+
+        _cassette = _protocol._cassette
+        _fingerprints = [_openai_request_key(_instructions, _text, _protocol) for _text, _instructions in _evaluation_batches] if _cassette is not None else None
+
+        ## nothing is submitted when replaying, so there's no batch to wait for or resume
+        if(_cassette is not None and _fingerprints is not None and _cassette.replaying):
+            return _openai_finish_batch_results(_cassette._replay_batch(_fingerprints), str(response_type))
+
+        ## kept with the batch so openai_resume_batch() only needs the id
+        _metadata = {"elucidate_response_type": str(response_type), "elucidate_count": str(len(_evaluation_batches))}
+
+        _batch_id = _openai_submit_batch(_openai_build_batch_file(_evaluation_batches, service=_protocol), _metadata, service=_protocol)
+
+        if(not wait):
+            return _batch_id
+
+        return self.openai_resume_batch(_batch_id, poll_interval=poll_interval, max_poll_interval=max_poll_interval, timeout=timeout, _protocol=_protocol, _fingerprints=_fingerprints)
+    
+##-------------------start-of-openai_batch_status()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def openai_batch_status(self, batch_id:str, _protocol:OpenAIServiceProtocol | None = None) -> str:
+
+        """
+
+        Returns the status of a batch submitted with openai_evaluate_batch(). (E.g. 'validating', 'in_progress', 'finalizing', 'completed', 'failed', 'expired', 'cancelled')
+
+        Parameters:
+        batch_id (string) : The id of the batch.
+
+        Returns:
+        status (string) : The status.
+
+        """
+
+        _protocol = _protocol or self._openai_service
+
+        return _protocol._sync_client.batches.retrieve(batch_id).status
+    
+##-------------------start-of-openai_resume_batch()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def openai_resume_batch(self, batch_id:str,
+                            poll_interval:float = 10.0,
+                            max_poll_interval:float = 300.0,
+                            timeout:float | None = None,
+                            _protocol:OpenAIServiceProtocol | None = None,
+                            _fingerprints:typing.Sequence[str] | None = None
+                            ) -> BatchResults:
+
+        """
+
+        Waits for a batch submitted with openai_evaluate_batch() to finish and returns its results. Works from a different process than the one that submitted the batch.
+
+        Parameters:
+        batch_id (string) : The id of the batch.
+        poll_interval (float) : The first wait between status checks, in seconds. Each wait is 1.5 times longer than the last.
+        max_poll_interval (float) : The longest wait between status checks, in seconds.
+        timeout (float or None) : How long to wait before raising. The batch keeps running and can be resumed again. None waits forever.
+
+        Returns:
+        result (BatchResults) : The evaluations in input order, with the response type the batch was submitted with. Items that failed are None and their errors are in result.errors.
+
+        """
+
+        _protocol = _protocol or self._openai_service
+
+        _batch = _openai_wait_for_batch(batch_id, poll_interval=poll_interval, max_poll_interval=max_poll_interval, timeout=timeout, service=_protocol)
+
+        _metadata = _batch.metadata or {}
+
+        assert "elucidate_count" in _metadata, ElucidateException(f"Batch {batch_id} was not submitted by openai_evaluate_batch().")
+
+        _response_type = _metadata.get("elucidate_response_type", "text")
+
+        _results = _openai_collect_batch_results(_batch, int(_metadata["elucidate_count"]), service=_protocol)
+
+        if(_protocol._cassette is not None and _fingerprints is not None):
+            _protocol._cassette._record_batch(_fingerprints, _results)
+
+        return _openai_finish_batch_results(_results, _response_type)
+    
+##-------------------start-of-gemini_evaluate()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def gemini_evaluate(self, text:typing.Union[str, typing.Iterable[str]],
+                        override_previous_settings:bool = True,
+                        decorator:typing.Callable | None = None,
+                        logging_directory:str | None = None,
+                        response_type:typing.Literal["text", "raw", "json", "raw_json"] | None = "text",
+                        response_schema:str | typing.Mapping[str, typing.Any] | None = None,
+                        evaluation_delay:float | None = None,
+                        evaluation_instructions:str | None = None,
+                        model:str="gemini-pro",
+                        temperature:float=0.5,
+                        top_p:float=0.9,
+                        top_k:int=40,
+                        stop_sequences:typing.List[str] | None=None,
+                        max_output_tokens:int | None=None,
+                        max_workers:int | None = None,
+                        _protocol:GeminiServiceProtocol | None = None
+                        ) -> typing.Union[typing.List[str], str, GenerateContentResponse, typing.List[GenerateContentResponse]]:
+        
+        """
+
+        Performs an evaluation on already translated text using the original untranslated text with Gemini. Your text attribute should contain both.
+
+        This function assumes that the API key has already been set.
+
+        Evaluation instructions default to 'Please suggest a revised of the given text given it's original text and it's evaluation.' if not specified.
+        
+        This function is not for use for real-time evaluation, nor for generating multiple response candidates. Another function may be implemented for this given demand.
+
+        Parameters:
+        text (string | iterable[str]) : The text to evaluate.  This should be the original untranslated text along with the translated text.
+        override_previous_settings (bool) : Whether to override the previous settings that were used during the last call to a Gemini evaluation function.
+        decorator (callable or None) : The decorator to use when evaluating. Typically for exponential backoff retrying. If this is None, Gemini will retry the request twice if it fails.
+        logging_directory (string or None) : The directory to log to. If None, no logging is done. This'll append the text result and some function information to a file in the specified directory. File is created if it doesn't exist.
+        response_type (literal["text", "raw", "json", "raw_json"]) : The type of response to return. 'text' returns the evaluated text, 'raw' returns the raw response, a GenerateContentResponse object, 'json' returns a json-parseable string. 'raw_json' returns the raw response, a GenerateContentResponse object, but with the content as a json-parseable string.
+        response_schema (string or mapping or None) : The schema to use for the response. If None, no schema is used. This is only used if the response type is 'json' or 'json_raw'. Elucidate only validates the schema to the extend that it is None or a valid json. It does not validate the contents of the json.4
+        evaluation_delay (float or None) : If text is an iterable, the delay between each evaluation. Default is none. This is more important for asynchronous evaluations where a semaphore alone may not be sufficient.
+        evaluation_instructions (string or None) : The evaluation instructions to use. If None, the default system message is used. If you plan on using the json response type, you must specify that you want a json output and it's format in the instructions. The default system message will ask for a generic json if the response type is json.
+        model (string) : The model to use. (E.g. 'gemini-pro', 'gemini-1.5-pro', 'gemini-1.5-flash', etc.)
+        temperature (float) : The temperature to use. The higher the temperature, the more creative the output. Lower temperatures are typically better for evaluation and evaluation.
+        top_p (float) : The nucleus sampling probability. The higher the value, the more words are considered for the next token. Generally, alter this or temperature, not both.
+        top_k (int) : The top k sampling probability. The higher the value, the more words are considered for the next token. Generally, alter this or temperature, not both.
+        stop_sequences (list or None) : String sequences that will cause the model to stop evaluation if encountered, generally useless.
+        max_output_tokens (int or None) : The maximum number of tokens to output.
+        max_workers (int or None) : If set, texts are evaluated on a thread pool of this many threads instead of one at a time, capped at the learned limit if adaptive concurrency is enabled. Order is preserved and rate limits set with set_rate_limits() still apply. A failing text doesn't stop the others, a BatchResults is returned with failed texts set to None and their errors in result.errors.
+
+        Returns:
+        result (string or list - string or GenerateContentResponse or list - GenerateContentResponse) : The evaluation result. A list of strings if the input was an iterable, a string otherwise. A list of GenerateContentResponse objects if the response type is 'raw' and input was an iterable, a GenerateContentResponse object otherwise.
+
+        """
+
+        assert response_type in ["text", "raw", "json", "raw_json"], InvalidResponseFormatException("Invalid response type specified. Must be 'text', 'raw', 'json' or 'raw_json'.")
+
+        _protocol = _protocol or self._gemini_service
+
+        if(logging_directory is not None):
+            print("Logging directory has been deprecated for gemini_evaluate().")
+
+        _settings = _return_curated_gemini_settings(locals())
+
+        _validate_elucidate_llm_translation_settings(_settings, "gemini")
+
+        _validate_stop_sequences(stop_sequences)
+
+        _validate_text_length(text, model, service="gemini", counter=self._token_counter)
+
+        response_schema = _validate_response_schema(response_schema)
+
+        ## Should be done after validating the settings to reduce cost to the user, cached so it isn't a request per call
+        self._credential_cache.verify("gemini", self.test_credentials)
+
+        json_mode = True if response_type in ["json", "raw_json"] else False
+
+        if(override_previous_settings == True):
+            _protocol._set_attributes(model=model,
+                                          system_message=evaluation_instructions,
+                                          temperature=temperature,
+                                          top_p=top_p,
+                                          top_k=top_k,
+                                          candidate_count=1,
+                                          stream=False,
+                                          stop_sequences=stop_sequences,
+                                          max_output_tokens=max_output_tokens,
+                                          decorator=decorator,
+                                          semaphore=None,
+                                          rate_limit_delay=evaluation_delay,
+                                          json_mode=json_mode,
+                                          response_schema=response_schema)
+            
+            ## Done afterwards, cause default evaluation instructions can change based on set_attributes()       
+            _protocol._system_message = evaluation_instructions or _protocol._default_evaluation_instructions
+        
+        if(isinstance(text, str)):
+            _result = _protocol._evaluate_translation(text)
+            
+            assert not isinstance(_result, list) and hasattr(_result, "text"), ElucidateException("Malformed response received. Please try again.")
+            
+            result = _result if response_type in ["raw", "raw_json"] else _result.text
+
+        elif(_is_iterable_of_strings(text) and max_workers is not None):
+
+            def _evaluate(_text:str) -> typing.Union[str, GenerateContentResponse]:
+                _result = _protocol._evaluate_translation(_text)
+                assert hasattr(_result, "text"), ElucidateException("Malformed response received. Please try again.")
+                return _result.text if response_type in ["text", "json"] else _result
+
+            result = _map_in_threads(_evaluate, list(text), self._default_max_workers(_protocol, max_workers))
+
+        elif(_is_iterable_of_strings(text)):
+            
+            _results = [_protocol._evaluate_translation(_text) for _text in text]
+
+            assert isinstance(_results, list) and all([hasattr(_r, "text") for _r in _results]), ElucidateException("Malformed response received. Please try again.")
+
+            result = [_r.text for _r in _results] if response_type in ["text","json"] else _results # type: ignore
+            
+        else:
+            raise InvalidTextInputException("text must be a string or an iterable of strings.")
+        
+        return result
+    
+##-------------------start-of-gemini_evaluate_async()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+    
+    async def gemini_evaluate_async(self, text:typing.Union[str, typing.Iterable[str]],
+                                    override_previous_settings:bool = True,
+                                    decorator:typing.Callable | None = None,
+                                    logging_directory:str | None = None,
+                                    response_type:typing.Literal["text", "raw", "json", "raw_json"] | None = "text",
+                                    response_schema:str | typing.Mapping[str, typing.Any] | None = None,
+                                    semaphore:int | None = 5,
+                                    evaluation_delay:float | None = None,
+                                    evaluation_instructions:str | None = None,
+                                    model:str="gemini-pro",
+                                    temperature:float=0.5,
+                                    top_p:float=0.9,
+                                    top_k:int=40,
+                                    stop_sequences:typing.List[str] | None=None,
+                                    max_output_tokens:int | None=None,
+                                    ingestion_window:int | None = None,
+                                    journal:EvaluationJournal | None = None,
+                                    _protocol:GeminiServiceProtocol | None = None,
+                                    _as_completed:typing.Literal["unordered", "ordered"] | None = None,
+                                    _return_exceptions:bool = False,
+                                    _token_stream:EvaluationStream | None = None
+                                    ) -> typing.Union[typing.List[str], str, AsyncGenerateContentResponse, typing.List[AsyncGenerateContentResponse]]:
+        
+        """
+
+        Asynchronous version of gemini_evaluate().
+        Will generally be faster for iterables. Order is preserved.
+
+        Performs an evaluation on already translated text using the original untranslated text with Gemini. Your text attribute should contain both.
+
+        This function assumes that the API key has already been set.
+
+        Evaluation instructions default to 'Please suggest a revised of the given text given it's original text and it's evaluation.' if not specified.
+
+        This function is not for use for real-time evaluation, nor for generating multiple response candidates. Another function may be implemented for this given demand.
+
+        Parameters:
+        text (string | iterable[str]) : The text to evaluate.  This should be the original untranslated text along with the translated text.
+        override_previous_settings (bool) : Whether to override the previous settings that were used during the last call to a Gemini evaluation function.
+        decorator (callable or None) : The decorator to use when evaluating. Typically for exponential backoff retrying. If this is None, Gemini will retry the request twice if it fails.
+        logging_directory (string or None) : The directory to log to. If None, no logging is done. This'll append the text result and some function information to a file in the specified directory. File is created if it doesn't exist.
+        response_type (literal["text", "raw", "json", "raw_json"]) : The type of response to return. 'text' returns the evaluated text, 'raw' returns the raw response, a GenerateContentResponse object, 'json' returns a json-parseable string. 'raw_json' returns the raw response, a GenerateContentResponse object, but with the content as a json-parseable string.
+        response_schema (string or mapping or None) : The schema to use for the response. If None, no schema is used. This is only used if the response type is 'json' or 'json_raw'. Elucidate only validates the schema to the extend that it is None or a valid json.4
+        semaphore (int) : The number of concurrent requests to make. Default is 5.
+        evaluation_delay (float or None) : If text is an iterable, the delay between each evaluation. Default is none. This is more important for asynchronous evaluations where a semaphore alone may not be sufficient. Ignored for models with a rate limit set through set_rate_limits(), which paces requests without holding a semaphore slot.
+        evaluation_instructions (string or None) : The evaluation instructions to use. If None, the default system message is used. If you plan on using the json response type, you must specify that you want a json output and it's format in the instructions. The default system message will ask for a generic json if the response type is json.
+        model (string) : The model to use. (E.g. 'gemini-pro', 'gemini-1.5-pro', 'gemini-1.5-flash', etc.)
+        temperature (float) : The temperature to use. The higher the temperature, the more creative the output. Lower temperatures are typically better for evaluation and evaluation.
+        top_p (float) : The nucleus sampling probability. The higher the value, the more words are considered for the next token. Generally, alter this or temperature, not both.
+        top_k (int) : The top k sampling probability. The higher the value, the more words are considered for the next token. Generally, alter this or temperature, not both.
+        stop_sequences (list or None) : String sequences that will cause the model to stop evaluation if encountered, generally useless.
+        max_output_tokens (int or None) : The maximum number of tokens to output.
+        ingestion_window (int or None) : The maximum number of texts admitted at a time. Texts are read, validated and built only as they're admitted, so memory stays O(window) and the first request goes out right away. Used automatically if text is an iterator or async iterable (e.g. a generator, a file or a DB cursor), defaulting to the semaphore. If given for a list, the list is ingested lazily too. Results are returned as a list.
+        journal (EvaluationJournal or None) : Records every response as it lands, so a job that dies partway through can be rerun with the same journal and only sends what didn't finish. See EvaluationJournal.
+
+        Returns:
+        result (string or list - string or GenerateContentResponse or list - GenerateContentResponse) : The evaluation result. A list of strings if the input was an iterable, a string otherwise. A list of GenerateContentResponse objects if the response type is 'raw' and input was an iterable, a GenerateContentResponse object otherwise.
+
+        """
+
+        assert response_type in ["text", "raw", "json", "raw_json"], InvalidResponseFormatException("Invalid response type specified. Must be 'text', 'raw', 'json' or 'raw_json'.")
+
+        _protocol = _protocol or self._gemini_service
+
+        if(logging_directory is not None):
+            print("Logging directory has been deprecated for gemini_evaluate_async().")
+
+        _settings = _return_curated_gemini_settings(locals())
+
+        _validate_elucidate_llm_translation_settings(_settings, "gemini")
+
+        _validate_stop_sequences(stop_sequences)
+
+        _lazy = not isinstance(text, (str, ModelTranslationMessage)) and (ingestion_window is not None or _is_lazy_iterable(text))
+
+        ## lazy inputs are validated per text as they're admitted
+        if(not _lazy):
+            _validate_text_length(text, model, service="gemini", counter=self._token_counter)
+
+        response_schema = _validate_response_schema(response_schema)
+
+        ## Should be done after validating the settings to reduce cost to the user, cached so it isn't a request per call
+        self._credential_cache.verify("gemini", self.test_credentials)
+
+        json_mode = True if response_type in ["json", "raw_json"] else False
+
+        if(override_previous_settings == True):
+            _protocol._set_attributes(model=model,
+                                          system_message=evaluation_instructions,
+                                          temperature=temperature,
+                                          top_p=top_p,
+                                          top_k=top_k,
+                                          candidate_count=1,
+                                          stream=False,
+                                          stop_sequences=stop_sequences,
+                                          max_output_tokens=max_output_tokens,
+                                          decorator=decorator,
+                                          semaphore=semaphore,
+                                          rate_limit_delay=evaluation_delay,
+                                          json_mode=json_mode,
+                                          response_schema=response_schema)
+            
+            ## Done afterwards, cause default evaluation instructions can change based on set_attributes()
+            _protocol._system_message = evaluation_instructions or _protocol._default_evaluation_instructions
+
+        ## a single text, streamed for evaluate_token_stream()
+        if(_token_stream is not None):
+            assert isinstance(text, str), InvalidTextInputException("text must be a string.")
+            return await _protocol._evaluate_translation_stream(text, _token_stream) # type: ignore
+
+        def _extract(_result:AsyncGenerateContentResponse) -> typing.Union[str, AsyncGenerateContentResponse]:
+            assert hasattr(_result, "text"), ElucidateException("Malformed response received. Please try again.")
+            return _result if response_type in ["raw", "raw_json"] else _result.text
+
+        ## the request keys include the client fingerprint, which is only brought up to date when the client is rebuilt
+        if(journal is not None):
+            _protocol._redefine_client()
+
+        def _request(_index:int, _text:str) -> typing.Awaitable[AsyncGenerateContentResponse]:
+
+            if(journal is None):
+                return _protocol._evaluate_translation_async(_text)
+
+            return journal._run(str(_index), _gemini_request_key(_text, _protocol), lambda: _protocol._evaluate_translation_async(_text))
+
+        if(_lazy):
+
+            _indices = itertools.count()
+
+            def _admit(_text:str) -> typing.Awaitable[AsyncGenerateContentResponse]:
+                ## taken first, so a text that fails validation still keeps the journal's positions in step with the stream's
+                _index = next(_indices)
+                assert isinstance(_text, str), InvalidTextInputException("text must be a string or an iterable of strings.")
+                _validate_text_length(_text, model, service="gemini", counter=self._token_counter)
+                return _request(_index, _text)
+
+            _stream = _iterate_as_completed(_admit_lazily(text, _admit), _extract, ordered=_as_completed == "ordered", window=ingestion_window or self._default_ingestion_window(_protocol), return_exceptions=_return_exceptions, on_close=journal.flush if journal is not None else None)
+
+            return _stream if _as_completed is not None else await _collect_by_index(_stream) # type: ignore
+
+        if(_as_completed is not None):
+
+            assert isinstance(text, str) or _is_iterable_of_strings(text), InvalidTextInputException("text must be a string or an iterable of strings.")
+
+            _texts = [text] if isinstance(text, str) else text
+
+            return _iterate_as_completed((_request(_index, _text) for _index, _text in enumerate(_texts)), _extract, ordered=_as_completed == "ordered", return_exceptions=_return_exceptions, on_close=journal.flush if journal is not None else None) # type: ignore
+
+        if(isinstance(text, str)):
+            _result = await _request(0, text)
+
+            result = _result if response_type in ["raw", "raw_json"] else _result.text
+            
+        elif(_is_iterable_of_strings(text)):
+            _tasks = [_request(_index, _text) for _index, _text in enumerate(text)]
+            _results = await asyncio.gather(*_tasks)
+
+            result = [_r.text for _r in _results] if response_type in ["text","json"] else _results # type: ignore
+
+        else:
+            raise InvalidTextInputException("text must be a string or an iterable of strings.")
+
+        if(journal is not None):
+            journal.flush()
+        
+        return result
+
+##-------------------start-of-anthropic_evaluate()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------    
+
+    def anthropic_evaluate(self, text:typing.Union[str, typing.Iterable[str], ModelTranslationMessage, typing.Iterable[ModelTranslationMessage]],
+                            override_previous_settings:bool = True,
+                            decorator:typing.Callable | None = None,
+                            logging_directory:str | None = None,
+                            response_type:typing.Literal["text", "raw", "json", "raw_json"] | None = "text",
+                            response_schema:str | typing.Mapping[str, typing.Any] | None = None,
+                            evaluation_delay:float | None = None,
+                            evaluation_instructions:str | None = None,
+                            model:str="claude-3-haiku-20240307",
+                            temperature:float | NotGiven = NOT_GIVEN,
+                            top_p:float | NotGiven = NOT_GIVEN,
+                            top_k:int | NotGiven = NOT_GIVEN,
+                            stop_sequences:typing.List[str] | NotGiven = NOT_GIVEN,
+                            max_output_tokens:int | NotGiven = NOT_GIVEN,
+                            cache_instructions:bool = False,
+                            shared_context:str | None = None,
+                            max_workers:int | None = None,
+                            _protocol:AnthropicServiceProtocol | None = None
+                            ) -> typing.Union[typing.List[str], str, AnthropicMessage, typing.List[AnthropicMessage]]:
+        
+        """
+        
+        Performs an evaluation on already translated text using the original untranslated text with Anthropic. Your text attribute should contain both.
+
+        This function assumes that the API key has already been set.
+
+        Evaluation instructions default to 'Please suggest a revised of the given text given it's original text and it's evaluation.' if not specified.
+
+        This function is not for use for real-time evaluation, nor for generating multiple response candidates. Another function may be implemented for this given demand.
+
+        Parameters:
+        text (string | ModelTranslationMessage | iterable[str] | iterable[ModelTranslationMessage]) : The text to evaluate.  This should be the original untranslated text along with the translated text.
+        override_previous_settings (bool) : Whether to override the previous settings that were used during the last call to an Anthropic evaluation function.
+        decorator (callable or None) : The decorator to use when evaluating. Typically for exponential backoff retrying. If this is None, Anthropic will retry the request twice if it fails.
+        logging_directory (string or None) : The directory to log to. If None, no logging is done. This'll append the text result and some function information to a file in the specified directory. File is created if it doesn't exist.
+        response_type (literal["text", "raw", "json", "raw_json"]) : The type of response to return. 'text' returns the evaluated text, 'raw' returns the raw response, a AnthropicMessage object, 'json' returns a json-parseable string. 'raw_json' returns the raw response, a AnthropicMessage object, but with the content as a json-parseable string.
+        response_schema (string or mapping or None) : The schema to use for the response. If None, no schema is used. This is only used if the response type is 'json' or 'json_raw'. Elucidate only validates the schema to the extend that it is None or a valid json.
+        evaluation_delay (float or None) : If text is an iterable, the delay between each evaluation. Default is none. This is more important for asynchronous evaluations where a semaphore alone may not be sufficient.
+        evaluation_instructions (string or None) : The evaluation instructions to use. If None, the default system message is used. If you plan on using the json response type, you must specify that you want a json output and it's format in the instructions. The default system message will ask for a generic json if the response type is json.
+        model (string) : The model to use. (E.g. 'claude-3-haiku-20240307', 'claude-3-haiku-20240307', 'claude-3-haiku-20240307', etc.)
+        temperature (float) : The temperature to use. The higher the temperature, the more creative the output. Lower temperatures are typically better for evaluation and evaluation.
+        top_p (float) : The nucleus sampling probability. The higher the value, the more words are considered for the next token. Generally, alter this or temperature, not both.
+        top_k (int) : The top k sampling probability. The higher the value, the more words are considered for the next token. Generally, alter this or temperature, not both.
+        stop_sequences (list or None) : String sequences that will cause the model to stop evaluation if encountered, generally useless.
+        max_output_tokens (int or None) : The maximum number of tokens to output.
+        cache_instructions (bool) : Whether to mark the system prompt for Anthropic's prompt caching, so long instructions are only paid for in full once every few minutes instead of on every request. They have to be at least 1024 tokens long (2048 for Haiku models) to be cached.
+        shared_context (string or None) : Context shared by every text, such as a style guide or glossary, sent as a second system block after the instructions. Cached along with them if cache_instructions is True.
+        max_workers (int or None) : If set, texts are evaluated on a thread pool of this many threads instead of one at a time, capped at the learned limit if adaptive concurrency is enabled. Order is preserved and rate limits set with set_rate_limits() still apply. A failing text doesn't stop the others, a BatchResults is returned with failed texts set to None and their errors in result.errors.
+        
+        Returns:
+        result (string or list - string or AnthropicMessage or list - AnthropicMessage) : The evaluation result. A list of strings if the input was an iterable, a string otherwise. A list of AnthropicMessage objects if the response type is 'raw' and input was an iterable, a AnthropicMessage object otherwise.
+
+        """
+
+        assert response_type in ["text", "raw", "json", "raw_json"], InvalidResponseFormatException("Invalid response type specified. Must be 'text', 'raw', 'json' or 'raw_json'.")
+
+        _protocol = _protocol or self._anthropic_service
+
+        if(logging_directory is not None):
+            print("Logging directory has been deprecated for anthropic_evaluate().")
+
+        _settings = _return_curated_anthropic_settings(locals())
+
+        _validate_elucidate_llm_translation_settings(_settings, "anthropic")
+
+        _validate_stop_sequences(stop_sequences)
+
+        _validate_text_length(text, model, service="anthropic", counter=self._token_counter)
+
+        response_schema = _validate_response_schema(response_schema)
+
+        ## Should be done after validating the settings to reduce cost to the user, cached so it isn't a request per call
+        self._credential_cache.verify("anthropic", self.test_credentials)
+
+        ## counted per call, so calls running at the same time don't add to each other's
+        _usage = _start_call_usage(_protocol)
+
+        json_mode = True if response_type in ["json", "raw_json"] else False
+
+        if(override_previous_settings == True):
+            _protocol._set_attributes(model=model,
+                                            system=evaluation_instructions,
+                                            temperature=temperature,
+                                            top_p=top_p,
+                                            top_k=top_k,
+                                            stop_sequences=stop_sequences,
+                                            stream=False,
+                                            max_tokens=max_output_tokens,
+                                            decorator=decorator,
+                                            semaphore=None,
+                                            rate_limit_delay=evaluation_delay,
+                                            json_mode=json_mode,
+                                            response_schema=response_schema)
+            
+            ## Done afterwards, cause default evaluation instructions can change based on set_attributes()
+            _protocol._system = evaluation_instructions or _protocol._default_evaluation_instructions
+            _protocol._prompt_caching = cache_instructions
+            _protocol._shared_context = shared_context
+
+        assert isinstance(text, str) or _is_iterable_of_strings(text) or isinstance(text, ModelTranslationMessage) or _is_iterable_of_strings(text), InvalidTextInputException("text must be a string, an iterable of strings, a ModelTranslationMessage or an iterable of ModelTranslationMessages.")
+
+        _evaluation_batches = _protocol._build_evaluation_batches(text)
+
+        def _evaluate(_text:ModelTranslationMessage) -> typing.Any:
+
+            ## set in the thread the request runs in
+            _call_usage.set(_usage)
+
+            _result = _protocol._evaluate_translation(_protocol._system, _text)
+
+            assert not isinstance(_result, list) and hasattr(_result, "content"), ElucidateException("Malformed response received. Please try again.")
+
+            if(response_type in ["raw", "raw_json"]):
+                evaluation = _result
+
+            ## response structure can vary if tools are used
+            else:
+                content = _result.content
+
+                if(isinstance(content[0], AnthropicTextBlock)):
+                    evaluation = content[0].text
+
+                elif(isinstance(content[0], AnthropicToolUseBlock)):
+                    evaluation = content[0].input
+
+            return evaluation
+
+        if(max_workers is not None and not isinstance(text, (str, ModelTranslationMessage))):
+            return _map_in_threads(_evaluate, _evaluation_batches, self._default_max_workers(_protocol, max_workers))
+
+        _evaluation = [_evaluate(_text) for _text in _evaluation_batches]
+
+        ## If originally a single text was provided, return a single evaluation instead of a list
+        result = _evaluation if isinstance(text, typing.Iterable) and not isinstance(text, str) else _evaluation[0]
+
+        return result
+    
+##-------------------start-of-anthropic_evaluate_async()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    async def anthropic_evaluate_async(self, text:typing.Union[str, typing.Iterable[str], ModelTranslationMessage, typing.Iterable[ModelTranslationMessage]],
+                                        override_previous_settings:bool = True,
+                                        decorator:typing.Callable | None = None,
+                                        logging_directory:str | None = None,
+                                        response_type:typing.Literal["text", "raw", "json", "raw_json"] | None = "text",
+                                        response_schema:str | typing.Mapping[str, typing.Any] | None = None,
+                                        semaphore:int | None = 5,
+                                        evaluation_delay:float | None = None,
+                                        evaluation_instructions:str | None = None,
+                                        model:str="claude-3-haiku-20240307",
+                                        temperature:float | NotGiven = NOT_GIVEN,
+                                        top_p:float | NotGiven = NOT_GIVEN,
+                                        top_k:int | NotGiven = NOT_GIVEN,
+                                        stop_sequences:typing.List[str] | NotGiven = NOT_GIVEN,
+                                        max_output_tokens:int | NotGiven = NOT_GIVEN,
+                                        cache_instructions:bool = False,
+                                        shared_context:str | None = None,
+                                        ingestion_window:int | None = None,
+                                        journal:EvaluationJournal | None = None,
+                                        _protocol:AnthropicServiceProtocol | None = None,
+                                        _as_completed:typing.Literal["unordered", "ordered"] | None = None,
+                                        _return_exceptions:bool = False,
+                                        _token_stream:EvaluationStream | None = None
+                                        ) -> typing.Union[typing.List[str], str, AnthropicMessage, typing.List[AnthropicMessage]]:
+        """
+
+        Asynchronous version of anthropic_evaluate().
+        Will generally be faster for iterables. Order is preserved.
+
+        Performs an evaluation on already translated text using the original untranslated text with Anthropic. Your text attribute should contain both.
+
+        This function assumes that the API key has already been set.
+
+        Evaluation instructions default to 'Please suggest a revised of the given text given it's original text and it's evaluation.' if not specified.
+
+        This function is not for use for real-time evaluation, nor for generating multiple response candidates. Another function may be implemented for this given demand.
+
+        Parameters:
+        text (string | ModelTranslationMessage | iterable[str] | iterable[ModelTranslationMessage]) : The text to evaluate.  This should be the original untranslated text along with the translated text.
+        override_previous_settings (bool) : Whether to override the previous settings that were used during the last call to an Anthropic evaluation function.
+        decorator (callable or None) : The decorator to use when evaluating. Typically for exponential backoff retrying. If this is None, Anthropic will retry the request twice if it fails.
+        logging_directory (string or None) : The directory to log to. If None, no logging is done. This'll append the text result and some function information to a file in the specified directory. File is created if it doesn't exist.
+        response_type (literal["text", "raw", "json", "raw_json"]) : The type of response to return. 'text' returns the evaluated text, 'raw' returns the raw response, a AnthropicMessage object, 'json' returns a json-parseable string. 'raw_json' returns the raw response, a AnthropicMessage object, but with the content as a json-parseable string.
+        response_schema (string or mapping or None) : The schema to use for the response. If None, no schema is used. This is only used if the response type is 'json' or 'json_raw'. Elucidate only validates the schema to the extend that it is None or a valid json.
+        semaphore (int) : The number of concurrent requests to make. Default is 5.
+        evaluation_delay (float or None) : If text is an iterable, the delay between each evaluation. Default is none. This is more important for asynchronous evaluations where a semaphore alone may not be sufficient. Ignored for models with a rate limit set through set_rate_limits(), which paces requests without holding a semaphore slot.
+        evaluation_instructions (string or None) : The evaluation instructions to use. If None, the default system message is used. If you plan on using the json response type, you must specify that you want a json output and it's format in the instructions. The default system message will ask for a generic json if the response type is json.
+        model (string) : The model to use. (E.g. 'claude-3-haiku-20240307', 'claude-3-haiku-20240307', 'claude-3-haiku-20240307', etc.)
+        temperature (float) : The temperature to use. The higher the temperature, the more creative the output. Lower temperatures are typically better for evaluation and evaluation.
+        top_p (float) : The nucleus sampling probability. The higher the value, the more words are considered for the next token. Generally, alter this or temperature, not both.
+        top_k (int) : The top k sampling probability. The higher the value, the more words are considered for the next token. Generally, alter this or temperature, not both.
+        stop_sequences (list or None) : String sequences that will cause the model to stop evaluation if encountered, generally useless.
+        max_output_tokens (int or None) : The maximum number of tokens to output.
+        cache_instructions (bool) : Whether to mark the system prompt for Anthropic's prompt caching, so long instructions are only paid for in full once every few minutes instead of on every request. They have to be at least 1024 tokens long (2048 for Haiku models) to be cached.
+        shared_context (string or None) : Context shared by every text, such as a style guide or glossary, sent as a second system block after the instructions. Cached along with them if cache_instructions is True.
+        ingestion_window (int or None) : The maximum number of texts admitted at a time. Texts are read, validated and built only as they're admitted, so memory stays O(window) and the first request goes out right away. Used automatically if text is an iterator or async iterable (e.g. a generator, a file or a DB cursor), defaulting to the semaphore. If given for a list, the list is ingested lazily too. Results are returned as a list.
+        journal (EvaluationJournal or None) : Records every response as it lands, so a job that dies partway through can be rerun with the same journal and only sends what didn't finish. See EvaluationJournal.
+        
+        Returns:
+        result (string or list - string or AnthropicMessage or list - AnthropicMessage) : The evaluation result. A list of strings if the input was an iterable, a string otherwise. A list of AnthropicMessage objects if the response type is 'raw' and input was an iterable, a AnthropicMessage object otherwise.
+
+        """
+
+        assert response_type in ["text", "raw", "json", "raw_json"], InvalidResponseFormatException("Invalid response type specified. Must be 'text', 'raw', 'json' or 'raw_json'.")
+
+        _protocol = _protocol or self._anthropic_service
+
+        if(logging_directory is not None):
+            print("Logging directory has been deprecated for anthropic_evaluate_async().")
+
+        _settings = _return_curated_anthropic_settings(locals())
+
+        _validate_elucidate_llm_translation_settings(_settings, "anthropic")
+
+        _validate_stop_sequences(stop_sequences)
+
+        _lazy = not isinstance(text, (str, ModelTranslationMessage)) and (ingestion_window is not None or _is_lazy_iterable(text))
+
+        ## lazy inputs are validated per text as they're admitted
+        if(not _lazy):
+            _validate_text_length(text, model, service="anthropic", counter=self._token_counter)
+
+        response_schema = _validate_response_schema(response_schema)
+
+        ## Should be done after validating the settings to reduce cost to the user, cached so it isn't a request per call
+        self._credential_cache.verify("anthropic", self.test_credentials)
+
+        ## counted per call, so calls running at the same time don't add to each other's
+        _usage = _start_call_usage(_protocol)
+
+        json_mode = True if response_type in ["json", "raw_json"] else False
+
+        if(override_previous_settings == True):
+            _protocol._set_attributes(model=model,
+                                            system=evaluation_instructions,
+                                            temperature=temperature,
+                                            top_p=top_p,
+                                            top_k=top_k,
+                                            stop_sequences=stop_sequences,
+                                            stream=False,
+                                            max_tokens=max_output_tokens,
+                                            decorator=decorator,
+                                            semaphore=semaphore,
+                                            rate_limit_delay=evaluation_delay,
+                                            json_mode=json_mode,
+                                            response_schema=response_schema)
+            
+            ## Done afterwards, cause default evaluation instructions can change based on set_attributes()
+            _protocol._system = evaluation_instructions or _protocol._default_evaluation_instructions
+            _protocol._prompt_caching = cache_instructions
+            _protocol._shared_context = shared_context
+
+        ## a single text, streamed for evaluate_token_stream()
+        if(_token_stream is not None):
+            return await _with_call_usage(_usage, lambda: _protocol._evaluate_translation_stream(_protocol._system, _protocol._build_evaluation_batches(text)[0], _token_stream)) # type: ignore
+
+        def _extract(_result:AnthropicMessage) -> typing.Any:
+            assert hasattr(_result, "content"), ElucidateException("Malformed response received. Please try again.")
+
+            if(response_type in ["raw", "raw_json"]):
+                return _result
+
+            ## response structure can vary if tools are used
+            return _result.content[0].input if isinstance(_result.content[0], AnthropicToolUseBlock) else _result.content[0].text
+
+        def _request(_index:int, _message:ModelTranslationMessage) -> typing.Awaitable[AnthropicMessage]:
+
+            if(journal is None):
+                return _with_call_usage(_usage, lambda: _protocol._evaluate_translation_async(_protocol._system, _message))
+
+            return journal._run(str(_index), _anthropic_request_key(_protocol._system, _message, _protocol), lambda: _with_call_usage(_usage, lambda: _protocol._evaluate_translation_async(_protocol._system, _message)))
+
+        if(_lazy):
+
+            _indices = itertools.count()
+
+            def _admit(_text:str | ModelTranslationMessage) -> typing.Awaitable[AnthropicMessage]:
+                ## taken first, so a text that fails validation still keeps the journal's positions in step with the stream's
+                _index = next(_indices)
+                _validate_text_length(_text, model, service="anthropic", counter=self._token_counter)
+                return _request(_index, _protocol._build_evaluation_batches(_text)[0])
+
+            _stream = _iterate_as_completed(_admit_lazily(text, _admit), _extract, ordered=_as_completed == "ordered", window=ingestion_window or self._default_ingestion_window(_protocol), return_exceptions=_return_exceptions, on_close=journal.flush if journal is not None else None)
+
+            return _stream if _as_completed is not None else await _collect_by_index(_stream) # type: ignore
+
+        assert isinstance(text, str) or _is_iterable_of_strings(text) or isinstance(text, ModelTranslationMessage) or _is_iterable_of_strings(text), InvalidTextInputException("text must be a string, an iterable of strings, a ModelTranslationMessage or an iterable of ModelTranslationMessages.")
+
+        _evaluation_batches = _protocol._build_evaluation_batches(text)
+
+        _evaluation_tasks = []
+
+        for _index, _text in enumerate(_evaluation_batches):
+            _task = _request(_index, _text)
+            _evaluation_tasks.append(_task)
+
+        if(_as_completed is not None):
+            return _iterate_as_completed(_evaluation_tasks, _extract, ordered=_as_completed == "ordered", return_exceptions=_return_exceptions, on_close=journal.flush if journal is not None else None) # type: ignore
+
+        _results = await asyncio.gather(*_evaluation_tasks)
+
+        if(journal is not None):
+            journal.flush()
+
+        _results:typing.List[AnthropicMessage] = _results
+
+        assert all([hasattr(_r, "content") for _r in _results]), ElucidateException("Malformed response received. Please try again.")
+
+        if(response_type in ["raw", "raw_json"]):
+            evaluation = _results
+
+        else:
+            evaluation = [result.content[0].input if isinstance(result.content[0], AnthropicToolUseBlock) else result.content[0].text for result in _results]
+        
+        result = evaluation if isinstance(text, typing.Iterable) and not isinstance(text, str) else evaluation[0]
+
+        return result # type: ignore
+    
+##-------------------start-of-anthropic_evaluate_batch()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def anthropic_evaluate_batch(self, text:typing.Union[str, typing.Iterable[str], ModelTranslationMessage, typing.Iterable[ModelTranslationMessage]],
+                                 override_previous_settings:bool = True,
+                                 response_type:typing.Literal["text", "raw", "json", "raw_json"] | None = "text",
+                                 response_schema:str | typing.Mapping[str, typing.Any] | None = None,
+                                 evaluation_instructions:str | None = None,
+                                 model:str="claude-3-haiku-20240307",
+                                 temperature:float | NotGiven = NOT_GIVEN,
+                                 top_p:float | NotGiven = NOT_GIVEN,
+                                 top_k:int | NotGiven = NOT_GIVEN,
+                                 stop_sequences:typing.List[str] | NotGiven = NOT_GIVEN,
+                                 max_output_tokens:int | NotGiven = NOT_GIVEN,
+                                 cache_instructions:bool = False,
+                                 shared_context:str | None = None,
+                                 wait:bool = True,
+                                 poll_interval:float = 10.0,
+                                 max_poll_interval:float = 300.0,
+                                 timeout:float | None = None,
+                                 max_requests_per_batch:int = 100_000,
+                                 _protocol:AnthropicServiceProtocol | None = None
+                                 ) -> typing.Union[BatchResults, typing.List[str]]:
+        
+        """
+
+        Message Batches version of anthropic_evaluate(). For bulk evaluations that don't need answers right away, Message Batches cost less and aren't subject to the usual rate limits, but can take up to 24 hours.
+
+        The requests are the same ones anthropic_evaluate() would send, including the format_to_json tool in json mode. Inputs too large for one batch are split across several.
+
+        Submitting and collecting are separable. Pass wait=False to only submit and get the batch ids, check on them with anthropic_batch_status() and collect the results with anthropic_resume_batch().
+
+        With a recording cassette (see set_cassette()) the results are recorded if wait is True. Results collected later with anthropic_resume_batch() aren't, the requests aren't known there. With a replaying cassette nothing is submitted, the recorded results are returned right away whatever wait is.
+
+        Parameters:
+        text (string | ModelTranslationMessage | iterable[string] | iterable[ModelTranslationMessage]) : The text to evaluate. This should be the original untranslated text along with the translated text.
+        override_previous_settings (bool) : Whether to override the previous settings that were used during the last call to an Anthropic evaluation function.
+        response_type (literal["text", "raw", "json", "raw_json"]) : The type of response to return. 'text' returns the evaluated text, 'raw' returns the raw response, an AnthropicMessage object, 'json' returns a json-parseable string. 'raw_json' returns the raw response, an AnthropicMessage object, but with the content as a json-parseable string.
+        response_schema (string or mapping or None) : The schema to use for the response. If None, no schema is used. This is only used if the response type is 'json' or 'json_raw'. Elucidate only validates the schema to the extend that it is None or a valid json. It does not validate the contents of the json.
+        evaluation_instructions (string or None) : The evaluation instructions to use. If None, the default system message is used.
+        model (string) : The model to use. (E.g. 'claude-3-haiku-20240307', 'claude-3-sonnet-20240229' or 'claude-3-opus-20240229')
+        temperature (float) : The temperature to use. The higher the temperature, the more creative the output. Lower temperatures are typically better for evaluation.
+        top_p (float) : The nucleus sampling probability. The higher the value, the more words are considered for the next token. Generally, alter this or temperature, not both.
+        top_k (int) : The top k sampling probability. The higher the value, the more words are considered for the next token. Generally, alter this or temperature, not both.
+        stop_sequences (list or None) : String sequences that will cause the model to stop evaluation if encountered, generally useless.
+        max_output_tokens (int or None) : The maximum number of tokens to output.
+        cache_instructions (bool) : Whether to mark the system prompt for Anthropic's prompt caching, so long instructions are only paid for in full once every few minutes instead of on every request. They have to be at least 1024 tokens long (2048 for Haiku models) to be cached.
+        shared_context (string or None) : Context shared by every text, such as a style guide or glossary, sent as a second system block after the instructions. Cached along with them if cache_instructions is True.
+        wait (bool) : Whether to wait for the batches to end and return the results. If False, the batch ids are returned right after submitting.
+        poll_interval (float) : The first wait between status checks, in seconds. Each wait is 1.5 times longer than the last.
+        max_poll_interval (float) : The longest wait between status checks, in seconds.
+        timeout (float or None) : How long to wait before raising. The batches keep running and can be resumed with anthropic_resume_batch(). None waits forever.
+        max_requests_per_batch (int) : The most texts submitted in a single batch. Batches are also split to stay under the size limit.
+
+        Returns:
+        result (BatchResults or list[string]) : If wait is True, the evaluations in input order, a list of strings or AnthropicMessage objects depending on response_type. Items that failed are None and their errors are in result.errors. If wait is False, the batch ids.
+
+        """
+
+        assert response_type in ["text", "raw", "json", "raw_json"], InvalidResponseFormatException("Invalid response type specified. Must be 'text', 'raw', 'json' or 'raw_json'.")
+
+        _protocol = _protocol or self._anthropic_service
+
+        _settings = _return_curated_anthropic_settings(locals())
+
+        _validate_elucidate_llm_translation_settings(_settings, "anthropic")
+
+        _validate_stop_sequences(stop_sequences)
+
+        _validate_text_length(text, model, service="anthropic", counter=self._token_counter)
+
+        response_schema = _validate_response_schema(response_schema)
+
+        ## Should be done after validating the settings to reduce cost to the user, cached so it isn't a request per call
+        self._credential_cache.verify("anthropic", self.test_credentials)
+
+        json_mode = True if response_type in ["json", "raw_json"] else False
+
+        if(override_previous_settings == True):
+            _protocol._set_attributes(model=model,
+                                            system=evaluation_instructions,
+                                            temperature=temperature,
+                                            top_p=top_p,
+                                            top_k=top_k,
+                                            stop_sequences=stop_sequences,
+                                            stream=False,
+                                            max_tokens=max_output_tokens,
+                                            decorator=None,
+                                            semaphore=None,
+                                            rate_limit_delay=None,
+                                            json_mode=json_mode,
+                                            response_schema=response_schema)
+            
+            ## Done afterwards, cause default evaluation instructions can change based on set_attributes()
+            _protocol._system = evaluation_instructions or _protocol._default_evaluation_instructions
+            _protocol._prompt_caching = cache_instructions
+            _protocol._shared_context = shared_context
+
+        assert isinstance(text, str) or _is_iterable_of_strings(text) or isinstance(text, ModelTranslationMessage) or _is_iterable_of_strings(text), InvalidTextInputException("text must be a string, an iterable of strings, a ModelTranslationMessage or an iterable of ModelTranslationMessages.")
+
+        _evaluation_batches = _protocol._build_evaluation_batches(text)
+
+        _cassette = _protocol._cassette
+        _fingerprints = [_anthropic_request_key(_protocol._system, _text, _protocol) for _text in _evaluation_batches] if _cassette is not None else None
+
+        ## nothing is submitted when replaying, so there's no batch to wait for or resume
+        if(_cassette is not None and _fingerprints is not None and _cassette.replaying):
+            return _anthropic_finish_batch_results(_cassette._replay_batch(_fingerprints), str(response_type), _protocol=_protocol)
+
+        _batch_ids = _anthropic_submit_batches(_anthropic_build_batch_requests(_evaluation_batches, max_requests_per_batch=max_requests_per_batch, _protocol=_protocol), _protocol=_protocol)
+
+        if(not wait):
+            return _batch_ids
+
+        return self.anthropic_resume_batch(_batch_ids, response_type=response_type, poll_interval=poll_interval, max_poll_interval=max_poll_interval, timeout=timeout, _protocol=_protocol, _fingerprints=_fingerprints)
+    
+##-------------------start-of-anthropic_batch_status()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def anthropic_batch_status(self, batch_ids:str | typing.Iterable[str], _protocol:AnthropicServiceProtocol | None = None) -> str:
+
+        """
+
+        Returns the status of batches submitted with anthropic_evaluate_batch(). 'ended' once every batch has ended, otherwise the status of the ones that haven't. ('in_progress' or 'canceling')
+
+        Parameters:
+        batch_ids (string or iterable[string]) : The ids anthropic_evaluate_batch() returned.
+
+        Returns:
+        status (string) : The status.
+
+        """
+
+        _protocol = _protocol or self._anthropic_service
+
+        _statuses = {_protocol._sync_client.messages.batches.retrieve(_batch_id).processing_status for _batch_id in ([batch_ids] if isinstance(batch_ids, str) else batch_ids)}
+
+        for _status in ["in_progress", "canceling"]:
+            if(_status in _statuses):
+                return _status
+
+        return "ended"
+    
+##-------------------start-of-anthropic_resume_batch()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def anthropic_resume_batch(self, batch_ids:str | typing.Iterable[str],
+                               response_type:typing.Literal["text", "raw", "json", "raw_json"] | None = "text",
+                               poll_interval:float = 10.0,
+                               max_poll_interval:float = 300.0,
+                               timeout:float | None = None,
+                               _protocol:AnthropicServiceProtocol | None = None,
+                               _fingerprints:typing.Sequence[str] | None = None
+                               ) -> BatchResults:
+
+        """
+
+        Waits for batches submitted with anthropic_evaluate_batch() to end and returns their results. Works from a different process than the one that submitted them.
+
+        Parameters:
+        batch_ids (string or iterable[string]) : The ids anthropic_evaluate_batch() returned, all of them and in the same order.
+        response_type (literal["text", "raw", "json", "raw_json"]) : The response type the batches were submitted with.
+        poll_interval (float) : The first wait between status checks, in seconds. Each wait is 1.5 times longer than the last.
+        max_poll_interval (float) : The longest wait between status checks, in seconds.
+        timeout (float or None) : How long to wait, for all batches together, before raising. The batches keep running and can be resumed again. None waits forever.
+
+        Returns:
+        result (BatchResults) : The evaluations in input order. Items that failed are None and their errors are in result.errors.
+
+        """
+
+        assert response_type in ["text", "raw", "json", "raw_json"], InvalidResponseFormatException("Invalid response type specified. Must be 'text', 'raw', 'json' or 'raw_json'.")
+
+        _protocol = _protocol or self._anthropic_service
+
+        _deadline = time.monotonic() + timeout if timeout is not None else None
+
+        _batches = []
+
+        for _batch_id in ([batch_ids] if isinstance(batch_ids, str) else batch_ids):
+
+            _remaining = max(0.0, _deadline - time.monotonic()) if _deadline is not None else None
+
+            _batches.append(_anthropic_wait_for_batch(_batch_id, poll_interval=poll_interval, max_poll_interval=max_poll_interval, timeout=_remaining, _protocol=_protocol))
+
+        _results = _anthropic_collect_batch_results(_batches, _protocol=_protocol)
+
+        if(_protocol._cassette is not None and _fingerprints is not None):
+            _protocol._cassette._record_batch(_fingerprints, _results)
+
+        return _anthropic_finish_batch_results(_results, str(response_type), _protocol=_protocol)
+    
+##-------------------start-of-evaluate()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+        
+    def evaluate(self, text:str | typing.Iterable[str] | ModelTranslationMessage | typing.Iterable[ModelTranslationMessage],
+                  service:typing.Optional[typing.Literal["openai", "gemini", "anthropic"]],
+                  **kwargs) -> typing.Union[typing.List[str], str, 
+                                            typing.List[ChatCompletion], ChatCompletion,
+                                            typing.List[GenerateContentResponse], GenerateContentResponse,
+                                            typing.List[AnthropicMessage], AnthropicMessage]:
+        
+        """
+
+        Evaluates the given text using the specified service. Your text attribute should contain both the original untranslated text and the translated text.
+
+        Please see the documentation for the specific evaluation function for the service you want to use.
+
+        OpenAI: openai_evaluate()
+        Gemini: gemini_evaluate()
+        Anthropic: anthropic_evaluate()
+
+        All functions can return a list of strings or a string, depending on the input. The response type can be specified to return the raw response instead:
+        OpenAI: ChatCompletion
+        Gemini: GenerateContentResponse
+        Anthropic: AnthropicMessage
+        
+        Parameters:
+        text (str | ModelTranslationMessage | typing.Iterable[str] | typing.Iterable[ModelTranslationMessage]) : The text to evaluate. This should be the original untranslated text along with the translated text.
+        service (string) : The service to use for evaluation.
+        **kwargs : The keyword arguments to pass to the evaluation function.
+
+        Returns:
+        result (See Function Signature) : The evaluation result.
+
+        """
+
+        assert service in ["openai", "gemini", "anthropic"], InvalidAPITypeException("Invalid service specified. Must be 'openai', 'gemini' or 'anthropic'.")
+
+        if(service == "openai"):
+            return self.openai_evaluate(text, **kwargs)
+        
+        elif(service == "gemini"):
+            return self.gemini_evaluate(text, **kwargs) # type: ignore
+        
+        elif(service == "anthropic"):
+            return self.anthropic_evaluate(text, **kwargs)
+        
+##-------------------start-of-translate_async()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+    
+    async def evaluate_async(self, text:str | typing.Iterable[str] | ModelTranslationMessage | typing.Iterable[ModelTranslationMessage],
+                              service:typing.Optional[typing.Literal["openai", "gemini", "anthropic"]],
+                              **kwargs) -> typing.Union[typing.List[str], str, 
+                                                        typing.List[ChatCompletion], ChatCompletion,
+                                                        typing.List[AsyncGenerateContentResponse], AsyncGenerateContentResponse,
+                                                        typing.List[AnthropicMessage], AnthropicMessage]:
+
+        
+        """
+
+        Asynchronous version of evaluate().
+        Will generally be faster for iterables. Order is preserved.
+        
+        Evaluates the given text using the specified service. Your text attribute should contain both the original untranslated text and the translated text.
+
+        Please see the documentation for the specific evaluation function for the service you want to use.
+
+        OpenAI: openai_evaluate_async()
+        Gemini: gemini_evaluate_async()
+        Anthropic: anthropic_evaluate_async()
+
+        All functions can return a list of strings or a string, depending on the input. The response type can be specified to return the raw response instead:
+        OpenAI: ChatCompletion
+        Gemini: AsyncGenerateContentResponse
+        Anthropic: AnthropicMessage
+
+        Parameters:
+        text (str | ModelTranslationMessage | typing.Iterable[str] | typing.Iterable[ModelTranslationMessage]) : The text to evaluate. This should be the original untranslated text along with the translated text.
+        service (string) : The service to use for evaluation.
+        **kwargs : The keyword arguments to pass to the evaluation function.
+
+        Returns:
+        result (See function signature) : The evaluation result.
+
+        """
+
+        assert service in ["openai", "gemini", "anthropic"], InvalidAPITypeException("Invalid service specified. Must be 'openai', 'gemini' or 'anthropic'.")
+
+        if(service == "openai"):
+            return await self.openai_evaluate_async(text, **kwargs)
+        
+        elif(service == "gemini"):
+            return await self.gemini_evaluate_async(text, **kwargs) # type: ignore
+        
+        elif(service == "anthropic"):
+            return await self.anthropic_evaluate_async(text, **kwargs)
+
+##-------------------start-of-evaluate_stream()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    async def evaluate_stream(self, text:str | typing.Iterable[str] | ModelTranslationMessage | typing.Iterable[ModelTranslationMessage],
+                              service:typing.Optional[typing.Literal["openai", "gemini", "anthropic"]],
+                              ordered:bool = False,
+                              return_exceptions:bool = False,
+                              **kwargs) -> typing.AsyncIterator[typing.Tuple[int, typing.Any]]:
+
+        """
+
+        Streaming version of evaluate_async().
+        Yields each evaluation as soon as its request completes instead of waiting for the slowest one, so results can be written out while the rest are still running.
+
+        Results are handed off as they're yielded and not kept by Elucidate, so memory stays flat if the consumer writes them out as they come.
+
+        text can also be an iterator or async iterable, such as a file or a DB cursor. Texts are then read only as they're admitted, at most ingestion_window at a time, see the evaluation function's ingestion_window.
+
+        Please see the documentation for the specific evaluation function for the service you want to use, kwargs are passed through to it.
+
+        OpenAI: openai_evaluate_async()
+        Gemini: gemini_evaluate_async()
+        Anthropic: anthropic_evaluate_async()
+
+        Parameters:
+        text (str | ModelTranslationMessage | typing.Iterable[str] | typing.Iterable[ModelTranslationMessage]) : The text to evaluate. This should be the original untranslated text along with the translated text.
+        service (string) : The service to use for evaluation.
+        ordered (bool) : If False, results are yielded in completion order. If True, results are yielded in input order, each as soon as every earlier one is done.
+        return_exceptions (bool) : If False, a failed request ends the stream with its exception. If True, the exception is yielded in place of that text's result and the stream goes on.
+        **kwargs : The keyword arguments to pass to the evaluation function.
+
+        Yields:
+        (int, result) : The index of the text in the input and its evaluation result, same type as the evaluation function would return for a single text. (or the exception, if return_exceptions is True and the request failed)
+
+        """
+
+        assert service in ["openai", "gemini", "anthropic"], InvalidAPITypeException("Invalid service specified. Must be 'openai', 'gemini' or 'anthropic'.")
+
+        _evaluate_async = {"openai": self.openai_evaluate_async,
+                           "gemini": self.gemini_evaluate_async,
+                           "anthropic": self.anthropic_evaluate_async}[service]
+
+        _results = await _evaluate_async(text, _as_completed="ordered" if ordered else "unordered", _return_exceptions=return_exceptions, **kwargs) # type: ignore
+
+        try:
+            async for _index, _result in _results: # type: ignore
+                yield _index, _result
+
+        finally:
+            ## if the consumer stops early, the stream underneath would otherwise only be closed when it's garbage collected, leaving its requests running and the journal unflushed until then
+            await _results.aclose() # type: ignore
+
+##-------------------start-of-evaluate_token_stream()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def evaluate_token_stream(self, text:str | ModelTranslationMessage,
+                              service:typing.Literal["openai", "gemini", "anthropic"],
+                              on_delta:typing.Callable[[str], typing.Any] | None = None,
+                              **kwargs) -> EvaluationStream:
+
+        """
+
+        Evaluates a single text, streaming the evaluation as the model generates it, so it can be shown as soon as the first tokens arrive instead of once it's complete.
+
+        Returns an EvaluationStream. Iterate it with async for to get the evaluation a delta at a time, or await it for the whole evaluation, the request is sent when either starts. Once it's done, it has the usage the provider reported, and the time it took to the first token. For the json response type, its json() parses the fields received so far while it's still streaming. Anthropic's deltas are then the json tool's input.
+
+        Settings are the evaluation function's, kwargs are passed through to it. Only the 'text' and 'json' response types can be streamed. Streamed requests wait for the rate limiter and the semaphore like any other and are recorded in the metrics, but aren't retried by the decorator, as the deltas already yielded can't be taken back.
+
+        OpenAI: openai_evaluate_async()
+        Gemini: gemini_evaluate_async()
+        Anthropic: anthropic_evaluate_async()
+
+        Parameters:
+        text (str | ModelTranslationMessage) : The text to evaluate. This should be the original untranslated text along with the translated text.
+        service (string) : The service to use for evaluation.
+        on_delta (callable or None) : Called with every delta as it arrives, whether the stream is iterated or not. Can be a coroutine function.
+        **kwargs : The keyword arguments to pass to the evaluation function.
+
+        Returns:
+        stream (EvaluationStream) : The evaluation's stream.
+
+        """
+
+        assert service in ["openai", "gemini", "anthropic"], InvalidAPITypeException("Invalid service specified. Must be 'openai', 'gemini' or 'anthropic'.")
+
+        assert kwargs.get("response_type", "text") in ["text", "json"], InvalidResponseFormatException("Invalid response type specified. Only 'text' and 'json' can be streamed.")
+
+        assert isinstance(text, (str, ModelTranslationMessage)), InvalidTextInputException("text must be a string or a ModelTranslationMessage. Only a single text can be streamed.")
+
+        _evaluate_async = {"openai": self.openai_evaluate_async,
+                           "gemini": self.gemini_evaluate_async,
+                           "anthropic": self.anthropic_evaluate_async}[service]
+
+        return EvaluationStream(lambda _stream: _evaluate_async(text, _token_stream=_stream, **kwargs), on_delta) # type: ignore
+
+##-------------------start-of-evaluate_failover_async()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    async def evaluate_failover_async(self, text:str | typing.Iterable[str] | ModelTranslationMessage | typing.Iterable[ModelTranslationMessage],
+                                      policy:FailoverPolicy,
+                                      **kwargs) -> BatchResults:
+
+        """
+
+        Evaluates the text with the policy's routes in order, moving each text on to the next route if its request fails or the route's provider's circuit breaker is open.
+
+        Every route runs at the same time, fed by the one before it, so texts a failing provider hands back are picked up by the next route while the rest are still in flight. A provider's breaker opening sends everything that's still waiting straight to the next route, until a probe shows the provider is back.
+
+        Routes sharing a provider (E.g. "openai:gpt-4o-mini" then "openai:gpt-4o") each get their own copy of its settings. The Elucidate class's services are shared by every caller and can't be copied, so such policies need an ElucidateClient.
+
+        Please see the documentation for the specific evaluation function for each route's service, kwargs are passed through to every route along with that route's own kwargs, so they should be ones every provider takes. (E.g. evaluation_instructions, semaphore, response_type)
+
+        OpenAI: openai_evaluate_async()
+        Gemini: gemini_evaluate_async()
+        Anthropic: anthropic_evaluate_async()
+
+        Parameters:
+        text (str | ModelTranslationMessage | typing.Iterable[str] | typing.Iterable[ModelTranslationMessage]) : The text to evaluate. This should be the original untranslated text along with the translated text.
+        policy (FailoverPolicy) : The routes, and the circuit breakers of their providers.
+        **kwargs : The keyword arguments to pass to every route's evaluation function.
+
+        Returns:
+        results (BatchResults) : The evaluations in input order, with the route that served each one in results.served_by. Texts that failed on every route are None, with the last route's error in results.errors.
+
+        """
+
+        assert isinstance(policy, FailoverPolicy), ElucidateException("policy must be a FailoverPolicy.")
+
+        ## positions in a route's stream aren't positions in the input, so a journal couldn't resume them
+        assert "journal" not in kwargs, ElucidateException("evaluate_failover_async() doesn't take a journal.")
+
+        _texts = [text] if isinstance(text, (str, ModelTranslationMessage)) else list(text)
+
+        _results:typing.List[typing.Any] = [None] * len(_texts)
+        _errors:typing.Dict[int, Exception] = {}
+        _served_by:typing.List[str | None] = [None] * len(_texts)
+
+        ## each route's inbox, None once the route before it is done and nothing more can arrive
+        _inboxes:typing.List[asyncio.Queue] = [asyncio.Queue() for _ in policy.routes]
+
+        for _item in enumerate(_texts):
+            _inboxes[0].put_nowait(_item)
+
+        _inboxes[0].put_nowait(None)
+
+        ## every route runs at once and sets up its provider's service with its own kwargs, so a provider's later routes get copies, otherwise their models would be swapped under each other
+        _protocols = [self._get_service(_provider) if all(_earlier != _provider for _earlier, _ in policy.routes[:_route]) else self._copy_service(_provider) for _route, (_provider, _) in enumerate(policy.routes)]
+
+        def _hand_on(_route:int, _item:typing.Tuple[int, typing.Any], _error:Exception) -> None:
+
+            if(_route + 1 < len(policy.routes)):
+                _inboxes[_route + 1].put_nowait(_item)
+
+            else:
+                _errors[_item[0]] = _error
+
+        async def _run_route(_route:int) -> None:
+
+            _provider, _route_kwargs = policy.routes[_route]
+            _breaker = policy.breakers[_provider]
+
+            _evaluate_async = {"openai": self.openai_evaluate_async,
+                               "gemini": self.gemini_evaluate_async,
+                               "anthropic": self.anthropic_evaluate_async}[_provider]
+
+            ## items sent by this route by their position in its stream, and the latency of their last attempt once it's done
+            _in_flight:typing.Dict[int, typing.Tuple[typing.Tuple[int, typing.Any], typing.List[float | None]]] = {}
+            _sent = itertools.count()
+            _inbox_done = False
+
+            ## the position of the probe this route sent while the breaker was half-open, until its outcome is recorded
+            _probe:int | None = None
+
+            async def _admit() -> typing.AsyncIterator[typing.Any]:
+
+                nonlocal _inbox_done, _probe
+
+                while((_item := await _inboxes[_route].get()) is not None):
+
+                    _probing = _breaker.state == "half_open"
+
+                    if(not _breaker.allow()):
+                        _hand_on(_route, _item, CircuitOpenException(f"The circuit breaker for {_provider} is open."))
+                        continue
+
+                    _position = next(_sent)
+
+                    if(_probing):
+                        _probe = _position
+
+                    ## the stream makes the item's request task right after this yields, and the task inherits the holder, so its attempts are timed from being sent, not from here, which would count the wait for the rate limiter and the semaphore
+                    _latency:typing.List[float | None] = [None]
+                    _attempt_latency.set(_latency)
+
+                    _in_flight[_position] = (_item, _latency)
+
+                    ## gemini only takes strings
+                    yield _item[1].content if _provider == "gemini" and isinstance(_item[1], ModelTranslationMessage) else _item[1]
+
+                _inbox_done = True
+
+            try:
+
+                _stream = await _evaluate_async(_admit(), **{**kwargs, **_route_kwargs}, _as_completed="unordered", _return_exceptions=True, _protocol=_protocols[_route]) # type: ignore
+
+                async for _index, _result in _stream:
+
+                    _item, _latency = _in_flight.pop(_index)
+
+                    if(_index == _probe):
+                        _probe = None
+
+                    if(isinstance(_result, Exception)):
+                        _breaker.record_failure()
+                        _hand_on(_route, _item, _result)
+
+                    else:
+                        _breaker.record_success(_latency[0])
+                        _results[_item[0]] = _result
+                        _served_by[_item[0]] = policy.route_name(_route)
+
+            ## the route itself failed, (E.g. its credentials are invalid) so everything it has or would get moves on
+            except Exception as _e:
+
+                _breaker.record_failure()
+                _probe = None
+
+                for _item, _ in _in_flight.values():
+                    _hand_on(_route, _item, _e)
+
+                while(not _inbox_done and (_item := await _inboxes[_route].get()) is not None):
+                    _hand_on(_route, _item, _e)
+
+            ## cancelled, (E.g. Ctrl-C) the probe's outcome will never be recorded, and the breaker would refuse every request after it
+            finally:
+
+                if(_probe is not None):
+                    _breaker.release()
+
+            if(_route + 1 < len(policy.routes)):
+                _inboxes[_route + 1].put_nowait(None)
+
+        await asyncio.gather(*[_run_route(_route) for _route in range(len(policy.routes))])
+
+        return BatchResults(_results, _errors, served_by=_served_by)
+
+##-------------------start-of-_prepare_packed_evaluation()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def _prepare_packed_evaluation(self, text:str | typing.Iterable[str] | ModelTranslationMessage | typing.Iterable[ModelTranslationMessage],
+                                   service:typing.Literal["openai", "gemini", "anthropic"],
+                                   evaluation_instructions:str | SystemTranslationMessage | None,
+                                   kwargs:typing.Dict[str, typing.Any]
+                                   ) -> typing.Tuple[typing.List[str], typing.Dict[str, typing.Any]]:
+
+        """
+
+        Shared setup of evaluate_packed() and evaluate_packed_async().
+
+        Returns:
+        segments (list[string]) : The text of every segment.
+        packed_kwargs (dict) : The keyword arguments for packed requests, the instructions extended with the packing format and json mode turned on.
+
+        """
+
+        assert service in ["openai", "gemini", "anthropic"], InvalidAPITypeException("Invalid service specified. Must be 'openai', 'gemini' or 'anthropic'.")
+
+        assert not any(_key in kwargs for _key in ["response_type", "response_schema"]), InvalidResponseFormatException("Packed evaluation returns one evaluation string per segment, response_type and response_schema can't be set.")
+
+        _service = self._get_service(service)
+
+        ## packing needs json mode, checked here as EasyTL only notices once the first request is being built
+        _model = kwargs.get("model", _service._default_model) if kwargs.get("override_previous_settings", True) else _service._model
+        _json_models = {"openai": VALID_JSON_OPENAI_MODELS, "gemini": VALID_JSON_GEMINI_MODELS, "anthropic": VALID_JSON_ANTHROPIC_MODELS}[service]
+
+        assert _model in _json_models, InvalidResponseFormatException(f"Packed evaluation needs json mode, which {_model} doesn't support. Pass one of these as model: {', '.join(_json_models)}")
+
+        assert isinstance(text, str) or _is_iterable_of_strings(text) or isinstance(text, ModelTranslationMessage) or _is_iterable_of_strings(text), InvalidTextInputException("text must be a string, an iterable of strings, a ModelTranslationMessage or an iterable of ModelTranslationMessages.")
+
+        _segments = [text] if isinstance(text, (str, ModelTranslationMessage)) else list(text)
+        _segments = [_segment.content if isinstance(_segment, ModelTranslationMessage) else _segment for _segment in _segments]
+
+        _instructions = evaluation_instructions or _service._default_evaluation_instructions
+        _instructions = _instructions.content if isinstance(_instructions, SystemTranslationMessage) else _instructions
+
+        _packed_kwargs = {**kwargs,
+                          "evaluation_instructions": f"{_instructions}\n\n{_packing_instructions}",
+                          "response_type": "json"}
+
+        ## OpenAI's json mode has no schema, the instructions carry the format
+        if(service != "openai"):
+            _packed_kwargs["response_schema"] = _packed_response_schema
+
+        return _segments, _packed_kwargs
+
+##-------------------start-of-evaluate_packed()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def evaluate_packed(self, text:str | typing.Iterable[str] | ModelTranslationMessage | typing.Iterable[ModelTranslationMessage],
+                        service:typing.Literal["openai", "gemini", "anthropic"],
+                        token_budget:int = 1024,
+                        max_segments_per_request:int = 50,
+                        max_retries:int = 2,
+                        evaluation_instructions:str | SystemTranslationMessage | None = None,
+                        **kwargs) -> typing.Union[typing.List[str], str]:
+
+        """
+
+        Evaluates many short segments with few requests. Segments are packed into requests of up to token_budget tokens, sent as a json object keyed by segment id, and the json answer is split back into one evaluation per segment.
+
+        The instructions and per request overhead are then paid once per pack instead of once per segment, which is most of the cost for short segments like UI strings.
+
+        Segments the model dropped or mangled are repacked and retried up to max_retries times, after which they're evaluated on their own, unpacked.
+
+        Please see the documentation for the specific evaluation function for the service you want to use, kwargs are passed through to it. response_type and response_schema are set by packing, which needs a model with json mode. (E.g. 'gpt-4o-mini' or 'gemini-1.5-flash', the OpenAI and Gemini defaults don't have it)
+
+        OpenAI: openai_evaluate()
+        Gemini: gemini_evaluate()
+        Anthropic: anthropic_evaluate()
+
+        Parameters:
+        text (str | ModelTranslationMessage | typing.Iterable[str] | typing.Iterable[ModelTranslationMessage]) : The segments to evaluate. Each should be the original untranslated text along with the translated text.
+        service (string) : The service to use for evaluation.
+        token_budget (int) : The most tokens of segments a single request may hold. A segment over the budget is sent on its own.
+        max_segments_per_request (int) : The most segments a single request may hold.
+        max_retries (int) : How many times dropped or mangled segments are repacked before being evaluated on their own.
+        evaluation_instructions (string or SystemTranslationMessage or None) : The evaluation instructions to apply to each segment. If None, the service's default is used.
+        **kwargs : The keyword arguments to pass to the evaluation function.
+
+        Returns:
+        result (string or list[string]) : The evaluation of every segment, in input order. A string if a single text was given.
+
+        """
+
+        _segments, _packed_kwargs = self._prepare_packed_evaluation(text, service, evaluation_instructions, kwargs)
+
+        _results:typing.List[str | None] = [None] * len(_segments)
+        _pending = list(range(len(_segments)))
+
+        for _ in range(max_retries + 1):
+
+            if(not _pending):
+                break
+
+            _packs = _pack_segments([(_index, _segments[_index]) for _index in _pending], token_budget, max_segments_per_request)
+
+            for _pack in _packs:
+
+                _response = self.evaluate(_build_packed_prompt(_pack), service, **_packed_kwargs)
+
+                for _index, _evaluation in _parse_packed_response(_response, _pack).items():
+                    _results[_index] = _evaluation
+
+            _pending = [_index for _index in _pending if _results[_index] is None]
+
+        if(_pending):
+
+            _fallback = self.evaluate([_segments[_index] for _index in _pending], service, evaluation_instructions=evaluation_instructions, **kwargs)
+
+            for _index, _evaluation in zip(_pending, _fallback): # type: ignore
+                _results[_index] = _evaluation
+
+        return _results if not isinstance(text, (str, ModelTranslationMessage)) else _results[0] # type: ignore
+
+##-------------------start-of-evaluate_packed_async()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    async def evaluate_packed_async(self, text:str | typing.Iterable[str] | ModelTranslationMessage | typing.Iterable[ModelTranslationMessage],
+                                    service:typing.Literal["openai", "gemini", "anthropic"],
+                                    token_budget:int = 1024,
+                                    max_segments_per_request:int = 50,
+                                    max_retries:int = 2,
+                                    evaluation_instructions:str | SystemTranslationMessage | None = None,
+                                    **kwargs) -> typing.Union[typing.List[str], str]:
+
+        """
+
+        Asynchronous version of evaluate_packed(). The packs of each round are sent concurrently, through the evaluation function's semaphore.
+
+        See evaluate_packed() for the parameters. kwargs are passed through to the asynchronous evaluation function.
+
+        """
+
+        _segments, _packed_kwargs = self._prepare_packed_evaluation(text, service, evaluation_instructions, kwargs)
+
+        _results:typing.List[str | None] = [None] * len(_segments)
+        _pending = list(range(len(_segments)))
+
+        for _ in range(max_retries + 1):
+
+            if(not _pending):
+                break
+
+            _packs = _pack_segments([(_index, _segments[_index]) for _index in _pending], token_budget, max_segments_per_request)
+
+            _responses = await self.evaluate_async([_build_packed_prompt(_pack) for _pack in _packs], service, **_packed_kwargs)
+
+            for _pack, _response in zip(_packs, _responses): # type: ignore
+                for _index, _evaluation in _parse_packed_response(_response, _pack).items():
+                    _results[_index] = _evaluation
+
+            _pending = [_index for _index in _pending if _results[_index] is None]
+
+        if(_pending):
+
+            _fallback = await self.evaluate_async([_segments[_index] for _index in _pending], service, evaluation_instructions=evaluation_instructions, **kwargs)
+
+            for _index, _evaluation in zip(_pending, _fallback): # type: ignore
+                _results[_index] = _evaluation
+
+        return _results if not isinstance(text, (str, ModelTranslationMessage)) else _results[0] # type: ignore
+
+##-------------------start-of-_prepare_chunked_evaluation()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def _prepare_chunked_evaluation(self, text:str | typing.Tuple[str, str] | ModelTranslationMessage | typing.Iterable[str | typing.Tuple[str, str] | ModelTranslationMessage],
+                                    service:typing.Literal["openai", "gemini", "anthropic"],
+                                    token_budget:int | None,
+                                    pair_format:str,
+                                    evaluation_instructions:str | SystemTranslationMessage | None,
+                                    kwargs:typing.Dict[str, typing.Any],
+                                    slots:int
+                                    ) -> typing.Tuple[typing.List[str], typing.List[int], typing.List[str], int]:
+
+        """
+
+        Shared setup of evaluate_chunked() and evaluate_chunked_async().
+
+        Returns:
+        prompts (list[string]) : The prompt of every chunk, in order. Texts that fit are a single chunk.
+        owners (list[int]) : The index of the text each chunk belongs to.
+        separators (list[string]) : What goes after each chunk's evaluation when they're stitched back together.
+        texts (int) : The number of texts.
+
+        """
+
+        assert service in ["openai", "gemini", "anthropic"], InvalidAPITypeException("Invalid service specified. Must be 'openai', 'gemini' or 'anthropic'.")
+
+        assert not any(_key in kwargs for _key in ["response_type", "response_schema"]), InvalidResponseFormatException("Chunked evaluation stitches evaluation strings together, response_type and response_schema can't be set.")
+
+        assert token_budget is None or token_budget >= 1, ValueError("token_budget must be None or a positive integer.")
+
+        _texts = [text] if isinstance(text, (str, tuple, ModelTranslationMessage)) else list(text)
+
+        ## every text as its sides, the source and translation of a pair or just the one string
+        _sides = [[_text.content] if isinstance(_text, ModelTranslationMessage) else [_text] if isinstance(_text, str) else list(_text) for _text in _texts]
+
+        assert all(len(_text_sides) in [1, 2] and all(isinstance(_side, str) for _side in _text_sides) for _text_sides in _sides), InvalidTextInputException("text must be a string, a ModelTranslationMessage, a (source, translation) tuple of strings or an iterable of those.")
+
+        _service = self._get_service(service)
+        _model = kwargs.get("model") or _service._default_model
+
+        def _count(_strings:typing.List[str]) -> typing.List[int]:
+            return self._token_counter.count_many(_strings, _model, service)
+
+        _instruction_tokens = self._token_counter.count(str(evaluation_instructions or _service._default_evaluation_instructions), _model, service)
+        _limit = token_budget or _model_chunk_limit(_model, service, kwargs.get("max_tokens", kwargs.get("max_output_tokens")), _instruction_tokens)
+
+        _tokens = [sum(_count(_text_sides)) for _text_sides in _sides]
+        _budget = token_budget or _chunk_budget(sum(_text_tokens for _text_tokens in _tokens if _text_tokens > _limit), slots, _limit)
+
+        _prompts:typing.List[str] = []
+        _owners:typing.List[int] = []
+        _separators:typing.List[str] = []
+
+        for _index, (_text_sides, _text_tokens) in enumerate(zip(_sides, _tokens)):
+
+            _chunks = _chunk_sides(_text_sides, _budget, _count) if _text_tokens > _limit else [_text_sides]
+
+            for _position, _chunk in enumerate(_chunks):
+
+                ## the whitespace the translation was split at goes back between the evaluations
+                _separator = _chunk[-1][len(_chunk[-1].rstrip()):] if _position + 1 < len(_chunks) else ""
+
+                _chunk = [_piece.strip() for _piece in _chunk] if len(_chunks) > 1 else _chunk
+
+                _prompts.append(_chunk[0] if len(_chunk) == 1 else pair_format.format(source=_chunk[0], translation=_chunk[1]))
+                _owners.append(_index)
+                _separators.append(_separator)
+
+        return _prompts, _owners, _separators, len(_texts)
+
+##-------------------start-of-evaluate_chunked()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def evaluate_chunked(self, text:str | typing.Tuple[str, str] | ModelTranslationMessage | typing.Iterable[str | typing.Tuple[str, str] | ModelTranslationMessage],
+                         service:typing.Literal["openai", "gemini", "anthropic"],
+                         token_budget:int | None = None,
+                         pair_format:str = "{source}\n{translation}",
+                         evaluation_instructions:str | SystemTranslationMessage | None = None,
+                         **kwargs) -> typing.Union[typing.List[str], str, BatchResults]:
+
+        """
+
+        Evaluates texts that may be too long for the model, instead of rejecting them. Texts that don't fit are split into chunks, every chunk is evaluated as its own request, and the evaluations are stitched back together in order.
+
+        A text can be given as a (source, translation) tuple, which is split on paragraph boundaries, or sentence boundaries where a paragraph doesn't fit, with each chunk keeping the source and translation of the same passage together. Each chunk is sent formatted with pair_format. A plain string is split the same way on its own.
+
+        Without a token_budget, a text is chunked when it wouldn't fit the model's input limit, or its evaluation wouldn't fit the output limit, and the chunks are sized so they're spread over the requests that can run at once. Pass max_workers to evaluate the chunks on a thread pool, otherwise they're sent one at a time and made as large as the model allows.
+
+        Please see the documentation for the specific evaluation function for the service you want to use, kwargs are passed through to it. response_type and response_schema can't be set, the evaluations are joined as strings.
+
+        OpenAI: openai_evaluate()
+        Gemini: gemini_evaluate()
+        Anthropic: anthropic_evaluate()
+
+        Parameters:
+        text (str | tuple[str, str] | ModelTranslationMessage | typing.Iterable[str | tuple[str, str] | ModelTranslationMessage]) : The texts to evaluate. A string should be the original untranslated text along with the translated text, a tuple is the two apart.
+        service (string) : The service to use for evaluation.
+        token_budget (int or None) : If set, texts over this many tokens are chunked, into chunks of at most this many tokens. If None, it's worked out from the model, see above.
+        pair_format (string) : How the source and translation of a chunk are put together, with {source} and {translation} in place of them.
+        evaluation_instructions (string or SystemTranslationMessage or None) : The evaluation instructions to apply to each chunk. If None, the service's default is used.
+        **kwargs : The keyword arguments to pass to the evaluation function.
+
+        Returns:
+        result (string or list[string] or BatchResults) : The evaluation of every text, in input order. A string if a single text was given. A BatchResults if max_workers is set, with a text that had a chunk fail set to None and the error in result.errors.
+
+        """
+
+        _prompts, _owners, _separators, _texts = self._prepare_chunked_evaluation(text, service, token_budget, pair_format, evaluation_instructions, kwargs, kwargs.get("max_workers") or 1)
+
+        _evaluations = self.evaluate(_prompts, service, evaluation_instructions=evaluation_instructions, **kwargs)
+
+        _results = _stitch_evaluations(_evaluations, _owners, _separators, _texts) # type: ignore
+
+        if(isinstance(text, (str, tuple, ModelTranslationMessage))):
+
+            if(_results.errors):
+                raise _results.errors[0]
+
+            return _results[0]
+
+        return _results if isinstance(_evaluations, BatchResults) else list(_results)
+
+##-------------------start-of-evaluate_chunked_async()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    async def evaluate_chunked_async(self, text:str | typing.Tuple[str, str] | ModelTranslationMessage | typing.Iterable[str | typing.Tuple[str, str] | ModelTranslationMessage],
+                                     service:typing.Literal["openai", "gemini", "anthropic"],
+                                     token_budget:int | None = None,
+                                     pair_format:str = "{source}\n{translation}",
+                                     evaluation_instructions:str | SystemTranslationMessage | None = None,
+                                     **kwargs) -> typing.Union[typing.List[str], str]:
+
+        """
+
+        Asynchronous version of evaluate_chunked(). The chunks of every text are sent concurrently, through the evaluation function's semaphore and rate limits, so a long text takes about as long as one of its chunks.
+
+        See evaluate_chunked() for the parameters. kwargs are passed through to the asynchronous evaluation function.
+
+        """
+
+        _service = self._get_service(service)
+
+        _prompts, _owners, _separators, _texts = self._prepare_chunked_evaluation(text, service, token_budget, pair_format, evaluation_instructions, kwargs, kwargs.get("semaphore") or self._default_ingestion_window(_service))
+
+        _evaluations = await self.evaluate_async(_prompts, service, evaluation_instructions=evaluation_instructions, **kwargs)
+
+        _results = _stitch_evaluations(_evaluations, _owners, _separators, _texts) # type: ignore
+
+        return _results[0] if isinstance(text, (str, tuple, ModelTranslationMessage)) else list(_results)
+
+##-------------------start-of-set_credentials()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def set_credentials(self, api_type:typing.Literal["gemini", "openai", "anthropic"], credentials:typing.Union[str, None] = None, transport:TransportOptions | None = None) -> None:
+        
+        """
+
+        Sets the credentials for the specified API type.
+
+        Parameters:
+        api_type (literal["gemini", "openai", "anthropic"]) : The API type to set the credentials for.
+        credentials (string) : The credentials to set. This is an api key for the specified API type.
+        transport (TransportOptions or None) : If given, also sets how the clients connect. See set_transport(). Not available for Gemini.
+
+        """
+
+        _service = self._get_service(api_type)
+
+        ## If credentials are not passed, check the environment variables
+        if(credentials is None and os.environ.get(_environment_map[api_type]) is not None):
+            credentials = os.environ.get(_environment_map[api_type])
+
+        assert credentials is not None, InvalidAPIKeyException(f"No credentials provided for {api_type}. Please provide the credentials or set the environment variable {_environment_map[api_type]} with the credentials.")
+
+        ## the new clients are copies of the old ones, so the key is set after
+        if(transport is not None):
+            self.set_transport(api_type, transport) # type: ignore
+
+        _service._set_api_key(credentials)
+
+        ## new credentials need to be verified again
+        self._credential_cache.clear(api_type)
+
+        ## the Gemini model holds on to the client it was first used with, so it has to be rebuilt to pick up the new key
+        if(api_type == "gemini"):
+            _service._client_fingerprint = None
+
+##-------------------start-of-set_transport()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def set_transport(self, api_type:typing.Literal["openai", "anthropic"], transport:TransportOptions | None) -> None:
+
+        """
+
+        Sets how the clients for the specified API type connect. (E.g. a keep-alive pool as big as the semaphore, or HTTP/2) See TransportOptions.
+
+        The clients are replaced, keeping their credentials and settings. Requests already in flight finish on the old ones, which aclose() closes.
+
+        Parameters:
+        api_type (literal["openai", "anthropic"]) : The API type to set the transport for.
+        transport (TransportOptions or None) : How to connect. None goes back to the SDK defaults.
+
+        """
+
+        assert api_type in ["openai", "anthropic"], InvalidAPITypeException("Transport options can only be set for 'openai' and 'anthropic'. Gemini's gRPC channel already multiplexes its requests over one HTTP/2 connection.")
+
+        ## stored once the clients are made, so options they can't be made with (E.g. http2 without h2) aren't kept
+        self._retired_clients.append(self._rebuild_clients(api_type, transport))
+
+        self._transports[api_type] = transport
+
+##-------------------start-of-_rebuild_clients()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def _rebuild_clients(self, api_type:typing.Literal["openai", "anthropic"], transport:TransportOptions | None) -> typing.Tuple[typing.Any, typing.Any]:
+
+        """
+
+        Replaces the service's sync and async clients with copies on new connection pools, made with transport. None is the SDK defaults.
+
+        Returns:
+        (tuple[any, any]) : The sync and async clients that were replaced. They're left open.
+
+        """
+
+        _service = self._get_service(api_type)
+        _transport = transport or TransportOptions()
+
+        _sync_http_client, _async_http_client = _transport._build_http_clients(api_type)
+
+        _old_clients = (_service._sync_client, _service._async_client)
+
+        ## copies keep the api key, base url and max_retries
+        _service._sync_client = _service._sync_client.with_options(http_client=_sync_http_client, timeout=_transport._timeout())
+        _service._async_client = _service._async_client.with_options(http_client=_async_http_client, timeout=_transport._timeout())
+
+        return _old_clients
+
+##-------------------start-of-warmup()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    async def warmup(self, api_type:typing.Literal["gemini", "openai", "anthropic"], connections:int = 1) -> None:
+
+        """
+
+        Opens connections to the specified API type ahead of a burst, so its first requests don't wait on TCP and TLS handshakes.
+
+        For OpenAI and Anthropic, connections model list requests are sent through the async client at once, so each opens its own connection, which is then kept alive for the burst. Keep connections within the transport's max_keepalive_connections and the burst within its keepalive_expiry, otherwise they're closed again. See TransportOptions. Over HTTP/2 they all share one connection.
+
+        For Gemini, waits for the async client's gRPC channel to connect. It's one connection however many are asked for.
+
+        Connections belong to the event loop they're opened in, so warm up in the one the burst runs in. While a cassette is replaying nothing is sent, so there's nothing to warm up.
+
+        Parameters:
+        api_type (literal["gemini", "openai", "anthropic"]) : The API type to connect to.
+        connections (int) : How many connections to open.
+
+        """
+
+        assert connections >= 1, ValueError("connections must be at least 1.")
+
+        _service = self._get_service(api_type)
+
+        if(_service._cassette is not None and _service._cassette.replaying):
+            return
+
+        if(api_type == "gemini"):
+            _client_manager = _service._client_manager or genai_client._client_manager
+            await _client_manager.get_default_client("generative_async").transport.grpc_channel.channel_ready()
+            return
+
+        ## a failed request still opened its connection, but the failure is worth knowing about, (E.g. bad credentials) so it's raised once they're all done
+        _client = _service._async_client.with_options(max_retries=0)
+        _results = await asyncio.gather(*(_client.models.list() for _ in range(connections)), return_exceptions=True)
+
+        for _result in _results:
+            if(isinstance(_result, BaseException)):
+                raise _result
+
+##-------------------start-of-aclose()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    async def aclose(self) -> None:
+
+        """
+
+        Closes every connection the client holds, and shuts down the token counter's process pool. (E.g. when a long-running worker is done) Also called when leaving async with.
+
+        The client can still be used afterwards, it connects again as needed. The response cache, journals and cassette are left open, as they can be shared. So are Gemini's clients if the client didn't make them, as for the Elucidate class, whose Gemini clients are google.generativeai's, shared by the whole process.
+
+        """
+
+        ## replaced by set_transport(), nothing new is sent on them
+        _retired_clients, self._retired_clients = self._retired_clients, []
+
+        for _sync_client, _async_client in _retired_clients:
+            _sync_client.close()
+            await _async_client.close()
+
+        ## the current clients' connections are closed rather than the clients, so they connect again as needed without being rebuilt, which would be wasted on a provider that's never used
+        for _service in (self._openai_service, self._anthropic_service):
+            _close_connections(_service._sync_client)
+            await _aclose_connections(_service._async_client)
+
+        _client_manager = self._gemini_service._client_manager
+
+        if(_client_manager is not None):
+
+            ## the gemini model is rebuilt on its next request, and makes new grpc clients then
+            _gemini_clients, _client_manager.clients = _client_manager.clients, {}
+
+            self._gemini_service._client_fingerprint = None
+
+            for _name, _gemini_client in _gemini_clients.items():
+
+                if(_name.endswith("_async")):
+                    await _gemini_client.transport.close()
+
+                else:
+                    _gemini_client.transport.close()
+
+        self._token_counter.close()
+
+##-------------------start-of-__aenter__()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    async def __aenter__(self) -> "ElucidateClient":
+        return self
+
+##-------------------start-of-__aexit__()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    async def __aexit__(self, *args) -> None:
+        await self.aclose()
+
+##-------------------start-of-test_credentials()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def test_credentials(self, api_type:typing.Literal["gemini", "openai", "anthropic"]) -> typing.Tuple[bool, typing.Optional[Exception]]:
+        
+        """
+
+        Tests the credentials for the specified API type.
+
+        A successful test is cached, so evaluation functions won't test the credentials again until the cache ttl runs out. See set_credential_cache_ttl(). While a cassette is replaying nothing is sent, so the credentials pass without a test.
+
+        Parameters:
+        api_type (literal["gemini", "openai", "anthropic"]) : The API type to test the credentials for.
+
+        Returns:
+        (bool) : Whether the credentials are valid.
+        (Exception) : The exception that was raised, if any. None otherwise.
+
+        """
+
+        _service = self._get_service(api_type)
+
+        if(_service._cassette is not None and _service._cassette.replaying):
+            return True, None
+
+        _, _e = _service._test_api_key_validity()
+
+        if(_e is not None):
+            raise _e
+
+        self._credential_cache.mark_verified(api_type)
+
+        return True, None
+    
+##-------------------start-of-verify_credentials()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def verify_credentials(self, api_types:typing.Iterable[typing.Literal["gemini", "openai", "anthropic"]] = ("openai", "gemini", "anthropic")) -> typing.Dict[str, typing.Tuple[bool, typing.Optional[Exception]]]:
+
+        """
+
+        Tests the credentials for several API types concurrently. Meant to be called once at startup, so later evaluation calls can skip their own credential check.
+
+        Unlike test_credentials(), this does not raise if the credentials are invalid. The exception is returned instead.
+
+        Parameters:
+        api_types (iterable[literal["gemini", "openai", "anthropic"]]) : The API types to test the credentials for. Defaults to all three.
+
+        Returns:
+        (dict[string, tuple[bool, Exception or None]]) : For each API type, whether the credentials are valid and the exception that was raised, if any.
+
+        """
+
+        assert all(_api_type in ["openai", "gemini", "anthropic"] for _api_type in api_types), InvalidAPITypeException("Invalid API type specified. Must be 'openai', 'gemini' or 'anthropic'.")
+
+        return self._credential_cache.verify_many(api_types, self.test_credentials)
+
+##-------------------start-of-set_credential_cache_ttl()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def set_credential_cache_ttl(self, ttl:float | None) -> None:
+
+        """
+
+        Sets how long a successful credential check is trusted before the evaluation functions check again. Default is 600 seconds.
+
+        Parameters:
+        ttl (float or None) : The time to live in seconds. None means a successful check never expires, 0 means the credentials are checked on every evaluation call.
+
+        """
+
+        self._credential_cache.ttl = ttl
+    
+##-------------------start-of-set_rate_limits()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def set_rate_limits(self, api_type:typing.Literal["gemini", "openai", "anthropic"],
+                        requests_per_minute:float | None = None,
+                        tokens_per_minute:float | None = None,
+                        model:str | None = None) -> None:
+
+        """
+
+        Sets the requests per minute and tokens per minute limits to pace requests to, typically your tier's limits. Requests are sent as fast as the limits allow without going over them.
+
+        Token usage is estimated from the input (plus the output token limit, if set) before a request and corrected from the response's usage afterwards. Requests wait for budget before taking a semaphore slot, and evaluation_delay is ignored for limited models.
+
+        Parameters:
+        api_type (literal["gemini", "openai", "anthropic"]) : The API type to set the limits for.
+        requests_per_minute (float or None) : The requests per minute limit. None means unlimited.
+        tokens_per_minute (float or None) : The tokens per minute limit. None means unlimited.
+        model (string or None) : The model the limits are for. If None, the limits apply to every model of api_type without limits of its own.
+
+        """
+
+        _service = self._get_service(api_type)
+
+        if(requests_per_minute is None and tokens_per_minute is None):
+            _service._rate_limiters.pop(model, None)
+
+        else:
+            _service._rate_limiters[model] = RateLimiter(requests_per_minute, tokens_per_minute)
+
+##-------------------start-of-enable_adaptive_concurrency()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def enable_adaptive_concurrency(self, api_type:typing.Literal["gemini", "openai", "anthropic"],
+                                    initial_limit:float | None = None,
+                                    min_limit:float = 1,
+                                    max_limit:float = 200,
+                                    state_path:str | None = None,
+                                    **kwargs) -> AdaptiveConcurrency:
+
+        """
+
+        Replaces the fixed semaphore for api_type with one that learns its limit. While enabled, the semaphore argument of the async evaluation functions is ignored.
+
+        The limit grows while requests succeed and is cut on rate limit errors, on latency climbing well past the best seen, and when the x-ratelimit-remaining-* / anthropic-ratelimit-* headers show the window is nearly used up.
+
+        Parameters:
+        api_type (literal["gemini", "openai", "anthropic"]) : The API type to enable adaptive concurrency for.
+        initial_limit (float or None) : The limit to start at. Defaults to the current semaphore value. A limit saved at state_path takes precedence.
+        min_limit (float) : The limit never drops below this.
+        max_limit (float) : The limit never grows past this.
+        state_path (string or None) : A json file the learned limit is loaded from and periodically saved to, so the next run starts warm.
+        **kwargs : Passed through to AdaptiveConcurrency. (backoff_factor, latency_tolerance)
+
+        Returns:
+        adaptive_concurrency (AdaptiveConcurrency) : The controller, its limit property is the learned limit.
+
+        """
+
+        _service = self._get_service(api_type)
+
+        _service._adaptive_concurrency = AdaptiveConcurrency(initial_limit=initial_limit or _service._semaphore_value,
+                                                             min_limit=min_limit,
+                                                             max_limit=max_limit,
+                                                             state_path=state_path,
+                                                             **kwargs)
+
+        return _service._adaptive_concurrency
+
+##-------------------start-of-disable_adaptive_concurrency()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def disable_adaptive_concurrency(self, api_type:typing.Literal["gemini", "openai", "anthropic"]) -> None:
+
+        """
+
+        Goes back to the fixed semaphore for api_type. The learned limit is saved first if the controller has a state_path.
+
+        Parameters:
+        api_type (literal["gemini", "openai", "anthropic"]) : The API type to disable adaptive concurrency for.
+
+        """
+
+        _service = self._get_service(api_type)
+
+        if(_service._adaptive_concurrency is not None and _service._adaptive_concurrency.state_path is not None):
+            _service._adaptive_concurrency.save()
+
+        _service._adaptive_concurrency = None
+
+##-------------------start-of-get_concurrency_limit()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def get_concurrency_limit(self, api_type:typing.Literal["gemini", "openai", "anthropic"]) -> int:
+
+        """
+
+        Returns how many requests api_type currently allows in flight, the learned limit if adaptive concurrency is enabled, the semaphore value otherwise.
+
+        Parameters:
+        api_type (literal["gemini", "openai", "anthropic"]) : The API type to get the limit for.
+
+        Returns:
+        limit (int) : The limit.
+
+        """
+
+        _service = self._get_service(api_type)
+
+        if(_service._adaptive_concurrency is not None):
+            return _service._adaptive_concurrency.limit
+
+        return _service._semaphore_value
+
+##-------------------start-of-get_anthropic_usage()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def get_anthropic_usage(self) -> typing.Dict[str, typing.Any]:
+
+        """
+
+        Returns the token usage of the last Anthropic evaluation call, or of the last batch collected with anthropic_resume_batch(). Responses served from the response cache aren't counted.
+
+        Every call counts its own requests only, so calls running at the same time don't mix. Called in the task or thread that made the call, it reports that call, even if others were started since. Called anywhere else, it reports the last call started on this client.
+
+        Returns:
+        usage (dict) : requests, input_tokens, output_tokens, cache_creation_input_tokens and cache_read_input_tokens, plus hit_rate, the fraction of input tokens read from the prompt cache. (None if nothing was recorded)
+
+        """
+
+        _token_usage = _get_call_usage(self._anthropic_service) or TokenUsage()
+
+        return _token_usage.as_dict()
+    
+##-------------------start-of-set_response_cache()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def set_response_cache(self, response_cache:ResponseCache | None) -> None:
+
+        """
+
+        Sets the cache repeated requests are answered from, for all three services. A hit skips the semaphore, the evaluation delay and the decorator, so it costs nothing.
+
+        A request is only a repeat if the provider, model, sampling parameters, json mode/schema, instructions and text all match.
+
+        Parameters:
+        response_cache (ResponseCache or None) : The cache to use. None disables caching.
+
+        """
+
+        for _service in (self._openai_service, self._gemini_service, self._anthropic_service):
+            _service._response_cache = response_cache
+
+##-------------------start-of-set_metrics()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def set_metrics(self, metrics:MetricsSink | None) -> None:
+
+        """
+
+        Sets where request metrics are recorded, for all three services. Every API call records its queue wait, latency, tokens and error, and every text its attempts and duration. Responses served from the response cache aren't recorded.
+
+        Parameters:
+        metrics (MetricsSink or None) : The sink to record to. (E.g. Metrics, or a MetricsSink subclass) None turns recording off.
+
+        """
+
+        for _service in (self._openai_service, self._gemini_service, self._anthropic_service):
+            _service._metrics = metrics
+
+##-------------------start-of-get_metrics()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def get_metrics(self) -> MetricsSink | None:
+
+        """
+
+        Returns the sink request metrics are recorded to, the in-memory Metrics unless set_metrics() replaced it.
+
+        """
+
+        return self._openai_service._metrics
+
+##-------------------start-of-set_cassette()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def set_cassette(self, cassette:Cassette | None) -> None:
+
+        """
+
+        Sets the cassette API calls are recorded to or replayed from, for all three services. A replaying cassette answers every request, sync, async and batched, without touching the network. See Cassette.
+
+        Parameters:
+        cassette (Cassette or None) : The cassette to use. None goes back to the providers.
+
+        """
+
+        for _service in (self._openai_service, self._gemini_service, self._anthropic_service):
+            _service._cassette = cassette
+
+##-------------------start-of-set_token_counter()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def set_token_counter(self, token_counter:TokenCounter) -> None:
+
+        """
+
+        Sets what counts tokens for validating text length and calculating costs. Counts are remembered, so a counter shared between clients, or kept across runs in one process, only tokenizes each text once.
+
+        Parameters:
+        token_counter (TokenCounter) : The counter to use.
+
+        """
+
+        self._token_counter = token_counter
+
+##-------------------start-of-calculate_cost()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def calculate_cost(self, text:str | typing.Iterable[str],
+                       service:typing.Literal["gemini", "openai", "anthropic"],
+                       model:typing.Optional[str] = None,
+                       evaluation_instructions:typing.Optional[str] = None
+                        ) -> typing.Tuple[int, float, str]:
+        
+        """
+
+        Calculates the cost of evaluating the given text using the specified service.
+
+        Every text is costed as its own request with the instructions, the way it will be sent. Counts come from the client's TokenCounter, so texts that were already counted aren't tokenized again.
+
+        Parameters:
+        text (string or iterable[string]) : The text to evaluate.
+        service (literal["gemini", "openai", "anthropic"]) : The service to use for evaluation.
+        model (string or None) : The model to use for evaluation. If None, the default model will be used.
+        evaluation_instructions (string or None) : The instructions to use for evaluation. If None, the default instructions will be used.
+
+        Returns:
+        (int) : The number of tokens in the text.
+        (float) : The cost of evaluating the text.
+        (string) : The model used for evaluation.
+
+        """
+
+        _num_tokens, _cost = 0, 0.0
+
+        for _, _, _num_tokens, _cost in self.calculate_cost_stream(text, service, model, evaluation_instructions):
+            pass
+
+        return _num_tokens, _cost, model or self._get_service(service)._default_model
+
+##-------------------start-of-calculate_cost_stream()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def calculate_cost_stream(self, text:str | typing.Iterable[str],
+                              service:typing.Literal["gemini", "openai", "anthropic"],
+                              model:typing.Optional[str] = None,
+                              evaluation_instructions:typing.Optional[str] = None,
+                              chunk_size:int = 10_000
+                              ) -> typing.Iterator[typing.Tuple[int, float, int, float]]:
+
+        """
+
+        Calculates the cost of evaluating each text in turn, holding at most chunk_size texts at a time. (E.g. a corpus read from a file line by line)
+
+        The texts of a chunk are counted together, see TokenCounter.count_many().
+
+        Parameters:
+        text (string or iterable[string]) : The texts to evaluate.
+        service (literal["gemini", "openai", "anthropic"]) : The service to use for evaluation.
+        model (string or None) : The model to use for evaluation. If None, the default model will be used.
+        evaluation_instructions (string or None) : The instructions to use for evaluation. If None, the default instructions will be used.
+        chunk_size (int) : How many texts are counted at a time.
+
+        Yields:
+        (int) : The number of tokens in the text and the instructions.
+        (float) : The cost of evaluating the text.
+        (int) : The number of tokens so far.
+        (float) : The cost so far.
+
+        """
+
+        assert chunk_size >= 1, ValueError("chunk_size must be a positive integer.")
+
+        _service = self._get_service(service)
+
+        model = model or _service._default_model
+
+        _cost_per_model_token = _cost_per_token(model)
+        _instruction_tokens = self._token_counter.count(str(evaluation_instructions or _service._default_evaluation_instructions), model, service)
+
+        _texts = iter([text] if isinstance(text, (str, ModelTranslationMessage)) else text)
+
+        _total_tokens, _total_cost = 0, 0.0
+
+        while(_chunk := [str(_text) for _text in itertools.islice(_texts, chunk_size)]):
+
+            for _num_tokens in self._token_counter.count_many(_chunk, model, service):
+
+                _num_tokens += _instruction_tokens
+                _cost = _num_tokens * _cost_per_model_token
+
+                _total_tokens += _num_tokens
+                _total_cost += _cost
+
+                yield _num_tokens, _cost, _total_tokens, _total_cost
\ No newline at end of file
@@ -4,28 +4,23 @@
 
 ## built-in libraries
 import typing
-import asyncio
 
 ## custom modules 
-from .protocols.openai_service_protocol import OpenAIServiceProtocol
-from .protocols.gemini_service_protocol import GeminiServiceProtocol
-from .protocols.anthropic_service_protocol import AnthropicServiceProtocol
+from .client import ElucidateClient
 
 from .util.classes import openai_service, gemini_service, anthropic_service
-
-from .monkeystrapper import monkeystrap
-
-## monkeystrapping new functions to EasyTL
-monkeystrap()
-
-## finally importing EasyTL with modified classes
-from easytl import EasyTL
-
-from .util.classes import ModelTranslationMessage, SystemTranslationMessage, ChatCompletion, NOT_GIVEN, NotGiven, GenerateContentResponse, AsyncGenerateContentResponse, AnthropicMessage, AnthropicTextBlock, AnthropicToolUseBlock
-from .util.attributes import _return_curated_openai_settings, _validate_stop_sequences, _validate_text_length, _is_iterable_of_strings, _validate_response_schema, _return_curated_gemini_settings, _return_curated_anthropic_settings
-from .util.llm_helper.validators import _validate_elucidate_llm_translation_settings
-
-from .exceptions import InvalidResponseFormatException, InvalidTextInputException, ElucidateException, InvalidAPITypeException
+from .util.classes import ModelTranslationMessage, SystemTranslationMessage, ChatCompletion, NOT_GIVEN, NotGiven, GenerateContentResponse, AsyncGenerateContentResponse, AnthropicMessage
+from .util.credentials import _credential_cache
+from .util.response_cache import ResponseCache
+from .util.journal import EvaluationJournal
+from .util.concurrency import AdaptiveConcurrency
+from .util.batching import BatchResults
+from .util.failover import FailoverPolicy
+from .util.metrics import MetricsSink
+from .util.cassette import Cassette
+from .util.token_counting import TokenCounter
+from .util.streaming import EvaluationStream
+from .util.transport import TransportOptions
 
 class Elucidate:
 
@@ -33,8 +28,16 @@ class Elucidate:
     
     Elucidate global client.
 
+    A thin facade over a default ElucidateClient that uses EasyTL's services and the process wide credential cache. Settings are shared by every caller, create an ElucidateClient per configuration if you need several at once.
+
+    Every function forwards its arguments by name to the matching ElucidateClient function.
 
     """
+
+    _default_client:ElucidateClient = ElucidateClient(_openai_service=typing.cast(typing.Any, openai_service.OpenAIService),
+                                                      _gemini_service=typing.cast(typing.Any, gemini_service.GeminiService),
+                                                      _anthropic_service=typing.cast(typing.Any, anthropic_service.AnthropicService),
+                                                      _credential_cache=_credential_cache)
     
 ##-------------------start-of-openai_evaluate()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
 
@@ -53,9 +56,9 @@ class Elucidate:
                         max_tokens:int | None | NotGiven = NOT_GIVEN,
                         presence_penalty:float | None | NotGiven = NOT_GIVEN,
                         frequency_penalty:float | None | NotGiven = NOT_GIVEN,
-                        _protocol:OpenAIServiceProtocol = typing.cast(OpenAIServiceProtocol, openai_service.OpenAIService)
+                        max_workers:int | None = None
                         ) -> typing.Union[typing.List[str], str, typing.List[ChatCompletion], ChatCompletion]:
-        
+
         """
 
         Performs an evaluation on already translated text using the original untranslated text with OpenAI. Your text attribute should contain both.
@@ -83,70 +86,29 @@ class Elucidate:
         max_tokens (int or None) : The maximum number of tokens to output.
         presence_penalty (float) : The presence penalty to use. This penalizes the model from repeating the same content in the output.
         frequency_penalty (float) : The frequency penalty to use. This penalizes the model from using the same words too frequently in the output.
+        max_workers (int or None) : If set, texts are evaluated on a thread pool of this many threads instead of one at a time, capped at the learned limit if adaptive concurrency is enabled. Order is preserved and rate limits set with set_rate_limits() still apply. A failing text doesn't stop the others, a BatchResults is returned with failed texts set to None and their errors in result.errors.
 
         Returns:
         result (string or list - string or ChatCompletion or list - ChatCompletion) : The evaluation result. A list of strings if the input was an iterable, a string otherwise. A list of ChatCompletion objects if the response type is 'raw' and input was an iterable, a ChatCompletion object otherwise.
 
         """
-        
-        assert response_type in ["text", "raw", "json", "raw_json"], InvalidResponseFormatException("Invalid response type specified. Must be 'text', 'raw', 'json' or 'raw_json'.")
-        
-        if(logging_directory is not None):
-            print("Logging directory has been deprecated for openai_evaluate().")
-
-        _settings = _return_curated_openai_settings(locals())
 
-        _validate_elucidate_llm_translation_settings(_settings, "openai")
+        return Elucidate._default_client.openai_evaluate(text=text,
+                                                         override_previous_settings=override_previous_settings,
+                                                         decorator=decorator,
+                                                         logging_directory=logging_directory,
+                                                         response_type=response_type,
+                                                         evaluation_delay=evaluation_delay,
+                                                         evaluation_instructions=evaluation_instructions,
+                                                         model=model,
+                                                         temperature=temperature,
+                                                         top_p=top_p,
+                                                         stop=stop,
+                                                         max_tokens=max_tokens,
+                                                         presence_penalty=presence_penalty,
+                                                         frequency_penalty=frequency_penalty,
+                                                         max_workers=max_workers)
 
-        _validate_stop_sequences(stop)
-
-        _validate_text_length(text, model, service="openai")
-
-        ## Should be done after validating the settings to reduce cost to the user
-        EasyTL.test_credentials("openai")
-
-        json_mode = True if response_type in ["json", "raw_json"] else False
-        
-        if(override_previous_settings == True):
-            _protocol._set_attributes(model=model,
-                                        temperature=temperature,
-                                        logit_bias=None,
-                                        top_p=top_p,
-                                        n=1,
-                                        stop=stop,
-                                        max_tokens=max_tokens,
-                                        presence_penalty=presence_penalty,
-                                        frequency_penalty=frequency_penalty,
-                                        decorator=decorator,
-                                        semaphore=None,
-                                        rate_limit_delay=evaluation_delay,
-                                        json_mode=json_mode)
-
-            ## Done afterwards, cause default evaluation instructions can change based on set_attributes()
-            evaluation_instructions = evaluation_instructions or _protocol._default_evaluation_instructions
-        
-        else:
-            evaluation_instructions = _protocol._system_message
-
-        assert isinstance(text, str) or _is_iterable_of_strings(text) or isinstance(text, ModelTranslationMessage) or _is_iterable_of_strings(text), InvalidTextInputException("text must be a string, an iterable of strings, a ModelTranslationMessage or an iterable of ModelTranslationMessages.")
-
-        evaluation_batches = _protocol._build_evaluation_batches(text, evaluation_instructions)
-        
-        evaluations = []
-        
-        for _text, _evaluation_instructions in evaluation_batches:
-
-            _result = _protocol._evaluate_translation(_evaluation_instructions, _text)
-
-            evaluation = _result if response_type in ["raw", "raw_json"] else _result.choices[0].message.content
-            
-            evaluations.append(evaluation)
-        
-        ## If originally a single text was provided, return a single evaluation instead of a list
-        result = evaluations if isinstance(text, typing.Iterable) and not isinstance(text, str) else evaluations[0]
-        
-        return result
-    
 ##-------------------start-of-openai_evaluate_async()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
 
     @staticmethod
@@ -165,9 +127,10 @@ class Elucidate:
                         max_tokens:int | None | NotGiven = NOT_GIVEN,
                         presence_penalty:float | None | NotGiven = NOT_GIVEN,
                         frequency_penalty:float | None | NotGiven = NOT_GIVEN,
-                        _protocol:OpenAIServiceProtocol = typing.cast(OpenAIServiceProtocol, openai_service.OpenAIService)
+                        ingestion_window:int | None = None,
+                        journal:EvaluationJournal | None = None
                         ) -> typing.Union[typing.List[str], str, typing.List[ChatCompletion], ChatCompletion]:
-        
+
         """
 
         Asynchronous version of openai_evaluate(). 
@@ -190,7 +153,7 @@ class Elucidate:
         logging_directory (string or None) : The directory to log to. If None, no logging is done. This'll append the text result and some function information to a file in the specified directory. File is created if it doesn't exist.
         response_type (literal["text", "raw", "json", "raw_json"]) : The type of response to return. 'text' returns the evaluated text, 'raw' returns the raw response, a ChatCompletion object, 'json' returns a json-parseable string. 'raw_json' returns the raw response, a ChatCompletion object, but with the content as a json-parseable string.
         semaphore (int) : The number of concurrent requests to make. Default is 5.
-        evaluation_delay (float or None) : If text is an iterable, the delay between each evaluation. Default is none. This is more important for asynchronous evaluations where a semaphore alone may not be sufficient.
+        evaluation_delay (float or None) : If text is an iterable, the delay between each evaluation. Default is none. This is more important for asynchronous evaluations where a semaphore alone may not be sufficient. Ignored for models with a rate limit set through set_rate_limits(), which paces requests without holding a semaphore slot.
         evaluation_instructions (string or SystemTranslationMessage or None) : The evaluation instructions to use. If None, the default system message is used. If you plan on using the json response type, you must specify that you want a json output and it's format in the instructions. The default system message will ask for a generic json if the response type is json.
         model (string) : The model to use. (E.g. 'gpt-4', 'gpt-3.5-turbo-0125', 'gpt-4o', etc.)
         temperature (float) : The temperature to use. The higher the temperature, the more creative the output. Lower temperatures are typically better for evaluation and evaluation.
@@ -199,73 +162,148 @@ class Elucidate:
         max_tokens (int or None) : The maximum number of tokens to output.
         presence_penalty (float) : The presence penalty to use. This penalizes the model from repeating the same content in the output.
         frequency_penalty (float) : The frequency penalty to use. This penalizes the model from using the same words too frequently in the output.
+        ingestion_window (int or None) : The maximum number of texts admitted at a time. Texts are read, validated and built only as they're admitted, so memory stays O(window) and the first request goes out right away. Used automatically if text is an iterator or async iterable (e.g. a generator, a file or a DB cursor), defaulting to the semaphore. If given for a list, the list is ingested lazily too. Results are returned as a list.
+        journal (EvaluationJournal or None) : Records every response as it lands, so a job that dies partway through can be rerun with the same journal and only sends what didn't finish. See EvaluationJournal.
 
         Returns:
         result (string or list - string or ChatCompletion or list - ChatCompletion) : The evaluation result. A list of strings if the input was an iterable, a string otherwise. A list of ChatCompletion objects if the response type is 'raw' and input was an iterable, a ChatCompletion object otherwise.
 
         """
-                
-        assert response_type in ["text", "raw", "json", "raw_json"], InvalidResponseFormatException("Invalid response type specified. Must be 'text', 'raw', 'json' or 'raw_json'.")
 
-        if(logging_directory is not None):
-            print("Logging directory has been deprecated for openai_evaluate_async().")
-        
-        _settings = _return_curated_openai_settings(locals())
+        return await Elucidate._default_client.openai_evaluate_async(text=text,
+                                                                     override_previous_settings=override_previous_settings,
+                                                                     decorator=decorator,
+                                                                     logging_directory=logging_directory,
+                                                                     response_type=response_type,
+                                                                     semaphore=semaphore,
+                                                                     evaluation_delay=evaluation_delay,
+                                                                     evaluation_instructions=evaluation_instructions,
+                                                                     model=model,
+                                                                     temperature=temperature,
+                                                                     top_p=top_p,
+                                                                     stop=stop,
+                                                                     max_tokens=max_tokens,
+                                                                     presence_penalty=presence_penalty,
+                                                                     frequency_penalty=frequency_penalty,
+                                                                     ingestion_window=ingestion_window,
+                                                                     journal=journal)
+
+##-------------------start-of-openai_evaluate_batch()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    @staticmethod
+    def openai_evaluate_batch(text:typing.Union[str, typing.Iterable[str], ModelTranslationMessage, typing.Iterable[ModelTranslationMessage]],
+                              override_previous_settings:bool = True,
+                              response_type:typing.Literal["text", "raw", "json", "raw_json"] | None = "text",
+                              evaluation_instructions:str | SystemTranslationMessage | None = None,
+                              model:str="gpt-4",
+                              temperature:float | None | NotGiven = NOT_GIVEN,
+                              top_p:float | None | NotGiven = NOT_GIVEN,
+                              stop:typing.List[str] | None | NotGiven = NOT_GIVEN,
+                              max_tokens:int | None | NotGiven = NOT_GIVEN,
+                              presence_penalty:float | None | NotGiven = NOT_GIVEN,
+                              frequency_penalty:float | None | NotGiven = NOT_GIVEN,
+                              wait:bool = True,
+                              poll_interval:float = 10.0,
+                              max_poll_interval:float = 300.0,
+                              timeout:float | None = None
+                              ) -> typing.Union[BatchResults, str]:
 
-        _validate_elucidate_llm_translation_settings(_settings, "openai")
+        """
 
-        _validate_stop_sequences(stop)
+        Batch API version of openai_evaluate(). For bulk evaluations that don't need answers right away, the Batch API has much higher throughput limits and costs less, but can take up to 24 hours.
 
-        _validate_text_length(text, model, service="openai")
+        The requests are the same ones openai_evaluate() would send. They're uploaded as a JSONL file and submitted as a single batch.
 
-        ## Should be done after validating the settings to reduce cost to the user
-        EasyTL.test_credentials("openai")
+        Submitting and collecting are separable, so a batch survives process restarts. Pass wait=False to only submit and get the batch id, check on it with openai_batch_status() and collect the results with openai_resume_batch().
 
-        json_mode = True if response_type in ["json", "raw_json"] else False
-        
-        if(override_previous_settings == True):
-            _protocol._set_attributes(model=model,
-                                        temperature=temperature,
-                                        logit_bias=None,
-                                        top_p=top_p,
-                                        n=1,
-                                        stop=stop,
-                                        max_tokens=max_tokens,
-                                        presence_penalty=presence_penalty,
-                                        frequency_penalty=frequency_penalty,
-                                        decorator=decorator,
-                                        semaphore=semaphore,
-                                        rate_limit_delay=evaluation_delay,
-                                        json_mode=json_mode)
-
-            ## Done afterwards, cause default evaluation instructions can change based on set_attributes()
-            evaluation_instructions = evaluation_instructions or _protocol._default_evaluation_instructions
-        
-        else:
-            evaluation_instructions = _protocol._system_message
+        With a recording cassette (see set_cassette()) the results are recorded if wait is True. Results collected later with openai_resume_batch() aren't, the requests aren't known there. With a replaying cassette nothing is submitted, the recorded results are returned right away whatever wait is.
 
-        assert isinstance(text, str) or _is_iterable_of_strings(text) or isinstance(text, ModelTranslationMessage) or _is_iterable_of_strings(text), InvalidTextInputException("text must be a string, an iterable of strings, a ModelTranslationMessage or an iterable of ModelTranslationMessages.")
+        Parameters:
+        text (string | ModelTranslationMessage | iterable[str] | iterable[ModelTranslationMessage]) : The text to evaluate. This should be the original untranslated text along with the translated text.
+        override_previous_settings (bool) : Whether to override the previous settings that were used during the last call to an OpenAI evaluation function.
+        response_type (literal["text", "raw", "json", "raw_json"]) : The type of response to return. 'text' returns the evaluated text, 'raw' returns the raw response, a ChatCompletion object, 'json' returns a json-parseable string. 'raw_json' returns the raw response, a ChatCompletion object, but with the content as a json-parseable string.
+        evaluation_instructions (string or SystemTranslationMessage or None) : The evaluation instructions to use. If None, the default system message is used.
+        model (string) : The model to use. (E.g. 'gpt-4', 'gpt-3.5-turbo-0125', 'gpt-4o', etc.)
+        temperature (float) : The temperature to use.
+        top_p (float) : The nucleus sampling probability.
+        stop (list or None) : String sequences that will cause the model to stop evaluation if encountered.
+        max_tokens (int or None) : The maximum number of tokens to output.
+        presence_penalty (float) : The presence penalty to use.
+        frequency_penalty (float) : The frequency penalty to use.
+        wait (bool) : Whether to wait for the batch to finish and return the results. If False, the batch id is returned right after submitting.
+        poll_interval (float) : The first wait between status checks, in seconds. Each wait is 1.5 times longer than the last.
+        max_poll_interval (float) : The longest wait between status checks, in seconds.
+        timeout (float or None) : How long to wait before raising. The batch keeps running and can be resumed with openai_resume_batch(). None waits forever.
 
-        _evaluation_batches = _protocol._build_evaluation_batches(text, evaluation_instructions)
+        Returns:
+        result (BatchResults or string) : If wait is True, the evaluations in input order, a list of strings or ChatCompletion objects depending on response_type. Items that failed are None and their errors are in result.errors. If wait is False, the batch id.
 
-        _evaluation_tasks = []
+        """
 
-        for _text, _evaluation_instructions in _evaluation_batches:
-            _task = _protocol._evaluate_translation_async(_evaluation_instructions, _text)
-            _evaluation_tasks.append(_task)
+        return Elucidate._default_client.openai_evaluate_batch(text=text,
+                                                               override_previous_settings=override_previous_settings,
+                                                               response_type=response_type,
+                                                               evaluation_instructions=evaluation_instructions,
+                                                               model=model,
+                                                               temperature=temperature,
+                                                               top_p=top_p,
+                                                               stop=stop,
+                                                               max_tokens=max_tokens,
+                                                               presence_penalty=presence_penalty,
+                                                               frequency_penalty=frequency_penalty,
+                                                               wait=wait,
+                                                               poll_interval=poll_interval,
+                                                               max_poll_interval=max_poll_interval,
+                                                               timeout=timeout)
+
+##-------------------start-of-openai_batch_status()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
 
-        _results = await asyncio.gather(*_evaluation_tasks)
+    @staticmethod
+    def openai_batch_status(batch_id:str) -> str:
 
-        _results:typing.List[ChatCompletion] = _results
+        """
 
-        assert all([hasattr(_r, "choices") for _r in _results]), ElucidateException("Malformed response received. Please try again.")
+        Returns the status of a batch submitted with openai_evaluate_batch(). (E.g. 'validating', 'in_progress', 'finalizing', 'completed', 'failed', 'expired', 'cancelled')
 
-        evaluation = _results if response_type in ["raw","raw_json"] else [result.choices[0].message.content for result in _results if result.choices[0].message.content is not None]
+        Parameters:
+        batch_id (string) : The id of the batch.
 
-        result = evaluation if isinstance(text, typing.Iterable) and not isinstance(text, str) else evaluation[0]
+        Returns:
+        status (string) : The status.
+
+        """
+
+        return Elucidate._default_client.openai_batch_status(batch_id=batch_id)
+
+##-------------------start-of-openai_resume_batch()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    @staticmethod
+    def openai_resume_batch(batch_id:str,
+                            poll_interval:float = 10.0,
+                            max_poll_interval:float = 300.0,
+                            timeout:float | None = None
+                            ) -> BatchResults:
+
+        """
+
+        Waits for a batch submitted with openai_evaluate_batch() to finish and returns its results. Works from a different process than the one that submitted the batch.
+
+        Parameters:
+        batch_id (string) : The id of the batch.
+        poll_interval (float) : The first wait between status checks, in seconds. Each wait is 1.5 times longer than the last.
+        max_poll_interval (float) : The longest wait between status checks, in seconds.
+        timeout (float or None) : How long to wait before raising. The batch keeps running and can be resumed again. None waits forever.
+
+        Returns:
+        result (BatchResults) : The evaluations in input order, with the response type the batch was submitted with. Items that failed are None and their errors are in result.errors.
+
+        """
+
+        return Elucidate._default_client.openai_resume_batch(batch_id=batch_id,
+                                                             poll_interval=poll_interval,
+                                                             max_poll_interval=max_poll_interval,
+                                                             timeout=timeout)
 
-        return result
-    
 ##-------------------start-of-gemini_evaluate()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
 
     @staticmethod
@@ -283,9 +321,9 @@ class Elucidate:
                         top_k:int=40,
                         stop_sequences:typing.List[str] | None=None,
                         max_output_tokens:int | None=None,
-                        _protocol:GeminiServiceProtocol = typing.cast(GeminiServiceProtocol, gemini_service.GeminiService)
+                        max_workers:int | None = None
                         ) -> typing.Union[typing.List[str], str, GenerateContentResponse, typing.List[GenerateContentResponse]]:
-        
+
         """
 
         Performs an evaluation on already translated text using the original untranslated text with Gemini. Your text attribute should contain both.
@@ -311,73 +349,31 @@ class Elucidate:
         top_k (int) : The top k sampling probability. The higher the value, the more words are considered for the next token. Generally, alter this or temperature, not both.
         stop_sequences (list or None) : String sequences that will cause the model to stop evaluation if encountered, generally useless.
         max_output_tokens (int or None) : The maximum number of tokens to output.
+        max_workers (int or None) : If set, texts are evaluated on a thread pool of this many threads instead of one at a time, capped at the learned limit if adaptive concurrency is enabled. Order is preserved and rate limits set with set_rate_limits() still apply. A failing text doesn't stop the others, a BatchResults is returned with failed texts set to None and their errors in result.errors.
 
         Returns:
         result (string or list - string or GenerateContentResponse or list - GenerateContentResponse) : The evaluation result. A list of strings if the input was an iterable, a string otherwise. A list of GenerateContentResponse objects if the response type is 'raw' and input was an iterable, a GenerateContentResponse object otherwise.
 
         """
 
-        assert response_type in ["text", "raw", "json", "raw_json"], InvalidResponseFormatException("Invalid response type specified. Must be 'text', 'raw', 'json' or 'raw_json'.")
-
-        if(logging_directory is not None):
-            print("Logging directory has been deprecated for gemini_evaluate().")
-
-        _settings = _return_curated_gemini_settings(locals())
-
-        _validate_elucidate_llm_translation_settings(_settings, "gemini")
-
-        _validate_stop_sequences(stop_sequences)
-
-        _validate_text_length(text, model, service="gemini")
+        return Elucidate._default_client.gemini_evaluate(text=text,
+                                                         override_previous_settings=override_previous_settings,
+                                                         decorator=decorator,
+                                                         logging_directory=logging_directory,
+                                                         response_type=response_type,
+                                                         response_schema=response_schema,
+                                                         evaluation_delay=evaluation_delay,
+                                                         evaluation_instructions=evaluation_instructions,
+                                                         model=model,
+                                                         temperature=temperature,
+                                                         top_p=top_p,
+                                                         top_k=top_k,
+                                                         stop_sequences=stop_sequences,
+                                                         max_output_tokens=max_output_tokens,
+                                                         max_workers=max_workers)
 
-        response_schema = _validate_response_schema(response_schema)
-
-        ## Should be done after validating the settings to reduce cost to the user
-        EasyTL.test_credentials("gemini")
-
-        json_mode = True if response_type in ["json", "raw_json"] else False
-
-        if(override_previous_settings == True):
-            _protocol._set_attributes(model=model,
-                                          system_message=evaluation_instructions,
-                                          temperature=temperature,
-                                          top_p=top_p,
-                                          top_k=top_k,
-                                          candidate_count=1,
-                                          stream=False,
-                                          stop_sequences=stop_sequences,
-                                          max_output_tokens=max_output_tokens,
-                                          decorator=decorator,
-                                          semaphore=None,
-                                          rate_limit_delay=evaluation_delay,
-                                          json_mode=json_mode,
-                                          response_schema=response_schema)
-            
-            ## Done afterwards, cause default evaluation instructions can change based on set_attributes()       
-            _protocol._system_message = evaluation_instructions or _protocol._default_evaluation_instructions
-        
-        if(isinstance(text, str)):
-            _result = _protocol._evaluate_translation(text)
-            
-            assert not isinstance(_result, list) and hasattr(_result, "text"), ElucidateException("Malformed response received. Please try again.")
-            
-            result = _result if response_type in ["raw", "raw_json"] else _result.text
-
-        elif(_is_iterable_of_strings(text)):
-            
-            _results = [_protocol._evaluate_translation(_text) for _text in text]
-
-            assert isinstance(_results, list) and all([hasattr(_r, "text") for _r in _results]), ElucidateException("Malformed response received. Please try again.")
-
-            result = [_r.text for _r in _results] if response_type in ["text","json"] else _results # type: ignore
-            
-        else:
-            raise InvalidTextInputException("text must be a string or an iterable of strings.")
-        
-        return result
-    
 ##-------------------start-of-gemini_evaluate_async()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
-    
+
     @staticmethod
     async def gemini_evaluate_async(text:typing.Union[str, typing.Iterable[str]],
                                     override_previous_settings:bool = True,
@@ -394,9 +390,10 @@ class Elucidate:
                                     top_k:int=40,
                                     stop_sequences:typing.List[str] | None=None,
                                     max_output_tokens:int | None=None,
-                                    _protocol:GeminiServiceProtocol = typing.cast(GeminiServiceProtocol, gemini_service.GeminiService)
+                                    ingestion_window:int | None = None,
+                                    journal:EvaluationJournal | None = None
                                     ) -> typing.Union[typing.List[str], str, AsyncGenerateContentResponse, typing.List[AsyncGenerateContentResponse]]:
-        
+
         """
 
         Asynchronous version of gemini_evaluate().
@@ -418,7 +415,7 @@ class Elucidate:
         response_type (literal["text", "raw", "json", "raw_json"]) : The type of response to return. 'text' returns the evaluated text, 'raw' returns the raw response, a GenerateContentResponse object, 'json' returns a json-parseable string. 'raw_json' returns the raw response, a GenerateContentResponse object, but with the content as a json-parseable string.
         response_schema (string or mapping or None) : The schema to use for the response. If None, no schema is used. This is only used if the response type is 'json' or 'json_raw'. Elucidate only validates the schema to the extend that it is None or a valid json.4
         semaphore (int) : The number of concurrent requests to make. Default is 5.
-        evaluation_delay (float or None) : If text is an iterable, the delay between each evaluation. Default is none. This is more important for asynchronous evaluations where a semaphore alone may not be sufficient.
+        evaluation_delay (float or None) : If text is an iterable, the delay between each evaluation. Default is none. This is more important for asynchronous evaluations where a semaphore alone may not be sufficient. Ignored for models with a rate limit set through set_rate_limits(), which paces requests without holding a semaphore slot.
         evaluation_instructions (string or None) : The evaluation instructions to use. If None, the default system message is used. If you plan on using the json response type, you must specify that you want a json output and it's format in the instructions. The default system message will ask for a generic json if the response type is json.
         model (string) : The model to use. (E.g. 'gemini-pro', 'gemini-1.5-pro', 'gemini-1.5-flash', etc.)
         temperature (float) : The temperature to use. The higher the temperature, the more creative the output. Lower temperatures are typically better for evaluation and evaluation.
@@ -426,68 +423,33 @@ class Elucidate:
         top_k (int) : The top k sampling probability. The higher the value, the more words are considered for the next token. Generally, alter this or temperature, not both.
         stop_sequences (list or None) : String sequences that will cause the model to stop evaluation if encountered, generally useless.
         max_output_tokens (int or None) : The maximum number of tokens to output.
+        ingestion_window (int or None) : The maximum number of texts admitted at a time. Texts are read, validated and built only as they're admitted, so memory stays O(window) and the first request goes out right away. Used automatically if text is an iterator or async iterable (e.g. a generator, a file or a DB cursor), defaulting to the semaphore. If given for a list, the list is ingested lazily too. Results are returned as a list.
+        journal (EvaluationJournal or None) : Records every response as it lands, so a job that dies partway through can be rerun with the same journal and only sends what didn't finish. See EvaluationJournal.
 
         Returns:
         result (string or list - string or GenerateContentResponse or list - GenerateContentResponse) : The evaluation result. A list of strings if the input was an iterable, a string otherwise. A list of GenerateContentResponse objects if the response type is 'raw' and input was an iterable, a GenerateContentResponse object otherwise.
 
         """
 
-        assert response_type in ["text", "raw", "json", "raw_json"], InvalidResponseFormatException("Invalid response type specified. Must be 'text', 'raw', 'json' or 'raw_json'.")
-
-        if(logging_directory is not None):
-            print("Logging directory has been deprecated for gemini_evaluate_async().")
-
-        _settings = _return_curated_gemini_settings(locals())
-
-        _validate_elucidate_llm_translation_settings(_settings, "gemini")
-
-        _validate_stop_sequences(stop_sequences)
-
-        _validate_text_length(text, model, service="gemini")
-
-        response_schema = _validate_response_schema(response_schema)
-
-        ## Should be done after validating the settings to reduce cost to the user
-        EasyTL.test_credentials("gemini")
-
-        json_mode = True if response_type in ["json", "raw_json"] else False
-
-        if(override_previous_settings == True):
-            _protocol._set_attributes(model=model,
-                                          system_message=evaluation_instructions,
-                                          temperature=temperature,
-                                          top_p=top_p,
-                                          top_k=top_k,
-                                          candidate_count=1,
-                                          stream=False,
-                                          stop_sequences=stop_sequences,
-                                          max_output_tokens=max_output_tokens,
-                                          decorator=decorator,
-                                          semaphore=semaphore,
-                                          rate_limit_delay=evaluation_delay,
-                                          json_mode=json_mode,
-                                          response_schema=response_schema)
-            
-            ## Done afterwards, cause default evaluation instructions can change based on set_attributes()
-            _protocol._system_message = evaluation_instructions or _protocol._default_evaluation_instructions
-            
-        if(isinstance(text, str)):
-            _result = await _protocol._evaluate_translation_async(text)
-
-            result = _result if response_type in ["raw", "raw_json"] else _result.text
-            
-        elif(_is_iterable_of_strings(text)):
-            _tasks = [_protocol._evaluate_translation_async(_text) for _text in text]
-            _results = await asyncio.gather(*_tasks)
-
-            result = [_r.text for _r in _results] if response_type in ["text","json"] else _results # type: ignore
-
-        else:
-            raise InvalidTextInputException("text must be a string or an iterable of strings.")
-        
-        return result
-
-##-------------------start-of-anthropic_evaluate()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------    
+        return await Elucidate._default_client.gemini_evaluate_async(text=text,
+                                                                     override_previous_settings=override_previous_settings,
+                                                                     decorator=decorator,
+                                                                     logging_directory=logging_directory,
+                                                                     response_type=response_type,
+                                                                     response_schema=response_schema,
+                                                                     semaphore=semaphore,
+                                                                     evaluation_delay=evaluation_delay,
+                                                                     evaluation_instructions=evaluation_instructions,
+                                                                     model=model,
+                                                                     temperature=temperature,
+                                                                     top_p=top_p,
+                                                                     top_k=top_k,
+                                                                     stop_sequences=stop_sequences,
+                                                                     max_output_tokens=max_output_tokens,
+                                                                     ingestion_window=ingestion_window,
+                                                                     journal=journal)
+
+##-------------------start-of-anthropic_evaluate()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
 
     @staticmethod
     def anthropic_evaluate(text:typing.Union[str, typing.Iterable[str], ModelTranslationMessage, typing.Iterable[ModelTranslationMessage]],
@@ -504,9 +466,11 @@ class Elucidate:
                             top_k:int | NotGiven = NOT_GIVEN,
                             stop_sequences:typing.List[str] | NotGiven = NOT_GIVEN,
                             max_output_tokens:int | NotGiven = NOT_GIVEN,
-                            _protocol:AnthropicServiceProtocol = typing.cast(AnthropicServiceProtocol, anthropic_service.AnthropicService)
+                            cache_instructions:bool = False,
+                            shared_context:str | None = None,
+                            max_workers:int | None = None
                             ) -> typing.Union[typing.List[str], str, AnthropicMessage, typing.List[AnthropicMessage]]:
-        
+
         """
         
         Performs an evaluation on already translated text using the original untranslated text with Anthropic. Your text attribute should contain both.
@@ -532,82 +496,33 @@ class Elucidate:
         top_k (int) : The top k sampling probability. The higher the value, the more words are considered for the next token. Generally, alter this or temperature, not both.
         stop_sequences (list or None) : String sequences that will cause the model to stop evaluation if encountered, generally useless.
         max_output_tokens (int or None) : The maximum number of tokens to output.
+        cache_instructions (bool) : Whether to mark the system prompt for Anthropic's prompt caching, so long instructions are only paid for in full once every few minutes instead of on every request. They have to be at least 1024 tokens long (2048 for Haiku models) to be cached.
+        shared_context (string or None) : Context shared by every text, such as a style guide or glossary, sent as a second system block after the instructions. Cached along with them if cache_instructions is True.
+        max_workers (int or None) : If set, texts are evaluated on a thread pool of this many threads instead of one at a time, capped at the learned limit if adaptive concurrency is enabled. Order is preserved and rate limits set with set_rate_limits() still apply. A failing text doesn't stop the others, a BatchResults is returned with failed texts set to None and their errors in result.errors.
         
         Returns:
         result (string or list - string or AnthropicMessage or list - AnthropicMessage) : The evaluation result. A list of strings if the input was an iterable, a string otherwise. A list of AnthropicMessage objects if the response type is 'raw' and input was an iterable, a AnthropicMessage object otherwise.
 
         """
 
-        assert response_type in ["text", "raw", "json", "raw_json"], InvalidResponseFormatException("Invalid response type specified. Must be 'text', 'raw', 'json' or 'raw_json'.")
-
-        if(logging_directory is not None):
-            print("Logging directory has been deprecated for anthropic_evaluate().")
-
-        _settings = _return_curated_anthropic_settings(locals())
-
-        _validate_elucidate_llm_translation_settings(_settings, "anthropic")
-
-        _validate_stop_sequences(stop_sequences)
-
-        _validate_text_length(text, model, service="anthropic")
-
-        response_schema = _validate_response_schema(response_schema)
-
-        ## Should be done after validating the settings to reduce cost to the user
-        EasyTL.test_credentials("anthropic")
-
-        json_mode = True if response_type in ["json", "raw_json"] else False
-
-        if(override_previous_settings == True):
-            _protocol._set_attributes(model=model,
-                                            system=evaluation_instructions,
-                                            temperature=temperature,
-                                            top_p=top_p,
-                                            top_k=top_k,
-                                            stop_sequences=stop_sequences,
-                                            stream=False,
-                                            max_tokens=max_output_tokens,
-                                            decorator=decorator,
-                                            semaphore=None,
-                                            rate_limit_delay=evaluation_delay,
-                                            json_mode=json_mode,
-                                            response_schema=response_schema)
-            
-            ## Done afterwards, cause default evaluation instructions can change based on set_attributes()
-            _protocol._system = evaluation_instructions or _protocol._default_evaluation_instructions
-
-        assert isinstance(text, str) or _is_iterable_of_strings(text) or isinstance(text, ModelTranslationMessage) or _is_iterable_of_strings(text), InvalidTextInputException("text must be a string, an iterable of strings, a ModelTranslationMessage or an iterable of ModelTranslationMessages.")
-
-        _evaluation_batches = _protocol._build_evaluation_batches(text)
+        return Elucidate._default_client.anthropic_evaluate(text=text,
+                                                            override_previous_settings=override_previous_settings,
+                                                            decorator=decorator,
+                                                            logging_directory=logging_directory,
+                                                            response_type=response_type,
+                                                            response_schema=response_schema,
+                                                            evaluation_delay=evaluation_delay,
+                                                            evaluation_instructions=evaluation_instructions,
+                                                            model=model,
+                                                            temperature=temperature,
+                                                            top_p=top_p,
+                                                            top_k=top_k,
+                                                            stop_sequences=stop_sequences,
+                                                            max_output_tokens=max_output_tokens,
+                                                            cache_instructions=cache_instructions,
+                                                            shared_context=shared_context,
+                                                            max_workers=max_workers)
 
-        _evaluation = []
-
-        for _text in _evaluation_batches:
-
-            _result = _protocol._evaluate_translation(_protocol._system, _text)
-
-            assert not isinstance(_result, list) and hasattr(_result, "content"), ElucidateException("Malformed response received. Please try again.")
-
-            if(response_type in ["raw", "raw_json"]):
-                evaluation = _result
-
-            ## response structure can vary if tools are used
-            else:
-                content = _result.content
-
-                if(isinstance(content[0], AnthropicTextBlock)):
-                    evaluation = content[0].text
-
-                elif(isinstance(content[0], AnthropicToolUseBlock)):
-                    evaluation = content[0].input
-                            
-            _evaluation.append(evaluation)
-
-        ## If originally a single text was provided, return a single evaluation instead of a list
-        result = _evaluation if isinstance(text, typing.Iterable) and not isinstance(text, str) else _evaluation[0]
-
-        return result
-    
 ##-------------------start-of-anthropic_evaluate_async()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
 
     @staticmethod
@@ -626,8 +541,12 @@ class Elucidate:
                                         top_k:int | NotGiven = NOT_GIVEN,
                                         stop_sequences:typing.List[str] | NotGiven = NOT_GIVEN,
                                         max_output_tokens:int | NotGiven = NOT_GIVEN,
-                                        _protocol:AnthropicServiceProtocol = typing.cast(AnthropicServiceProtocol, anthropic_service.AnthropicService)
+                                        cache_instructions:bool = False,
+                                        shared_context:str | None = None,
+                                        ingestion_window:int | None = None,
+                                        journal:EvaluationJournal | None = None
                                         ) -> typing.Union[typing.List[str], str, AnthropicMessage, typing.List[AnthropicMessage]]:
+
         """
 
         Asynchronous version of anthropic_evaluate().
@@ -649,7 +568,7 @@ class Elucidate:
         response_type (literal["text", "raw", "json", "raw_json"]) : The type of response to return. 'text' returns the evaluated text, 'raw' returns the raw response, a AnthropicMessage object, 'json' returns a json-parseable string. 'raw_json' returns the raw response, a AnthropicMessage object, but with the content as a json-parseable string.
         response_schema (string or mapping or None) : The schema to use for the response. If None, no schema is used. This is only used if the response type is 'json' or 'json_raw'. Elucidate only validates the schema to the extend that it is None or a valid json.
         semaphore (int) : The number of concurrent requests to make. Default is 5.
-        evaluation_delay (float or None) : If text is an iterable, the delay between each evaluation. Default is none. This is more important for asynchronous evaluations where a semaphore alone may not be sufficient.
+        evaluation_delay (float or None) : If text is an iterable, the delay between each evaluation. Default is none. This is more important for asynchronous evaluations where a semaphore alone may not be sufficient. Ignored for models with a rate limit set through set_rate_limits(), which paces requests without holding a semaphore slot.
         evaluation_instructions (string or None) : The evaluation instructions to use. If None, the default system message is used. If you plan on using the json response type, you must specify that you want a json output and it's format in the instructions. The default system message will ask for a generic json if the response type is json.
         model (string) : The model to use. (E.g. 'claude-3-haiku-20240307', 'claude-3-haiku-20240307', 'claude-3-haiku-20240307', etc.)
         temperature (float) : The temperature to use. The higher the temperature, the more creative the output. Lower temperatures are typically better for evaluation and evaluation.
@@ -657,78 +576,166 @@ class Elucidate:
         top_k (int) : The top k sampling probability. The higher the value, the more words are considered for the next token. Generally, alter this or temperature, not both.
         stop_sequences (list or None) : String sequences that will cause the model to stop evaluation if encountered, generally useless.
         max_output_tokens (int or None) : The maximum number of tokens to output.
+        cache_instructions (bool) : Whether to mark the system prompt for Anthropic's prompt caching, so long instructions are only paid for in full once every few minutes instead of on every request. They have to be at least 1024 tokens long (2048 for Haiku models) to be cached.
+        shared_context (string or None) : Context shared by every text, such as a style guide or glossary, sent as a second system block after the instructions. Cached along with them if cache_instructions is True.
+        ingestion_window (int or None) : The maximum number of texts admitted at a time. Texts are read, validated and built only as they're admitted, so memory stays O(window) and the first request goes out right away. Used automatically if text is an iterator or async iterable (e.g. a generator, a file or a DB cursor), defaulting to the semaphore. If given for a list, the list is ingested lazily too. Results are returned as a list.
+        journal (EvaluationJournal or None) : Records every response as it lands, so a job that dies partway through can be rerun with the same journal and only sends what didn't finish. See EvaluationJournal.
         
         Returns:
         result (string or list - string or AnthropicMessage or list - AnthropicMessage) : The evaluation result. A list of strings if the input was an iterable, a string otherwise. A list of AnthropicMessage objects if the response type is 'raw' and input was an iterable, a AnthropicMessage object otherwise.
 
         """
 
-        assert response_type in ["text", "raw", "json", "raw_json"], InvalidResponseFormatException("Invalid response type specified. Must be 'text', 'raw', 'json' or 'raw_json'.")
+        return await Elucidate._default_client.anthropic_evaluate_async(text=text,
+                                                                        override_previous_settings=override_previous_settings,
+                                                                        decorator=decorator,
+                                                                        logging_directory=logging_directory,
+                                                                        response_type=response_type,
+                                                                        response_schema=response_schema,
+                                                                        semaphore=semaphore,
+                                                                        evaluation_delay=evaluation_delay,
+                                                                        evaluation_instructions=evaluation_instructions,
+                                                                        model=model,
+                                                                        temperature=temperature,
+                                                                        top_p=top_p,
+                                                                        top_k=top_k,
+                                                                        stop_sequences=stop_sequences,
+                                                                        max_output_tokens=max_output_tokens,
+                                                                        cache_instructions=cache_instructions,
+                                                                        shared_context=shared_context,
+                                                                        ingestion_window=ingestion_window,
+                                                                        journal=journal)
+
+##-------------------start-of-anthropic_evaluate_batch()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    @staticmethod
+    def anthropic_evaluate_batch(text:typing.Union[str, typing.Iterable[str], ModelTranslationMessage, typing.Iterable[ModelTranslationMessage]],
+                                 override_previous_settings:bool = True,
+                                 response_type:typing.Literal["text", "raw", "json", "raw_json"] | None = "text",
+                                 response_schema:str | typing.Mapping[str, typing.Any] | None = None,
+                                 evaluation_instructions:str | None = None,
+                                 model:str="claude-3-haiku-20240307",
+                                 temperature:float | NotGiven = NOT_GIVEN,
+                                 top_p:float | NotGiven = NOT_GIVEN,
+                                 top_k:int | NotGiven = NOT_GIVEN,
+                                 stop_sequences:typing.List[str] | NotGiven = NOT_GIVEN,
+                                 max_output_tokens:int | NotGiven = NOT_GIVEN,
+                                 cache_instructions:bool = False,
+                                 shared_context:str | None = None,
+                                 wait:bool = True,
+                                 poll_interval:float = 10.0,
+                                 max_poll_interval:float = 300.0,
+                                 timeout:float | None = None,
+                                 max_requests_per_batch:int = 100_000
+                                 ) -> typing.Union[BatchResults, typing.List[str]]:
+
+        """
+
+        Message Batches version of anthropic_evaluate(). For bulk evaluations that don't need answers right away, Message Batches cost less and aren't subject to the usual rate limits, but can take up to 24 hours.
 
-        if(logging_directory is not None):
-            print("Logging directory has been deprecated for anthropic_evaluate_async().")
+        The requests are the same ones anthropic_evaluate() would send, including the format_to_json tool in json mode. Inputs too large for one batch are split across several.
 
-        _settings = _return_curated_anthropic_settings(locals())
+        Submitting and collecting are separable. Pass wait=False to only submit and get the batch ids, check on them with anthropic_batch_status() and collect the results with anthropic_resume_batch().
 
-        _validate_elucidate_llm_translation_settings(_settings, "anthropic")
+        With a recording cassette (see set_cassette()) the results are recorded if wait is True. Results collected later with anthropic_resume_batch() aren't, the requests aren't known there. With a replaying cassette nothing is submitted, the recorded results are returned right away whatever wait is.
 
-        _validate_stop_sequences(stop_sequences)
+        Parameters:
+        text (string | ModelTranslationMessage | iterable[string] | iterable[ModelTranslationMessage]) : The text to evaluate. This should be the original untranslated text along with the translated text.
+        override_previous_settings (bool) : Whether to override the previous settings that were used during the last call to an Anthropic evaluation function.
+        response_type (literal["text", "raw", "json", "raw_json"]) : The type of response to return. 'text' returns the evaluated text, 'raw' returns the raw response, an AnthropicMessage object, 'json' returns a json-parseable string. 'raw_json' returns the raw response, an AnthropicMessage object, but with the content as a json-parseable string.
+        response_schema (string or mapping or None) : The schema to use for the response. If None, no schema is used. This is only used if the response type is 'json' or 'json_raw'. Elucidate only validates the schema to the extend that it is None or a valid json. It does not validate the contents of the json.
+        evaluation_instructions (string or None) : The evaluation instructions to use. If None, the default system message is used.
+        model (string) : The model to use. (E.g. 'claude-3-haiku-20240307', 'claude-3-sonnet-20240229' or 'claude-3-opus-20240229')
+        temperature (float) : The temperature to use. The higher the temperature, the more creative the output. Lower temperatures are typically better for evaluation.
+        top_p (float) : The nucleus sampling probability. The higher the value, the more words are considered for the next token. Generally, alter this or temperature, not both.
+        top_k (int) : The top k sampling probability. The higher the value, the more words are considered for the next token. Generally, alter this or temperature, not both.
+        stop_sequences (list or None) : String sequences that will cause the model to stop evaluation if encountered, generally useless.
+        max_output_tokens (int or None) : The maximum number of tokens to output.
+        cache_instructions (bool) : Whether to mark the system prompt for Anthropic's prompt caching, so long instructions are only paid for in full once every few minutes instead of on every request. They have to be at least 1024 tokens long (2048 for Haiku models) to be cached.
+        shared_context (string or None) : Context shared by every text, such as a style guide or glossary, sent as a second system block after the instructions. Cached along with them if cache_instructions is True.
+        wait (bool) : Whether to wait for the batches to end and return the results. If False, the batch ids are returned right after submitting.
+        poll_interval (float) : The first wait between status checks, in seconds. Each wait is 1.5 times longer than the last.
+        max_poll_interval (float) : The longest wait between status checks, in seconds.
+        timeout (float or None) : How long to wait before raising. The batches keep running and can be resumed with anthropic_resume_batch(). None waits forever.
+        max_requests_per_batch (int) : The most texts submitted in a single batch. Batches are also split to stay under the size limit.
 
-        _validate_text_length(text, model, service="anthropic")
+        Returns:
+        result (BatchResults or list[string]) : If wait is True, the evaluations in input order, a list of strings or AnthropicMessage objects depending on response_type. Items that failed are None and their errors are in result.errors. If wait is False, the batch ids.
 
-        response_schema = _validate_response_schema(response_schema)
+        """
 
-        ## Should be done after validating the settings to reduce cost to the user
-        EasyTL.test_credentials("anthropic")
+        return Elucidate._default_client.anthropic_evaluate_batch(text=text,
+                                                                  override_previous_settings=override_previous_settings,
+                                                                  response_type=response_type,
+                                                                  response_schema=response_schema,
+                                                                  evaluation_instructions=evaluation_instructions,
+                                                                  model=model,
+                                                                  temperature=temperature,
+                                                                  top_p=top_p,
+                                                                  top_k=top_k,
+                                                                  stop_sequences=stop_sequences,
+                                                                  max_output_tokens=max_output_tokens,
+                                                                  cache_instructions=cache_instructions,
+                                                                  shared_context=shared_context,
+                                                                  wait=wait,
+                                                                  poll_interval=poll_interval,
+                                                                  max_poll_interval=max_poll_interval,
+                                                                  timeout=timeout,
+                                                                  max_requests_per_batch=max_requests_per_batch)
+
+##-------------------start-of-anthropic_batch_status()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
 
-        json_mode = True if response_type in ["json", "raw_json"] else False
+    @staticmethod
+    def anthropic_batch_status(batch_ids:str | typing.Iterable[str]) -> str:
 
-        if(override_previous_settings == True):
-            _protocol._set_attributes(model=model,
-                                            system=evaluation_instructions,
-                                            temperature=temperature,
-                                            top_p=top_p,
-                                            top_k=top_k,
-                                            stop_sequences=stop_sequences,
-                                            stream=False,
-                                            max_tokens=max_output_tokens,
-                                            decorator=decorator,
-                                            semaphore=semaphore,
-                                            rate_limit_delay=evaluation_delay,
-                                            json_mode=json_mode,
-                                            response_schema=response_schema)
-            
-            ## Done afterwards, cause default evaluation instructions can change based on set_attributes()
-            _protocol._system = evaluation_instructions or _protocol._default_evaluation_instructions
-        
-        assert isinstance(text, str) or _is_iterable_of_strings(text) or isinstance(text, ModelTranslationMessage) or _is_iterable_of_strings(text), InvalidTextInputException("text must be a string, an iterable of strings, a ModelTranslationMessage or an iterable of ModelTranslationMessages.")
+        """
 
-        _evaluation_batches = _protocol._build_evaluation_batches(text)
+        Returns the status of batches submitted with anthropic_evaluate_batch(). 'ended' once every batch has ended, otherwise the status of the ones that haven't. ('in_progress' or 'canceling')
 
-        _evaluation_tasks = []
+        Parameters:
+        batch_ids (string or iterable[string]) : The ids anthropic_evaluate_batch() returned.
 
-        for _text in _evaluation_batches:
-            _task = _protocol._evaluate_translation_async(_protocol._system, _text)
-            _evaluation_tasks.append(_task)
+        Returns:
+        status (string) : The status.
 
-        _results = await asyncio.gather(*_evaluation_tasks)
+        """
 
-        _results:typing.List[AnthropicMessage] = _results
+        return Elucidate._default_client.anthropic_batch_status(batch_ids=batch_ids)
 
-        assert all([hasattr(_r, "content") for _r in _results]), ElucidateException("Malformed response received. Please try again.")
+##-------------------start-of-anthropic_resume_batch()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
 
-        if(response_type in ["raw", "raw_json"]):
-            evaluation = _results
+    @staticmethod
+    def anthropic_resume_batch(batch_ids:str | typing.Iterable[str],
+                               response_type:typing.Literal["text", "raw", "json", "raw_json"] | None = "text",
+                               poll_interval:float = 10.0,
+                               max_poll_interval:float = 300.0,
+                               timeout:float | None = None
+                               ) -> BatchResults:
 
-        else:
-            evaluation = [result.content[0].input if isinstance(result.content[0], AnthropicToolUseBlock) else result.content[0].text for result in _results]
-        
-        result = evaluation if isinstance(text, typing.Iterable) and not isinstance(text, str) else evaluation[0]
+        """
+
+        Waits for batches submitted with anthropic_evaluate_batch() to end and returns their results. Works from a different process than the one that submitted them.
+
+        Parameters:
+        batch_ids (string or iterable[string]) : The ids anthropic_evaluate_batch() returned, all of them and in the same order.
+        response_type (literal["text", "raw", "json", "raw_json"]) : The response type the batches were submitted with.
+        poll_interval (float) : The first wait between status checks, in seconds. Each wait is 1.5 times longer than the last.
+        max_poll_interval (float) : The longest wait between status checks, in seconds.
+        timeout (float or None) : How long to wait, for all batches together, before raising. The batches keep running and can be resumed again. None waits forever.
+
+        Returns:
+        result (BatchResults) : The evaluations in input order. Items that failed are None and their errors are in result.errors.
+
+        """
+
+        return Elucidate._default_client.anthropic_resume_batch(batch_ids=batch_ids,
+                                                                response_type=response_type,
+                                                                poll_interval=poll_interval,
+                                                                max_poll_interval=max_poll_interval,
+                                                                timeout=timeout)
 
-        return result # type: ignore
-    
 ##-------------------start-of-evaluate()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
-        
+
     @staticmethod
     def evaluate(text:str | typing.Iterable[str] | ModelTranslationMessage | typing.Iterable[ModelTranslationMessage],
                   service:typing.Optional[typing.Literal["openai", "gemini", "anthropic"]],
@@ -736,7 +743,7 @@ class Elucidate:
                                             typing.List[ChatCompletion], ChatCompletion,
                                             typing.List[GenerateContentResponse], GenerateContentResponse,
                                             typing.List[AnthropicMessage], AnthropicMessage]:
-        
+
         """
 
         Evaluates the given text using the specified service. Your text attribute should contain both the original untranslated text and the translated text.
@@ -762,19 +769,12 @@ class Elucidate:
 
         """
 
-        assert service in ["openai", "gemini", "anthropic"], InvalidAPITypeException("Invalid service specified. Must be 'openai', 'gemini' or 'anthropic'.")
+        return Elucidate._default_client.evaluate(text=text,
+                                                  service=service,
+                                                  **kwargs)
+
+##-------------------start-of-evaluate_async()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
 
-        if(service == "openai"):
-            return Elucidate.openai_evaluate(text, **kwargs)
-        
-        elif(service == "gemini"):
-            return Elucidate.gemini_evaluate(text, **kwargs) # type: ignore
-        
-        elif(service == "anthropic"):
-            return Elucidate.anthropic_evaluate(text, **kwargs)
-        
-##-------------------start-of-translate_async()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
-    
     @staticmethod
     async def evaluate_async(text:str | typing.Iterable[str] | ModelTranslationMessage | typing.Iterable[ModelTranslationMessage],
                               service:typing.Optional[typing.Literal["openai", "gemini", "anthropic"]],
@@ -783,7 +783,6 @@ class Elucidate:
                                                         typing.List[AsyncGenerateContentResponse], AsyncGenerateContentResponse,
                                                         typing.List[AnthropicMessage], AnthropicMessage]:
 
-        
         """
 
         Asynchronous version of evaluate().
@@ -812,21 +811,271 @@ class Elucidate:
 
         """
 
-        assert service in ["openai", "gemini", "anthropic"], InvalidAPITypeException("Invalid service specified. Must be 'openai', 'gemini' or 'anthropic'.")
+        return await Elucidate._default_client.evaluate_async(text=text,
+                                                              service=service,
+                                                              **kwargs)
 
-        if(service == "openai"):
-            return await Elucidate.openai_evaluate_async(text, **kwargs)
-        
-        elif(service == "gemini"):
-            return await Elucidate.gemini_evaluate_async(text, **kwargs) # type: ignore
-        
-        elif(service == "anthropic"):
-            return await Elucidate.anthropic_evaluate_async(text, **kwargs)
+##-------------------start-of-evaluate_stream()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    @staticmethod
+    async def evaluate_stream(text:str | typing.Iterable[str] | ModelTranslationMessage | typing.Iterable[ModelTranslationMessage],
+                              service:typing.Optional[typing.Literal["openai", "gemini", "anthropic"]],
+                              ordered:bool = False,
+                              return_exceptions:bool = False,
+                              **kwargs) -> typing.AsyncIterator[typing.Tuple[int, typing.Any]]:
+
+        """
+
+        Streaming version of evaluate_async().
+        Yields each evaluation as soon as its request completes instead of waiting for the slowest one, so results can be written out while the rest are still running.
+
+        Results are handed off as they're yielded and not kept by Elucidate, so memory stays flat if the consumer writes them out as they come.
+
+        text can also be an iterator or async iterable, such as a file or a DB cursor. Texts are then read only as they're admitted, at most ingestion_window at a time, see the evaluation function's ingestion_window.
+
+        Please see the documentation for the specific evaluation function for the service you want to use, kwargs are passed through to it.
+
+        OpenAI: openai_evaluate_async()
+        Gemini: gemini_evaluate_async()
+        Anthropic: anthropic_evaluate_async()
+
+        Parameters:
+        text (str | ModelTranslationMessage | typing.Iterable[str] | typing.Iterable[ModelTranslationMessage]) : The text to evaluate. This should be the original untranslated text along with the translated text.
+        service (string) : The service to use for evaluation.
+        ordered (bool) : If False, results are yielded in completion order. If True, results are yielded in input order, each as soon as every earlier one is done.
+        return_exceptions (bool) : If False, a failed request ends the stream with its exception. If True, the exception is yielded in place of that text's result and the stream goes on.
+        **kwargs : The keyword arguments to pass to the evaluation function.
+
+        Yields:
+        (int, result) : The index of the text in the input and its evaluation result, same type as the evaluation function would return for a single text. (or the exception, if return_exceptions is True and the request failed)
+
+        """
+
+        async for _index, _result in Elucidate._default_client.evaluate_stream(text=text,
+                                                                               service=service,
+                                                                               ordered=ordered,
+                                                                               return_exceptions=return_exceptions,
+                                                                               **kwargs):
+            yield _index, _result
+
+##-------------------start-of-evaluate_token_stream()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    @staticmethod
+    def evaluate_token_stream(text:str | ModelTranslationMessage,
+                              service:typing.Literal["openai", "gemini", "anthropic"],
+                              on_delta:typing.Callable[[str], typing.Any] | None = None,
+                              **kwargs) -> EvaluationStream:
+
+        """
+
+        Evaluates a single text, streaming the evaluation as the model generates it, so it can be shown as soon as the first tokens arrive instead of once it's complete.
+
+        Returns an EvaluationStream. Iterate it with async for to get the evaluation a delta at a time, or await it for the whole evaluation, the request is sent when either starts. Once it's done, it has the usage the provider reported, and the time it took to the first token. For the json response type, its json() parses the fields received so far while it's still streaming. Anthropic's deltas are then the json tool's input.
+
+        Settings are the evaluation function's, kwargs are passed through to it. Only the 'text' and 'json' response types can be streamed. Streamed requests wait for the rate limiter and the semaphore like any other and are recorded in the metrics, but aren't retried by the decorator, as the deltas already yielded can't be taken back.
+
+        OpenAI: openai_evaluate_async()
+        Gemini: gemini_evaluate_async()
+        Anthropic: anthropic_evaluate_async()
+
+        Parameters:
+        text (str | ModelTranslationMessage) : The text to evaluate. This should be the original untranslated text along with the translated text.
+        service (string) : The service to use for evaluation.
+        on_delta (callable or None) : Called with every delta as it arrives, whether the stream is iterated or not. Can be a coroutine function.
+        **kwargs : The keyword arguments to pass to the evaluation function.
+
+        Returns:
+        stream (EvaluationStream) : The evaluation's stream.
+
+        """
+
+        return Elucidate._default_client.evaluate_token_stream(text=text,
+                                                               service=service,
+                                                               on_delta=on_delta,
+                                                               **kwargs)
+
+##-------------------start-of-evaluate_failover_async()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    @staticmethod
+    async def evaluate_failover_async(text:str | typing.Iterable[str] | ModelTranslationMessage | typing.Iterable[ModelTranslationMessage],
+                                      policy:FailoverPolicy,
+                                      **kwargs) -> BatchResults:
+
+        """
+
+        Evaluates the text with the policy's routes in order, moving each text on to the next route if its request fails or the route's provider's circuit breaker is open.
+
+        Every route runs at the same time, fed by the one before it, so texts a failing provider hands back are picked up by the next route while the rest are still in flight. A provider's breaker opening sends everything that's still waiting straight to the next route, until a probe shows the provider is back.
+
+        Routes sharing a provider (E.g. "openai:gpt-4o-mini" then "openai:gpt-4o") each get their own copy of its settings. The Elucidate class's services are shared by every caller and can't be copied, so such policies need an ElucidateClient.
+
+        Please see the documentation for the specific evaluation function for each route's service, kwargs are passed through to every route along with that route's own kwargs, so they should be ones every provider takes. (E.g. evaluation_instructions, semaphore, response_type)
+
+        OpenAI: openai_evaluate_async()
+        Gemini: gemini_evaluate_async()
+        Anthropic: anthropic_evaluate_async()
+
+        Parameters:
+        text (str | ModelTranslationMessage | typing.Iterable[str] | typing.Iterable[ModelTranslationMessage]) : The text to evaluate. This should be the original untranslated text along with the translated text.
+        policy (FailoverPolicy) : The routes, and the circuit breakers of their providers.
+        **kwargs : The keyword arguments to pass to every route's evaluation function.
+
+        Returns:
+        results (BatchResults) : The evaluations in input order, with the route that served each one in results.served_by. Texts that failed on every route are None, with the last route's error in results.errors.
+
+        """
+
+        return await Elucidate._default_client.evaluate_failover_async(text=text,
+                                                                       policy=policy,
+                                                                       **kwargs)
+
+##-------------------start-of-evaluate_packed()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    @staticmethod
+    def evaluate_packed(text:str | typing.Iterable[str] | ModelTranslationMessage | typing.Iterable[ModelTranslationMessage],
+                        service:typing.Literal["openai", "gemini", "anthropic"],
+                        token_budget:int = 1024,
+                        max_segments_per_request:int = 50,
+                        max_retries:int = 2,
+                        evaluation_instructions:str | SystemTranslationMessage | None = None,
+                        **kwargs) -> typing.Union[typing.List[str], str]:
+
+        """
+
+        Evaluates many short segments with few requests. Segments are packed into requests of up to token_budget tokens, sent as a json object keyed by segment id, and the json answer is split back into one evaluation per segment.
+
+        The instructions and per request overhead are then paid once per pack instead of once per segment, which is most of the cost for short segments like UI strings.
+
+        Segments the model dropped or mangled are repacked and retried up to max_retries times, after which they're evaluated on their own, unpacked.
+
+        Please see the documentation for the specific evaluation function for the service you want to use, kwargs are passed through to it. response_type and response_schema are set by packing, which needs a model with json mode. (E.g. 'gpt-4o-mini' or 'gemini-1.5-flash', the OpenAI and Gemini defaults don't have it)
+
+        OpenAI: openai_evaluate()
+        Gemini: gemini_evaluate()
+        Anthropic: anthropic_evaluate()
+
+        Parameters:
+        text (str | ModelTranslationMessage | typing.Iterable[str] | typing.Iterable[ModelTranslationMessage]) : The segments to evaluate. Each should be the original untranslated text along with the translated text.
+        service (string) : The service to use for evaluation.
+        token_budget (int) : The most tokens of segments a single request may hold. A segment over the budget is sent on its own.
+        max_segments_per_request (int) : The most segments a single request may hold.
+        max_retries (int) : How many times dropped or mangled segments are repacked before being evaluated on their own.
+        evaluation_instructions (string or SystemTranslationMessage or None) : The evaluation instructions to apply to each segment. If None, the service's default is used.
+        **kwargs : The keyword arguments to pass to the evaluation function.
+
+        Returns:
+        result (string or list[string]) : The evaluation of every segment, in input order. A string if a single text was given.
+
+        """
+
+        return Elucidate._default_client.evaluate_packed(text=text,
+                                                         service=service,
+                                                         token_budget=token_budget,
+                                                         max_segments_per_request=max_segments_per_request,
+                                                         max_retries=max_retries,
+                                                         evaluation_instructions=evaluation_instructions,
+                                                         **kwargs)
+
+##-------------------start-of-evaluate_packed_async()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    @staticmethod
+    async def evaluate_packed_async(text:str | typing.Iterable[str] | ModelTranslationMessage | typing.Iterable[ModelTranslationMessage],
+                                    service:typing.Literal["openai", "gemini", "anthropic"],
+                                    token_budget:int = 1024,
+                                    max_segments_per_request:int = 50,
+                                    max_retries:int = 2,
+                                    evaluation_instructions:str | SystemTranslationMessage | None = None,
+                                    **kwargs) -> typing.Union[typing.List[str], str]:
+
+        """
+
+        Asynchronous version of evaluate_packed(). The packs of each round are sent concurrently, through the evaluation function's semaphore.
+
+        See evaluate_packed() for the parameters. kwargs are passed through to the asynchronous evaluation function.
+
+        """
+
+        return await Elucidate._default_client.evaluate_packed_async(text=text,
+                                                                     service=service,
+                                                                     token_budget=token_budget,
+                                                                     max_segments_per_request=max_segments_per_request,
+                                                                     max_retries=max_retries,
+                                                                     evaluation_instructions=evaluation_instructions,
+                                                                     **kwargs)
+
+##-------------------start-of-evaluate_chunked()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    @staticmethod
+    def evaluate_chunked(text:str | typing.Tuple[str, str] | ModelTranslationMessage | typing.Iterable[str | typing.Tuple[str, str] | ModelTranslationMessage],
+                         service:typing.Literal["openai", "gemini", "anthropic"],
+                         token_budget:int | None = None,
+                         pair_format:str = "{source}\n{translation}",
+                         evaluation_instructions:str | SystemTranslationMessage | None = None,
+                         **kwargs) -> typing.Union[typing.List[str], str, BatchResults]:
+
+        """
+
+        Evaluates texts that may be too long for the model, instead of rejecting them. Texts that don't fit are split into chunks, every chunk is evaluated as its own request, and the evaluations are stitched back together in order.
+
+        A text can be given as a (source, translation) tuple, which is split on paragraph boundaries, or sentence boundaries where a paragraph doesn't fit, with each chunk keeping the source and translation of the same passage together. Each chunk is sent formatted with pair_format. A plain string is split the same way on its own.
+
+        Without a token_budget, a text is chunked when it wouldn't fit the model's input limit, or its evaluation wouldn't fit the output limit, and the chunks are sized so they're spread over the requests that can run at once. Pass max_workers to evaluate the chunks on a thread pool, otherwise they're sent one at a time and made as large as the model allows.
+
+        Please see the documentation for the specific evaluation function for the service you want to use, kwargs are passed through to it. response_type and response_schema can't be set, the evaluations are joined as strings.
+
+        OpenAI: openai_evaluate()
+        Gemini: gemini_evaluate()
+        Anthropic: anthropic_evaluate()
+
+        Parameters:
+        text (str | tuple[str, str] | ModelTranslationMessage | typing.Iterable[str | tuple[str, str] | ModelTranslationMessage]) : The texts to evaluate. A string should be the original untranslated text along with the translated text, a tuple is the two apart.
+        service (string) : The service to use for evaluation.
+        token_budget (int or None) : If set, texts over this many tokens are chunked, into chunks of at most this many tokens. If None, it's worked out from the model, see above.
+        pair_format (string) : How the source and translation of a chunk are put together, with {source} and {translation} in place of them.
+        evaluation_instructions (string or SystemTranslationMessage or None) : The evaluation instructions to apply to each chunk. If None, the service's default is used.
+        **kwargs : The keyword arguments to pass to the evaluation function.
+
+        Returns:
+        result (string or list[string] or BatchResults) : The evaluation of every text, in input order. A string if a single text was given. A BatchResults if max_workers is set, with a text that had a chunk fail set to None and the error in result.errors.
+
+        """
+
+        return Elucidate._default_client.evaluate_chunked(text=text,
+                                                          service=service,
+                                                          token_budget=token_budget,
+                                                          pair_format=pair_format,
+                                                          evaluation_instructions=evaluation_instructions,
+                                                          **kwargs)
+
+##-------------------start-of-evaluate_chunked_async()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    @staticmethod
+    async def evaluate_chunked_async(text:str | typing.Tuple[str, str] | ModelTranslationMessage | typing.Iterable[str | typing.Tuple[str, str] | ModelTranslationMessage],
+                                     service:typing.Literal["openai", "gemini", "anthropic"],
+                                     token_budget:int | None = None,
+                                     pair_format:str = "{source}\n{translation}",
+                                     evaluation_instructions:str | SystemTranslationMessage | None = None,
+                                     **kwargs) -> typing.Union[typing.List[str], str]:
+
+        """
+
+        Asynchronous version of evaluate_chunked(). The chunks of every text are sent concurrently, through the evaluation function's semaphore and rate limits, so a long text takes about as long as one of its chunks.
+
+        See evaluate_chunked() for the parameters. kwargs are passed through to the asynchronous evaluation function.
+
+        """
+
+        return await Elucidate._default_client.evaluate_chunked_async(text=text,
+                                                                      service=service,
+                                                                      token_budget=token_budget,
+                                                                      pair_format=pair_format,
+                                                                      evaluation_instructions=evaluation_instructions,
+                                                                      **kwargs)
 
 ##-------------------start-of-set_credentials()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
 
     @staticmethod
-    def set_credentials(api_type:typing.Literal["gemini", "openai", "anthropic"], credentials:typing.Union[str, None] = None) -> None:
+    def set_credentials(api_type:typing.Literal["gemini", "openai", "anthropic"], credentials:typing.Union[str, None] = None, transport:TransportOptions | None = None) -> None:
         
         """
 
@@ -835,10 +1084,68 @@ class Elucidate:
         Parameters:
         api_type (literal["gemini", "openai", "anthropic"]) : The API type to set the credentials for.
         credentials (string) : The credentials to set. This is an api key for the specified API type.
+        transport (TransportOptions or None) : If given, also sets how the clients connect. See set_transport(). Not available for Gemini.
 
         """
 
-        EasyTL.set_credentials(api_type, credentials)
+        Elucidate._default_client.set_credentials(api_type=api_type, credentials=credentials, transport=transport)
+
+##-------------------start-of-set_transport()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    @staticmethod
+    def set_transport(api_type:typing.Literal["openai", "anthropic"], transport:TransportOptions | None) -> None:
+
+        """
+
+        Sets how the clients for the specified API type connect. (E.g. a keep-alive pool as big as the semaphore, or HTTP/2) See TransportOptions.
+
+        The clients are replaced, keeping their credentials and settings. Requests already in flight finish on the old ones, which aclose() closes.
+
+        Parameters:
+        api_type (literal["openai", "anthropic"]) : The API type to set the transport for.
+        transport (TransportOptions or None) : How to connect. None goes back to the SDK defaults.
+
+        """
+
+        Elucidate._default_client.set_transport(api_type=api_type, transport=transport)
+
+##-------------------start-of-warmup()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    @staticmethod
+    async def warmup(api_type:typing.Literal["gemini", "openai", "anthropic"], connections:int = 1) -> None:
+
+        """
+
+        Opens connections to the specified API type ahead of a burst, so its first requests don't wait on TCP and TLS handshakes.
+
+        For OpenAI and Anthropic, connections model list requests are sent through the async client at once, so each opens its own connection, which is then kept alive for the burst. Keep connections within the transport's max_keepalive_connections and the burst within its keepalive_expiry, otherwise they're closed again. See TransportOptions. Over HTTP/2 they all share one connection.
+
+        For Gemini, waits for the async client's gRPC channel to connect. It's one connection however many are asked for.
+
+        Connections belong to the event loop they're opened in, so warm up in the one the burst runs in. While a cassette is replaying nothing is sent, so there's nothing to warm up.
+
+        Parameters:
+        api_type (literal["gemini", "openai", "anthropic"]) : The API type to connect to.
+        connections (int) : How many connections to open.
+
+        """
+
+        await Elucidate._default_client.warmup(api_type=api_type, connections=connections)
+
+##-------------------start-of-aclose()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    @staticmethod
+    async def aclose() -> None:
+
+        """
+
+        Closes the connections the global client holds to OpenAI and Anthropic. It connects again as needed. Gemini's are google.generativeai's, shared by the whole process, so they're left open.
+
+        See ElucidateClient.aclose().
+
+        """
+
+        await Elucidate._default_client.aclose()
 
 ##-------------------start-of-test_credentials()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
 
@@ -849,6 +1156,8 @@ class Elucidate:
 
         Tests the credentials for the specified API type.
 
+        A successful test is cached, so evaluation functions won't test the credentials again until the cache ttl runs out. See set_credential_cache_ttl().
+
         Parameters:
         api_type (literal["gemini", "openai", "anthropic"]) : The API type to test the credentials for.
 
@@ -858,8 +1167,240 @@ class Elucidate:
 
         """
 
-        return EasyTL.test_credentials(api_type)
+        return Elucidate._default_client.test_credentials(api_type=api_type)
     
+##-------------------start-of-verify_credentials()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    @staticmethod
+    def verify_credentials(api_types:typing.Iterable[typing.Literal["gemini", "openai", "anthropic"]] = ("openai", "gemini", "anthropic")) -> typing.Dict[str, typing.Tuple[bool, typing.Optional[Exception]]]:
+
+        """
+
+        Tests the credentials for several API types concurrently. Meant to be called once at startup, so later evaluation calls can skip their own credential check.
+
+        Unlike test_credentials(), this does not raise if the credentials are invalid. The exception is returned instead.
+
+        Parameters:
+        api_types (iterable[literal["gemini", "openai", "anthropic"]]) : The API types to test the credentials for. Defaults to all three.
+
+        Returns:
+        (dict[string, tuple[bool, Exception or None]]) : For each API type, whether the credentials are valid and the exception that was raised, if any.
+
+        """
+
+        return Elucidate._default_client.verify_credentials(api_types=api_types)
+
+##-------------------start-of-set_credential_cache_ttl()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    @staticmethod
+    def set_credential_cache_ttl(ttl:float | None) -> None:
+
+        """
+
+        Sets how long a successful credential check is trusted before the evaluation functions check again. Default is 600 seconds.
+
+        Parameters:
+        ttl (float or None) : The time to live in seconds. None means a successful check never expires, 0 means the credentials are checked on every evaluation call.
+
+        """
+
+        Elucidate._default_client.set_credential_cache_ttl(ttl=ttl)
+    
+##-------------------start-of-set_rate_limits()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    @staticmethod
+    def set_rate_limits(api_type:typing.Literal["gemini", "openai", "anthropic"],
+                        requests_per_minute:float | None = None,
+                        tokens_per_minute:float | None = None,
+                        model:str | None = None) -> None:
+
+        """
+
+        Sets the requests per minute and tokens per minute limits to pace requests to, typically your tier's limits. Requests are sent as fast as the limits allow without going over them.
+
+        Token usage is estimated from the input (plus the output token limit, if set) before a request and corrected from the response's usage afterwards. Requests wait for budget before taking a semaphore slot, and evaluation_delay is ignored for limited models.
+
+        Parameters:
+        api_type (literal["gemini", "openai", "anthropic"]) : The API type to set the limits for.
+        requests_per_minute (float or None) : The requests per minute limit. None means unlimited.
+        tokens_per_minute (float or None) : The tokens per minute limit. None means unlimited.
+        model (string or None) : The model the limits are for. If None, the limits apply to every model of api_type without limits of its own.
+
+        """
+
+        Elucidate._default_client.set_rate_limits(api_type=api_type,
+                                                  requests_per_minute=requests_per_minute,
+                                                  tokens_per_minute=tokens_per_minute,
+                                                  model=model)
+
+##-------------------start-of-enable_adaptive_concurrency()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    @staticmethod
+    def enable_adaptive_concurrency(api_type:typing.Literal["gemini", "openai", "anthropic"],
+                                    initial_limit:float | None = None,
+                                    min_limit:float = 1,
+                                    max_limit:float = 200,
+                                    state_path:str | None = None,
+                                    **kwargs) -> AdaptiveConcurrency:
+
+        """
+
+        Replaces the fixed semaphore for api_type with one that learns its limit. While enabled, the semaphore argument of the async evaluation functions is ignored.
+
+        The limit grows while requests succeed and is cut on rate limit errors, on latency climbing well past the best seen, and when the x-ratelimit-remaining-* / anthropic-ratelimit-* headers show the window is nearly used up.
+
+        Parameters:
+        api_type (literal["gemini", "openai", "anthropic"]) : The API type to enable adaptive concurrency for.
+        initial_limit (float or None) : The limit to start at. Defaults to the current semaphore value. A limit saved at state_path takes precedence.
+        min_limit (float) : The limit never drops below this.
+        max_limit (float) : The limit never grows past this.
+        state_path (string or None) : A json file the learned limit is loaded from and periodically saved to, so the next run starts warm.
+        **kwargs : Passed through to AdaptiveConcurrency. (backoff_factor, latency_tolerance)
+
+        Returns:
+        adaptive_concurrency (AdaptiveConcurrency) : The controller, its limit property is the learned limit.
+
+        """
+
+        return Elucidate._default_client.enable_adaptive_concurrency(api_type=api_type,
+                                                                     initial_limit=initial_limit,
+                                                                     min_limit=min_limit,
+                                                                     max_limit=max_limit,
+                                                                     state_path=state_path,
+                                                                     **kwargs)
+
+##-------------------start-of-disable_adaptive_concurrency()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    @staticmethod
+    def disable_adaptive_concurrency(api_type:typing.Literal["gemini", "openai", "anthropic"]) -> None:
+
+        """
+
+        Goes back to the fixed semaphore for api_type. The learned limit is saved first if the controller has a state_path.
+
+        Parameters:
+        api_type (literal["gemini", "openai", "anthropic"]) : The API type to disable adaptive concurrency for.
+
+        """
+
+        Elucidate._default_client.disable_adaptive_concurrency(api_type=api_type)
+
+##-------------------start-of-get_concurrency_limit()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    @staticmethod
+    def get_concurrency_limit(api_type:typing.Literal["gemini", "openai", "anthropic"]) -> int:
+
+        """
+
+        Returns how many requests api_type currently allows in flight, the learned limit if adaptive concurrency is enabled, the semaphore value otherwise.
+
+        Parameters:
+        api_type (literal["gemini", "openai", "anthropic"]) : The API type to get the limit for.
+
+        Returns:
+        limit (int) : The limit.
+
+        """
+
+        return Elucidate._default_client.get_concurrency_limit(api_type=api_type)
+
+##-------------------start-of-get_anthropic_usage()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    @staticmethod
+    def get_anthropic_usage() -> typing.Dict[str, typing.Any]:
+
+        """
+
+        Returns the token usage of the last Anthropic evaluation call, or of the last batch collected with anthropic_resume_batch(). Responses served from the response cache aren't counted.
+
+        Every call counts its own requests only, so calls running at the same time don't mix. Called in the task or thread that made the call, it reports that call, even if others were started since. Called anywhere else, it reports the last call started.
+
+        Returns:
+        usage (dict) : requests, input_tokens, output_tokens, cache_creation_input_tokens and cache_read_input_tokens, plus hit_rate, the fraction of input tokens read from the prompt cache. (None if nothing was recorded)
+
+        """
+
+        return Elucidate._default_client.get_anthropic_usage()
+
+##-------------------start-of-set_response_cache()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    @staticmethod
+    def set_response_cache(response_cache:ResponseCache | None) -> None:
+
+        """
+
+        Sets the cache repeated requests are answered from, for all three services. A hit skips the semaphore, the evaluation delay and the decorator, so it costs nothing.
+
+        A request is only a repeat if the provider, model, sampling parameters, json mode/schema, instructions and text all match.
+
+        Parameters:
+        response_cache (ResponseCache or None) : The cache to use. None disables caching.
+
+        """
+
+        Elucidate._default_client.set_response_cache(response_cache=response_cache)
+
+##-------------------start-of-set_metrics()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    @staticmethod
+    def set_metrics(metrics:MetricsSink | None) -> None:
+
+        """
+
+        Sets where request metrics are recorded, for all three services. Every API call records its queue wait, latency, tokens and error, and every text its attempts and duration. Responses served from the response cache aren't recorded.
+
+        Parameters:
+        metrics (MetricsSink or None) : The sink to record to. (E.g. Metrics, or a MetricsSink subclass) None turns recording off.
+
+        """
+
+        Elucidate._default_client.set_metrics(metrics=metrics)
+
+##-------------------start-of-get_metrics()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    @staticmethod
+    def get_metrics() -> MetricsSink | None:
+
+        """
+
+        Returns the sink request metrics are recorded to, the in-memory Metrics unless set_metrics() replaced it.
+
+        """
+
+        return Elucidate._default_client.get_metrics()
+
+##-------------------start-of-set_cassette()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    @staticmethod
+    def set_cassette(cassette:Cassette | None) -> None:
+
+        """
+
+        Sets the cassette API calls are recorded to or replayed from, for all three services. A replaying cassette answers every request, sync, async and batched, without touching the network. See Cassette.
+
+        Parameters:
+        cassette (Cassette or None) : The cassette to use. None goes back to the providers.
+
+        """
+
+        Elucidate._default_client.set_cassette(cassette=cassette)
+
+##-------------------start-of-set_token_counter()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    @staticmethod
+    def set_token_counter(token_counter:TokenCounter) -> None:
+
+        """
+
+        Sets what counts tokens for validating text length and calculating costs. Counts are remembered, so a counter shared between clients, or kept across runs in one process, only tokenizes each text once.
+
+        Parameters:
+        token_counter (TokenCounter) : The counter to use.
+
+        """
+
+        Elucidate._default_client.set_token_counter(token_counter=token_counter)
+
 ##-------------------start-of-calculate_cost()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
 
     @staticmethod
@@ -868,11 +1409,13 @@ class Elucidate:
                        model:typing.Optional[str] = None,
                        evaluation_instructions:typing.Optional[str] = None
                         ) -> typing.Tuple[int, float, str]:
-        
+
         """
 
         Calculates the cost of evaluating the given text using the specified service.
 
+        Every text is costed as its own request with the instructions, the way it will be sent. Counts come from the client's TokenCounter, so texts that were already counted aren't tokenized again.
+
         Parameters:
         text (string or iterable[string]) : The text to evaluate.
         service (literal["gemini", "openai", "anthropic"]) : The service to use for evaluation.
@@ -886,4 +1429,45 @@ class Elucidate:
 
         """
 
-        return EasyTL.calculate_cost(text, service, model, evaluation_instructions)
\ No newline at end of file
+        return Elucidate._default_client.calculate_cost(text=text,
+                                                        service=service,
+                                                        model=model,
+                                                        evaluation_instructions=evaluation_instructions)
+
+##-------------------start-of-calculate_cost_stream()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    @staticmethod
+    def calculate_cost_stream(text:str | typing.Iterable[str],
+                              service:typing.Literal["gemini", "openai", "anthropic"],
+                              model:typing.Optional[str] = None,
+                              evaluation_instructions:typing.Optional[str] = None,
+                              chunk_size:int = 10_000
+                              ) -> typing.Iterator[typing.Tuple[int, float, int, float]]:
+
+        """
+
+        Calculates the cost of evaluating each text in turn, holding at most chunk_size texts at a time. (E.g. a corpus read from a file line by line)
+
+        The texts of a chunk are counted together, see TokenCounter.count_many().
+
+        Parameters:
+        text (string or iterable[string]) : The texts to evaluate.
+        service (literal["gemini", "openai", "anthropic"]) : The service to use for evaluation.
+        model (string or None) : The model to use for evaluation. If None, the default model will be used.
+        evaluation_instructions (string or None) : The instructions to use for evaluation. If None, the default instructions will be used.
+        chunk_size (int) : How many texts are counted at a time.
+
+        Yields:
+        (int) : The number of tokens in the text and the instructions.
+        (float) : The cost of evaluating the text.
+        (int) : The number of tokens so far.
+        (float) : The cost so far.
+
+        """
+
+        return Elucidate._default_client.calculate_cost_stream(text=text,
+                                                               service=service,
+                                                               model=model,
+                                                               evaluation_instructions=evaluation_instructions,
+                                                               chunk_size=chunk_size)
+
@@ -0,0 +1,215 @@
+## Copyright 2024 Kakusui LLC (https://kakusui.org) (https://github.com/Kakusui) (https://github.com/Kakusui/Elucidate)
+## Use of this source code is governed by an GNU Lesser General Public License v2.1
+## license that can be found in the LICENSE file.
+
+## built-in imports
+import typing
+import json
+
+## custom modules
+from ..protocols.anthropic_service_protocol import AnthropicServiceProtocol
+
+from ..evaluators.anthropic_evaluator import _anthropic_build_message_args
+
+from ..util.classes import ModelTranslationMessage, AnthropicTextBlock, AnthropicToolUseBlock, anthropic_service
+from ..util.batching import BatchResults, _poll_with_backoff
+from ..util.usage import _start_call_usage
+
+from ..exceptions import ElucidateException
+
+##-------------------start-of-attributes---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+## Message Batches limits, a single batch can hold at most this many requests and bytes
+_anthropic_batch_max_requests = 100_000
+_anthropic_batch_max_bytes = 256 * 1024 * 1024
+
+## room left for the envelope around the requests
+_anthropic_batch_byte_margin = 0.9
+
+##-------------------start-of-_anthropic_build_batch_requests()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+def _anthropic_build_batch_requests(evaluation_batches:typing.Iterable[ModelTranslationMessage],
+                                    max_requests_per_batch:int = _anthropic_batch_max_requests,
+                                    _protocol:AnthropicServiceProtocol = typing.cast(AnthropicServiceProtocol, anthropic_service.AnthropicService)
+                                    ) -> typing.List[typing.List[typing.Dict[str, typing.Any]]]:
+
+    """
+
+    Builds the Message Batches requests, with the same arguments _anthropic_internal_evaluate_translation() would send, split into chunks that stay under the batch limits.
+
+    Parameters:
+    evaluation_batches (iterable[ModelTranslationMessage]) : The evaluation batches.
+    max_requests_per_batch (int) : The most requests a chunk may hold.
+
+    Returns:
+    chunks (list[list[dict]]) : The requests, chunked. Each request's custom_id is the index of its text across all chunks.
+
+    """
+
+    assert 0 < max_requests_per_batch <= _anthropic_batch_max_requests, ValueError(f"max_requests_per_batch must be between 1 and {_anthropic_batch_max_requests}.")
+
+    _max_bytes = _anthropic_batch_max_bytes * _anthropic_batch_byte_margin
+
+    _chunks:typing.List[typing.List[typing.Dict[str, typing.Any]]] = []
+    _chunk:typing.List[typing.Dict[str, typing.Any]] = []
+    _chunk_bytes = 0
+
+    for _index, _text in enumerate(evaluation_batches):
+
+        _params = _anthropic_build_message_args(_protocol._system, _text, _protocol)
+
+        ## batches don't stream
+        _params.pop("stream", None)
+
+        _request = {"custom_id": str(_index), "params": _params}
+        _request_bytes = len(json.dumps(_request, default=str).encode("utf-8"))
+
+        if(_chunk and (len(_chunk) >= max_requests_per_batch or _chunk_bytes + _request_bytes > _max_bytes)):
+            _chunks.append(_chunk)
+            _chunk = []
+            _chunk_bytes = 0
+
+        _chunk.append(_request)
+        _chunk_bytes += _request_bytes
+
+    if(_chunk):
+        _chunks.append(_chunk)
+
+    return _chunks
+
+##-------------------start-of-_anthropic_submit_batches()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+def _anthropic_submit_batches(chunks:typing.List[typing.List[typing.Dict[str, typing.Any]]],
+                              _protocol:AnthropicServiceProtocol = typing.cast(AnthropicServiceProtocol, anthropic_service.AnthropicService)
+                              ) -> typing.List[str]:
+
+    """
+
+    Creates one batch per chunk.
+
+    Parameters:
+    chunks (list[list[dict]]) : The chunks built by _anthropic_build_batch_requests().
+
+    Returns:
+    batch_ids (list[string]) : The ids of the batches, in chunk order.
+
+    """
+
+    return [_protocol._sync_client.messages.batches.create(requests=typing.cast(typing.Any, _chunk)).id for _chunk in chunks]
+
+##-------------------start-of-_anthropic_wait_for_batch()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+def _anthropic_wait_for_batch(batch_id:str,
+                              poll_interval:float = 10.0,
+                              max_poll_interval:float = 300.0,
+                              timeout:float | None = None,
+                              _protocol:AnthropicServiceProtocol = typing.cast(AnthropicServiceProtocol, anthropic_service.AnthropicService)
+                              ) -> typing.Any:
+
+    """
+
+    Polls the batch with backoff until it has ended.
+
+    Parameters:
+    batch_id (string) : The id of the batch.
+    poll_interval (float) : The first wait between polls, in seconds.
+    max_poll_interval (float) : The longest wait between polls, in seconds.
+    timeout (float or None) : Give up after this many seconds, the batch keeps running. None waits forever.
+
+    Returns:
+    batch (MessageBatch) : The ended batch.
+
+    """
+
+    return _poll_with_backoff(lambda: _protocol._sync_client.messages.batches.retrieve(batch_id),
+                              lambda _batch: _batch.processing_status == "ended",
+                              poll_interval=poll_interval,
+                              max_poll_interval=max_poll_interval,
+                              timeout=timeout)
+
+##-------------------start-of-_anthropic_collect_batch_results()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+def _anthropic_collect_batch_results(batches:typing.List[typing.Any],
+                                     _protocol:AnthropicServiceProtocol = typing.cast(AnthropicServiceProtocol, anthropic_service.AnthropicService)
+                                     ) -> BatchResults:
+
+    """
+
+    Downloads the results of ended batches and maps them back to input order.
+
+    Parameters:
+    batches (list[MessageBatch]) : The ended batches, every chunk of one submission.
+
+    Returns:
+    results (BatchResults) : The AnthropicMessage of every text in input order, None with an entry in errors for those that failed.
+
+    """
+
+    ## custom_ids run across chunks, so the request counts add up to the number of texts
+    _count = sum(_batch.request_counts.succeeded + _batch.request_counts.errored + _batch.request_counts.canceled + _batch.request_counts.expired + _batch.request_counts.processing for _batch in batches)
+
+    _results:typing.List[typing.Any] = [None] * _count
+    _errors:typing.Dict[int, Exception] = {}
+
+    for _batch in batches:
+
+        for _response in _protocol._sync_client.messages.batches.results(_batch.id):
+
+            _index = int(_response.custom_id)
+            _result = _response.result
+
+            if(_result.type == "succeeded"):
+                _results[_index] = _result.message
+
+            elif(_result.type == "errored"):
+                _error = getattr(_result.error, "error", _result.error)
+                _errors[_index] = ElucidateException(f"Batch request {_index} failed with {getattr(_error, 'type', 'an error')}: {getattr(_error, 'message', _error)}")
+
+            else:
+                _errors[_index] = ElucidateException(f"Batch request {_index} was {_result.type} before it ran.")
+
+    for _index in range(_count):
+        if(_results[_index] is None and _index not in _errors):
+            _errors[_index] = ElucidateException(f"Batch request {_index} has no result.")
+
+    return BatchResults(_results, _errors, [_batch.id for _batch in batches])
+
+##-------------------start-of-_anthropic_finish_batch_results()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+def _anthropic_finish_batch_results(results:BatchResults,
+                                    response_type:str,
+                                    _protocol:AnthropicServiceProtocol = typing.cast(AnthropicServiceProtocol, anthropic_service.AnthropicService)
+                                    ) -> BatchResults:
+
+    """
+
+    Adds up the usage of a batch and turns its AnthropicMessages into the requested response type, in place.
+
+    Parameters:
+    results (BatchResults) : The results, from _anthropic_collect_batch_results() or a replaying cassette.
+    response_type (string) : The response type to return.
+
+    Returns:
+    results (BatchResults) : The same results.
+
+    """
+
+    _usage = _start_call_usage(_protocol)
+
+    for _result in results.succeeded.values():
+        _usage.record(getattr(_result, "usage", None))
+
+    if(response_type not in ["raw", "raw_json"]):
+
+        for _index, _result in results.succeeded.items():
+
+            ## response structure can vary if tools are used
+            content = _result.content
+
+            if(isinstance(content[0], AnthropicTextBlock)):
+                results[_index] = content[0].text
+
+            elif(isinstance(content[0], AnthropicToolUseBlock)):
+                results[_index] = content[0].input
+
+    return results
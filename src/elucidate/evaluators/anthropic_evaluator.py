@@ -5,13 +5,21 @@
 ## built-in imports
 import typing
 import asyncio
+import json
+import time
 
 ## custom modules
 from ..protocols.anthropic_service_protocol import AnthropicServiceProtocol
 
 from ..util.attributes import VALID_JSON_ANTHROPIC_MODELS
+from ..util.request_template import _RequestTemplate
+from ..util.rate_limiter import _get_rate_limiter, _estimate_tokens
+from ..util.concurrency import _is_rate_limit_error
+from ..util.metrics import _AttemptTimer, _RequestTimer, _usage_counts
+from ..util.usage import _record_call_usage
+from ..util.streaming import EvaluationStream
 
-from ..util.classes import ModelTranslationMessage, AnthropicMessage, anthropic_service, NOT_GIVEN
+from ..util.classes import ModelTranslationMessage, AnthropicMessage, AnthropicToolUseBlock, anthropic_service, NOT_GIVEN
 
 ##-------------------start-of-Attributes---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
 
@@ -52,6 +60,123 @@ def _anthropic_build_evaluation_batches(text:typing.Union[str, typing.Iterable[s
     
     return text
 
+##-------------------start-of-_anthropic_build_system()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+def _anthropic_build_system(instructions:str,
+                            _protocol:AnthropicServiceProtocol = typing.cast(AnthropicServiceProtocol, anthropic_service.AnthropicService)
+                            ) -> typing.Union[str, typing.List[typing.Dict[str, typing.Any]]]:
+
+    """
+
+    Builds the system prompt. A plain string unless there's a shared context or prompt caching is on, then a list of text blocks with the last one marked for caching.
+
+    Parameters:
+    instructions (str) : The instructions to use for the evaluation.
+
+    Returns:
+    system (str or list[dict]) : The system prompt.
+
+    """
+
+    if(not _protocol._prompt_caching and _protocol._shared_context is None):
+        return instructions
+
+    _blocks:typing.List[typing.Dict[str, typing.Any]] = [{"type": "text", "text": str(instructions)}]
+
+    if(_protocol._shared_context is not None):
+        _blocks.append({"type": "text", "text": _protocol._shared_context})
+
+    ## a cache breakpoint caches everything before it, tools included
+    if(_protocol._prompt_caching):
+        _blocks[-1]["cache_control"] = {"type": "ephemeral"}
+
+    return _blocks
+
+##-------------------start-of-_anthropic_request_template()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+def _anthropic_request_template(instructions:str,
+                                _protocol:AnthropicServiceProtocol = typing.cast(AnthropicServiceProtocol, anthropic_service.AnthropicService)
+                                ) -> _RequestTemplate:
+
+    """
+
+    Returns the service's request template for instructions. Built on the first request after _set_attributes() or after the instructions change, and reused until then.
+
+    The shared context and prompt caching are set right after _set_attributes(), before any request, so the template picks them up too.
+
+    Parameters:
+    instructions (str) : The instructions to use for the evaluation.
+
+    Returns:
+    template (_RequestTemplate) : The template.
+
+    """
+
+    _template = _protocol._request_template
+
+    if(_template is not None and _template.instructions == instructions):
+        return _template
+
+    attributes = ["temperature", "top_p", "top_k", "stream", "stop_sequences", "max_tokens"]
+    message_args = {
+        "model": _protocol._model,
+        "system": _anthropic_build_system(instructions, _protocol),
+        ## scary looking dict comprehension to get the attributes that are not NOT_GIVEN
+        **{attr: getattr(_protocol, f"_{attr}") for attr in attributes if getattr(_protocol, f"_{attr}") != NOT_GIVEN}
+    }
+    
+    ## Special case for max_tokens
+    message_args["max_tokens"] = message_args.get("max_tokens", 4096)
+    
+    if(_protocol._json_mode and _protocol._model in VALID_JSON_ANTHROPIC_MODELS):
+        message_args.update({
+            "tools": [_protocol._json_tool],
+            "tool_choice": {"type": "tool", "name": "format_to_json"}
+        })
+
+    _template = _RequestTemplate("anthropic", instructions, message_args)
+
+    _protocol._request_template = _template
+
+    return _template
+
+##-------------------start-of-_anthropic_build_message_args()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+def _anthropic_build_message_args(instructions:str,
+                                  prompt:ModelTranslationMessage,
+                                  _protocol:AnthropicServiceProtocol = typing.cast(AnthropicServiceProtocol, anthropic_service.AnthropicService)
+                                  ) -> typing.Dict[str, typing.Any]:
+
+    """
+
+    Builds the arguments for messages.create() from the service's current settings.
+
+    Parameters:
+    instructions (str) : The instructions to use for the evaluation.
+    prompt (ModelTranslationMessage) : The text to evaluate.
+
+    Returns:
+    message_args (dict) : The arguments.
+
+    """
+
+    return _anthropic_request_template(instructions, _protocol).build(prompt)
+
+##-------------------start-of-_anthropic_request_key()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+def _anthropic_request_key(instructions:str | None,
+                           prompt:ModelTranslationMessage,
+                           _protocol:AnthropicServiceProtocol = typing.cast(AnthropicServiceProtocol, anthropic_service.AnthropicService)
+                           ) -> str:
+
+    """
+
+    Returns the key of the request _anthropic_evaluate_translation() would send for prompt, used by the response cache and the evaluation journal.
+
+    """
+
+    return _anthropic_request_template(instructions or _protocol._default_evaluation_instructions, _protocol).key(prompt)
+
 ##-------------------start-of-_anthropic_evaluate_translation()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
 
 @staticmethod
@@ -76,11 +201,36 @@ def _anthropic_evaluate_translation(evaluation_instructions:typing.Optional[str]
     if(evaluation_instructions is None):
         evaluation_instructions = _protocol._default_evaluation_instructions
 
-    if(_protocol._decorator_to_use is None):
-        return _protocol.__evaluate_translation(evaluation_instructions, evaluation_prompt)
+    _response_cache = _protocol._response_cache
+
+    ## cache hits skip the semaphore, the delay and the decorator entirely
+    if(_response_cache is not None):
+        _cache_key = _anthropic_request_key(evaluation_instructions, evaluation_prompt, _protocol)
+        _cached_response = _response_cache.get(_cache_key)
+
+        if(_cached_response is not None):
+            return _cached_response
+
+    _request = _RequestTimer(_protocol._metrics, "anthropic", _protocol._model)
+
+    try:
+        if(_protocol._decorator_to_use is None):
+            response = _protocol.__evaluate_translation(evaluation_instructions, evaluation_prompt)
 
-    decorated_function = _protocol._decorator_to_use(_protocol.__evaluate_translation)
-    return decorated_function(evaluation_instructions, evaluation_prompt)
+        else:
+            decorated_function = _protocol._decorator_to_use(_request.counting(_protocol.__evaluate_translation))
+            response = decorated_function(evaluation_instructions, evaluation_prompt)
+
+    except Exception as _e:
+        _request.done(_e)
+        raise
+
+    _request.done()
+
+    if(_response_cache is not None):
+        _response_cache.set(_cache_key, response)
+
+    return response
 
 ##-------------------start-of-_anthropic_evaluate_translation_async()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
 
@@ -106,11 +256,36 @@ async def _anthropic_evaluate_translation_async(evaluation_instructions: typing.
     if(evaluation_instructions is None):
         evaluation_instructions = _protocol._default_evaluation_instructions
 
-    if(_protocol._decorator_to_use is None):
-        return await _protocol.__evaluate_translation_async(evaluation_instructions, evaluation_prompt)
-    
-    decorated_function = _protocol._decorator_to_use(_protocol.__evaluate_translation_async)
-    return await decorated_function(evaluation_instructions, evaluation_prompt)
+    _response_cache = _protocol._response_cache
+
+    ## cache hits skip the semaphore, the delay and the decorator entirely
+    if(_response_cache is not None):
+        _cache_key = _anthropic_request_key(evaluation_instructions, evaluation_prompt, _protocol)
+        _cached_response = _response_cache.get(_cache_key)
+
+        if(_cached_response is not None):
+            return _cached_response
+
+    _request = _RequestTimer(_protocol._metrics, "anthropic", _protocol._model)
+
+    try:
+        if(_protocol._decorator_to_use is None):
+            response = await _protocol.__evaluate_translation_async(evaluation_instructions, evaluation_prompt)
+
+        else:
+            decorated_function = _protocol._decorator_to_use(_request.counting_async(_protocol.__evaluate_translation_async))
+            response = await decorated_function(evaluation_instructions, evaluation_prompt)
+
+    except Exception as _e:
+        _request.done(_e)
+        raise
+
+    _request.done()
+
+    if(_response_cache is not None):
+        _response_cache.set(_cache_key, response)
+
+    return response
 
 ##-------------------start-of-_anthropic_internal_evaluate_translation()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
 
@@ -132,25 +307,45 @@ def _anthropic_internal_evaluate_translation(instructions:str,
 
     """
     
-    attributes = ["temperature", "top_p", "top_k", "stream", "stop_sequences", "max_tokens"]
-    message_args = {
-        "model": _protocol._model,
-        "system": instructions,
-        "messages": [prompt.to_dict()],
-        ## scary looking dict comprehension to get the attributes that are not NOT_GIVEN
-        **{attr: getattr(_protocol, f"_{attr}") for attr in attributes if getattr(_protocol, f"_{attr}") != NOT_GIVEN}
-    }
-    
-    ## Special case for max_tokens
-    message_args["max_tokens"] = message_args.get("max_tokens", 4096)
-    
-    if(_protocol._json_mode and _protocol._model in VALID_JSON_ANTHROPIC_MODELS):
-        message_args.update({
-            "tools": [_protocol._json_tool],
-            "tool_choice": {"type": "tool", "name": "format_to_json"}
-        })
-    
-    response = _protocol._sync_client.messages.create(**message_args)
+    message_args = _anthropic_build_message_args(instructions, prompt, _protocol)
+
+    _attempt = _AttemptTimer(_protocol._metrics, "anthropic", _protocol._model)
+
+    _rate_limiter = _get_rate_limiter(_protocol._rate_limiters, _protocol._model)
+    _estimated_tokens = _estimate_tokens([str(instructions), _protocol._shared_context or "", prompt.content], message_args["max_tokens"]) if _rate_limiter is not None else 0
+
+    if(_rate_limiter is not None):
+        _rate_limiter.acquire_sync(_estimated_tokens)
+
+    _cassette = _protocol._cassette
+    _fingerprint = _anthropic_request_key(instructions, prompt, _protocol) if _cassette is not None else ""
+
+    _attempt.sent()
+    _started_at = time.monotonic()
+
+    try:
+        if(_cassette is not None and _cassette.replaying):
+            response = _cassette._replay_sync(_fingerprint)
+
+        else:
+            response = _protocol._sync_client.messages.create(**message_args)
+
+    except Exception as _e:
+        _attempt.done(error=_e)
+
+        if(_rate_limiter is not None):
+            _rate_limiter.settle(_estimated_tokens, 0)
+        raise
+
+    _attempt.done(response)
+
+    if(_cassette is not None):
+        _cassette.record(_fingerprint, response, time.monotonic() - _started_at)
+
+    if(_rate_limiter is not None):
+        _rate_limiter.settle(_estimated_tokens, _anthropic_usage_tokens(response))
+
+    _record_call_usage(response)
     
     return response
 
@@ -173,29 +368,209 @@ async def _anthropic_internal_evaluate_translation_async(instructions:str, promp
 
     """
 
-    async with _protocol._semaphore:
+    message_args = _anthropic_build_message_args(instructions, prompt, _protocol)
+
+    _attempt = _AttemptTimer(_protocol._metrics, "anthropic", _protocol._model)
+
+    _rate_limiter = _get_rate_limiter(_protocol._rate_limiters, _protocol._model)
+    _estimated_tokens = _estimate_tokens([str(instructions), _protocol._shared_context or "", prompt.content], message_args["max_tokens"]) if _rate_limiter is not None else 0
+
+    ## waits for budget before taking a slot, so a slot is never held while waiting
+    if(_rate_limiter is not None):
+        await _rate_limiter.acquire(_estimated_tokens)
+
+    _adaptive_concurrency = _protocol._adaptive_concurrency
+
+    _cassette = _protocol._cassette
+    _fingerprint = _anthropic_request_key(instructions, prompt, _protocol) if _cassette is not None else ""
+
+    async with (_adaptive_concurrency or _protocol._semaphore):
 
-        if(_protocol._rate_limit_delay is not None):
+        ## the limiter paces requests on its own, the delay is only for when there isn't one
+        if(_protocol._rate_limit_delay is not None and _rate_limiter is None):
             await asyncio.sleep(_protocol._rate_limit_delay)
+            _attempt.delayed(_protocol._rate_limit_delay)
 
-        attributes = ["temperature", "top_p", "top_k", "stream", "stop_sequences", "max_tokens"]
-        message_args = {
-            "model": _protocol._model,
-            "system": instructions,
-            "messages": [prompt.to_dict()],
-            ## scary looking dict comprehension to get the attributes that are not NOT_GIVEN
-            **{attr: getattr(_protocol, f"_{attr}") for attr in attributes if getattr(_protocol, f"_{attr}") != NOT_GIVEN}
-        }
-        
-        ## Special case for max_tokens
-        message_args["max_tokens"] = message_args.get("max_tokens", 4096)
-        
-        if(_protocol._json_mode and _protocol._model in VALID_JSON_ANTHROPIC_MODELS):
-            message_args.update({
-                "tools": [_protocol._json_tool],
-                "tool_choice": {"type": "tool", "name": "format_to_json"}
-            })
+        _attempt.sent()
+        _started_at = time.monotonic()
+
+        try:
+            if(_cassette is not None and _cassette.replaying):
+                response = await _cassette._replay(_fingerprint)
+
+                if(_adaptive_concurrency is not None):
+                    _adaptive_concurrency.record_success(time.monotonic() - _started_at)
+
+            elif(_adaptive_concurrency is None):
+                response = await _protocol._async_client.messages.create(**message_args)
+
+            else:
+                ## the raw response carries the rate limit headers
+                _raw_response = await _protocol._async_client.messages.with_raw_response.create(**message_args)
+                response = _raw_response.parse()
+
+                _adaptive_concurrency.record_success(time.monotonic() - _started_at, _raw_response.headers)
+
+        except Exception as _e:
+            _attempt.done(error=_e)
+
+            if(_adaptive_concurrency is not None and _is_rate_limit_error(_e)):
+                _adaptive_concurrency.record_rate_limit()
+
+            if(_rate_limiter is not None):
+                _rate_limiter.settle(_estimated_tokens, 0)
+            raise
+
+    _attempt.done(response)
+
+    if(_cassette is not None):
+        _cassette.record(_fingerprint, response, time.monotonic() - _started_at)
+
+    if(_rate_limiter is not None):
+        _rate_limiter.settle(_estimated_tokens, _anthropic_usage_tokens(response))
+
+    _record_call_usage(response)
+
+    return response
+
+##-------------------start-of-_anthropic_evaluate_translation_stream()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+@staticmethod
+async def _anthropic_evaluate_translation_stream(evaluation_instructions:typing.Optional[str],
+                                                 evaluation_prompt:ModelTranslationMessage,
+                                                 stream:EvaluationStream,
+                                                 _protocol:AnthropicServiceProtocol = typing.cast(AnthropicServiceProtocol, anthropic_service.AnthropicService)
+                                                 ) -> None:
+
+    """
+
+    Asynchronously evaluates the translation using the Anthropic API, pushing the evaluation into stream as it's generated. In json mode that's the json tool's input, as it's written.
+
+    Waits for the rate limiter and a concurrency slot like _anthropic_evaluate_translation_async() does, but isn't retried by the decorator, as the deltas already pushed can't be taken back. Streamed responses aren't stored in the response cache or recorded by the cassette, but ones already in either are pushed whole.
+
+    Parameters:
+    evaluation_instructions (str) : The instructions to use for the evaluation.
+    evaluation_prompt (ModelTranslationMessage) : The text to evaluate.
+    stream (EvaluationStream) : The stream to push the evaluation into.
+
+    """
+
+    if(evaluation_instructions is None):
+        evaluation_instructions = _protocol._default_evaluation_instructions
+
+    _response_cache = _protocol._response_cache
+    _cassette = _protocol._cassette
+
+    ## stream isn't part of the key, so streamed and whole requests share cached and recorded responses
+    _fingerprint = _anthropic_request_key(evaluation_instructions, evaluation_prompt, _protocol) if _response_cache is not None or _cassette is not None else ""
+    _cached_response = _response_cache.get(_fingerprint) if _response_cache is not None else None
+
+    if(_cached_response is not None):
+        await stream._push(_anthropic_response_text(_cached_response))
+        stream._finish(*_usage_counts(_cached_response))
+        return
+
+    message_args = _anthropic_build_message_args(evaluation_instructions, evaluation_prompt, _protocol)
+
+    ## messages.stream() always streams, and doesn't take the setting
+    message_args.pop("stream", None)
+
+    _request = _RequestTimer(_protocol._metrics, "anthropic", _protocol._model)
+    _attempt = _AttemptTimer(_protocol._metrics, "anthropic", _protocol._model)
+
+    _rate_limiter = _get_rate_limiter(_protocol._rate_limiters, _protocol._model)
+    _estimated_tokens = _estimate_tokens([str(evaluation_instructions), _protocol._shared_context or "", evaluation_prompt.content], message_args["max_tokens"]) if _rate_limiter is not None else 0
+
+    ## waits for budget before taking a slot, so a slot is never held while waiting
+    if(_rate_limiter is not None):
+        await _rate_limiter.acquire(_estimated_tokens)
+
+    _adaptive_concurrency = _protocol._adaptive_concurrency
+
+    async with (_adaptive_concurrency or _protocol._semaphore):
+
+        ## the limiter paces requests on its own, the delay is only for when there isn't one
+        if(_protocol._rate_limit_delay is not None and _rate_limiter is None):
+            await asyncio.sleep(_protocol._rate_limit_delay)
+            _attempt.delayed(_protocol._rate_limit_delay)
+
+        _attempt.sent()
+        _started_at = time.monotonic()
+
+        try:
+            if(_cassette is not None and _cassette.replaying):
+                response = await _cassette._replay(_fingerprint)
+                await stream._push(_anthropic_response_text(response))
+
+                _headers = None
+
+            else:
+                async with _protocol._async_client.messages.stream(**message_args) as _events:
+
+                    async for _event in _events:
+
+                        if(_event.type == "text"):
+                            await stream._push(_event.text)
+
+                        elif(_event.type == "input_json"):
+                            await stream._push(_event.partial_json)
+
+                    response = await _events.get_final_message()
+                    _headers = _events.response.headers
+
+            if(_adaptive_concurrency is not None):
+                _adaptive_concurrency.record_success(time.monotonic() - _started_at, _headers)
+
+        ## cancelled streams give their budget back too
+        except BaseException as _e:
+            _attempt.done(error=_e)
+            _request.done(_e)
+
+            if(_adaptive_concurrency is not None and _is_rate_limit_error(_e)):
+                _adaptive_concurrency.record_rate_limit()
+
+            if(_rate_limiter is not None):
+                _rate_limiter.settle(_estimated_tokens, 0)
+            raise
+
+    _attempt.done(response)
+    _request.done()
+
+    if(_rate_limiter is not None):
+        _rate_limiter.settle(_estimated_tokens, _anthropic_usage_tokens(response))
+
+    _record_call_usage(response)
+
+    stream._finish(*_usage_counts(response))
+
+##-------------------start-of-_anthropic_response_text()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+def _anthropic_response_text(response:AnthropicMessage) -> str:
+
+    """
+
+    Returns a whole response's evaluation as it would have been streamed, the json tool's input as JSON if it was used.
+
+    """
+
+    _block = response.content[0]
+
+    return json.dumps(_block.input, ensure_ascii=False) if isinstance(_block, AnthropicToolUseBlock) else _block.text
+
+##-------------------start-of-_anthropic_usage_tokens()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+def _anthropic_usage_tokens(response:AnthropicMessage) -> int | None:
+
+    """
+
+    Returns the tokens a response counted against the tokens per minute limit, or None if it didn't report usage.
+
+    """
+
+    _usage = getattr(response, "usage", None)
 
-        response = await _protocol._async_client.messages.create(**message_args)
+    if(_usage is None):
+        return None
 
-        return response
\ No newline at end of file
+    ## cache writes count against the limit, cache reads don't
+    return (getattr(_usage, "input_tokens", 0) or 0) + (getattr(_usage, "cache_creation_input_tokens", 0) or 0) + (getattr(_usage, "output_tokens", 0) or 0)
\ No newline at end of file
@@ -5,6 +5,8 @@
 ## built-in imports
 import typing
 import asyncio
+import json
+import time
 
 ## third-party imports
 import google.generativeai as genai
@@ -14,11 +16,39 @@ from ..protocols.gemini_service_protocol import GeminiServiceProtocol
 
 from ..util.classes import gemini_service, GenerationConfig, GenerateContentResponse, AsyncGenerateContentResponse
 from ..util.attributes import VALID_JSON_GEMINI_MODELS as VALID_SYSTEM_MESSAGE_MODELS
+from ..util.response_cache import ResponseCache
+from ..util.rate_limiter import _get_rate_limiter, _estimate_tokens
+from ..util.concurrency import _is_rate_limit_error
+from ..util.metrics import _AttemptTimer, _RequestTimer, _usage_counts
+from ..util.streaming import EvaluationStream
 
 ##-------------------start-of-attributes---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
 
 _gemini_default_evaluation_instructions = "Please suggest a revised of the given text given it's original text and it's translation."
 
+## fingerprint of the settings the current client was built with, None forces a rebuild
+_gemini_client_fingerprint_default:str | None = None
+
+##-------------------start-of-_gemini_client_fingerprint()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+def _gemini_client_fingerprint(gen_model_params:typing.Dict[str, typing.Any],
+                               generation_config_params:typing.Dict[str, typing.Any]) -> str:
+
+    """
+
+    Returns a fingerprint of the settings the Gemini client and generation config are built from.
+
+    Parameters:
+    gen_model_params (dict) : The GenerativeModel parameters.
+    generation_config_params (dict) : The GenerationConfig parameters.
+
+    Returns:
+    fingerprint (string) : A stable string that only changes when the settings change.
+
+    """
+
+    return json.dumps([gen_model_params, generation_config_params], sort_keys=True, default=str)
+
 ##-------------------start-of-_gemini_redefine_client()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
 
 @staticmethod
@@ -29,6 +59,8 @@ def _gemini_redefine_client(_protocol:GeminiServiceProtocol = typing.cast(Gemini
 
     Redefines the Gemini client and generation config. This should be called before making any requests to the Gemini service, or after changing any of the services's settings.
 
+    The client is only rebuilt if the settings have changed since it was last built. The semaphore is left alone, it's created by _set_attributes() and shared by every request in a batch.
+
     """
 
     response_mime_type = "application/json" if _protocol._json_mode else "text/plain"
@@ -39,8 +71,6 @@ def _gemini_redefine_client(_protocol:GeminiServiceProtocol = typing.cast(Gemini
         "system_instruction": _protocol._system_message if _protocol._model in VALID_SYSTEM_MESSAGE_MODELS else None
     }
     
-    _protocol._client = genai.GenerativeModel(**gen_model_params)
-    
     generation_config_params = {
         "candidate_count": _protocol._candidate_count,
         "stop_sequences": _protocol._stop_sequences,
@@ -51,10 +81,22 @@ def _gemini_redefine_client(_protocol:GeminiServiceProtocol = typing.cast(Gemini
         "response_mime_type": response_mime_type,
         "response_schema": _protocol._response_schema if _protocol._response_schema and _protocol._json_mode else None
     }
+
+    _fingerprint = _gemini_client_fingerprint(gen_model_params, generation_config_params)
+
+    if(_fingerprint == _protocol._client_fingerprint):
+        return
     
-    _protocol._generation_config = GenerationConfig(**generation_config_params)
+    _protocol._client = genai.GenerativeModel(**gen_model_params)
+
+    ## scoped services carry their own api key, EasyTL's service relies on genai.configure()
+    ## the async client is attached in _gemini_internal_evaluate_translation_async(), as it has to be made inside an event loop
+    if(_protocol._client_manager is not None):
+        _protocol._client._client = _protocol._client_manager.get_default_client("generative")
     
-    _protocol._semaphore = asyncio.Semaphore(_protocol._semaphore_value)
+    _protocol._generation_config = GenerationConfig(**generation_config_params)
+
+    _protocol._client_fingerprint = _fingerprint
 
 ##-------------------start-of-_gemini_redefine_client_decorator()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
 
@@ -76,11 +118,26 @@ def _gemini_redefine_client_decorator(func:typing.Callable,
     """
 
     def wrapper(*args, **kwargs):
-        _protocol._redefine_client() 
+        ## bound services pass themselves in as _protocol
+        kwargs.get("_protocol", _protocol)._redefine_client()
         return func(*args, **kwargs)
     
     return wrapper
 
+##-------------------start-of-_gemini_request_key()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+def _gemini_request_key(text_to_evaluate:str,
+                        _protocol:GeminiServiceProtocol = typing.cast(GeminiServiceProtocol, gemini_service.GeminiService)
+                        ) -> str:
+
+    """
+
+    Returns the key of the request _gemini_evaluate_translation() would send for text_to_evaluate, used by the response cache and the evaluation journal. The client fingerprint covers the model and generation settings.
+
+    """
+
+    return ResponseCache.make_key("gemini", {"client": _protocol._client_fingerprint, "system_message": _protocol._system_message, "stream": _protocol._stream, "text": text_to_evaluate})
+
 ##-------------------start-of-_gemini_evaluate_translation()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
 
 @staticmethod
@@ -101,11 +158,36 @@ def _gemini_evaluate_translation(text_to_evaluate:str,
 
     """
 
-    if(_protocol._decorator_to_use is None):
-        return _protocol.__evaluate_translation(text_to_evaluate)
+    _response_cache = _protocol._response_cache
+
+    ## cache hits skip the semaphore, the delay and the decorator entirely
+    if(_response_cache is not None):
+        _cache_key = _gemini_request_key(text_to_evaluate, _protocol)
+        _cached_response = _response_cache.get(_cache_key)
+
+        if(_cached_response is not None):
+            return _cached_response
 
-    _decorated_function = _protocol._decorator_to_use(_protocol.__evaluate_translation)
-    return _decorated_function(text_to_evaluate)
+    _request = _RequestTimer(_protocol._metrics, "gemini", _protocol._model)
+
+    try:
+        if(_protocol._decorator_to_use is None):
+            _response = _protocol.__evaluate_translation(text_to_evaluate)
+
+        else:
+            _decorated_function = _protocol._decorator_to_use(_request.counting(_protocol.__evaluate_translation))
+            _response = _decorated_function(text_to_evaluate)
+
+    except Exception as _e:
+        _request.done(_e)
+        raise
+
+    _request.done()
+
+    if(_response_cache is not None):
+        _response_cache.set(_cache_key, _response)
+
+    return _response
 
 ##-------------------start-of-_gemini_internal_evaluate_translation()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
 
@@ -128,12 +210,46 @@ def _gemini_internal_evaluate_translation(text_to_evaluate:str,
 
     text_request = f"{text_to_evaluate}" if _protocol._model in VALID_SYSTEM_MESSAGE_MODELS else f"{_protocol._system_message}\n{text_to_evaluate}"
 
-    _response = _protocol._client.generate_content(
-        contents=text_request,
-        generation_config=_protocol._generation_config,
-        safety_settings=_protocol._safety_settings,
-        stream=_protocol._stream
-    )
+    _attempt = _AttemptTimer(_protocol._metrics, "gemini", _protocol._model)
+
+    _rate_limiter = _get_rate_limiter(_protocol._rate_limiters, _protocol._model)
+    _estimated_tokens = _estimate_tokens([str(_protocol._system_message), text_to_evaluate], _protocol._max_output_tokens) if _rate_limiter is not None else 0
+
+    if(_rate_limiter is not None):
+        _rate_limiter.acquire_sync(_estimated_tokens)
+
+    _cassette = _protocol._cassette
+    _fingerprint = _gemini_request_key(text_to_evaluate, _protocol) if _cassette is not None else ""
+
+    _attempt.sent()
+    _started_at = time.monotonic()
+
+    try:
+        if(_cassette is not None and _cassette.replaying):
+            _response = _cassette._replay_sync(_fingerprint)
+
+        else:
+            _response = _protocol._client.generate_content(
+                contents=text_request,
+                generation_config=_protocol._generation_config,
+                safety_settings=_protocol._safety_settings,
+                stream=_protocol._stream
+            )
+
+    except Exception as _e:
+        _attempt.done(error=_e)
+
+        if(_rate_limiter is not None):
+            _rate_limiter.settle(_estimated_tokens, 0)
+        raise
+
+    _attempt.done(_response)
+
+    if(_cassette is not None):
+        _cassette.record(_fingerprint, _response, time.monotonic() - _started_at)
+
+    if(_rate_limiter is not None):
+        _rate_limiter.settle(_estimated_tokens, _gemini_usage_tokens(_response))
     
     return _response
 
@@ -158,11 +274,36 @@ async def _gemini_evaluate_translation_async(text_to_evaluate:str,
 
     """
 
-    if(_protocol._decorator_to_use is None):
-        return await _protocol.__evaluate_translation_async(text_to_evaluate)
+    _response_cache = _protocol._response_cache
+
+    ## cache hits skip the semaphore, the delay and the decorator entirely
+    if(_response_cache is not None):
+        _cache_key = _gemini_request_key(text_to_evaluate, _protocol)
+        _cached_response = _response_cache.get(_cache_key)
+
+        if(_cached_response is not None):
+            return _cached_response
+
+    _request = _RequestTimer(_protocol._metrics, "gemini", _protocol._model)
+
+    try:
+        if(_protocol._decorator_to_use is None):
+            _response = await _protocol.__evaluate_translation_async(text_to_evaluate)
+
+        else:
+            _decorated_function = _protocol._decorator_to_use(_request.counting_async(_protocol.__evaluate_translation_async))
+            _response = await _decorated_function(text_to_evaluate)
+
+    except Exception as _e:
+        _request.done(_e)
+        raise
+
+    _request.done()
 
-    _decorated_function = _protocol._decorator_to_use(_protocol.__evaluate_translation_async)
-    return await _decorated_function(text_to_evaluate)
+    if(_response_cache is not None):
+        _response_cache.set(_cache_key, _response)
+
+    return _response
 
 ##-------------------start-of-__translate_message_async()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
 
@@ -183,18 +324,201 @@ async def _gemini_internal_evaluate_translation_async(text_to_evaluate:str,
 
     """
 
-    async with _protocol._semaphore:
+    _attempt = _AttemptTimer(_protocol._metrics, "gemini", _protocol._model)
+
+    _rate_limiter = _get_rate_limiter(_protocol._rate_limiters, _protocol._model)
+    _estimated_tokens = _estimate_tokens([str(_protocol._system_message), text_to_evaluate], _protocol._max_output_tokens) if _rate_limiter is not None else 0
+
+    ## waits for budget before taking a slot, so a slot is never held while waiting
+    if(_rate_limiter is not None):
+        await _rate_limiter.acquire(_estimated_tokens)
 
-        if(_protocol._rate_limit_delay is not None):
+    _adaptive_concurrency = _protocol._adaptive_concurrency
+
+    _cassette = _protocol._cassette
+    _fingerprint = _gemini_request_key(text_to_evaluate, _protocol) if _cassette is not None else ""
+
+    async with (_adaptive_concurrency or _protocol._semaphore):
+
+        ## the limiter paces requests on its own, the delay is only for when there isn't one
+        if(_protocol._rate_limit_delay is not None and _rate_limiter is None):
             await asyncio.sleep(_protocol._rate_limit_delay)
+            _attempt.delayed(_protocol._rate_limit_delay)
+
+        if(_protocol._client_manager is not None and _protocol._client._async_client is None):
+            _protocol._client._async_client = _protocol._client_manager.get_default_client("generative_async")
 
         text_request = f"{text_to_evaluate}" if _protocol._model in VALID_SYSTEM_MESSAGE_MODELS else f"{_protocol._system_message}\n{text_to_evaluate}"
 
-        _response = await _protocol._client.generate_content_async(
-            contents=text_request,
-            generation_config=_protocol._generation_config,
-            safety_settings=_protocol._safety_settings,
-            stream=_protocol._stream
-        )
+        _attempt.sent()
+        _started_at = time.monotonic()
+
+        try:
+            if(_cassette is not None and _cassette.replaying):
+                _response = await _cassette._replay(_fingerprint)
+
+            else:
+                _response = await _protocol._client.generate_content_async(
+                    contents=text_request,
+                    generation_config=_protocol._generation_config,
+                    safety_settings=_protocol._safety_settings,
+                    stream=_protocol._stream
+                )
+
+            ## grpc responses don't carry rate limit headers, so only latency and errors are fed back
+            if(_adaptive_concurrency is not None):
+                _adaptive_concurrency.record_success(time.monotonic() - _started_at)
+
+        except Exception as _e:
+            _attempt.done(error=_e)
+
+            if(_adaptive_concurrency is not None and _is_rate_limit_error(_e)):
+                _adaptive_concurrency.record_rate_limit()
+
+            if(_rate_limiter is not None):
+                _rate_limiter.settle(_estimated_tokens, 0)
+            raise
+
+    _attempt.done(_response)
+
+    if(_cassette is not None):
+        _cassette.record(_fingerprint, _response, time.monotonic() - _started_at)
+
+    if(_rate_limiter is not None):
+        _rate_limiter.settle(_estimated_tokens, _gemini_usage_tokens(_response))
         
-        return _response
\ No newline at end of file
+    return _response
+
+##-------------------start-of-_gemini_evaluate_translation_stream()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+@staticmethod
+@_gemini_redefine_client_decorator
+async def _gemini_evaluate_translation_stream(text_to_evaluate:str,
+                                              stream:EvaluationStream,
+                                              _protocol:GeminiServiceProtocol = typing.cast(GeminiServiceProtocol, gemini_service.GeminiService)
+                                              ) -> None:
+
+    """
+
+    Asynchronously evaluates the text using the Gemini API, pushing the evaluation into stream as it's generated.
+
+    Waits for the rate limiter and a concurrency slot like _gemini_evaluate_translation_async() does, but isn't retried by the decorator, as the deltas already pushed can't be taken back. Streamed responses aren't stored in the response cache or recorded by the cassette, but ones already in either are pushed whole.
+
+    Parameters:
+    text_to_evaluate (string) : The text to evaluate.
+    stream (EvaluationStream) : The stream to push the evaluation into.
+
+    """
+
+    _response_cache = _protocol._response_cache
+    _cassette = _protocol._cassette
+
+    ## the key has the service's stream setting, not this request's, so streamed and whole requests share cached and recorded responses
+    _fingerprint = _gemini_request_key(text_to_evaluate, _protocol) if _response_cache is not None or _cassette is not None else ""
+    _cached_response = _response_cache.get(_fingerprint) if _response_cache is not None else None
+
+    if(_cached_response is not None):
+        await stream._push(_cached_response.text)
+        stream._finish(*_usage_counts(_cached_response))
+        return
+
+    _request = _RequestTimer(_protocol._metrics, "gemini", _protocol._model)
+    _attempt = _AttemptTimer(_protocol._metrics, "gemini", _protocol._model)
+
+    _rate_limiter = _get_rate_limiter(_protocol._rate_limiters, _protocol._model)
+    _estimated_tokens = _estimate_tokens([str(_protocol._system_message), text_to_evaluate], _protocol._max_output_tokens) if _rate_limiter is not None else 0
+
+    ## waits for budget before taking a slot, so a slot is never held while waiting
+    if(_rate_limiter is not None):
+        await _rate_limiter.acquire(_estimated_tokens)
+
+    _adaptive_concurrency = _protocol._adaptive_concurrency
+
+    async with (_adaptive_concurrency or _protocol._semaphore):
+
+        ## the limiter paces requests on its own, the delay is only for when there isn't one
+        if(_protocol._rate_limit_delay is not None and _rate_limiter is None):
+            await asyncio.sleep(_protocol._rate_limit_delay)
+            _attempt.delayed(_protocol._rate_limit_delay)
+
+        if(_protocol._client_manager is not None and _protocol._client._async_client is None):
+            _protocol._client._async_client = _protocol._client_manager.get_default_client("generative_async")
+
+        text_request = f"{text_to_evaluate}" if _protocol._model in VALID_SYSTEM_MESSAGE_MODELS else f"{_protocol._system_message}\n{text_to_evaluate}"
+
+        _attempt.sent()
+        _started_at = time.monotonic()
+
+        try:
+            if(_cassette is not None and _cassette.replaying):
+                _response = await _cassette._replay(_fingerprint)
+                await stream._push(_response.text)
+
+            else:
+                _response = await _protocol._client.generate_content_async(
+                    contents=text_request,
+                    generation_config=_protocol._generation_config,
+                    safety_settings=_protocol._safety_settings,
+                    stream=True
+                )
+
+                ## the response joins the chunks as they're read, usage included
+                ## it only yields a chunk once it's read the next one, so deltas land a chunk late, which is still a small part of the generation
+                async for _chunk in _response:
+                    await stream._push(_gemini_chunk_text(_chunk))
+
+            if(_adaptive_concurrency is not None):
+                _adaptive_concurrency.record_success(time.monotonic() - _started_at)
+
+        ## cancelled streams give their budget back too
+        except BaseException as _e:
+            _attempt.done(error=_e)
+            _request.done(_e)
+
+            if(_adaptive_concurrency is not None and _is_rate_limit_error(_e)):
+                _adaptive_concurrency.record_rate_limit()
+
+            if(_rate_limiter is not None):
+                _rate_limiter.settle(_estimated_tokens, 0)
+            raise
+
+    _attempt.done(_response)
+    _request.done()
+
+    if(_rate_limiter is not None):
+        _rate_limiter.settle(_estimated_tokens, _gemini_usage_tokens(_response))
+
+    stream._finish(*_usage_counts(_response))
+
+##-------------------start-of-_gemini_chunk_text()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+def _gemini_chunk_text(chunk:GenerateContentResponse) -> str:
+
+    """
+
+    Returns the text a streamed chunk carries. The last chunk can carry only the finish reason and usage, which .text raises on.
+
+    """
+
+    try:
+        return chunk.text
+
+    except ValueError:
+        return ""
+
+##-------------------start-of-_gemini_usage_tokens()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+def _gemini_usage_tokens(response:GenerateContentResponse | AsyncGenerateContentResponse) -> int | None:
+
+    """
+
+    Returns the tokens a response counted against the tokens per minute limit, or None if it didn't report usage.
+
+    """
+
+    try:
+        return response.usage_metadata.total_token_count or None
+
+    ## streamed and blocked responses don't always carry usage
+    except Exception:
+        return None
\ No newline at end of file
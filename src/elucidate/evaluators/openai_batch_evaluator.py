@@ -0,0 +1,189 @@
+## Copyright 2024 Kakusui LLC (https://kakusui.org) (https://github.com/Kakusui) (https://github.com/Kakusui/Elucidate)
+## Use of this source code is governed by an GNU Lesser General Public License v2.1
+## license that can be found in the LICENSE file.
+
+## built-in imports
+import typing
+import json
+
+## custom modules
+from ..protocols.openai_service_protocol import OpenAIServiceProtocol
+
+from ..evaluators.openai_evaluator import _openai_build_message_args
+
+from ..util.classes import SystemTranslationMessage, ModelTranslationMessage, ChatCompletion, openai_service
+from ..util.batching import BatchResults, _poll_with_backoff
+
+from ..exceptions import ElucidateException
+
+##-------------------start-of-attributes---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+_openai_batch_endpoint = "/v1/chat/completions"
+
+## statuses after which a batch won't change anymore
+_openai_batch_final_statuses = ["completed", "failed", "expired", "cancelled"]
+
+##-------------------start-of-_openai_build_batch_file()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+def _openai_build_batch_file(evaluation_batches:typing.Iterable[typing.Tuple[ModelTranslationMessage, SystemTranslationMessage]],
+                             service:OpenAIServiceProtocol = typing.cast(OpenAIServiceProtocol, openai_service.OpenAIService)
+                             ) -> bytes:
+
+    """
+
+    Builds the Batch API input file, one request per line with the same arguments _openai_internal_evaluate_translation() would send.
+
+    Parameters:
+    evaluation_batches (iterable[tuple[ModelTranslationMessage, SystemTranslationMessage]]) : The evaluation batches.
+
+    Returns:
+    batch_file (bytes) : The JSONL file. Each line's custom_id is the index of its text.
+
+    """
+
+    _lines = []
+
+    for _index, (_text, _instructions) in enumerate(evaluation_batches):
+        _lines.append(json.dumps({"custom_id": str(_index),
+                                  "method": "POST",
+                                  "url": _openai_batch_endpoint,
+                                  "body": _openai_build_message_args(_instructions, _text, service)}, default=str))
+
+    return ("\n".join(_lines) + "\n").encode("utf-8")
+
+##-------------------start-of-_openai_submit_batch()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+def _openai_submit_batch(batch_file:bytes,
+                         metadata:typing.Dict[str, str],
+                         completion_window:typing.Literal["24h"] = "24h",
+                         service:OpenAIServiceProtocol = typing.cast(OpenAIServiceProtocol, openai_service.OpenAIService)
+                         ) -> str:
+
+    """
+
+    Uploads the input file and creates the batch.
+
+    Parameters:
+    batch_file (bytes) : The JSONL file built by _openai_build_batch_file().
+    metadata (dict[string, string]) : Stored with the batch, it's how results are mapped back when resuming.
+    completion_window (literal["24h"]) : How long OpenAI has to finish the batch.
+
+    Returns:
+    batch_id (string) : The id of the batch.
+
+    """
+
+    _input_file = service._sync_client.files.create(file=("elucidate_batch.jsonl", batch_file), purpose="batch")
+
+    _batch = service._sync_client.batches.create(input_file_id=_input_file.id,
+                                                 endpoint=_openai_batch_endpoint,
+                                                 completion_window=completion_window,
+                                                 metadata=metadata)
+
+    return _batch.id
+
+##-------------------start-of-_openai_wait_for_batch()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+def _openai_wait_for_batch(batch_id:str,
+                           poll_interval:float = 10.0,
+                           max_poll_interval:float = 300.0,
+                           timeout:float | None = None,
+                           service:OpenAIServiceProtocol = typing.cast(OpenAIServiceProtocol, openai_service.OpenAIService)
+                           ) -> typing.Any:
+
+    """
+
+    Polls the batch with backoff until it reaches a final status.
+
+    Parameters:
+    batch_id (string) : The id of the batch.
+    poll_interval (float) : The first wait between polls, in seconds.
+    max_poll_interval (float) : The longest wait between polls, in seconds.
+    timeout (float or None) : Give up after this many seconds, the batch keeps running. None waits forever.
+
+    Returns:
+    batch (Batch) : The finished batch.
+
+    """
+
+    return _poll_with_backoff(lambda: service._sync_client.batches.retrieve(batch_id),
+                              lambda _batch: _batch.status in _openai_batch_final_statuses,
+                              poll_interval=poll_interval,
+                              max_poll_interval=max_poll_interval,
+                              timeout=timeout)
+
+##-------------------start-of-_openai_collect_batch_results()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+def _openai_collect_batch_results(batch:typing.Any,
+                                  count:int,
+                                  service:OpenAIServiceProtocol = typing.cast(OpenAIServiceProtocol, openai_service.OpenAIService)
+                                  ) -> BatchResults:
+
+    """
+
+    Downloads a finished batch's output and error files and maps them back to input order.
+
+    Parameters:
+    batch (Batch) : The finished batch.
+    count (int) : How many texts were submitted.
+
+    Returns:
+    results (BatchResults) : The ChatCompletion of every text in input order, None with an entry in errors for those that failed.
+
+    """
+
+    _results:typing.List[typing.Any] = [None] * count
+    _errors:typing.Dict[int, Exception] = {}
+
+    for _file_id in [batch.output_file_id, batch.error_file_id]:
+
+        if(_file_id is None):
+            continue
+
+        for _line in service._sync_client.files.content(_file_id).text.splitlines():
+
+            if(not _line.strip()):
+                continue
+
+            _record = json.loads(_line)
+            _index = int(_record["custom_id"])
+            _response = _record.get("response") or {}
+
+            if(_response.get("status_code") == 200):
+                _results[_index] = ChatCompletion.construct(**_response["body"])
+
+            else:
+                _error = _record.get("error") or (_response.get("body") or {}).get("error") or {}
+                _errors[_index] = ElucidateException(f"Batch request {_index} failed with status {_response.get('status_code')}: {_error.get('message', _error)}")
+
+    ## the batch as a whole failed, expired or was cancelled before these ran
+    for _index in range(count):
+        if(_results[_index] is None and _index not in _errors):
+            _errors[_index] = ElucidateException(f"Batch request {_index} has no result, the batch ended with status '{batch.status}'.")
+
+    return BatchResults(_results, _errors, [batch.id])
+
+##-------------------start-of-_openai_finish_batch_results()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+def _openai_finish_batch_results(results:BatchResults,
+                                 response_type:str
+                                 ) -> BatchResults:
+
+    """
+
+    Turns the ChatCompletions of a batch into the response type it was submitted with, in place.
+
+    Parameters:
+    results (BatchResults) : The results, from _openai_collect_batch_results() or a replaying cassette.
+    response_type (string) : The response type the batch was submitted with.
+
+    Returns:
+    results (BatchResults) : The same results.
+
+    """
+
+    if(response_type not in ["raw", "raw_json"]):
+        for _index, _result in results.succeeded.items():
+            results[_index] = _result.choices[0].message.content
+
+    return results
@@ -5,12 +5,18 @@
 ## built-in imports
 import typing
 import asyncio
+import time
 
 ## custom modules
 from ..protocols.openai_service_protocol import OpenAIServiceProtocol
 
 from ..util.classes import SystemTranslationMessage, ModelTranslationMessage, ChatCompletion, NOT_GIVEN, openai_service
 from ..util.attributes import VALID_JSON_OPENAI_MODELS
+from ..util.request_template import _RequestTemplate
+from ..util.rate_limiter import _get_rate_limiter, _estimate_tokens
+from ..util.concurrency import _is_rate_limit_error
+from ..util.metrics import _AttemptTimer, _RequestTimer, _usage_counts
+from ..util.streaming import EvaluationStream
 
 ##-------------------start-of-attributes---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
 
@@ -58,6 +64,83 @@ def _openai_build_evaluation_batches(text: typing.Union[str, typing.Iterable[str
     
     return [(item, instructions) for item in text]
 
+##-------------------start-of-_openai_request_template()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+def _openai_request_template(instructions:SystemTranslationMessage,
+                             service:OpenAIServiceProtocol = typing.cast(OpenAIServiceProtocol, openai_service.OpenAIService)
+                             ) -> _RequestTemplate:
+
+    """
+
+    Returns the service's request template for instructions. Built on the first request after _set_attributes() or after the instructions change, and reused until then.
+
+    Parameters:
+    instructions (SystemTranslationMessage) : The instructions to use for the evaluation.
+
+    Returns:
+    template (_RequestTemplate) : The template.
+
+    """
+
+    _template = service._request_template
+
+    ## compared by content, as the lazy paths wrap string instructions in a new SystemTranslationMessage for every text
+    if(_template is not None and (_template.instructions is instructions or (type(_template.instructions) is type(instructions) and _template.instructions.content == instructions.content))):
+        return _template
+
+    response_format = "json_object" if service._json_mode and service._model in VALID_JSON_OPENAI_MODELS else "text"
+
+    attributes = ["temperature", "logit_bias", "top_p", "n", "stream", "stop", "presence_penalty", "frequency_penalty", "max_tokens"]
+    message_args = {
+        "response_format": { "type": response_format },
+        "model": service._model,
+        ## scary looking dict comprehension to get the attributes that are not NOT_GIVEN
+        **{attr: getattr(service, f"_{attr}") for attr in attributes if getattr(service, f"_{attr}") != NOT_GIVEN}
+    }
+
+    _template = _RequestTemplate("openai", instructions, message_args, [instructions.to_dict()])
+
+    service._request_template = _template
+
+    return _template
+
+##-------------------start-of-_openai_build_message_args()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+def _openai_build_message_args(instructions:SystemTranslationMessage,
+                               prompt:ModelTranslationMessage,
+                               service:OpenAIServiceProtocol = typing.cast(OpenAIServiceProtocol, openai_service.OpenAIService)
+                               ) -> typing.Dict[str, typing.Any]:
+
+    """
+
+    Builds the arguments for chat.completions.create() from the service's current settings.
+
+    Parameters:
+    instructions (SystemTranslationMessage) : The instructions to use for the evaluation.
+    prompt (ModelTranslationMessage) : The text to evaluate.
+
+    Returns:
+    message_args (dict) : The arguments.
+
+    """
+
+    return _openai_request_template(instructions, service).build(prompt)
+
+##-------------------start-of-_openai_request_key()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+def _openai_request_key(instructions:SystemTranslationMessage | None,
+                        prompt:ModelTranslationMessage,
+                        service:OpenAIServiceProtocol = typing.cast(OpenAIServiceProtocol, openai_service.OpenAIService)
+                        ) -> str:
+
+    """
+
+    Returns the key of the request _openai_evaluate_translation() would send for prompt, used by the response cache and the evaluation journal.
+
+    """
+
+    return _openai_request_template(instructions or service._default_evaluation_instructions, service).key(prompt)
+
 ##-------------------start-of-_openai_evaluate_translation()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
 
 @staticmethod
@@ -82,11 +165,36 @@ def _openai_evaluate_translation(evaluation_instructions:typing.Optional[SystemT
     if(evaluation_instructions is None):
         evaluation_instructions = service._default_evaluation_instructions
 
-    if(service._decorator_to_use is None):
-        return service.__evaluate_translation(evaluation_instructions, evaluation_prompt)
+    _response_cache = service._response_cache
 
-    decorated_function = service._decorator_to_use(service.__evaluate_translation)
-    return decorated_function(evaluation_instructions, evaluation_prompt)
+    ## cache hits skip the semaphore, the delay and the decorator entirely
+    if(_response_cache is not None):
+        _cache_key = _openai_request_key(evaluation_instructions, evaluation_prompt, service)
+        _cached_response = _response_cache.get(_cache_key)
+
+        if(_cached_response is not None):
+            return _cached_response
+
+    _request = _RequestTimer(service._metrics, "openai", service._model)
+
+    try:
+        if(service._decorator_to_use is None):
+            response = service.__evaluate_translation(evaluation_instructions, evaluation_prompt)
+
+        else:
+            decorated_function = service._decorator_to_use(_request.counting(service.__evaluate_translation))
+            response = decorated_function(evaluation_instructions, evaluation_prompt)
+
+    except Exception as _e:
+        _request.done(_e)
+        raise
+
+    _request.done()
+
+    if(_response_cache is not None):
+        _response_cache.set(_cache_key, response)
+
+    return response
 
 ##-------------------start-of-_openai_evaluate_translation_async()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
 
@@ -112,11 +220,36 @@ async def _openai_evaluate_translation_async(evaluation_instructions:typing.Opti
     if(evaluation_instructions is None):
         evaluation_instructions = service._default_evaluation_instructions
 
-    if(service._decorator_to_use is None):
-        return await service.__evaluate_translation_async(evaluation_instructions, evaluation_prompt)
-    
-    decorated_function = service._decorator_to_use(service.__evaluate_translation_async)
-    return await decorated_function(evaluation_instructions, evaluation_prompt)
+    _response_cache = service._response_cache
+
+    ## cache hits skip the semaphore, the delay and the decorator entirely
+    if(_response_cache is not None):
+        _cache_key = _openai_request_key(evaluation_instructions, evaluation_prompt, service)
+        _cached_response = _response_cache.get(_cache_key)
+
+        if(_cached_response is not None):
+            return _cached_response
+
+    _request = _RequestTimer(service._metrics, "openai", service._model)
+
+    try:
+        if(service._decorator_to_use is None):
+            response = await service.__evaluate_translation_async(evaluation_instructions, evaluation_prompt)
+
+        else:
+            decorated_function = service._decorator_to_use(_request.counting_async(service.__evaluate_translation_async))
+            response = await decorated_function(evaluation_instructions, evaluation_prompt)
+
+    except Exception as _e:
+        _request.done(_e)
+        raise
+
+    _request.done()
+
+    if(_response_cache is not None):
+        _response_cache.set(_cache_key, response)
+
+    return response
 
 ##-------------------start-of-_openai_internal_evaluate_translation()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
 
@@ -139,18 +272,43 @@ def _openai_internal_evaluate_translation(instructions:SystemTranslationMessage,
 
     """
 
-    response_format = "json_object" if service._json_mode and service._model in VALID_JSON_OPENAI_MODELS else "text"
+    message_args = _openai_build_message_args(instructions, prompt, service)
 
-    attributes = ["temperature", "logit_bias", "top_p", "n", "stream", "stop", "presence_penalty", "frequency_penalty", "max_tokens"]
-    message_args = {
-        "response_format": { "type": response_format },
-        "model": service._model,
-        "messages": [instructions.to_dict(), prompt.to_dict()],
-        ## scary looking dict comprehension to get the attributes that are not NOT_GIVEN
-        **{attr: getattr(service, f"_{attr}") for attr in attributes if getattr(service, f"_{attr}") != NOT_GIVEN}
-    }
+    _attempt = _AttemptTimer(service._metrics, "openai", service._model)
 
-    response = service._sync_client.chat.completions.create(**message_args)
+    _rate_limiter = _get_rate_limiter(service._rate_limiters, service._model)
+    _estimated_tokens = _estimate_tokens([instructions.content, prompt.content], service._max_tokens) if _rate_limiter is not None else 0
+
+    if(_rate_limiter is not None):
+        _rate_limiter.acquire_sync(_estimated_tokens)
+
+    _cassette = service._cassette
+    _fingerprint = _openai_request_key(instructions, prompt, service) if _cassette is not None else ""
+
+    _attempt.sent()
+    _started_at = time.monotonic()
+
+    try:
+        if(_cassette is not None and _cassette.replaying):
+            response = _cassette._replay_sync(_fingerprint)
+
+        else:
+            response = service._sync_client.chat.completions.create(**message_args)
+
+    except Exception as _e:
+        _attempt.done(error=_e)
+
+        if(_rate_limiter is not None):
+            _rate_limiter.settle(_estimated_tokens, 0)
+        raise
+
+    _attempt.done(response)
+
+    if(_cassette is not None):
+        _cassette.record(_fingerprint, response, time.monotonic() - _started_at)
+
+    if(_rate_limiter is not None):
+        _rate_limiter.settle(_estimated_tokens, _openai_usage_tokens(response))
     
     return response
 
@@ -175,22 +333,182 @@ async def _openai_internal_evaluate_translation_async(instructions:SystemTransla
 
     """
 
-    async with service._semaphore:
+    message_args = _openai_build_message_args(instructions, prompt, service)
 
-        response_format = "json_object" if service._json_mode and service._model in VALID_JSON_OPENAI_MODELS else "text"
+    _attempt = _AttemptTimer(service._metrics, "openai", service._model)
 
-        if(service._rate_limit_delay is not None):
+    _rate_limiter = _get_rate_limiter(service._rate_limiters, service._model)
+    _estimated_tokens = _estimate_tokens([instructions.content, prompt.content], service._max_tokens) if _rate_limiter is not None else 0
+
+    ## waits for budget before taking a slot, so a slot is never held while waiting
+    if(_rate_limiter is not None):
+        await _rate_limiter.acquire(_estimated_tokens)
+
+    _adaptive_concurrency = service._adaptive_concurrency
+
+    _cassette = service._cassette
+    _fingerprint = _openai_request_key(instructions, prompt, service) if _cassette is not None else ""
+
+    async with (_adaptive_concurrency or service._semaphore):
+
+        ## the limiter paces requests on its own, the delay is only for when there isn't one
+        if(service._rate_limit_delay is not None and _rate_limiter is None):
             await asyncio.sleep(service._rate_limit_delay)
+            _attempt.delayed(service._rate_limit_delay)
+
+        _attempt.sent()
+        _started_at = time.monotonic()
+
+        try:
+            if(_cassette is not None and _cassette.replaying):
+                response = await _cassette._replay(_fingerprint)
+
+                if(_adaptive_concurrency is not None):
+                    _adaptive_concurrency.record_success(time.monotonic() - _started_at)
+
+            elif(_adaptive_concurrency is None):
+                response = await service._async_client.chat.completions.create(**message_args)
 
-        attributes = ["temperature", "logit_bias", "top_p", "n", "stream", "stop", "presence_penalty", "frequency_penalty", "max_tokens"]
-        message_args = {
-            "response_format": { "type": response_format },
-            "model": service._model,
-            "messages": [instructions.to_dict(), prompt.to_dict()],
-            ## scary looking dict comprehension to get the attributes that are not NOT_GIVEN
-            **{attr: getattr(service, f"_{attr}") for attr in attributes if getattr(service, f"_{attr}") != NOT_GIVEN}
-        }
+            else:
+                ## the raw response carries the rate limit headers
+                _raw_response = await service._async_client.chat.completions.with_raw_response.create(**message_args)
+                response = _raw_response.parse()
 
-        response = await service._async_client.chat.completions.create(**message_args)
+                _adaptive_concurrency.record_success(time.monotonic() - _started_at, _raw_response.headers)
+
+        except Exception as _e:
+            _attempt.done(error=_e)
+
+            if(_adaptive_concurrency is not None and _is_rate_limit_error(_e)):
+                _adaptive_concurrency.record_rate_limit()
+
+            if(_rate_limiter is not None):
+                _rate_limiter.settle(_estimated_tokens, 0)
+            raise
+
+    _attempt.done(response)
+
+    if(_cassette is not None):
+        _cassette.record(_fingerprint, response, time.monotonic() - _started_at)
+
+    if(_rate_limiter is not None):
+        _rate_limiter.settle(_estimated_tokens, _openai_usage_tokens(response))
         
-        return response
\ No newline at end of file
+    return response
+
+##-------------------start-of-_openai_evaluate_translation_stream()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+@staticmethod
+async def _openai_evaluate_translation_stream(evaluation_instructions:typing.Optional[SystemTranslationMessage],
+                                              evaluation_prompt:ModelTranslationMessage,
+                                              stream:EvaluationStream,
+                                              service:OpenAIServiceProtocol = typing.cast(OpenAIServiceProtocol, openai_service.OpenAIService)
+                                              ) -> None:
+
+    """
+
+    Asynchronously evaluates the text using the OpenAI API, pushing the evaluation into stream as it's generated.
+
+    Waits for the rate limiter and a concurrency slot like _openai_evaluate_translation_async() does, but isn't retried by the decorator, as the deltas already pushed can't be taken back. Streamed responses aren't stored in the response cache or recorded by the cassette, but ones already in either are pushed whole.
+
+    Parameters:
+    evaluation_instructions (SystemTranslationMessage) : The instructions to use for the evaluation.
+    evaluation_prompt (ModelTranslationMessage) : The text to evaluate.
+    stream (EvaluationStream) : The stream to push the evaluation into.
+
+    """
+
+    if(evaluation_instructions is None):
+        evaluation_instructions = service._default_evaluation_instructions
+
+    _response_cache = service._response_cache
+    _cassette = service._cassette
+
+    ## stream isn't part of the key, so streamed and whole requests share cached and recorded responses
+    _fingerprint = _openai_request_key(evaluation_instructions, evaluation_prompt, service) if _response_cache is not None or _cassette is not None else ""
+    _cached_response = _response_cache.get(_fingerprint) if _response_cache is not None else None
+
+    if(_cached_response is not None):
+        await stream._push(_cached_response.choices[0].message.content or "")
+        stream._finish(*_usage_counts(_cached_response))
+        return
+
+    message_args = {**_openai_build_message_args(evaluation_instructions, evaluation_prompt, service), "stream": True, "stream_options": {"include_usage": True}}
+
+    _request = _RequestTimer(service._metrics, "openai", service._model)
+    _attempt = _AttemptTimer(service._metrics, "openai", service._model)
+
+    _rate_limiter = _get_rate_limiter(service._rate_limiters, service._model)
+    _estimated_tokens = _estimate_tokens([evaluation_instructions.content, evaluation_prompt.content], service._max_tokens) if _rate_limiter is not None else 0
+
+    ## waits for budget before taking a slot, so a slot is never held while waiting
+    if(_rate_limiter is not None):
+        await _rate_limiter.acquire(_estimated_tokens)
+
+    _adaptive_concurrency = service._adaptive_concurrency
+
+    ## the last chunk is the one carrying the usage
+    response = None
+
+    async with (_adaptive_concurrency or service._semaphore):
+
+        ## the limiter paces requests on its own, the delay is only for when there isn't one
+        if(service._rate_limit_delay is not None and _rate_limiter is None):
+            await asyncio.sleep(service._rate_limit_delay)
+            _attempt.delayed(service._rate_limit_delay)
+
+        _attempt.sent()
+        _started_at = time.monotonic()
+
+        try:
+            if(_cassette is not None and _cassette.replaying):
+                response = await _cassette._replay(_fingerprint)
+                await stream._push(response.choices[0].message.content or "")
+
+                _headers = None
+
+            else:
+                _chunks = await service._async_client.chat.completions.create(**message_args)
+
+                async for response in _chunks:
+                    if(response.choices and response.choices[0].delta.content):
+                        await stream._push(response.choices[0].delta.content)
+
+                _headers = _chunks.response.headers
+
+            if(_adaptive_concurrency is not None):
+                _adaptive_concurrency.record_success(time.monotonic() - _started_at, _headers)
+
+        ## cancelled streams give their budget back too
+        except BaseException as _e:
+            _attempt.done(error=_e)
+            _request.done(_e)
+
+            if(_adaptive_concurrency is not None and _is_rate_limit_error(_e)):
+                _adaptive_concurrency.record_rate_limit()
+
+            if(_rate_limiter is not None):
+                _rate_limiter.settle(_estimated_tokens, 0)
+            raise
+
+    _attempt.done(response)
+    _request.done()
+
+    if(_rate_limiter is not None):
+        _rate_limiter.settle(_estimated_tokens, _openai_usage_tokens(response))
+
+    stream._finish(*_usage_counts(response))
+
+##-------------------start-of-_openai_usage_tokens()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+def _openai_usage_tokens(response:ChatCompletion) -> int | None:
+
+    """
+
+    Returns the tokens a response counted against the tokens per minute limit, or None if it didn't report usage.
+
+    """
+
+    _usage = getattr(response, "usage", None)
+
+    return getattr(_usage, "total_tokens", None)
\ No newline at end of file
@@ -2,7 +2,7 @@
 ## Use of this source code is governed by an GNU Lesser General Public License v2.1
 ## license that can be found in the LICENSE file.
 
-from .util.imports.easytl_importer import InvalidResponseFormatException, InvalidTextInputException, EasyTLException, InvalidAPITypeException, OpenAIError, GoogleAPIError, AnthropicAPIError, InvalidEasyTLSettingsException
+from .util.imports.easytl_importer import InvalidResponseFormatException, InvalidTextInputException, EasyTLException, InvalidAPITypeException, InvalidAPIKeyException, OpenAIError, GoogleAPIError, AnthropicAPIError, InvalidEasyTLSettingsException
 
 class ElucidateException(EasyTLException):
     
@@ -12,4 +12,26 @@ class ElucidateException(EasyTLException):
 class InvalidElucidateSettingsException(InvalidEasyTLSettingsException):
     
     def __init__(self, message:str):
-        super().__init__(message)
\ No newline at end of file
+        super().__init__(message)
+
+class CircuitOpenException(ElucidateException):
+
+    """
+
+    Recorded for a text whose every failover route was refused by an open circuit breaker.
+
+    """
+    
+    def __init__(self, message:str):
+        super().__init__(message)
+
+class CassetteMissException(ElucidateException):
+
+    """
+
+    Raised when a replaying Cassette has no recorded response for a request.
+
+    """
+    
+    def __init__(self, message:str):
+        super().__init__(message)
@@ -2,14 +2,18 @@
 ## Use of this source code is governed by an GNU Lesser General Public License v2.1
 ## license that can be found in the LICENSE file.
 
+## built-in imports
+import typing
+import functools
+
 ## custom modules 
 from .util.classes import openai_service, gemini_service, anthropic_service
 
-from .evaluators.openai_evaluator import _openai_default_evaluation_instructions, _openai_evaluate_translation, _openai_internal_evaluate_translation, _openai_build_evaluation_batches, _openai_evaluate_translation_async, _openai_internal_evaluate_translation_async
+from .evaluators.openai_evaluator import _openai_default_evaluation_instructions, _openai_evaluate_translation, _openai_internal_evaluate_translation, _openai_build_evaluation_batches, _openai_evaluate_translation_async, _openai_internal_evaluate_translation_async, _openai_evaluate_translation_stream
 
-from .evaluators.gemini_evaluator import _gemini_default_evaluation_instructions, _gemini_redefine_client, _gemini_evaluate_translation, _gemini_internal_evaluate_translation, _gemini_evaluate_translation_async, _gemini_internal_evaluate_translation_async
+from .evaluators.gemini_evaluator import _gemini_default_evaluation_instructions, _gemini_client_fingerprint_default, _gemini_redefine_client, _gemini_evaluate_translation, _gemini_internal_evaluate_translation, _gemini_evaluate_translation_async, _gemini_internal_evaluate_translation_async, _gemini_evaluate_translation_stream
 
-from .evaluators.anthropic_evaluator import _anthropic_default_evaluation_instructions, _anthropic_build_evaluation_batches, _anthropic_evaluate_translation, _anthropic_internal_evaluate_translation, _anthropic_evaluate_translation_async, _anthropic_internal_evaluate_translation_async
+from .evaluators.anthropic_evaluator import _anthropic_default_evaluation_instructions, _anthropic_build_evaluation_batches, _anthropic_evaluate_translation, _anthropic_internal_evaluate_translation, _anthropic_evaluate_translation_async, _anthropic_internal_evaluate_translation_async, _anthropic_evaluate_translation_stream
 
 ##-------------------start-of-monkeystrap()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
 
@@ -32,9 +36,19 @@ def perform_openai_monkeystrapping():
     ## monkeystrapping new async functions to OpenAIService
     setattr(openai_service.OpenAIService, "_evaluate_translation_async", _openai_evaluate_translation_async)
     setattr(openai_service.OpenAIService, "__evaluate_translation_async", _openai_internal_evaluate_translation_async)
+    setattr(openai_service.OpenAIService, "_evaluate_translation_stream", _openai_evaluate_translation_stream)
 
     ## monkeystrapping new attributes to OpenAIService
     setattr(openai_service.OpenAIService, "_default_evaluation_instructions", _openai_default_evaluation_instructions)
+    setattr(openai_service.OpenAIService, "_response_cache", None)
+    setattr(openai_service.OpenAIService, "_rate_limiters", {})
+    setattr(openai_service.OpenAIService, "_adaptive_concurrency", None)
+    setattr(openai_service.OpenAIService, "_metrics", None)
+    setattr(openai_service.OpenAIService, "_cassette", None)
+    setattr(openai_service.OpenAIService, "_request_template", None)
+
+    ## EasyTL's settings are changed through its own _set_attributes(), which has to drop the template built from the old ones
+    setattr(openai_service.OpenAIService, "_set_attributes", staticmethod(_clearing_request_template(openai_service.OpenAIService._set_attributes, openai_service.OpenAIService)))
 
 ##-------------------start-of-perform_gemini_monkeystrapping()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
 
@@ -48,9 +62,17 @@ def perform_gemini_monkeystrapping():
     ## monkeystrapping new async functions to GeminiServiceProtocol
     setattr(gemini_service.GeminiService, "_evaluate_translation_async", _gemini_evaluate_translation_async)
     setattr(gemini_service.GeminiService, "__evaluate_translation_async", _gemini_internal_evaluate_translation_async)
+    setattr(gemini_service.GeminiService, "_evaluate_translation_stream", _gemini_evaluate_translation_stream)
 
     ## monkeystrapping new attributes to GeminiServiceProtocol
     setattr(gemini_service.GeminiService, "_default_evaluation_instructions", _gemini_default_evaluation_instructions)
+    setattr(gemini_service.GeminiService, "_client_fingerprint", _gemini_client_fingerprint_default)
+    setattr(gemini_service.GeminiService, "_client_manager", None)
+    setattr(gemini_service.GeminiService, "_response_cache", None)
+    setattr(gemini_service.GeminiService, "_rate_limiters", {})
+    setattr(gemini_service.GeminiService, "_adaptive_concurrency", None)
+    setattr(gemini_service.GeminiService, "_metrics", None)
+    setattr(gemini_service.GeminiService, "_cassette", None)
 
 ##-------------------start-of-perform_anthropic_monkeystrapping()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
 
@@ -65,6 +87,111 @@ def perform_anthropic_monkeystrapping():
     ## monkeystrapping new async functions to AnthropicServiceProtocol
     setattr(anthropic_service.AnthropicService, "_evaluate_translation_async", _anthropic_evaluate_translation_async)
     setattr(anthropic_service.AnthropicService, "__evaluate_translation_async", _anthropic_internal_evaluate_translation_async)
+    setattr(anthropic_service.AnthropicService, "_evaluate_translation_stream", _anthropic_evaluate_translation_stream)
 
     ## monkeystrapping new attributes to AnthropicServiceProtocol
-    setattr(anthropic_service.AnthropicService, "_default_evaluation_instructions", _anthropic_default_evaluation_instructions)
\ No newline at end of file
+    setattr(anthropic_service.AnthropicService, "_default_evaluation_instructions", _anthropic_default_evaluation_instructions)
+    setattr(anthropic_service.AnthropicService, "_response_cache", None)
+    setattr(anthropic_service.AnthropicService, "_rate_limiters", {})
+    setattr(anthropic_service.AnthropicService, "_adaptive_concurrency", None)
+    setattr(anthropic_service.AnthropicService, "_metrics", None)
+    setattr(anthropic_service.AnthropicService, "_cassette", None)
+    setattr(anthropic_service.AnthropicService, "_request_template", None)
+    setattr(anthropic_service.AnthropicService, "_token_usage", None)
+    setattr(anthropic_service.AnthropicService, "_prompt_caching", False)
+    setattr(anthropic_service.AnthropicService, "_shared_context", None)
+
+    setattr(anthropic_service.AnthropicService, "_set_attributes", staticmethod(_clearing_request_template(anthropic_service.AnthropicService._set_attributes, anthropic_service.AnthropicService)))
+
+##-------------------start-of-_clearing_request_template()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+def _clearing_request_template(set_attributes:typing.Callable, service:typing.Any) -> typing.Callable:
+
+    """
+
+    Wraps one of EasyTL's _set_attributes() so the service's request template is built again from the new settings.
+
+    Parameters:
+    set_attributes (callable) : EasyTL's _set_attributes().
+    service (any) : The service it sets the attributes of.
+
+    Returns:
+    wrapper (callable) : The wrapped function.
+
+    """
+
+    @functools.wraps(set_attributes)
+    def wrapper(*args, **kwargs):
+
+        try:
+            return set_attributes(*args, **kwargs)
+
+        finally:
+            service._request_template = None
+
+    return wrapper
+
+##-------------------start-of-bind_openai_evaluators()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+def bind_openai_evaluators(service:object) -> None:
+
+    """
+
+    Same as perform_openai_monkeystrapping(), but for a single service instance. The evaluation functions are bound to the instance, so they use its settings and clients rather than EasyTL's OpenAIService.
+
+    Parameters:
+    service (object) : The service instance to bind to.
+
+    """
+
+    setattr(service, "_evaluate_translation", functools.partial(_openai_evaluate_translation, service=service))
+    setattr(service, "__evaluate_translation", functools.partial(_openai_internal_evaluate_translation, service=service))
+
+    setattr(service, "_build_evaluation_batches", _openai_build_evaluation_batches)
+
+    setattr(service, "_evaluate_translation_async", functools.partial(_openai_evaluate_translation_async, service=service))
+    setattr(service, "__evaluate_translation_async", functools.partial(_openai_internal_evaluate_translation_async, service=service))
+    setattr(service, "_evaluate_translation_stream", functools.partial(_openai_evaluate_translation_stream, service=service))
+
+##-------------------start-of-bind_gemini_evaluators()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+def bind_gemini_evaluators(service:object) -> None:
+
+    """
+
+    Same as perform_gemini_monkeystrapping(), but for a single service instance.
+
+    Parameters:
+    service (object) : The service instance to bind to.
+
+    """
+
+    setattr(service, "_redefine_client", functools.partial(_gemini_redefine_client, _protocol=service))
+    setattr(service, "_evaluate_translation", functools.partial(_gemini_evaluate_translation, _protocol=service))
+    setattr(service, "__evaluate_translation", functools.partial(_gemini_internal_evaluate_translation, _protocol=service))
+
+    setattr(service, "_evaluate_translation_async", functools.partial(_gemini_evaluate_translation_async, _protocol=service))
+    setattr(service, "__evaluate_translation_async", functools.partial(_gemini_internal_evaluate_translation_async, _protocol=service))
+    setattr(service, "_evaluate_translation_stream", functools.partial(_gemini_evaluate_translation_stream, _protocol=service))
+
+##-------------------start-of-bind_anthropic_evaluators()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+def bind_anthropic_evaluators(service:object) -> None:
+
+    """
+
+    Same as perform_anthropic_monkeystrapping(), but for a single service instance.
+
+    Parameters:
+    service (object) : The service instance to bind to.
+
+    """
+
+    setattr(service, "_evaluate_translation", functools.partial(_anthropic_evaluate_translation, _protocol=service))
+    setattr(service, "__evaluate_translation", functools.partial(_anthropic_internal_evaluate_translation, _protocol=service))
+
+    setattr(service, "_build_evaluation_batches", _anthropic_build_evaluation_batches)
+
+    setattr(service, "_evaluate_translation_async", functools.partial(_anthropic_evaluate_translation_async, _protocol=service))
+    setattr(service, "__evaluate_translation_async", functools.partial(_anthropic_internal_evaluate_translation_async, _protocol=service))
+    setattr(service, "_evaluate_translation_stream", functools.partial(_anthropic_evaluate_translation_stream, _protocol=service))
\ No newline at end of file
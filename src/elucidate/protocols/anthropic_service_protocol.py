@@ -8,6 +8,14 @@ import asyncio
 
 ## custom modules
 from ..util.classes import NOT_GIVEN, NotGiven, Anthropic, AsyncAnthropic, ModelTranslationMessage, AnthropicMessage
+from ..util.response_cache import ResponseCache
+from ..util.rate_limiter import RateLimiter
+from ..util.concurrency import AdaptiveConcurrency
+from ..util.metrics import MetricsSink
+from ..util.cassette import Cassette
+from ..util.request_template import _RequestTemplate
+from ..util.usage import TokenUsage
+from ..util.streaming import EvaluationStream
 
 class AnthropicServiceProtocol(typing.Protocol):
 
@@ -27,6 +35,14 @@ class AnthropicServiceProtocol(typing.Protocol):
     _semaphore_value:int
     _semaphore:asyncio.Semaphore
 
+    _response_cache:ResponseCache | None
+    _rate_limiters:typing.Dict[str | None, RateLimiter]
+    _adaptive_concurrency:AdaptiveConcurrency | None
+    _metrics:MetricsSink | None
+    _cassette:Cassette | None
+    _request_template:_RequestTemplate | None
+    _token_usage:TokenUsage | None
+
     _sync_client:Anthropic
     _async_client:AsyncAnthropic
 
@@ -38,6 +54,9 @@ class AnthropicServiceProtocol(typing.Protocol):
 
     _json_mode:bool
     _response_schema:typing.Mapping[str, typing.Any] | None
+
+    _prompt_caching:bool
+    _shared_context:str | None
     
     _json_tool = {
         "name": "format_to_json",
@@ -70,6 +89,12 @@ class AnthropicServiceProtocol(typing.Protocol):
                             evaluation_prompt:ModelTranslationMessage
                             ) -> AnthropicMessage: ...
 
+    @staticmethod
+    async def _evaluate_translation_stream(evaluation_instructions:typing.Optional[str],
+                                    evaluation_prompt:ModelTranslationMessage,
+                                    stream:EvaluationStream
+                                    ) -> None: ...
+
     @staticmethod
     def __evaluate_translation(instructions: str, 
                                prompt: ModelTranslationMessage) -> AnthropicMessage: ...
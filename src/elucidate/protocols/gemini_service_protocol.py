@@ -11,6 +11,12 @@ import google.generativeai as genai
 
 ## custom modules
 from ..util.classes import GenerationConfig, GenerateContentResponse, AsyncGenerateContentResponse
+from ..util.response_cache import ResponseCache
+from ..util.rate_limiter import RateLimiter
+from ..util.concurrency import AdaptiveConcurrency
+from ..util.metrics import MetricsSink
+from ..util.cassette import Cassette
+from ..util.streaming import EvaluationStream
 
 class GeminiServiceProtocol(typing.Protocol):
 
@@ -30,10 +36,18 @@ class GeminiServiceProtocol(typing.Protocol):
 
     _client:genai.GenerativeModel
     _generation_config:GenerationConfig
+    _client_fingerprint:str | None
+    _client_manager:typing.Any | None
 
     _semaphore_value:int 
     _semaphore:asyncio.Semaphore 
 
+    _response_cache:ResponseCache | None
+    _rate_limiters:typing.Dict[str | None, RateLimiter]
+    _adaptive_concurrency:AdaptiveConcurrency | None
+    _metrics:MetricsSink | None
+    _cassette:Cassette | None
+
     _rate_limit_delay:float | None
 
     _decorator_to_use:typing.Union[typing.Callable, None] 
@@ -85,6 +99,11 @@ class GeminiServiceProtocol(typing.Protocol):
     async def __evaluate_translation_async(text_to_evaluate:str
                                     ) -> AsyncGenerateContentResponse: ...
 
+    @staticmethod
+    async def _evaluate_translation_stream(text_to_evaluate:str,
+                                    stream:EvaluationStream
+                                    ) -> None: ...
+
     
     @staticmethod
     def _set_attributes(model:str="gemini-pro",
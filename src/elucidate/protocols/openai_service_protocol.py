@@ -8,6 +8,13 @@ import asyncio
 
 ## custom modules
 from ..util.classes import SystemTranslationMessage, ModelTranslationMessage, ChatCompletion, NOT_GIVEN, NotGiven, OpenAI, AsyncOpenAI
+from ..util.response_cache import ResponseCache
+from ..util.rate_limiter import RateLimiter
+from ..util.concurrency import AdaptiveConcurrency
+from ..util.metrics import MetricsSink
+from ..util.cassette import Cassette
+from ..util.request_template import _RequestTemplate
+from ..util.streaming import EvaluationStream
 
 class OpenAIServiceProtocol(typing.Protocol):
 
@@ -31,6 +38,13 @@ class OpenAIServiceProtocol(typing.Protocol):
     _semaphore_value:int 
     _semaphore:asyncio.Semaphore
 
+    _response_cache:ResponseCache | None
+    _rate_limiters:typing.Dict[str | None, RateLimiter]
+    _adaptive_concurrency:AdaptiveConcurrency | None
+    _metrics:MetricsSink | None
+    _cassette:Cassette | None
+    _request_template:_RequestTemplate | None
+
     @staticmethod
     def _build_evaluation_batches(text: typing.Union[str, typing.Iterable[str], ModelTranslationMessage, typing.Iterable[ModelTranslationMessage]],
                                 instructions: typing.Optional[typing.Union[str, SystemTranslationMessage]] = None) -> typing.List[typing.Tuple[ModelTranslationMessage, SystemTranslationMessage]]: ...
@@ -44,6 +58,12 @@ class OpenAIServiceProtocol(typing.Protocol):
                             evaluation_prompt:ModelTranslationMessage
                             ) -> ChatCompletion: ...
 
+    @staticmethod
+    async def _evaluate_translation_stream(evaluation_instructions:typing.Optional[SystemTranslationMessage],
+                                    evaluation_prompt:ModelTranslationMessage,
+                                    stream:EvaluationStream
+                                    ) -> None: ...
+
     @staticmethod
     def __evaluate_translation(instructions: SystemTranslationMessage, 
                                prompt: ModelTranslationMessage) -> ChatCompletion: ...
@@ -0,0 +1,210 @@
+## Copyright 2024 Kakusui LLC (https://kakusui.org) (https://github.com/Kakusui) (https://github.com/Kakusui/Elucidate)
+## Use of this source code is governed by an GNU Lesser General Public License v2.1
+## license that can be found in the LICENSE file.
+
+## built-in imports
+import typing
+import asyncio
+import copy
+
+## custom modules
+from ..monkeystrapper import bind_anthropic_evaluators
+from ..evaluators.anthropic_evaluator import _anthropic_default_evaluation_instructions
+
+from ..util.classes import NOT_GIVEN, NotGiven, Anthropic, AsyncAnthropic, anthropic_service
+from ..util.attributes import VALID_JSON_ANTHROPIC_MODELS
+from ..util.response_cache import ResponseCache
+from ..util.rate_limiter import RateLimiter
+from ..util.concurrency import AdaptiveConcurrency
+from ..util.metrics import MetricsSink
+from ..util.cassette import Cassette
+from ..util.request_template import _RequestTemplate
+from ..util.usage import TokenUsage
+from ..exceptions import EasyTLException
+
+##-------------------start-of-attributes---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+## taken before EasyTL's _set_attributes() gets a chance to overwrite its input_schema
+_anthropic_default_json_tool = copy.deepcopy(anthropic_service.AnthropicService._json_tool)
+
+class ScopedAnthropicService:
+
+    """
+
+    Instance scoped counterpart of EasyTL's AnthropicService.
+
+    Holds its own clients and settings instead of sharing EasyTL's class attributes, so several differently configured services can be used at the same time.
+
+    Satisfies AnthropicServiceProtocol.
+
+    """
+
+    _default_model:str = "claude-3-haiku-20240307"
+    _default_evaluation_instructions:str = _anthropic_default_evaluation_instructions
+
+##-------------------start-of-__init__()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def __init__(self, api_key:str | None = None) -> None:
+
+        """
+
+        Parameters:
+        api_key (string or None) : The API key to use. Can be set later with _set_api_key().
+
+        """
+
+        self._system:str | None = self._default_evaluation_instructions
+
+        self._model:str = self._default_model
+        self._temperature:float | NotGiven = NOT_GIVEN
+        self._top_p:float | NotGiven = NOT_GIVEN
+        self._top_k:int | NotGiven = NOT_GIVEN
+        self._stream:bool = False
+        self._stop_sequences:typing.List[str] | NotGiven = NOT_GIVEN
+        self._max_tokens:int | NotGiven = NOT_GIVEN
+
+        self._semaphore_value:int = 5
+        self._semaphore:asyncio.Semaphore = asyncio.Semaphore(self._semaphore_value)
+
+        self._sync_client = Anthropic(api_key=api_key or "DummyKey")
+        self._async_client = AsyncAnthropic(api_key=api_key or "DummyKey")
+
+        self._rate_limit_delay:float | None = None
+
+        self._decorator_to_use:typing.Union[typing.Callable, None] = None
+
+        self._log_directory:str | None = None
+
+        self._json_mode:bool = False
+        self._response_schema:typing.Mapping[str, typing.Any] | None = None
+
+        self._json_tool = copy.deepcopy(_anthropic_default_json_tool)
+
+        self._prompt_caching:bool = False
+        self._shared_context:str | None = None
+
+        self._response_cache:ResponseCache | None = None
+        self._rate_limiters:typing.Dict[str | None, RateLimiter] = {}
+        self._adaptive_concurrency:AdaptiveConcurrency | None = None
+        self._metrics:MetricsSink | None = None
+        self._cassette:Cassette | None = None
+        self._request_template:_RequestTemplate | None = None
+        self._token_usage:TokenUsage | None = None
+
+        bind_anthropic_evaluators(self)
+
+##-------------------start-of-_set_api_key()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def _set_api_key(self, api_key:str) -> None:
+
+        """
+
+        Sets the API key for this service's clients.
+
+        Parameters:
+        api_key (string) : The API key to set.
+
+        """
+
+        self._sync_client.api_key = api_key
+        self._async_client.api_key = api_key
+
+##-------------------start-of-_set_attributes()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def _set_attributes(self,
+                        model:str = _default_model,
+                        system:str | None = _default_evaluation_instructions,
+                        temperature:float | NotGiven = NOT_GIVEN,
+                        top_p:float | NotGiven = NOT_GIVEN,
+                        top_k:int | NotGiven = NOT_GIVEN,
+                        stream:bool = False,
+                        stop_sequences:typing.List[str] | NotGiven = NOT_GIVEN,
+                        max_tokens:int | NotGiven = NOT_GIVEN,
+                        decorator:typing.Union[typing.Callable, None]=None,
+                        logging_directory:str | None=None,
+                        semaphore:int | None=None,
+                        rate_limit_delay:float | None=None,
+                        json_mode:bool=False,
+                        response_schema:typing.Mapping[str, typing.Any] | None = None
+                        ) -> None:
+
+        """
+
+        Sets the attributes for this service. Mirrors AnthropicService._set_attributes().
+
+        """
+
+        self._model = model
+        self._system = system
+        self._temperature = temperature
+        self._top_p = top_p
+        self._top_k = top_k
+        self._stream = stream
+        self._stop_sequences = stop_sequences
+        self._max_tokens = max_tokens
+
+        self._decorator_to_use = decorator
+
+        self._log_directory = logging_directory
+
+        self._rate_limit_delay = rate_limit_delay
+
+        self._json_mode = json_mode
+        self._response_schema = response_schema
+
+        ## copied so setting a response schema doesn't touch EasyTL's tool, the generic input/output schema is kept if none was given
+        self._json_tool = copy.deepcopy(_anthropic_default_json_tool)
+
+        self._prompt_caching:bool = False
+        self._shared_context:str | None = None
+
+        if(self._response_schema is not None):
+            self._json_tool["input_schema"] = self._response_schema
+
+        ## rebuilt from the new settings on the next request
+        self._request_template = None
+
+        ## if a decorator is used, we want to disable retries, otherwise set it to the default value which is 2
+        _max_retries = 0 if self._decorator_to_use is not None else 2
+
+        self._sync_client.max_retries = _max_retries
+        self._async_client.max_retries = _max_retries
+
+        if(semaphore is not None):
+            self._semaphore_value = semaphore
+            self._semaphore = asyncio.Semaphore(self._semaphore_value)
+
+        if(self._json_mode and self._model not in VALID_JSON_ANTHROPIC_MODELS):
+            model_string = ", ".join(VALID_JSON_ANTHROPIC_MODELS)
+            raise EasyTLException("JSON mode for Anthropic is only available for the following models: " + model_string)
+
+##-------------------start-of-_test_api_key_validity()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def _test_api_key_validity(self) -> typing.Tuple[bool, typing.Union[Exception, None]]:
+
+        """
+
+        Tests the validity of the API key.
+
+        Returns:
+        validity (bool) : True if the API key is valid, False if it is not.
+        e (Exception) : The exception that was raised, if any.
+
+        """
+
+        try:
+
+            self._sync_client.messages.create(
+                model="claude-3-haiku-20240307",
+                max_tokens=10,
+                temperature=0.0,
+                messages=[
+                    {"role": "user", "content": "Respond to this with 1"},
+                ]
+            )
+
+            return True, None
+
+        except Exception as _e:
+
+            return False, _e
@@ -0,0 +1,199 @@
+## Copyright 2024 Kakusui LLC (https://kakusui.org) (https://github.com/Kakusui) (https://github.com/Kakusui/Elucidate)
+## Use of this source code is governed by an GNU Lesser General Public License v2.1
+## license that can be found in the LICENSE file.
+
+## built-in imports
+import typing
+import asyncio
+
+## third-party imports
+import google.generativeai as genai
+from google.generativeai.client import _ClientManager
+
+## custom modules
+from ..monkeystrapper import bind_gemini_evaluators
+from ..evaluators.gemini_evaluator import _gemini_default_evaluation_instructions
+
+from ..util.classes import GenerationConfig, gemini_service
+from ..util.attributes import VALID_JSON_GEMINI_MODELS
+from ..util.response_cache import ResponseCache
+from ..util.rate_limiter import RateLimiter
+from ..util.concurrency import AdaptiveConcurrency
+from ..util.metrics import MetricsSink
+from ..util.cassette import Cassette
+from ..exceptions import EasyTLException
+
+class ScopedGeminiService:
+
+    """
+
+    Instance scoped counterpart of EasyTL's GeminiService.
+
+    Holds its own settings, client and api key instead of sharing EasyTL's class attributes and genai.configure(), so several differently configured services can be used at the same time.
+
+    Satisfies GeminiServiceProtocol.
+
+    """
+
+    _default_model:str = "gemini-pro"
+    _default_evaluation_instructions:str = _gemini_default_evaluation_instructions
+
+    _safety_settings = gemini_service.GeminiService._safety_settings
+
+##-------------------start-of-__init__()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def __init__(self, api_key:str | None = None) -> None:
+
+        """
+
+        Parameters:
+        api_key (string or None) : The API key to use. If None, genai falls back to the GEMINI_API_KEY/GOOGLE_API_KEY environment variables. Can be set later with _set_api_key().
+
+        """
+
+        self._system_message:str | None = self._default_evaluation_instructions
+
+        self._model:str = self._default_model
+        self._temperature:float = 0.5
+        self._top_p:float = 0.9
+        self._top_k:int = 40
+        self._candidate_count:int = 1
+        self._stream:bool = False
+        self._stop_sequences:typing.List[str] | None = None
+        self._max_output_tokens:int | None = None
+
+        self._client:genai.GenerativeModel
+        self._generation_config:GenerationConfig
+        self._client_fingerprint:str | None = None
+
+        ## the grpc clients are made from this rather than the process wide genai.configure()
+        self._client_manager:_ClientManager = _ClientManager()
+        self._client_manager.configure(api_key=api_key)
+
+        self._semaphore_value:int = 5
+        self._semaphore:asyncio.Semaphore = asyncio.Semaphore(self._semaphore_value)
+
+        self._rate_limit_delay:float | None = None
+
+        self._decorator_to_use:typing.Union[typing.Callable, None] = None
+
+        self._log_directory:str | None = None
+
+        self._json_mode:bool = False
+        self._response_schema:typing.Mapping[str, typing.Any] | None = None
+
+        self._response_cache:ResponseCache | None = None
+        self._rate_limiters:typing.Dict[str | None, RateLimiter] = {}
+        self._adaptive_concurrency:AdaptiveConcurrency | None = None
+        self._metrics:MetricsSink | None = None
+        self._cassette:Cassette | None = None
+
+        bind_gemini_evaluators(self)
+
+##-------------------start-of-_set_api_key()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def _set_api_key(self, api_key:str) -> None:
+
+        """
+
+        Sets the API key for this service's clients.
+
+        Parameters:
+        api_key (string) : The API key.
+
+        """
+
+        self._client_manager.configure(api_key=api_key)
+
+        ## forces the model to be rebuilt with the new grpc clients
+        self._client_fingerprint = None
+
+##-------------------start-of-_set_attributes()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def _set_attributes(self,
+                        model:str="gemini-pro",
+                        system_message:str | None = _default_evaluation_instructions,
+                        temperature:float=0.5,
+                        top_p:float=0.9,
+                        top_k:int=40,
+                        candidate_count:int=1,
+                        stream:bool=False,
+                        stop_sequences:typing.List[str] | None=None,
+                        max_output_tokens:int | None=None,
+                        decorator:typing.Union[typing.Callable, None]=None,
+                        logging_directory:str | None=None,
+                        semaphore:int | None=None,
+                        rate_limit_delay:float | None=None,
+                        json_mode:bool=False,
+                        response_schema:typing.Mapping[str, typing.Any] | None = None
+                        ) -> None:
+
+        """
+
+        Sets the attributes for this service. Mirrors GeminiService._set_attributes().
+
+        """
+
+        self._model = model
+        self._system_message = system_message
+        self._temperature = temperature
+        self._top_p = top_p
+        self._top_k = top_k
+        self._candidate_count = candidate_count
+        self._stream = stream
+        self._stop_sequences = stop_sequences
+        self._max_output_tokens = max_output_tokens
+
+        self._decorator_to_use = decorator
+
+        self._log_directory = logging_directory
+
+        self._rate_limit_delay = rate_limit_delay
+
+        self._json_mode = json_mode
+        self._response_schema = response_schema
+
+        ## if a semaphore is not provided, set it to the default value based on the model
+        ## rate limits for 1.5 models are 2 requests per second
+        semaphore_values = {"gemini-1.5-pro": 2,
+                            "gemini-1.5-flash": 2,
+                            "gemini-1.5-pro-latest": 2,
+                            "gemini-1.5-flash-latest": 2,
+                            }
+
+        self._semaphore_value = semaphore or semaphore_values.get(self._model, 5)
+        self._semaphore = asyncio.Semaphore(self._semaphore_value)
+
+        if(self._json_mode and self._model not in VALID_JSON_GEMINI_MODELS):
+            allowed_models_string = ", ".join(VALID_JSON_GEMINI_MODELS)
+            raise EasyTLException(f"JSON mode for Gemini is only supported for the following models: {allowed_models_string}")
+
+##-------------------start-of-_test_api_key_validity()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def _test_api_key_validity(self) -> typing.Tuple[bool, typing.Union[Exception, None]]:
+
+        """
+
+        Tests the validity of the API key.
+
+        Returns:
+        validity (bool) : True if the API key is valid, False if it is not.
+        e (Exception) : The exception that was raised, if any.
+
+        """
+
+        try:
+
+            self._redefine_client() # type: ignore
+
+            _generation_config = GenerationConfig(candidate_count=1, max_output_tokens=1)
+
+            self._client.generate_content(
+                "Respond to this with 1", generation_config=_generation_config
+            )
+
+            return True, None
+
+        except Exception as _e:
+
+            return False, _e
@@ -0,0 +1,189 @@
+## Copyright 2024 Kakusui LLC (https://kakusui.org) (https://github.com/Kakusui) (https://github.com/Kakusui/Elucidate)
+## Use of this source code is governed by an GNU Lesser General Public License v2.1
+## license that can be found in the LICENSE file.
+
+## built-in imports
+import typing
+import asyncio
+
+## custom modules
+from ..monkeystrapper import bind_openai_evaluators
+from ..evaluators.openai_evaluator import _openai_default_evaluation_instructions
+
+from ..util.classes import SystemTranslationMessage, NOT_GIVEN, NotGiven, OpenAI, AsyncOpenAI
+from ..util.attributes import VALID_JSON_OPENAI_MODELS
+from ..util.response_cache import ResponseCache
+from ..util.rate_limiter import RateLimiter
+from ..util.concurrency import AdaptiveConcurrency
+from ..util.metrics import MetricsSink
+from ..util.cassette import Cassette
+from ..util.request_template import _RequestTemplate
+from ..exceptions import EasyTLException
+
+class ScopedOpenAIService:
+
+    """
+
+    Instance scoped counterpart of EasyTL's OpenAIService.
+
+    EasyTL keeps its settings and clients as class attributes, so every caller shares them. This holds its own clients and settings instead, so several differently configured services can be used at the same time.
+
+    Satisfies OpenAIServiceProtocol.
+
+    """
+
+    _default_model:str = "gpt-4"
+    _default_evaluation_instructions:SystemTranslationMessage = _openai_default_evaluation_instructions
+
+##-------------------start-of-__init__()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def __init__(self, api_key:str | None = None) -> None:
+
+        """
+
+        Parameters:
+        api_key (string or None) : The API key to use. Can be set later with _set_api_key().
+
+        """
+
+        self._system_message:typing.Optional[typing.Union[SystemTranslationMessage, str]] = self._default_evaluation_instructions
+
+        self._model:str = self._default_model
+        self._temperature:float | None | NotGiven = NOT_GIVEN
+        self._logit_bias:typing.Dict[str, int] | None | NotGiven = NOT_GIVEN
+        self._top_p:float | None | NotGiven = NOT_GIVEN
+        self._n:int | None | NotGiven = 1
+        self._stream:bool = False
+        self._stop:typing.List[str] | None | NotGiven = NOT_GIVEN
+        self._max_tokens:int | None | NotGiven = NOT_GIVEN
+        self._presence_penalty:float | None | NotGiven = NOT_GIVEN
+        self._frequency_penalty:float | None | NotGiven = NOT_GIVEN
+
+        self._semaphore_value:int = 5
+        self._semaphore:asyncio.Semaphore = asyncio.Semaphore(self._semaphore_value)
+
+        self._sync_client = OpenAI(api_key=api_key or "DummyKey")
+        self._async_client = AsyncOpenAI(api_key=api_key or "DummyKey")
+
+        self._rate_limit_delay:float | None = None
+
+        self._decorator_to_use:typing.Union[typing.Callable, None] = None
+
+        self._log_directory:str | None = None
+
+        self._json_mode:bool = False
+
+        self._response_cache:ResponseCache | None = None
+        self._rate_limiters:typing.Dict[str | None, RateLimiter] = {}
+        self._adaptive_concurrency:AdaptiveConcurrency | None = None
+        self._metrics:MetricsSink | None = None
+        self._cassette:Cassette | None = None
+        self._request_template:_RequestTemplate | None = None
+
+        bind_openai_evaluators(self)
+
+##-------------------start-of-_set_api_key()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def _set_api_key(self, api_key:str) -> None:
+
+        """
+
+        Sets the API key for this service's clients.
+
+        Parameters:
+        api_key (string) : The API key to set.
+
+        """
+
+        self._sync_client.api_key = api_key
+        self._async_client.api_key = api_key
+
+##-------------------start-of-_set_attributes()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def _set_attributes(self,
+                        model:str = _default_model,
+                        temperature:float | None | NotGiven = NOT_GIVEN,
+                        logit_bias:typing.Dict[str, int] | None | NotGiven = NOT_GIVEN,
+                        top_p:float | None | NotGiven = NOT_GIVEN,
+                        n:int | None | NotGiven = 1,
+                        stream:bool = False,
+                        stop:typing.List[str] | None | NotGiven = NOT_GIVEN,
+                        max_tokens:int | None | NotGiven = NOT_GIVEN,
+                        presence_penalty:float | None | NotGiven = NOT_GIVEN,
+                        frequency_penalty:float | None | NotGiven = NOT_GIVEN,
+                        decorator:typing.Union[typing.Callable, None]=None,
+                        logging_directory:str | None=None,
+                        semaphore:int | None=None,
+                        rate_limit_delay:float | None=None,
+                        json_mode:bool=False
+                        ) -> None:
+
+        """
+
+        Sets the attributes for this service. Mirrors OpenAIService._set_attributes().
+
+        """
+
+        self._model = model
+        self._temperature = temperature
+        self._logit_bias = logit_bias
+        self._top_p = top_p
+        self._n = n
+        self._stream = stream
+        self._stop = stop
+        self._max_tokens = max_tokens
+        self._presence_penalty = presence_penalty
+        self._frequency_penalty = frequency_penalty
+
+        self._decorator_to_use = decorator
+
+        self._log_directory = logging_directory
+
+        self._rate_limit_delay = rate_limit_delay
+
+        self._json_mode = json_mode
+
+        ## rebuilt from the new settings on the next request
+        self._request_template = None
+
+        ## if a decorator is used, we want to disable retries, otherwise set it to the default value which is 2
+        _max_retries = 0 if self._decorator_to_use is not None else 2
+
+        self._sync_client.max_retries = _max_retries
+        self._async_client.max_retries = _max_retries
+
+        if(semaphore is not None):
+            self._semaphore_value = semaphore
+            self._semaphore = asyncio.Semaphore(self._semaphore_value)
+
+        if(self._json_mode and self._model not in VALID_JSON_OPENAI_MODELS):
+            model_string = ", ".join(VALID_JSON_OPENAI_MODELS)
+            raise EasyTLException("JSON mode for OpenAI is only available for the following models: " + model_string)
+
+##-------------------start-of-_test_api_key_validity()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def _test_api_key_validity(self) -> typing.Tuple[bool, typing.Union[Exception, None]]:
+
+        """
+
+        Tests the validity of the API key.
+
+        Returns:
+        validity (bool) : True if the API key is valid, False if it is not.
+        e (Exception) : The exception that was raised, if any.
+
+        """
+
+        try:
+
+            self._sync_client.chat.completions.create(
+                model="gpt-3.5-turbo",
+                messages=[{"role":"user","content":"This is a test."}],
+                max_tokens=1
+            )
+
+            return True, None
+
+        except Exception as _e:
+
+            return False, _e
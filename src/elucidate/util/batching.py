@@ -0,0 +1,100 @@
+## Copyright 2024 Kakusui LLC (https://kakusui.org) (https://github.com/Kakusui) (https://github.com/Kakusui/Elucidate)
+## Use of this source code is governed by an GNU Lesser General Public License v2.1
+## license that can be found in the LICENSE file.
+
+## built-in imports
+import typing
+import time
+
+## custom modules
+from ..exceptions import ElucidateException
+
+class BatchResults(list):
+
+    """
+
+    The results of a bulk evaluation, in input order. Returned by provider side batch jobs, by the sync evaluation functions when max_workers is set and by evaluate_failover_async().
+
+    A list like any other, except that items whose request failed are None, with the reason kept separately in errors.
+
+    """
+
+##-------------------start-of-__init__()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def __init__(self, results:typing.Iterable[typing.Any] = (), errors:typing.Mapping[int, Exception] | None = None, batch_ids:typing.Iterable[str] = (), served_by:typing.Iterable[str | None] = ()) -> None:
+
+        """
+
+        Parameters:
+        results (iterable) : The results in input order, None for failed items.
+        errors (mapping[int, Exception] or None) : The index and error of every failed item.
+        batch_ids (iterable[string]) : The ids of the provider side batches the results came from, if any.
+        served_by (iterable[string or None]) : The route that evaluated each item, if they could come from different providers. None for failed items.
+
+        """
+
+        super().__init__(results)
+
+        self.errors:typing.Dict[int, Exception] = dict(errors or {})
+        self.batch_ids:typing.List[str] = list(batch_ids)
+        self.served_by:typing.List[str | None] = list(served_by)
+
+##-------------------start-of-succeeded---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    @property
+    def succeeded(self) -> typing.Dict[int, typing.Any]:
+
+        """
+
+        The index and result of every item that succeeded.
+
+        """
+
+        return {_index: _result for _index, _result in enumerate(self) if _index not in self.errors}
+
+##-------------------start-of-__repr__()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def __repr__(self) -> str:
+        return f"BatchResults({list.__repr__(self)}, errors={self.errors!r}, batch_ids={self.batch_ids!r}" + (f", served_by={self.served_by!r})" if self.served_by else ")")
+
+##-------------------start-of-_poll_with_backoff()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+def _poll_with_backoff(retrieve:typing.Callable[[], typing.Any],
+                       is_done:typing.Callable[[typing.Any], bool],
+                       poll_interval:float = 10.0,
+                       max_poll_interval:float = 300.0,
+                       timeout:float | None = None
+                       ) -> typing.Any:
+
+    """
+
+    Calls retrieve until is_done is true for what it returns, waiting 1.5 times longer after every poll, up to max_poll_interval.
+
+    Parameters:
+    retrieve (callable) : Fetches the current state of the job.
+    is_done (callable) : Whether the job is finished, successfully or not.
+    poll_interval (float) : The first wait, in seconds.
+    max_poll_interval (float) : The longest wait, in seconds.
+    timeout (float or None) : Raises ElucidateException if the job isn't done after this many seconds. The job itself keeps running and can be resumed. None waits forever.
+
+    Returns:
+    state (any) : The last thing retrieve returned.
+
+    """
+
+    _deadline = time.monotonic() + timeout if timeout is not None else None
+    _interval = poll_interval
+
+    while(True):
+
+        _state = retrieve()
+
+        if(is_done(_state)):
+            return _state
+
+        if(_deadline is not None and time.monotonic() + _interval > _deadline):
+            raise ElucidateException("Timed out waiting for the batch to finish. It is still running and can be resumed with its id.")
+
+        time.sleep(_interval)
+
+        _interval = min(max_poll_interval, _interval * 1.5)
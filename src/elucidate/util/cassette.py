@@ -0,0 +1,304 @@
+## Copyright 2024 Kakusui LLC (https://kakusui.org) (https://github.com/Kakusui) (https://github.com/Kakusui/Elucidate)
+## Use of this source code is governed by an GNU Lesser General Public License v2.1
+## license that can be found in the LICENSE file.
+
+## built-in imports
+import typing
+import time
+import zlib
+import atexit
+import pickle
+import asyncio
+import sqlite3
+import threading
+
+## custom modules
+from ..util.batching import BatchResults
+
+from ..exceptions import CassetteMissException
+
+class Cassette:
+
+    """
+
+    Records the responses the evaluators get, and how long each took, so a run can be replayed later without the network or the bill. (E.g. regression runs and load tests against real traffic)
+
+    In record mode every successful API call is written down under the fingerprint of the exact request, the same one the response cache and the evaluation journal use. In replay mode no request is sent, the recorded response is served instead after the recorded latency divided by speed. The semaphore, rate limiters, decorator and metrics all still apply, so a replay behaves like the original run minus the provider. A request that was recorded several times is answered with each recording in turn, starting over once they run out. A request that was never recorded raises CassetteMissException.
+
+    The async, sync and batched paths of every provider share fingerprints, so a cassette recorded through one can be replayed through another as long as the settings match. Responses served from the response cache never reach the cassette.
+
+    Responses are pickled and compressed into a SQLite file, so only point path at a file you trust.
+
+    """
+
+    _default_flush_interval:float = 1.0
+    _default_flush_every:int = 1000
+
+##-------------------start-of-__init__()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def __init__(self,
+                 path:str,
+                 mode:typing.Literal["record", "replay"] = "replay",
+                 speed:float | None = 1.0,
+                 flush_interval:float = _default_flush_interval,
+                 flush_every:int = _default_flush_every
+                 ) -> None:
+
+        """
+
+        Parameters:
+        path (string) : The SQLite file to record to or replay from. Recording starts it over.
+        mode (literal["record", "replay"]) : Whether to record what the providers answer or to answer from the recording.
+        speed (float or None) : How fast to replay. 1.0 waits out the original latencies, 2.0 waits half as long. None answers right away.
+        flush_interval (float) : The longest a recording is buffered before it's written, in seconds.
+        flush_every (int) : The most recordings buffered before they're written.
+
+        """
+
+        assert mode in ["record", "replay"], ValueError("mode must be 'record' or 'replay'.")
+        assert speed is None or speed > 0, ValueError("speed must be None or a positive number.")
+        assert flush_interval >= 0, ValueError("flush_interval must be a non-negative number of seconds.")
+        assert flush_every >= 1, ValueError("flush_every must be a positive integer.")
+
+        self._path = path
+        self._mode = mode
+        self._speed = speed
+        self._flush_interval = flush_interval
+        self._flush_every = flush_every
+
+        ## how many recordings each fingerprint has, and in replay mode the latency of each and which is served next
+        self._counts:typing.Dict[str, int] = {}
+        self._latencies:typing.Dict[str, typing.List[float]] = {}
+        self._positions:typing.Dict[str, int] = {}
+
+        self._pending:typing.List[typing.Tuple[str, int, float, bytes]] = []
+        self._last_flush = time.monotonic()
+        self._lock = threading.Lock()
+
+        self.recorded = 0
+        self.replayed = 0
+        self.misses = 0
+
+        self._connection:sqlite3.Connection | None = sqlite3.connect(path, check_same_thread=False)
+
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.execute("CREATE TABLE IF NOT EXISTS interactions (fingerprint TEXT NOT NULL, sequence INTEGER NOT NULL, latency REAL NOT NULL, value BLOB NOT NULL, PRIMARY KEY (fingerprint, sequence)) WITHOUT ROWID")
+
+        if(mode == "record"):
+            self._connection.execute("DELETE FROM interactions")
+
+        else:
+            ## only the latencies are kept in memory, responses are read as they're served
+            for _fingerprint, _latency in self._connection.execute("SELECT fingerprint, latency FROM interactions ORDER BY fingerprint, sequence"):
+                self._latencies.setdefault(_fingerprint, []).append(_latency)
+
+        self._connection.commit()
+
+        atexit.register(self.flush)
+
+##-------------------start-of-replaying---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    @property
+    def replaying(self) -> bool:
+
+        """
+
+        Whether responses are served from the cassette instead of the provider.
+
+        """
+
+        return self._mode == "replay"
+
+##-------------------start-of-record()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def record(self, fingerprint:str, response:typing.Any, latency:float) -> None:
+
+        """
+
+        Records response for fingerprint. Written with the next flush. Does nothing in replay mode.
+
+        Parameters:
+        fingerprint (string) : The fingerprint of the request.
+        response (any) : The response the provider gave.
+        latency (float) : How long the provider took, in seconds.
+
+        """
+
+        if(self._mode != "record"):
+            return
+
+        try:
+            _value = zlib.compress(pickle.dumps(response))
+
+        ## some responses hold things that can't be pickled (E.g. streams), those can't be replayed
+        except Exception:
+            return
+
+        with self._lock:
+
+            _sequence = self._counts.get(fingerprint, 0)
+            self._counts[fingerprint] = _sequence + 1
+
+            self._pending.append((fingerprint, _sequence, latency, _value))
+            self.recorded += 1
+
+            if(len(self._pending) >= self._flush_every or time.monotonic() - self._last_flush >= self._flush_interval):
+                self._write_pending()
+
+##-------------------start-of-flush()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def flush(self) -> None:
+
+        """
+
+        Writes every buffered recording.
+
+        """
+
+        with self._lock:
+            self._write_pending()
+
+##-------------------start-of-stats()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def stats(self) -> typing.Dict[str, int]:
+
+        """
+
+        Returns how many responses this cassette recorded, replayed and couldn't replay, and how many recordings it holds.
+
+        """
+
+        with self._lock:
+            return {"recorded": self.recorded,
+                    "replayed": self.replayed,
+                    "misses": self.misses,
+                    "entries": sum(len(_latencies) for _latencies in self._latencies.values()) if self._mode == "replay" else sum(self._counts.values())}
+
+##-------------------start-of-close()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def close(self) -> None:
+
+        with self._lock:
+
+            self._write_pending()
+
+            if(self._connection is not None):
+                self._connection.close()
+                self._connection = None
+
+        atexit.unregister(self.flush)
+
+##-------------------start-of-_next()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def _next(self, fingerprint:str) -> typing.Tuple[typing.Any, float]:
+
+        """
+
+        Returns the next recorded response for fingerprint and how long to wait before serving it.
+
+        """
+
+        with self._lock:
+
+            _latencies = self._latencies.get(fingerprint)
+
+            if(not _latencies or self._connection is None):
+                self.misses += 1
+                raise CassetteMissException(f"No recorded response for request {fingerprint} in {self._path}.")
+
+            _sequence = self._positions.get(fingerprint, 0) % len(_latencies)
+            self._positions[fingerprint] = _sequence + 1
+
+            _value = self._connection.execute("SELECT value FROM interactions WHERE fingerprint = ? AND sequence = ?", (fingerprint, _sequence)).fetchone()[0]
+
+            self.replayed += 1
+
+        ## unpickled on every replay, so callers can't change what later replays get
+        _response = pickle.loads(zlib.decompress(_value))
+
+        return _response, (_latencies[_sequence] / self._speed if self._speed is not None else 0.0)
+
+##-------------------start-of-_replay()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    async def _replay(self, fingerprint:str) -> typing.Any:
+
+        """
+
+        Serves the next recorded response for fingerprint, after its latency.
+
+        """
+
+        _response, _delay = self._next(fingerprint)
+
+        if(_delay > 0):
+            await asyncio.sleep(_delay)
+
+        return _response
+
+##-------------------start-of-_replay_sync()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def _replay_sync(self, fingerprint:str) -> typing.Any:
+
+        """
+
+        Blocking counterpart of _replay().
+
+        """
+
+        _response, _delay = self._next(fingerprint)
+
+        if(_delay > 0):
+            time.sleep(_delay)
+
+        return _response
+
+##-------------------start-of-_record_batch()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def _record_batch(self, fingerprints:typing.Sequence[str], results:BatchResults) -> None:
+
+        """
+
+        Records the items of a provider side batch that succeeded. Batches take minutes to hours as a whole, so the items are recorded without a latency.
+
+        """
+
+        for _index, _result in results.succeeded.items():
+            self.record(fingerprints[_index], _result, 0.0)
+
+##-------------------start-of-_replay_batch()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def _replay_batch(self, fingerprints:typing.Sequence[str]) -> BatchResults:
+
+        """
+
+        Serves a batch from the cassette without submitting it, in input order. Items that were never recorded are None with a CassetteMissException in errors.
+
+        """
+
+        _results:typing.List[typing.Any] = [None] * len(fingerprints)
+        _errors:typing.Dict[int, Exception] = {}
+
+        for _index, _fingerprint in enumerate(fingerprints):
+
+            try:
+                _results[_index] = self._next(_fingerprint)[0]
+
+            except CassetteMissException as _e:
+                _errors[_index] = _e
+
+        return BatchResults(_results, _errors)
+
+##-------------------start-of-_write_pending()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def _write_pending(self) -> None:
+
+        self._last_flush = time.monotonic()
+
+        if(not self._pending or self._connection is None):
+            return
+
+        self._connection.executemany("INSERT OR REPLACE INTO interactions (fingerprint, sequence, latency, value) VALUES (?, ?, ?, ?)", self._pending)
+        self._connection.commit()
+
+        self._pending.clear()
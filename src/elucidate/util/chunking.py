@@ -0,0 +1,244 @@
+## Copyright 2024 Kakusui LLC (https://kakusui.org) (https://github.com/Kakusui) (https://github.com/Kakusui/Elucidate)
+## Use of this source code is governed by an GNU Lesser General Public License v2.1
+## license that can be found in the LICENSE file.
+
+## built-in imports
+import typing
+import bisect
+import itertools
+import math
+import re
+
+## custom modules
+from .imports.easytl_importer import MODEL_MAX_TOKENS, _update_model_name
+from .batching import BatchResults
+
+##-------------------start-of-attributes---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+## texts are split on the first of these that gives more than one piece, a blank line between paragraphs, then the end of a sentence or a line
+_boundaries:typing.List[typing.Pattern[str]] = [
+    re.compile(r"\n[^\S\n]*\n\s*"),
+    re.compile(r"[.!?…]+[\"'”’)\]]*\s+|[。！？]+[」』”’）]*\s*|\n\s*")
+]
+
+## used when the model's output limit isn't known
+_default_max_output_tokens:int = 4096
+
+## chunks aren't made smaller than this to fill more concurrency slots, the model needs some context to evaluate well
+_min_chunk_tokens:int = 1024
+
+##-------------------start-of-_model_chunk_limit()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+def _model_chunk_limit(model:str, service:str, max_output_tokens:typing.Any, instruction_tokens:int) -> int:
+
+    """
+
+    Returns the most tokens of text a single request can hold for model. The evaluation is about as long as the translation, which is about half the text, so it has to fit the output limit twice over, and the text and the instructions have to fit the input limit.
+
+    Parameters:
+    model (string) : The model.
+    service (string) : The service the model belongs to.
+    max_output_tokens (any) : The request's output token limit, used over the model's if it's an int.
+    instruction_tokens (int) : The number of tokens in the evaluation instructions.
+
+    Returns:
+    limit (int) : The limit.
+
+    """
+
+    _limits = MODEL_MAX_TOKENS.get(_update_model_name(model) if service == "openai" else model, {})
+
+    _output_tokens = max_output_tokens if isinstance(max_output_tokens, int) else _limits.get("max_output_tokens", _default_max_output_tokens)
+
+    _limit = 2 * _output_tokens
+
+    if(_limits.get("max_input_tokens")):
+        _limit = min(_limit, _limits["max_input_tokens"] - instruction_tokens)
+
+    return max(_limit, 1)
+
+##-------------------start-of-_chunk_budget()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+def _chunk_budget(oversize_tokens:int, slots:int, limit:int) -> int:
+
+    """
+
+    Returns how many tokens each chunk of the oversize texts gets, so there are about as many chunks as there are slots to send them in. Every text then takes about as long as one chunk, instead of its chunks queueing behind each other.
+
+    Parameters:
+    oversize_tokens (int) : The number of tokens in every text that has to be chunked.
+    slots (int) : How many requests can be in flight at once.
+    limit (int) : The most tokens a chunk can hold. (See _model_chunk_limit())
+
+    Returns:
+    budget (int) : The budget.
+
+    """
+
+    return max(min(math.ceil(oversize_tokens / max(slots, 1)), limit), min(_min_chunk_tokens, limit))
+
+##-------------------start-of-_split_units()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+def _split_units(text:str, boundary:typing.Pattern[str]) -> typing.List[str]:
+
+    """
+
+    Splits text after every match of boundary. Every piece keeps the separator that follows it, so joining the pieces gives text back.
+
+    """
+
+    _units:typing.List[str] = []
+    _start = 0
+
+    for _match in boundary.finditer(text):
+
+        if(_start < _match.end() < len(text)):
+            _units.append(text[_start:_match.end()])
+            _start = _match.end()
+
+    _units.append(text[_start:])
+
+    return _units
+
+##-------------------start-of-_chunk_sides()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+def _chunk_sides(sides:typing.List[str],
+                 token_budget:int,
+                 count:typing.Callable[[typing.List[str]], typing.List[int]],
+                 level:int = 0
+                 ) -> typing.List[typing.List[str]]:
+
+    """
+
+    Splits the sides of a text, its source and translation or just the one string, into chunks of at most token_budget tokens for every side together, keeping the sides aligned.
+
+    Sides are split on paragraph boundaries, falling back to sentence boundaries for paragraphs that don't fit, into chunks of about the same size. Where both sides have as many pieces, piece n of the source goes with piece n of the translation. Where they don't, each side is cut at the boundaries closest to the same share of its length. A sentence that doesn't fit on its own is left whole.
+
+    Parameters:
+    sides (list[string]) : The sides of the text.
+    token_budget (int) : The most tokens a chunk may hold.
+    count (callable) : Returns the number of tokens in each of a list of strings.
+
+    Returns:
+    chunks (list[list[string]]) : The chunks, in order, each with its piece of every side. Joining a side's pieces gives the side back.
+
+    """
+
+    _tokens = sum(count(sides))
+
+    if(_tokens <= token_budget or level >= len(_boundaries)):
+        return [sides]
+
+    _units = [_split_units(_side, _boundaries[level]) for _side in sides]
+
+    if(all(len(_side_units) == 1 for _side_units in _units)):
+        return _chunk_sides(sides, token_budget, count, level + 1)
+
+    if(any(len(_side_units) != len(_units[0]) for _side_units in _units)):
+
+        ## the sides don't line up at this level, so try the finer one before cutting by length
+        if(level + 1 < len(_boundaries)):
+            return _chunk_sides(sides, token_budget, count, level + 1)
+
+        return _cut_proportionally(_units, math.ceil(_tokens / token_budget))
+
+    _chunks:typing.List[typing.List[str]] = []
+    _chunk:typing.List[str] = []
+    _chunk_tokens = 0
+
+    ## aiming for evenly sized chunks, rather than full ones and a short one at the end
+    _target = _tokens / math.ceil(_tokens / token_budget)
+
+    _rows = [list(_row) for _row in zip(*_units)]
+
+    for _row, _row_tokens in zip(_rows, [sum(count(_row)) for _row in _rows]):
+
+        if(_chunk and (_chunk_tokens + _row_tokens > token_budget or _chunk_tokens + _row_tokens / 2 > _target)):
+            _chunks.append(_chunk)
+            _chunk = []
+            _chunk_tokens = 0
+
+        if(_row_tokens > token_budget):
+            _chunks.extend(_chunk_sides(_row, token_budget, count, level + 1))
+            continue
+
+        _chunk = [_piece + _unit for _piece, _unit in zip(_chunk, _row)] if _chunk else _row
+        _chunk_tokens += _row_tokens
+
+    if(_chunk):
+        _chunks.append(_chunk)
+
+    return _chunks
+
+##-------------------start-of-_cut_proportionally()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+def _cut_proportionally(units:typing.List[typing.List[str]], pieces:int) -> typing.List[typing.List[str]]:
+
+    """
+
+    Cuts every side into up to pieces pieces, at the unit boundaries closest to the same shares of each side's length, so the pieces of different sides cover about the same part of the text. A share that would leave a side with an empty piece is skipped on every side.
+
+    """
+
+    ## the length of each side up to each boundary between its units
+    _offsets = [list(itertools.accumulate(map(len, _side_units[:-1]))) for _side_units in units]
+    _totals = [sum(map(len, _side_units)) for _side_units in units]
+
+    _cuts:typing.List[typing.List[int]] = [[0] for _ in units]
+
+    for _share in range(1, pieces):
+
+        _candidates = []
+
+        for _side_offsets, _total in zip(_offsets, _totals):
+
+            _target = _total * _share / pieces
+            _index = bisect.bisect_left(_side_offsets, _target)
+
+            ## the closer of the boundaries either side of the target
+            if(_index > 0 and (_index == len(_side_offsets) or _target - _side_offsets[_index - 1] <= _side_offsets[_index] - _target)):
+                _index -= 1
+
+            _candidates.append(_index + 1)
+
+        if(all(_side_offsets and _candidate > _side_cuts[-1] for _side_offsets, _candidate, _side_cuts in zip(_offsets, _candidates, _cuts))):
+            for _side_cuts, _candidate in zip(_cuts, _candidates):
+                _side_cuts.append(_candidate)
+
+    _sides_pieces = [["".join(_side_units[_start:_end]) for _start, _end in zip(_side_cuts, _side_cuts[1:] + [len(_side_units)])] for _side_units, _side_cuts in zip(units, _cuts)]
+
+    return [list(_chunk) for _chunk in zip(*_sides_pieces)]
+
+##-------------------start-of-_stitch_evaluations()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+def _stitch_evaluations(evaluations:typing.Sequence[typing.Any], owners:typing.Sequence[int], separators:typing.Sequence[str], texts:int) -> BatchResults:
+
+    """
+
+    Joins the evaluations of every text's chunks back together, in order, with the whitespace the text was split at between them.
+
+    Parameters:
+    evaluations (sequence) : The evaluation of every chunk, in order. A BatchResults if some may have failed.
+    owners (sequence[int]) : The index of the text each chunk belongs to.
+    separators (sequence[string]) : What goes after each chunk's evaluation.
+    texts (int) : The number of texts.
+
+    Returns:
+    results (BatchResults) : The evaluation of every text, in input order. A text any of whose chunks failed is None, with the first failed chunk's error in errors.
+
+    """
+
+    _parts:typing.List[typing.List[str]] = [[] for _ in range(texts)]
+    _errors:typing.Dict[int, Exception] = {}
+
+    for _index, (_evaluation, _owner, _separator) in enumerate(zip(evaluations, owners, separators)):
+
+        _error = getattr(evaluations, "errors", {}).get(_index)
+
+        if(_error is not None):
+            _errors.setdefault(_owner, _error)
+
+        else:
+            _parts[_owner].extend([_evaluation, _separator])
+
+    return BatchResults([None if _index in _errors else "".join(_text_parts) for _index, _text_parts in enumerate(_parts)], _errors)
@@ -3,8 +3,8 @@
 ## license that can be found in the LICENSE file.
 
 ## third-party imports
-from openai import AsyncOpenAI, OpenAI
-from anthropic import AsyncAnthropic, Anthropic
+from openai import AsyncOpenAI, OpenAI, DefaultHttpxClient as OpenAIHttpClient, DefaultAsyncHttpxClient as AsyncOpenAIHttpClient
+from anthropic import AsyncAnthropic, Anthropic, DefaultHttpxClient as AnthropicHttpClient, DefaultAsyncHttpxClient as AsyncAnthropicHttpClient
 
 ## custom modules
 from .imports.easytl_importer import openai_service, gemini_service, anthropic_service
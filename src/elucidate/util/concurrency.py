@@ -0,0 +1,313 @@
+## Copyright 2024 Kakusui LLC (https://kakusui.org) (https://github.com/Kakusui) (https://github.com/Kakusui/Elucidate)
+## Use of this source code is governed by an GNU Lesser General Public License v2.1
+## license that can be found in the LICENSE file.
+
+## built-in imports
+import typing
+import time
+import json
+import os
+import asyncio
+import threading
+
+## Header pairs (remaining, limit) providers use to report how much of the rate limit window is left
+_rate_limit_headers = [
+    ("x-ratelimit-remaining-requests", "x-ratelimit-limit-requests"),
+    ("x-ratelimit-remaining-tokens", "x-ratelimit-limit-tokens"),
+    ("anthropic-ratelimit-requests-remaining", "anthropic-ratelimit-requests-limit"),
+    ("anthropic-ratelimit-tokens-remaining", "anthropic-ratelimit-tokens-limit"),
+    ("anthropic-ratelimit-input-tokens-remaining", "anthropic-ratelimit-input-tokens-limit"),
+    ("anthropic-ratelimit-output-tokens-remaining", "anthropic-ratelimit-output-tokens-limit"),
+]
+
+class AdaptiveConcurrency:
+
+    """
+
+    A semaphore whose limit adjusts itself with AIMD (additive increase, multiplicative decrease).
+
+    Every successful request raises the limit by 1/limit, so roughly one per limit's worth of requests. A rate limit error cuts the limit by backoff_factor, as does latency climbing past latency_tolerance times the best latency seen. Rate limit headers stop the growth when the window is nearly used up, and cut the limit when it is.
+
+    Cuts are spaced at least a cooldown apart, so a burst of 429s from one window only counts once.
+
+    """
+
+##-------------------start-of-__init__()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def __init__(self,
+                 initial_limit:float = 5,
+                 min_limit:float = 1,
+                 max_limit:float = 200,
+                 backoff_factor:float = 0.5,
+                 latency_tolerance:float | None = 2.0,
+                 state_path:str | None = None
+                 ) -> None:
+
+        """
+
+        Parameters:
+        initial_limit (float) : The limit to start at, unless state_path holds a learned one.
+        min_limit (float) : The limit never drops below this.
+        max_limit (float) : The limit never grows past this.
+        backoff_factor (float) : What the limit is multiplied by on a rate limit error.
+        latency_tolerance (float or None) : How many times the best latency seen a request may take before it's treated as congestion. None ignores latency.
+        state_path (string or None) : A json file the learned limit is loaded from and saved to, so the next run starts warm.
+
+        """
+
+        assert 1 <= min_limit <= max_limit, ValueError("min_limit must be at least 1 and no more than max_limit.")
+        assert 0 < backoff_factor < 1, ValueError("backoff_factor must be between 0 and 1.")
+        assert latency_tolerance is None or latency_tolerance > 1, ValueError("latency_tolerance must be None or greater than 1.")
+
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.backoff_factor = backoff_factor
+        self.latency_tolerance = latency_tolerance
+        self.state_path = state_path
+
+        self._limit = float(min(max(initial_limit, min_limit), max_limit))
+
+        ## smoothed latency and the best smoothed latency seen, the baseline congestion is measured against
+        self._latency:float | None = None
+        self._best_latency:float | None = None
+
+        self._last_decrease = 0.0
+        self._last_save = 0.0
+
+        self._in_flight = 0
+
+        ## the condition belongs to an event loop, so it's made lazily
+        self._condition:asyncio.Condition | None = None
+        self._condition_loop:asyncio.AbstractEventLoop | None = None
+
+        self._lock = threading.Lock()
+
+        if(state_path is not None and os.path.exists(state_path)):
+            self.load(state_path)
+
+##-------------------start-of-limit---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    @property
+    def limit(self) -> int:
+
+        """
+
+        The current number of requests allowed in flight.
+
+        """
+
+        return int(self._limit)
+
+##-------------------start-of-in_flight---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+##-------------------start-of-_get_condition()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def _get_condition(self) -> asyncio.Condition:
+
+        _loop = asyncio.get_running_loop()
+
+        if(self._condition is None or self._condition_loop is not _loop):
+            self._condition = asyncio.Condition()
+            self._condition_loop = _loop
+
+        return self._condition
+
+##-------------------start-of-__aenter__()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    async def __aenter__(self) -> "AdaptiveConcurrency":
+
+        _condition = self._get_condition()
+
+        async with _condition:
+            await _condition.wait_for(lambda: self._in_flight < self.limit)
+            self._in_flight += 1
+
+        return self
+
+##-------------------start-of-__aexit__()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    async def __aexit__(self, *args) -> None:
+
+        _condition = self._get_condition()
+
+        async with _condition:
+            self._in_flight -= 1
+
+            ## the limit may have grown since the last release, so wake as many as there's room for
+            _condition.notify(max(self.limit - self._in_flight, 1))
+
+##-------------------start-of-record_success()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def record_success(self, latency:float, headers:typing.Mapping[str, str] | None = None) -> None:
+
+        """
+
+        Feeds back a successful request.
+
+        Parameters:
+        latency (float) : How long the request took, in seconds.
+        headers (mapping or None) : The response headers, if the provider sends rate limit headers.
+
+        """
+
+        with self._lock:
+
+            self._latency = latency if self._latency is None else 0.8 * self._latency + 0.2 * latency
+            self._best_latency = self._latency if self._best_latency is None else min(self._best_latency, self._latency)
+
+            _headroom = _rate_limit_headroom(headers) if headers is not None else None
+
+            if(_headroom is not None and _headroom <= 0.02):
+                self._decrease(self.backoff_factor)
+
+            elif(self.latency_tolerance is not None and self._latency > self._best_latency * self.latency_tolerance):
+                ## congestion is a gentler signal than a 429, so the cut is smaller
+                self._decrease((1 + self.backoff_factor) / 2)
+
+            ## nearly out of window, hold where we are
+            elif(_headroom is not None and _headroom < 0.1):
+                pass
+
+            else:
+                self._limit = min(self.max_limit, self._limit + 1 / self._limit)
+
+            self._maybe_save()
+
+##-------------------start-of-record_rate_limit()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def record_rate_limit(self) -> None:
+
+        """
+
+        Feeds back a request that was rejected for exceeding the provider's rate limit.
+
+        """
+
+        with self._lock:
+            self._decrease(self.backoff_factor)
+            self._maybe_save()
+
+##-------------------start-of-_decrease()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def _decrease(self, factor:float) -> None:
+
+        _now = time.monotonic()
+
+        ## requests already in flight when the limit was cut will report the same congestion, only the first counts
+        if(_now - self._last_decrease < max(1.0, self._latency or 0.0)):
+            return
+
+        self._limit = max(self.min_limit, self._limit * factor)
+        self._last_decrease = _now
+
+##-------------------start-of-state()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def state(self) -> typing.Dict[str, typing.Any]:
+
+        """
+
+        Returns what has been learned, in a json serializable form.
+
+        """
+
+        return {"limit": self._limit, "best_latency": self._best_latency}
+
+##-------------------start-of-save()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def save(self, path:str | None = None) -> None:
+
+        """
+
+        Saves the learned state to path, or to state_path if path is None.
+
+        """
+
+        _path = path or self.state_path
+
+        assert _path is not None, ValueError("No path given and no state_path set.")
+
+        _temporary_path = f"{_path}.tmp"
+
+        with open(_temporary_path, "w", encoding="utf-8") as _file:
+            json.dump(self.state(), _file)
+
+        os.replace(_temporary_path, _path)
+
+##-------------------start-of-load()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def load(self, path:str) -> None:
+
+        """
+
+        Loads state saved by save(). The limit is clamped to min_limit and max_limit.
+
+        """
+
+        with open(path, "r", encoding="utf-8") as _file:
+            _state = json.load(_file)
+
+        self._limit = float(min(max(_state.get("limit", self._limit), self.min_limit), self.max_limit))
+        self._best_latency = _state.get("best_latency")
+
+##-------------------start-of-_maybe_save()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def _maybe_save(self) -> None:
+
+        if(self.state_path is None):
+            return
+
+        _now = time.monotonic()
+
+        ## saved at most every few seconds, it's only a warm start for the next run
+        if(_now - self._last_save < 5.0):
+            return
+
+        self._last_save = _now
+
+        try:
+            self.save()
+
+        except OSError:
+            pass
+
+##-------------------start-of-_rate_limit_headroom()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+def _rate_limit_headroom(headers:typing.Mapping[str, str]) -> float | None:
+
+    """
+
+    Returns the smallest remaining/limit fraction in the rate limit headers, or None if there aren't any.
+
+    """
+
+    _headroom = None
+
+    for _remaining_header, _limit_header in _rate_limit_headers:
+
+        try:
+            _remaining = float(headers[_remaining_header])
+            _limit = float(headers[_limit_header])
+
+        except (KeyError, TypeError, ValueError):
+            continue
+
+        if(_limit > 0):
+            _headroom = min(_headroom if _headroom is not None else 1.0, _remaining / _limit)
+
+    return _headroom
+
+##-------------------start-of-_is_rate_limit_error()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+def _is_rate_limit_error(error:BaseException) -> bool:
+
+    """
+
+    Returns whether error is a provider rejecting a request for exceeding its rate limit. (OpenAIRateLimitError, AnthropicRateLimitError, Gemini's ResourceExhausted)
+
+    """
+
+    return getattr(error, "status_code", None) == 429 or getattr(error, "code", None) == 429
@@ -0,0 +1,155 @@
+## Copyright 2024 Kakusui LLC (https://kakusui.org) (https://github.com/Kakusui) (https://github.com/Kakusui/Elucidate)
+## Use of this source code is governed by an GNU Lesser General Public License v2.1
+## license that can be found in the LICENSE file.
+
+## built-in imports
+import typing
+import time
+import threading
+
+from concurrent.futures import ThreadPoolExecutor
+
+class CredentialCache:
+
+    """
+
+    Remembers which services have had their credentials verified, so evaluation functions don't have to send a probe request on every call.
+
+    Only successful verifications are cached. A failed verification raises and is retried on the next call.
+
+    """
+
+    _default_ttl:float | None = 600.0
+
+##-------------------start-of-__init__()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def __init__(self, ttl:float | None = _default_ttl) -> None:
+
+        """
+
+        Parameters:
+        ttl (float or None) : How long, in seconds, a successful verification is trusted. None means forever, 0 disables the cache.
+
+        """
+
+        self._ttl = ttl
+        self._verified_at:typing.Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+##-------------------start-of-ttl---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    @property
+    def ttl(self) -> float | None:
+        return self._ttl
+
+    @ttl.setter
+    def ttl(self, value:float | None) -> None:
+
+        assert value is None or value >= 0, ValueError("ttl must be None or a non-negative number of seconds.")
+
+        self._ttl = value
+
+##-------------------start-of-is_verified()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def is_verified(self, api_type:str) -> bool:
+
+        """
+
+        Returns whether the credentials for api_type were verified within the ttl.
+
+        """
+
+        with self._lock:
+            _verified_at = self._verified_at.get(api_type)
+
+        if(_verified_at is None or self._ttl == 0):
+            return False
+
+        return self._ttl is None or time.monotonic() - _verified_at < self._ttl
+
+##-------------------start-of-mark_verified()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def mark_verified(self, api_type:str) -> None:
+
+        with self._lock:
+            self._verified_at[api_type] = time.monotonic()
+
+##-------------------start-of-clear()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def clear(self, api_type:str | None = None) -> None:
+
+        """
+
+        Forgets the verification for api_type, or for every service if api_type is None.
+
+        """
+
+        with self._lock:
+            if(api_type is None):
+                self._verified_at.clear()
+
+            else:
+                self._verified_at.pop(api_type, None)
+
+##-------------------start-of-verify()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def verify(self, api_type:str, test_function:typing.Callable[[str], typing.Any]) -> None:
+
+        """
+
+        Verifies the credentials for api_type unless a cached verification is still valid.
+
+        Parameters:
+        api_type (string) : The service to verify.
+        test_function (callable) : Called with api_type, should raise if the credentials are invalid.
+
+        """
+
+        if(self.is_verified(api_type)):
+            return
+
+        test_function(api_type)
+
+        self.mark_verified(api_type)
+
+##-------------------start-of-verify_many()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def verify_many(self, api_types:typing.Iterable[str], test_function:typing.Callable[[str], typing.Any]) -> typing.Dict[str, typing.Tuple[bool, typing.Optional[Exception]]]:
+
+        """
+
+        Verifies several services concurrently, one thread per service. Exceptions are returned instead of raised.
+
+        Parameters:
+        api_types (iterable[string]) : The services to verify.
+        test_function (callable) : Called with each api_type, should raise if the credentials are invalid.
+
+        Returns:
+        results (dict[string, tuple[bool, Exception or None]]) : Whether each service's credentials are valid and the exception raised, if any.
+
+        """
+
+        _api_types = list(dict.fromkeys(api_types))
+
+        def _verify(api_type:str) -> typing.Tuple[bool, typing.Optional[Exception]]:
+            try:
+                test_function(api_type)
+                self.mark_verified(api_type)
+                return True, None
+
+            except Exception as _e:
+                self.clear(api_type)
+                return False, _e
+
+        if(len(_api_types) == 0):
+            return {}
+
+        with ThreadPoolExecutor(max_workers=len(_api_types)) as _executor:
+            _results = list(_executor.map(_verify, _api_types))
+
+        return dict(zip(_api_types, _results))
+
+##-------------------start-of-attributes---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+## Process wide cache used by the Elucidate global client
+_credential_cache = CredentialCache()
@@ -0,0 +1,271 @@
+## Copyright 2024 Kakusui LLC (https://kakusui.org) (https://github.com/Kakusui) (https://github.com/Kakusui/Elucidate)
+## Use of this source code is governed by an GNU Lesser General Public License v2.1
+## license that can be found in the LICENSE file.
+
+## built-in imports
+import typing
+import time
+import threading
+
+from collections import deque
+
+## custom modules
+from ..exceptions import InvalidAPITypeException
+
+class CircuitBreaker:
+
+    """
+
+    Tracks the outcome of a provider's recent requests, and stops sending it traffic while it's failing.
+
+    Closed, requests go through. Once at least min_requests of the last window_size requests have finished and the share that failed reaches failure_threshold, the breaker opens. A request slower than slow_request_threshold counts as failed, so a provider that's timing out rather than erroring is caught too.
+
+    Open, requests are refused right away. After reset_timeout seconds the breaker is half-open and lets a single probe through. The probe succeeding closes the breaker, it failing opens it again for another reset_timeout.
+
+    """
+
+##-------------------start-of-__init__()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def __init__(self,
+                 failure_threshold:float = 0.5,
+                 window_size:int = 20,
+                 min_requests:int = 5,
+                 reset_timeout:float = 30.0,
+                 slow_request_threshold:float | None = None
+                 ) -> None:
+
+        """
+
+        Parameters:
+        failure_threshold (float) : The share of failed requests in the window that opens the breaker.
+        window_size (int) : How many of the most recent requests the failure rate is taken over.
+        min_requests (int) : The fewest requests in the window before the breaker can open.
+        reset_timeout (float) : How long the breaker stays open before a probe is let through, in seconds.
+        slow_request_threshold (float or None) : A request taking longer than this, in seconds, counts as failed. None ignores latency.
+
+        """
+
+        assert 0 < failure_threshold <= 1, ValueError("failure_threshold must be between 0 and 1.")
+        assert 1 <= min_requests <= window_size, ValueError("min_requests must be at least 1 and no more than window_size.")
+        assert reset_timeout >= 0, ValueError("reset_timeout must be a non-negative number of seconds.")
+        assert slow_request_threshold is None or slow_request_threshold > 0, ValueError("slow_request_threshold must be None or a positive number of seconds.")
+
+        self.failure_threshold = failure_threshold
+        self.min_requests = min_requests
+        self.reset_timeout = reset_timeout
+        self.slow_request_threshold = slow_request_threshold
+
+        ## True for every failed request, newest last
+        self._outcomes:typing.Deque[bool] = deque(maxlen=window_size)
+
+        self._state:typing.Literal["closed", "open", "half_open"] = "closed"
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+
+        self.times_opened = 0
+
+        ## sync evaluations can run on several threads
+        self._lock = threading.Lock()
+
+##-------------------start-of-state---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    @property
+    def state(self) -> typing.Literal["closed", "open", "half_open"]:
+
+        """
+
+        "closed", "open" or "half_open". An open breaker reads as half-open once reset_timeout has passed.
+
+        """
+
+        with self._lock:
+            self._check_reset_timeout()
+            return self._state
+
+##-------------------start-of-allow()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def allow(self) -> bool:
+
+        """
+
+        Returns whether a request may be sent now. When half-open, True is returned once, for the probe, until its outcome is recorded or it's released.
+
+        """
+
+        with self._lock:
+
+            self._check_reset_timeout()
+
+            if(self._state == "closed"):
+                return True
+
+            if(self._state == "half_open" and not self._probe_in_flight):
+                self._probe_in_flight = True
+                return True
+
+            return False
+
+##-------------------start-of-release()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def release(self) -> None:
+
+        """
+
+        Gives up the probe allow() let through without recording its outcome, (E.g. it was cancelled) so the next request can probe instead.
+
+        """
+
+        with self._lock:
+            self._probe_in_flight = False
+
+##-------------------start-of-record_success()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def record_success(self, latency:float | None = None) -> None:
+
+        """
+
+        Records a request that succeeded, after latency seconds. Counts as a failure if it was slower than slow_request_threshold.
+
+        """
+
+        if(self.slow_request_threshold is not None and latency is not None and latency > self.slow_request_threshold):
+            self.record_failure()
+            return
+
+        with self._lock:
+
+            if(self._state == "half_open" and self._probe_in_flight):
+                self._state = "closed"
+                self._probe_in_flight = False
+                self._outcomes.clear()
+
+            self._outcomes.append(False)
+
+##-------------------start-of-record_failure()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def record_failure(self) -> None:
+
+        """
+
+        Records a request that failed.
+
+        """
+
+        with self._lock:
+
+            self._outcomes.append(True)
+
+            if(self._state == "half_open" and self._probe_in_flight):
+                self._open()
+
+            elif(self._state == "closed" and len(self._outcomes) >= self.min_requests and sum(self._outcomes) / len(self._outcomes) >= self.failure_threshold):
+                self._open()
+
+##-------------------start-of-as_dict()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def as_dict(self) -> typing.Dict[str, typing.Any]:
+
+        with self._lock:
+
+            self._check_reset_timeout()
+
+            return {"state": self._state,
+                    "failure_rate": sum(self._outcomes) / len(self._outcomes) if self._outcomes else None,
+                    "window": len(self._outcomes),
+                    "times_opened": self.times_opened}
+
+##-------------------start-of-_open()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def _open(self) -> None:
+
+        self._state = "open"
+        self._opened_at = time.monotonic()
+        self._probe_in_flight = False
+
+        self.times_opened += 1
+
+##-------------------start-of-_check_reset_timeout()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def _check_reset_timeout(self) -> None:
+
+        if(self._state == "open" and time.monotonic() - self._opened_at >= self.reset_timeout):
+            self._state = "half_open"
+
+class FailoverPolicy:
+
+    """
+
+    An ordered list of routes to evaluate with, each a provider and optionally a model, and a CircuitBreaker per provider.
+
+    Every text goes to the first route whose provider's breaker allows it. If that request fails, or the breaker is open, the text moves on to the next route. Breakers are kept on the policy, so reusing a policy across calls carries what it learned about each provider along.
+
+    """
+
+##-------------------start-of-__init__()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def __init__(self,
+                 routes:typing.Sequence[str | typing.Tuple[str, typing.Mapping[str, typing.Any]]],
+                 failure_threshold:float = 0.5,
+                 window_size:int = 20,
+                 min_requests:int = 5,
+                 reset_timeout:float = 30.0,
+                 slow_request_threshold:float | None = None
+                 ) -> None:
+
+        """
+
+        Parameters:
+        routes (sequence[string or tuple[string, mapping]]) : The routes in order of preference. Either "provider" or "provider:model" (E.g. "openai:gpt-4o"), or a (provider, kwargs) tuple, kwargs going to that provider's evaluation function only, for settings whose names differ between providers.
+        failure_threshold, window_size, min_requests, reset_timeout, slow_request_threshold : Passed to every provider's CircuitBreaker. See CircuitBreaker.
+
+        """
+
+        assert len(routes) >= 1, ValueError("routes must hold at least one route.")
+
+        self.routes:typing.List[typing.Tuple[str, typing.Dict[str, typing.Any]]] = []
+
+        for _route in routes:
+
+            if(isinstance(_route, str)):
+                _provider, _, _model = _route.partition(":")
+                _kwargs = {"model": _model} if _model else {}
+
+            else:
+                _provider, _kwargs = _route[0], dict(_route[1])
+
+            assert _provider in ["openai", "gemini", "anthropic"], InvalidAPITypeException(f"Invalid provider in route {_route!r}. Must be 'openai', 'gemini' or 'anthropic'.")
+
+            self.routes.append((_provider, _kwargs))
+
+        self.breakers:typing.Dict[str, CircuitBreaker] = {_provider: CircuitBreaker(failure_threshold=failure_threshold,
+                                                                                   window_size=window_size,
+                                                                                   min_requests=min_requests,
+                                                                                   reset_timeout=reset_timeout,
+                                                                                   slow_request_threshold=slow_request_threshold)
+                                                          for _provider, _ in self.routes}
+
+##-------------------start-of-route_name()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def route_name(self, route:int) -> str:
+
+        """
+
+        Returns the "provider:model" (or "provider", if the route doesn't set a model) of a route, as recorded in BatchResults.served_by.
+
+        """
+
+        _provider, _kwargs = self.routes[route]
+
+        return f"{_provider}:{_kwargs['model']}" if "model" in _kwargs else _provider
+
+##-------------------start-of-stats()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def stats(self) -> typing.Dict[str, typing.Dict[str, typing.Any]]:
+
+        """
+
+        Returns the state, recent failure rate and times opened of every provider's breaker.
+
+        """
+
+        return {_provider: _breaker.as_dict() for _provider, _breaker in self.breakers.items()}
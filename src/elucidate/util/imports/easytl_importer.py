@@ -6,10 +6,10 @@
 from easytl.services import openai_service, gemini_service, anthropic_service
 
 from easytl.classes import SystemTranslationMessage, ModelTranslationMessage, ChatCompletion, NOT_GIVEN, NotGiven, GenerationConfig, GenerateContentResponse, AsyncGenerateContentResponse, AnthropicMessage, AnthropicTextBlock, AnthropicToolUseBlock
-from easytl.util.constants import VALID_JSON_OPENAI_MODELS, VALID_JSON_ANTHROPIC_MODELS, VALID_JSON_GEMINI_MODELS
+from easytl.util.constants import VALID_JSON_OPENAI_MODELS, VALID_JSON_ANTHROPIC_MODELS, VALID_JSON_GEMINI_MODELS, MODEL_MAX_TOKENS, MODEL_COSTS
 from easytl.exceptions import InvalidResponseFormatException
 
-from easytl.util.util import _is_iterable_of_strings
+from easytl.util.util import _is_iterable_of_strings, _update_model_name
 from easytl.util.llm_util import _validate_easytl_llm_translation_settings, _return_curated_gemini_settings, _return_curated_openai_settings, _validate_stop_sequences, _validate_response_schema,  _return_curated_anthropic_settings, _validate_text_length, _convert_to_correct_type 
 
-from easytl.exceptions import InvalidResponseFormatException, InvalidTextInputException, EasyTLException, InvalidAPITypeException, OpenAIError, GoogleAPIError, AnthropicAPIError, InvalidEasyTLSettingsException
\ No newline at end of file
+from easytl.exceptions import InvalidResponseFormatException, InvalidTextInputException, EasyTLException, InvalidAPITypeException, InvalidAPIKeyException, OpenAIError, GoogleAPIError, AnthropicAPIError, InvalidEasyTLSettingsException, TooManyInputTokensException
\ No newline at end of file
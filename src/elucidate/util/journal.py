@@ -0,0 +1,237 @@
+## Copyright 2024 Kakusui LLC (https://kakusui.org) (https://github.com/Kakusui) (https://github.com/Kakusui/Elucidate)
+## Use of this source code is governed by an GNU Lesser General Public License v2.1
+## license that can be found in the LICENSE file.
+
+## built-in imports
+import typing
+import time
+import atexit
+import pickle
+import sqlite3
+import threading
+
+class EvaluationJournal:
+
+    """
+
+    Append-only record of finished evaluations, so a long job that dies partway through can be rerun without paying for what already finished.
+
+    Every response is recorded as it lands, keyed by the text's position in the input and a fingerprint of the exact request. Rerunning the same job with the same journal returns the recorded responses and only sends the rest. Changing the model, settings, instructions or text changes the fingerprint, so those are sent again.
+
+    Records are buffered and written in one transaction every flush_interval seconds or flush_every records, whichever comes first. The buffer is also written when an evaluation fails or is cancelled and when the interpreter exits, so only a hard kill (E.g. OOM) can lose records, at most flush_interval seconds of them.
+
+    Responses are pickled into the SQLite file, so only point path at a file you trust.
+
+    """
+
+    _default_flush_interval:float = 1.0
+    _default_flush_every:int = 1000
+
+##-------------------start-of-__init__()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def __init__(self,
+                 path:str,
+                 flush_interval:float = _default_flush_interval,
+                 flush_every:int = _default_flush_every
+                 ) -> None:
+
+        """
+
+        Parameters:
+        path (string) : The SQLite file to record responses to. Created if it doesn't exist.
+        flush_interval (float) : The longest a record is buffered before it's written, in seconds.
+        flush_every (int) : The most records buffered before they're written.
+
+        """
+
+        assert flush_interval >= 0, ValueError("flush_interval must be a non-negative number of seconds.")
+        assert flush_every >= 1, ValueError("flush_every must be a positive integer.")
+
+        self._path = path
+        self._flush_interval = flush_interval
+        self._flush_every = flush_every
+
+        self._pending:typing.Dict[typing.Tuple[str, str], typing.Tuple[bytes, float]] = {}
+        self._last_flush = time.monotonic()
+        self._lock = threading.Lock()
+
+        self.recorded = 0
+        self.resumed = 0
+
+        self._connection:sqlite3.Connection | None = sqlite3.connect(path, check_same_thread=False)
+
+        ## a crash can only lose what's still buffered, NORMAL is durable enough for that under WAL and much cheaper than FULL
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.execute("CREATE TABLE IF NOT EXISTS evaluations (item TEXT NOT NULL, fingerprint TEXT NOT NULL, value BLOB NOT NULL, recorded_at REAL NOT NULL, PRIMARY KEY (item, fingerprint)) WITHOUT ROWID")
+        self._connection.commit()
+
+        atexit.register(self.flush)
+
+##-------------------start-of-get()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def get(self, item:str, fingerprint:str) -> typing.Any | None:
+
+        """
+
+        Returns the recorded response for item and fingerprint, or None if there isn't one.
+
+        """
+
+        with self._lock:
+
+            _value = self._pending.get((item, fingerprint), (None,))[0]
+
+            if(_value is None and self._connection is not None):
+                _row = self._connection.execute("SELECT value FROM evaluations WHERE item = ? AND fingerprint = ?", (item, fingerprint)).fetchone()
+                _value = _row[0] if _row is not None else None
+
+            if(_value is None):
+                return None
+
+            try:
+                _response = pickle.loads(_value)
+
+            ## written by an incompatible version of the provider sdk, sent again
+            except Exception:
+                return None
+
+            self.resumed += 1
+
+            return _response
+
+##-------------------start-of-record()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def record(self, item:str, fingerprint:str, response:typing.Any) -> None:
+
+        """
+
+        Records response for item and fingerprint. Written with the next flush.
+
+        """
+
+        try:
+            _value = pickle.dumps(response)
+
+        ## some responses hold things that can't be pickled, those are sent again on a rerun
+        except Exception:
+            return
+
+        with self._lock:
+
+            self._pending[(item, fingerprint)] = (_value, time.time())
+            self.recorded += 1
+
+            if(len(self._pending) >= self._flush_every or time.monotonic() - self._last_flush >= self._flush_interval):
+                self._write_pending()
+
+##-------------------start-of-flush()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def flush(self) -> None:
+
+        """
+
+        Writes every buffered record.
+
+        """
+
+        with self._lock:
+            self._write_pending()
+
+##-------------------start-of-stats()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def stats(self) -> typing.Dict[str, int]:
+
+        """
+
+        Returns how many responses were recorded and resumed by this journal, how many are still buffered, and how many are in the file.
+
+        """
+
+        with self._lock:
+            return {"recorded": self.recorded,
+                    "resumed": self.resumed,
+                    "pending": len(self._pending),
+                    "entries": self._connection.execute("SELECT COUNT(*) FROM evaluations").fetchone()[0] + len(self._pending) if self._connection is not None else len(self._pending)}
+
+##-------------------start-of-clear()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def clear(self) -> None:
+
+        """
+
+        Removes every record, buffered and on disk. Counters are kept.
+
+        """
+
+        with self._lock:
+
+            self._pending.clear()
+
+            if(self._connection is not None):
+                self._connection.execute("DELETE FROM evaluations")
+                self._connection.commit()
+
+##-------------------start-of-close()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def close(self) -> None:
+
+        with self._lock:
+
+            self._write_pending()
+
+            if(self._connection is not None):
+                self._connection.close()
+                self._connection = None
+
+        atexit.unregister(self.flush)
+
+##-------------------start-of-_run()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    async def _run(self, item:str, fingerprint:str, request:typing.Callable[[], typing.Awaitable[typing.Any]]) -> typing.Any:
+
+        """
+
+        Returns the recorded response if there is one, otherwise awaits request() and records what it returns.
+
+        Parameters:
+        item (string) : The text's position in the input.
+        fingerprint (string) : The fingerprint of the request.
+        request (callable) : Starts the request. Only called if there's no recorded response.
+
+        Returns:
+        response (any) : The response.
+
+        """
+
+        _response = self.get(item, fingerprint)
+
+        if(_response is not None):
+            return _response
+
+        try:
+            _response = await request()
+
+        ## whatever finished before a failure or a cancellation is written right away
+        except BaseException:
+            self.flush()
+            raise
+
+        self.record(item, fingerprint, _response)
+
+        return _response
+
+##-------------------start-of-_write_pending()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def _write_pending(self) -> None:
+
+        self._last_flush = time.monotonic()
+
+        if(not self._pending or self._connection is None):
+            return
+
+        self._connection.executemany("INSERT OR REPLACE INTO evaluations (item, fingerprint, value, recorded_at) VALUES (?, ?, ?, ?)",
+                                     [(_item, _fingerprint, _value, _recorded_at) for (_item, _fingerprint), (_value, _recorded_at) in self._pending.items()])
+        self._connection.commit()
+
+        self._pending.clear()
@@ -0,0 +1,504 @@
+## Copyright 2024 Kakusui LLC (https://kakusui.org) (https://github.com/Kakusui) (https://github.com/Kakusui/Elucidate)
+## Use of this source code is governed by an GNU Lesser General Public License v2.1
+## license that can be found in the LICENSE file.
+
+## built-in imports
+import typing
+import time
+import os
+import bisect
+import functools
+import threading
+import contextvars
+
+class MetricsSink:
+
+    """
+
+    Receives a record of every request the evaluation functions make. Does nothing with them, subclass it and override the record methods to send them somewhere. (E.g. StatsD or OpenTelemetry) Metrics is the in-memory default.
+
+    Both methods are called on the event loop or on an evaluation thread, so they should be quick and thread-safe.
+
+    """
+
+##-------------------start-of-record_attempt()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def record_attempt(self,
+                       provider:str,
+                       model:str,
+                       queue_wait:float,
+                       delay:float,
+                       latency:float | None,
+                       input_tokens:int,
+                       output_tokens:int,
+                       error:BaseException | None
+                       ) -> None:
+
+        """
+
+        Called once per API call, so a request the decorator retried is several attempts.
+
+        Parameters:
+        provider (string) : "openai", "gemini" or "anthropic".
+        model (string) : The model.
+        queue_wait (float) : Seconds spent waiting for rate limit budget and a concurrency slot.
+        delay (float) : Seconds slept on evaluation_delay.
+        latency (float or None) : Seconds the API call took. None if it failed before it was sent.
+        input_tokens (int) : The input tokens the response reported, 0 if it failed.
+        output_tokens (int) : The output tokens the response reported, 0 if it failed.
+        error (exception or None) : What the call raised, if it failed.
+
+        """
+
+        pass
+
+##-------------------start-of-record_request()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def record_request(self,
+                       provider:str,
+                       model:str,
+                       attempts:int,
+                       duration:float,
+                       error:BaseException | None
+                       ) -> None:
+
+        """
+
+        Called once per text evaluated, after the decorator is done retrying. Responses served from the response cache aren't recorded.
+
+        Parameters:
+        provider (string) : "openai", "gemini" or "anthropic".
+        model (string) : The model.
+        attempts (int) : How many API calls it took, so attempts - 1 retries.
+        duration (float) : Seconds from the first attempt starting to the last one finishing, waits and retries included.
+        error (exception or None) : What the request finally raised, if it failed.
+
+        """
+
+        pass
+
+class _Histogram:
+
+    """
+
+    A Prometheus style histogram, cumulative counts of observations at or below each bucket's upper bound.
+
+    """
+
+    def __init__(self, buckets:typing.Sequence[float]) -> None:
+
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value:float) -> None:
+
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative_counts(self) -> typing.List[int]:
+
+        _total = 0
+        _cumulative = []
+
+        for _count in self.counts:
+            _total += _count
+            _cumulative.append(_total)
+
+        return _cumulative
+
+class _Series:
+
+    """
+
+    Everything recorded for one provider and model.
+
+    """
+
+    def __init__(self, buckets:typing.Sequence[float]) -> None:
+
+        self.queue_wait = _Histogram(buckets)
+        self.latency = _Histogram(buckets)
+        self.duration = _Histogram(buckets)
+
+        self.requests = 0
+        self.failed_requests = 0
+        self.attempts = 0
+        self.retries = 0
+        self.delay = 0.0
+        self.input_tokens = 0
+        self.output_tokens = 0
+
+        ## attempts that raised, by exception class
+        self.errors:typing.Dict[str, int] = {}
+
+class Metrics(MetricsSink):
+
+    """
+
+    Keeps histograms of queue wait, API latency and request duration, and counts of requests, retries, tokens and errors, per provider and model.
+
+    Recording is a few additions under a lock, cheap enough to leave on. Export with to_prometheus() or write_prometheus(), or pass a callback to get every record as it happens.
+
+    """
+
+    ## seconds
+    _default_buckets:typing.Tuple[float, ...] = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+##-------------------start-of-__init__()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def __init__(self,
+                 buckets:typing.Sequence[float] = _default_buckets,
+                 callback:typing.Callable[[typing.Dict[str, typing.Any]], None] | None = None
+                 ) -> None:
+
+        """
+
+        Parameters:
+        buckets (sequence[float]) : The upper bounds of the histogram buckets, in seconds.
+        callback (callable or None) : Called with a dict for every attempt and request recorded, "type" being "attempt" or "request" and the rest the record method's parameters. (error as the exception's class name)
+
+        """
+
+        assert len(buckets) >= 1 and list(buckets) == sorted(buckets), ValueError("buckets must be a non-empty ascending sequence.")
+
+        self._buckets = tuple(buckets)
+        self._callback = callback
+
+        self._series:typing.Dict[typing.Tuple[str, str], _Series] = {}
+        self._lock = threading.Lock()
+
+##-------------------start-of-record_attempt()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def record_attempt(self,
+                       provider:str,
+                       model:str,
+                       queue_wait:float,
+                       delay:float,
+                       latency:float | None,
+                       input_tokens:int,
+                       output_tokens:int,
+                       error:BaseException | None
+                       ) -> None:
+
+        with self._lock:
+
+            _series = self._get_series(provider, model)
+
+            _series.attempts += 1
+            _series.queue_wait.observe(queue_wait)
+            _series.delay += delay
+            _series.input_tokens += input_tokens
+            _series.output_tokens += output_tokens
+
+            if(latency is not None):
+                _series.latency.observe(latency)
+
+            if(error is not None):
+                _series.errors[type(error).__name__] = _series.errors.get(type(error).__name__, 0) + 1
+
+        if(self._callback is not None):
+            self._callback({"type": "attempt", "provider": provider, "model": model, "queue_wait": queue_wait, "delay": delay, "latency": latency,
+                            "input_tokens": input_tokens, "output_tokens": output_tokens, "error": type(error).__name__ if error is not None else None})
+
+##-------------------start-of-record_request()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def record_request(self,
+                       provider:str,
+                       model:str,
+                       attempts:int,
+                       duration:float,
+                       error:BaseException | None
+                       ) -> None:
+
+        with self._lock:
+
+            _series = self._get_series(provider, model)
+
+            _series.requests += 1
+            _series.retries += max(attempts - 1, 0)
+            _series.duration.observe(duration)
+
+            if(error is not None):
+                _series.failed_requests += 1
+
+        if(self._callback is not None):
+            self._callback({"type": "request", "provider": provider, "model": model, "attempts": attempts, "duration": duration, "error": type(error).__name__ if error is not None else None})
+
+##-------------------start-of-snapshot()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def snapshot(self) -> typing.Dict[str, typing.Dict[str, typing.Any]]:
+
+        """
+
+        Returns the counters and the mean of every histogram, keyed by "provider:model".
+
+        """
+
+        def _mean(_histogram:_Histogram) -> float | None:
+            return _histogram.sum / _histogram.count if _histogram.count else None
+
+        with self._lock:
+            return {f"{_provider}:{_model}": {"requests": _series.requests,
+                                              "failed_requests": _series.failed_requests,
+                                              "attempts": _series.attempts,
+                                              "retries": _series.retries,
+                                              "mean_queue_wait": _mean(_series.queue_wait),
+                                              "mean_latency": _mean(_series.latency),
+                                              "mean_duration": _mean(_series.duration),
+                                              "delay": _series.delay,
+                                              "input_tokens": _series.input_tokens,
+                                              "output_tokens": _series.output_tokens,
+                                              "errors": dict(_series.errors)}
+                    for (_provider, _model), _series in self._series.items()}
+
+##-------------------start-of-to_prometheus()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def to_prometheus(self) -> str:
+
+        """
+
+        Returns the metrics in the Prometheus text exposition format.
+
+        """
+
+        _lines:typing.List[str] = []
+
+        with self._lock:
+
+            _series = sorted(self._series.items())
+
+            for _name, _attribute, _help in [("elucidate_queue_wait_seconds", "queue_wait", "Time spent waiting for rate limit budget and a concurrency slot."),
+                                             ("elucidate_request_latency_seconds", "latency", "Time the API call took, per attempt."),
+                                             ("elucidate_request_duration_seconds", "duration", "Time from the first attempt to the last, waits and retries included.")]:
+
+                _lines.append(f"# HELP {_name} {_help}")
+                _lines.append(f"# TYPE {_name} histogram")
+
+                for (_provider, _model), _values in _series:
+
+                    _histogram:_Histogram = getattr(_values, _attribute)
+                    _labels = _format_labels(provider=_provider, model=_model)
+
+                    for _bound, _count in zip([*map(_format_value, self._buckets), "+Inf"], _histogram.cumulative_counts()):
+                        _lines.append(f"{_name}_bucket{_format_labels(provider=_provider, model=_model, le=_bound)} {_count}")
+
+                    _lines.append(f"{_name}_sum{_labels} {_format_value(_histogram.sum)}")
+                    _lines.append(f"{_name}_count{_labels} {_histogram.count}")
+
+            for _name, _attribute, _help in [("elucidate_requests_total", "requests", "Texts evaluated."),
+                                             ("elucidate_failed_requests_total", "failed_requests", "Texts whose request failed after every retry."),
+                                             ("elucidate_attempts_total", "attempts", "API calls made."),
+                                             ("elucidate_retries_total", "retries", "API calls made by the decorator retrying."),
+                                             ("elucidate_delay_seconds_total", "delay", "Time slept on evaluation_delay."),
+                                             ("elucidate_input_tokens_total", "input_tokens", "Input tokens reported by responses."),
+                                             ("elucidate_output_tokens_total", "output_tokens", "Output tokens reported by responses.")]:
+
+                _lines.append(f"# HELP {_name} {_help}")
+                _lines.append(f"# TYPE {_name} counter")
+
+                for (_provider, _model), _values in _series:
+                    _lines.append(f"{_name}{_format_labels(provider=_provider, model=_model)} {_format_value(getattr(_values, _attribute))}")
+
+            _lines.append("# HELP elucidate_errors_total API calls that raised, by exception class.")
+            _lines.append("# TYPE elucidate_errors_total counter")
+
+            for (_provider, _model), _values in _series:
+                for _error, _count in sorted(_values.errors.items()):
+                    _lines.append(f"elucidate_errors_total{_format_labels(provider=_provider, model=_model, error=_error)} {_count}")
+
+        return "\n".join(_lines) + "\n"
+
+##-------------------start-of-write_prometheus()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def write_prometheus(self, path:str) -> None:
+
+        """
+
+        Writes to_prometheus() to path, replacing it in one step so a scraper never reads a half written file. (E.g. for node_exporter's textfile collector)
+
+        """
+
+        _temporary_path = f"{path}.{os.getpid()}.tmp"
+
+        with open(_temporary_path, "w", encoding="utf-8") as _file:
+            _file.write(self.to_prometheus())
+
+        os.replace(_temporary_path, path)
+
+##-------------------start-of-reset()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def reset(self) -> None:
+
+        """
+
+        Forgets everything recorded.
+
+        """
+
+        with self._lock:
+            self._series.clear()
+
+##-------------------start-of-_get_series()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def _get_series(self, provider:str, model:str) -> _Series:
+
+        _key = (provider, str(model))
+
+        if(_key not in self._series):
+            self._series[_key] = _Series(self._buckets)
+
+        return self._series[_key]
+
+##-------------------start-of-_format_labels()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+def _format_labels(**labels:str) -> str:
+
+    _escaped = {_name: str(_value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n") for _name, _value in labels.items()}
+
+    return "{" + ",".join(f"{_name}=\"{_value}\"" for _name, _value in _escaped.items()) + "}"
+
+##-------------------start-of-_format_value()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+def _format_value(value:float) -> str:
+
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+##-------------------start-of-_usage_counts()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+def _usage_counts(response:typing.Any) -> typing.Tuple[int, int]:
+
+    """
+
+    Returns the input and output tokens a response reported, (0, 0) if it didn't. Handles OpenAI's usage, Anthropic's usage and Gemini's usage_metadata.
+
+    """
+
+    _usage = getattr(response, "usage", None)
+
+    if(_usage is not None):
+        return (getattr(_usage, "prompt_tokens", None) or getattr(_usage, "input_tokens", None) or 0,
+                getattr(_usage, "completion_tokens", None) or getattr(_usage, "output_tokens", None) or 0)
+
+    try:
+        _usage = getattr(response, "usage_metadata", None)
+
+    ## streamed and blocked gemini responses don't always carry usage
+    except Exception:
+        return 0, 0
+
+    if(_usage is not None):
+        return (getattr(_usage, "prompt_token_count", 0) or 0, getattr(_usage, "candidates_token_count", 0) or 0)
+
+    return 0, 0
+
+## set by a caller that needs its requests' latencies, (E.g. for a slow request threshold) each request's task inherits it and every attempt overwrites it, so it ends up holding the last attempt's time from being sent to done, queue wait left out
+_attempt_latency:contextvars.ContextVar[typing.List[float | None] | None] = contextvars.ContextVar("_attempt_latency", default=None)
+
+class _AttemptTimer:
+
+    """
+
+    Times one API call for a sink, created when the call starts waiting.
+
+    """
+
+    def __init__(self, sink:MetricsSink | None, provider:str, model:str) -> None:
+
+        self._sink = sink
+        self._provider = provider
+        self._model = model
+
+        self._created_at = time.monotonic()
+        self._queue_wait = 0.0
+        self._delay = 0.0
+        self._sent_at:float | None = None
+
+        self._latency_holder = _attempt_latency.get()
+
+    def delayed(self, seconds:float) -> None:
+
+        self._delay += seconds
+
+    def sent(self) -> None:
+
+        """
+
+        Marks the call as sent, everything before this that wasn't a delay was queue wait.
+
+        """
+
+        self._sent_at = time.monotonic()
+        self._queue_wait = self._sent_at - self._created_at - self._delay
+
+    def done(self, response:typing.Any = None, error:BaseException | None = None) -> None:
+
+        _latency = time.monotonic() - self._sent_at if self._sent_at is not None else None
+
+        if(self._latency_holder is not None):
+            self._latency_holder[0] = _latency
+
+        if(self._sink is None):
+            return
+
+        _input_tokens, _output_tokens = _usage_counts(response) if error is None else (0, 0)
+
+        ## failed before it was sent, all of it was queue wait
+        if(self._sent_at is None):
+            self._queue_wait = time.monotonic() - self._created_at - self._delay
+
+        self._sink.record_attempt(self._provider, self._model, self._queue_wait, self._delay, _latency, _input_tokens, _output_tokens, error)
+
+class _RequestTimer:
+
+    """
+
+    Times one text's request, retries included, for a sink.
+
+    """
+
+    def __init__(self, sink:MetricsSink | None, provider:str, model:str) -> None:
+
+        self._sink = sink
+        self._provider = provider
+        self._model = model
+
+        self._started_at = time.monotonic()
+        self.attempts = 0
+
+    def counting(self, function:typing.Callable) -> typing.Callable:
+
+        """
+
+        Wraps the function the decorator retries, so every call counts as an attempt.
+
+        """
+
+        @functools.wraps(function)
+        def _counted(*args, **kwargs):
+            self.attempts += 1
+            return function(*args, **kwargs)
+
+        return _counted
+
+    def counting_async(self, function:typing.Callable) -> typing.Callable:
+
+        """
+
+        counting() for the async evaluation functions. The services bind those as partials, which don't look like coroutine functions, so the wrapper is one, letting decorators that check tell them apart.
+
+        """
+
+        @functools.wraps(function)
+        async def _counted_async(*args, **kwargs):
+            self.attempts += 1
+            return await function(*args, **kwargs)
+
+        return _counted_async
+
+    def done(self, error:BaseException | None = None) -> None:
+
+        if(self._sink is not None):
+            self._sink.record_request(self._provider, self._model, max(self.attempts, 1), time.monotonic() - self._started_at, error)
@@ -0,0 +1,145 @@
+## Copyright 2024 Kakusui LLC (https://kakusui.org) (https://github.com/Kakusui) (https://github.com/Kakusui/Elucidate)
+## Use of this source code is governed by an GNU Lesser General Public License v2.1
+## license that can be found in the LICENSE file.
+
+## built-in imports
+import typing
+import json
+
+## custom modules
+from .rate_limiter import _estimate_tokens
+
+##-------------------start-of-attributes---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+## appended to the evaluation instructions of packed requests
+_packing_instructions:str = (
+    "You will be given several independent segments as a JSON object of the form {\"segments\": [{\"id\": ..., \"text\": ...}]}. "
+    "Apply the instructions above to each segment on its own. "
+    "Respond with a JSON object of the form {\"evaluations\": [{\"id\": ..., \"evaluation\": ...}]}, with exactly one entry per segment and the same ids."
+)
+
+## passed as the response_schema for Gemini and Anthropic, OpenAI's json mode doesn't take one
+_packed_response_schema:typing.Dict[str, typing.Any] = {
+    "type": "object",
+    "properties": {
+        "evaluations": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "id": {"type": "string"},
+                    "evaluation": {"type": "string"}
+                },
+                "required": ["id", "evaluation"]
+            }
+        }
+    },
+    "required": ["evaluations"]
+}
+
+##-------------------start-of-_pack_segments()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+def _pack_segments(segments:typing.Iterable[typing.Tuple[int, str]],
+                   token_budget:int,
+                   max_segments_per_request:int
+                   ) -> typing.List[typing.List[typing.Tuple[int, str]]]:
+
+    """
+
+    Greedily fills packs with segments, in order, until the next one would go over token_budget or max_segments_per_request. A segment larger than the budget gets a pack of its own.
+
+    Parameters:
+    segments (iterable[tuple[int, string]]) : The index and text of every segment.
+    token_budget (int) : The most tokens of segments a pack may hold.
+    max_segments_per_request (int) : The most segments a pack may hold.
+
+    Returns:
+    packs (list[list[tuple[int, string]]]) : The packs.
+
+    """
+
+    _packs:typing.List[typing.List[typing.Tuple[int, str]]] = []
+    _pack:typing.List[typing.Tuple[int, str]] = []
+    _pack_tokens = 0
+
+    for _index, _text in segments:
+
+        ## counted as it'll be sent, the id and json escaping cost tokens too
+        _tokens = _estimate_tokens([json.dumps({"id": str(_index), "text": _text}, ensure_ascii=False)])
+
+        if(_pack and (_pack_tokens + _tokens > token_budget or len(_pack) >= max_segments_per_request)):
+            _packs.append(_pack)
+            _pack = []
+            _pack_tokens = 0
+
+        _pack.append((_index, _text))
+        _pack_tokens += _tokens
+
+    if(_pack):
+        _packs.append(_pack)
+
+    return _packs
+
+##-------------------start-of-_build_packed_prompt()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+def _build_packed_prompt(pack:typing.List[typing.Tuple[int, str]]) -> str:
+
+    """
+
+    Returns the prompt for a pack, the segments as a json object keyed by id.
+
+    """
+
+    return json.dumps({"segments": [{"id": str(_index), "text": _text} for _index, _text in pack]}, ensure_ascii=False)
+
+##-------------------start-of-_parse_packed_response()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+def _parse_packed_response(response:typing.Any, pack:typing.List[typing.Tuple[int, str]]) -> typing.Dict[int, str]:
+
+    """
+
+    Splits a packed response back into per segment evaluations. Anything that doesn't parse, isn't a string or has an id that wasn't in the pack is left out, so those segments can be retried.
+
+    Parameters:
+    response (string or mapping) : The json response, a string or already parsed. (Anthropic's format_to_json tool returns the parsed input)
+    pack (list[tuple[int, string]]) : The pack the response is for.
+
+    Returns:
+    evaluations (dict[int, string]) : The index and evaluation of every segment that came back intact.
+
+    """
+
+    if(isinstance(response, str)):
+
+        _response = response.strip()
+
+        ## some models wrap json in a code fence even in json mode
+        if(_response.startswith("```")):
+            _response = _response.strip("`").removeprefix("json").strip()
+
+        try:
+            response = json.loads(_response)
+
+        except json.JSONDecodeError:
+            return {}
+
+    if(not isinstance(response, typing.Mapping) or not isinstance(response.get("evaluations"), list)):
+        return {}
+
+    _expected = {str(_index): _index for _index, _ in pack}
+    _evaluations:typing.Dict[int, str] = {}
+
+    for _item in response["evaluations"]:
+
+        if(not isinstance(_item, typing.Mapping)):
+            continue
+
+        _index = _expected.get(str(_item.get("id")))
+        _evaluation = _item.get("evaluation")
+
+        if(_index is None or _index in _evaluations or not isinstance(_evaluation, str) or not _evaluation.strip()):
+            continue
+
+        _evaluations[_index] = _evaluation
+
+    return _evaluations
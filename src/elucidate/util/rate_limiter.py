@@ -0,0 +1,259 @@
+## Copyright 2024 Kakusui LLC (https://kakusui.org) (https://github.com/Kakusui) (https://github.com/Kakusui/Elucidate)
+## Use of this source code is governed by an GNU Lesser General Public License v2.1
+## license that can be found in the LICENSE file.
+
+## built-in imports
+import typing
+import time
+import asyncio
+import threading
+import functools
+
+## third-party imports
+import tiktoken
+
+class TokenBucket:
+
+    """
+
+    A bucket that holds up to capacity units and refills continuously at capacity per minute.
+
+    The level may go negative when a request turns out to cost more than estimated, later requests then wait until it refills.
+
+    """
+
+##-------------------start-of-__init__()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def __init__(self, per_minute:float) -> None:
+
+        """
+
+        Parameters:
+        per_minute (float) : The capacity of the bucket and how much it refills per minute.
+
+        """
+
+        assert per_minute > 0, ValueError("A rate limit must be a positive number.")
+
+        self.capacity = float(per_minute)
+        self._refill_rate = self.capacity / 60.0
+        self._level = self.capacity
+        self._updated_at = time.monotonic()
+
+##-------------------start-of-_refill()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def _refill(self, now:float) -> None:
+
+        self._level = min(self.capacity, self._level + (now - self._updated_at) * self._refill_rate)
+        self._updated_at = now
+
+##-------------------start-of-time_until()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def time_until(self, amount:float, now:float) -> float:
+
+        """
+
+        Returns how many seconds until amount can be taken. Amounts over the capacity are treated as the capacity, otherwise they'd never fit.
+
+        """
+
+        self._refill(now)
+
+        _missing = min(amount, self.capacity) - self._level
+
+        return 0.0 if _missing <= 0 else _missing / self._refill_rate
+
+##-------------------start-of-take()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def take(self, amount:float) -> None:
+
+        self._level -= amount
+
+##-------------------start-of-give_back()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def give_back(self, amount:float) -> None:
+
+        self._level = min(self.capacity, self._level + amount)
+
+class RateLimiter:
+
+    """
+
+    Paces requests to a requests per minute and a tokens per minute limit, like the limits providers enforce per model.
+
+    Requests wait for budget before they take a semaphore slot, so a slot is never held while waiting. Token cost is estimated before the request and corrected from the response's usage afterwards.
+
+    """
+
+##-------------------start-of-__init__()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def __init__(self, requests_per_minute:float | None = None, tokens_per_minute:float | None = None) -> None:
+
+        """
+
+        Parameters:
+        requests_per_minute (float or None) : The requests per minute limit. None means unlimited.
+        tokens_per_minute (float or None) : The tokens per minute limit. None means unlimited.
+
+        """
+
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+
+        self._requests = TokenBucket(requests_per_minute) if requests_per_minute is not None else None
+        self._tokens = TokenBucket(tokens_per_minute) if tokens_per_minute is not None else None
+
+        ## guards the buckets, shared between the event loop and sync callers
+        self._lock = threading.Lock()
+
+        ## makes async waiters take their turn in order, created lazily since it belongs to an event loop
+        self._async_turn:asyncio.Lock | None = None
+        self._async_turn_loop:asyncio.AbstractEventLoop | None = None
+
+##-------------------start-of-_try_take()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def _try_take(self, tokens:int) -> float:
+
+        """
+
+        Takes one request and tokens if both are available. Otherwise takes nothing and returns how long to wait.
+
+        """
+
+        with self._lock:
+
+            _now = time.monotonic()
+
+            _wait = max(self._requests.time_until(1, _now) if self._requests is not None else 0.0,
+                        self._tokens.time_until(tokens, _now) if self._tokens is not None else 0.0)
+
+            if(_wait > 0):
+                return _wait
+
+            if(self._requests is not None):
+                self._requests.take(1)
+
+            if(self._tokens is not None):
+                self._tokens.take(tokens)
+
+            return 0.0
+
+##-------------------start-of-acquire()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    async def acquire(self, tokens:int) -> None:
+
+        """
+
+        Waits until a request of the estimated size fits within both limits, then takes it from the budget.
+
+        Parameters:
+        tokens (int) : The estimated number of tokens the request will use.
+
+        """
+
+        _loop = asyncio.get_running_loop()
+
+        if(self._async_turn is None or self._async_turn_loop is not _loop):
+            self._async_turn = asyncio.Lock()
+            self._async_turn_loop = _loop
+
+        async with self._async_turn:
+
+            while((_wait := self._try_take(tokens)) > 0):
+                await asyncio.sleep(_wait)
+
+##-------------------start-of-acquire_sync()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def acquire_sync(self, tokens:int) -> None:
+
+        """
+
+        Blocking version of acquire().
+
+        """
+
+        while((_wait := self._try_take(tokens)) > 0):
+            time.sleep(_wait)
+
+##-------------------start-of-settle()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def settle(self, estimated_tokens:int, actual_tokens:int | None) -> None:
+
+        """
+
+        Corrects the token budget once the real usage is known.
+
+        Parameters:
+        estimated_tokens (int) : What acquire() was called with.
+        actual_tokens (int or None) : The tokens the request actually used, 0 if it failed before being counted. None if unknown, the estimate is kept.
+
+        """
+
+        if(self._tokens is None or actual_tokens is None):
+            return
+
+        with self._lock:
+
+            _difference = estimated_tokens - actual_tokens
+
+            if(_difference >= 0):
+                self._tokens.give_back(_difference)
+
+            else:
+                self._tokens.take(-_difference)
+
+##-------------------start-of-_get_rate_limiter()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+def _get_rate_limiter(rate_limiters:typing.Mapping[str | None, RateLimiter], model:str) -> RateLimiter | None:
+
+    """
+
+    Returns the limiter for model, falling back to the provider wide one stored under None.
+
+    """
+
+    if(not rate_limiters):
+        return None
+
+    return rate_limiters.get(model) or rate_limiters.get(None)
+
+##-------------------start-of-_get_estimation_encoding()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+@functools.lru_cache(maxsize=1)
+def _get_estimation_encoding() -> tiktoken.Encoding | None:
+
+    try:
+        return tiktoken.get_encoding("cl100k_base")
+
+    ## the encoding has to be downloaded the first time, which isn't always possible
+    except Exception:
+        return None
+
+##-------------------start-of-_estimate_tokens()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+def _estimate_tokens(texts:typing.Iterable[str], max_output_tokens:typing.Any = None) -> int:
+
+    """
+
+    Estimates how many tokens a request will count against a tokens per minute limit. It only needs to be close, the limiter corrects it from the response's usage.
+
+    Parameters:
+    texts (iterable[string]) : The text sent with the request.
+    max_output_tokens (any) : The request's output token limit, counted if it's an int since providers reserve it up front.
+
+    Returns:
+    tokens (int) : The estimate.
+
+    """
+
+    _encoding = _get_estimation_encoding()
+
+    _tokens = 0
+
+    for _text in texts:
+        _tokens += len(_encoding.encode(_text, disallowed_special=())) if _encoding is not None else len(_text) // 4 + 1
+
+    if(isinstance(max_output_tokens, int)):
+        _tokens += max_output_tokens
+
+    return _tokens
@@ -0,0 +1,77 @@
+## Copyright 2024 Kakusui LLC (https://kakusui.org) (https://github.com/Kakusui) (https://github.com/Kakusui/Elucidate)
+## Use of this source code is governed by an GNU Lesser General Public License v2.1
+## license that can be found in the LICENSE file.
+
+## built-in imports
+import typing
+import types
+
+## custom modules
+from ..util.response_cache import ResponseCache
+
+class _RequestTemplate:
+
+    """
+
+    Everything in a request that only depends on a service's settings and instructions, built once and shared by every request until either changes. Requests are the template plus the text's message.
+
+    Services keep theirs in _request_template, which _set_attributes() clears, and the evaluators build a new one on the next request.
+
+    """
+
+    __slots__ = ("instructions", "arguments", "_provider", "_leading_messages", "_key")
+
+##-------------------start-of-__init__()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def __init__(self,
+                 provider:str,
+                 instructions:typing.Any,
+                 arguments:typing.Mapping[str, typing.Any],
+                 leading_messages:typing.Iterable[typing.Dict[str, typing.Any]] = ()
+                 ) -> None:
+
+        """
+
+        Parameters:
+        provider (string) : The provider the requests are for, part of their keys.
+        instructions (any) : The instructions the template was built for.
+        arguments (mapping) : The request arguments, except the messages.
+        leading_messages (iterable[dict]) : The messages that come before the text's. (E.g. OpenAI's system message)
+
+        """
+
+        self.instructions = instructions
+        self.arguments:typing.Mapping[str, typing.Any] = types.MappingProxyType(dict(arguments))
+
+        self._provider = provider
+        self._leading_messages = tuple(leading_messages)
+
+        ## only needed with a response cache, journal or cassette, so it's made on the first key
+        self._key:typing.Callable[[typing.Any], str] | None = None
+
+##-------------------start-of-build()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def build(self, prompt:typing.Any) -> typing.Dict[str, typing.Any]:
+
+        """
+
+        Returns the arguments of the request for prompt. A new dict every time, so callers can change it, but the values inside are shared with the template.
+
+        """
+
+        return {**self.arguments, "messages": [*self._leading_messages, prompt.to_dict()]}
+
+##-------------------start-of-key()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def key(self, prompt:typing.Any) -> str:
+
+        """
+
+        Returns the same key ResponseCache.make_key() would for build(prompt), without serializing the rest of the request again.
+
+        """
+
+        if(self._key is None):
+            self._key = ResponseCache._key_function(self._provider, self.arguments, "messages")
+
+        return self._key([*self._leading_messages, prompt.to_dict()])
@@ -0,0 +1,418 @@
+## Copyright 2024 Kakusui LLC (https://kakusui.org) (https://github.com/Kakusui) (https://github.com/Kakusui/Elucidate)
+## Use of this source code is governed by an GNU Lesser General Public License v2.1
+## license that can be found in the LICENSE file.
+
+## built-in imports
+import typing
+import time
+import json
+import atexit
+import pickle
+import sqlite3
+import hashlib
+import threading
+
+from collections import OrderedDict
+
+class ResponseCache:
+
+    """
+
+    Content addressed cache for raw provider responses. A bounded in-memory LRU sits in front of an optional SQLite store.
+
+    Keys are a hash of the provider and the exact request that would be sent, so the model, sampling parameters, json mode/schema, instructions and text all take part. Identical requests are answered from the cache without touching the semaphore, the evaluation delay or the decorator.
+
+    Writes to the SQLite store, new responses and the access times of disk hits, are buffered and written in one transaction every flush_interval seconds or flush_every writes, whichever comes first, and when the interpreter exits. So a miss or a hit doesn't wait on a commit while other requests are waiting on the lock.
+
+    Responses are pickled into the SQLite store, so only point path at a file you trust.
+
+    """
+
+    _default_max_memory_entries:int = 1024
+    _default_max_disk_entries:int | None = 100_000
+
+    _default_flush_interval:float = 1.0
+    _default_flush_every:int = 1000
+
+##-------------------start-of-__init__()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def __init__(self,
+                 path:str | None = None,
+                 max_memory_entries:int = _default_max_memory_entries,
+                 max_disk_entries:int | None = _default_max_disk_entries,
+                 ttl:float | None = None,
+                 flush_interval:float = _default_flush_interval,
+                 flush_every:int = _default_flush_every
+                 ) -> None:
+
+        """
+
+        Parameters:
+        path (string or None) : The SQLite file to persist responses to. If None, the cache is memory only.
+        max_memory_entries (int) : The number of responses kept in memory. The least recently used are evicted first.
+        max_disk_entries (int or None) : The number of responses kept in the SQLite store. The least recently used are evicted first. None means unbounded.
+        ttl (float or None) : How long, in seconds, a response is served from the cache. None means forever.
+        flush_interval (float) : The longest a write to the SQLite store is buffered, in seconds.
+        flush_every (int) : The most writes to the SQLite store buffered before they're written.
+
+        """
+
+        assert max_memory_entries >= 0, ValueError("max_memory_entries must be a non-negative integer.")
+        assert max_disk_entries is None or max_disk_entries >= 1, ValueError("max_disk_entries must be None or a positive integer.")
+        assert ttl is None or ttl > 0, ValueError("ttl must be None or a positive number of seconds.")
+        assert flush_interval >= 0, ValueError("flush_interval must be a non-negative number of seconds.")
+        assert flush_every >= 1, ValueError("flush_every must be a positive integer.")
+
+        self._path = path
+        self._max_memory_entries = max_memory_entries
+        self._max_disk_entries = max_disk_entries
+        self._ttl = ttl
+        self._flush_interval = flush_interval
+        self._flush_every = flush_every
+
+        self._memory:OrderedDict[str, typing.Tuple[typing.Any, float]] = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.evictions = 0
+
+        self._connection:sqlite3.Connection | None = None
+        self._disk_entries = 0
+
+        ## writes waiting for the next flush, new responses as (value, stored_at), access times of disk hits, and expired keys
+        self._pending_writes:typing.Dict[str, typing.Tuple[bytes, float]] = {}
+        self._pending_accesses:typing.Dict[str, float] = {}
+        self._pending_deletes:typing.Set[str] = set()
+        self._last_flush = time.monotonic()
+
+        if(path is not None):
+            self._connection = sqlite3.connect(path, check_same_thread=False)
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute("CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, value BLOB NOT NULL, stored_at REAL NOT NULL, accessed_at REAL NOT NULL)")
+            self._connection.execute("CREATE INDEX IF NOT EXISTS responses_accessed_at ON responses (accessed_at)")
+            self._connection.commit()
+
+            self._disk_entries = self._connection.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+            atexit.register(self.flush)
+
+##-------------------start-of-make_key()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    @staticmethod
+    def make_key(provider:str, request:typing.Mapping[str, typing.Any]) -> str:
+
+        """
+
+        Hashes a request into a cache key.
+
+        Parameters:
+        provider (string) : The provider the request is for.
+        request (mapping) : Everything that determines the response, typically the arguments sent to the API.
+
+        Returns:
+        key (string) : The key.
+
+        """
+
+        _payload = json.dumps({"provider": provider, "request": request}, sort_keys=True, default=str, ensure_ascii=False)
+
+        return hashlib.sha256(_payload.encode("utf-8")).hexdigest()
+
+##-------------------start-of-_key_function()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    @staticmethod
+    def _key_function(provider:str, request:typing.Mapping[str, typing.Any], field:str) -> typing.Callable[[typing.Any], str]:
+
+        """
+
+        Returns a function that gives make_key(provider, {**request, field: value}) for a value. The rest of the request is serialized and hashed once, here, so each key only costs serializing value.
+
+        Parameters:
+        provider (string) : The provider the request is for.
+        request (mapping) : Everything in the request except field.
+        field (string) : The part of the request that changes between keys.
+
+        Returns:
+        key_function (callable) : Returns the key for a value of field.
+
+        """
+
+        _placeholder = "\x00elucidate-key-placeholder\x00"
+
+        _payload = json.dumps({"provider": provider, "request": {**request, field: _placeholder}}, sort_keys=True, default=str, ensure_ascii=False)
+
+        ## sort_keys puts field somewhere in the middle, everything around it is fixed
+        _prefix, _suffix = _payload.split(json.dumps(_placeholder, ensure_ascii=False))
+
+        _hash = hashlib.sha256(_prefix.encode("utf-8"))
+        _suffix_bytes = _suffix.encode("utf-8")
+
+        def _key(value:typing.Any) -> str:
+
+            _value_hash = _hash.copy()
+            _value_hash.update(json.dumps(value, sort_keys=True, default=str, ensure_ascii=False).encode("utf-8"))
+            _value_hash.update(_suffix_bytes)
+
+            return _value_hash.hexdigest()
+
+        return _key
+
+##-------------------start-of-get()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def get(self, key:str) -> typing.Any | None:
+
+        """
+
+        Returns the cached response for key, or None if there isn't a live one.
+
+        """
+
+        _now = time.time()
+
+        with self._lock:
+
+            _entry = self._memory.get(key)
+
+            if(_entry is not None and self._is_live(_entry[1], _now)):
+                self._memory.move_to_end(key)
+                self.hits += 1
+                self.memory_hits += 1
+                return _entry[0]
+
+            if(_entry is not None):
+                del self._memory[key]
+
+            _response = self._get_from_disk(key, _now)
+
+            if(_response is None):
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            self.disk_hits += 1
+
+            self._remember(key, _response[0], _response[1])
+
+            return _response[0]
+
+##-------------------start-of-set()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def set(self, key:str, response:typing.Any) -> None:
+
+        """
+
+        Caches response under key.
+
+        """
+
+        _now = time.time()
+
+        with self._lock:
+
+            self._remember(key, response, _now)
+
+            if(self._connection is None):
+                return
+
+            try:
+                _value = pickle.dumps(response)
+
+            ## some responses hold things that can't be pickled, those stay in memory only
+            except Exception:
+                return
+
+            self._pending_writes[key] = (_value, _now)
+            self._pending_accesses.pop(key, None)
+            self._pending_deletes.discard(key)
+
+            self._disk_entries += 1
+
+            self._flush_if_due()
+
+##-------------------start-of-flush()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def flush(self) -> None:
+
+        """
+
+        Writes every buffered write to the SQLite store.
+
+        """
+
+        with self._lock:
+            self._write_pending()
+
+##-------------------start-of-stats()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def stats(self) -> typing.Dict[str, int]:
+
+        """
+
+        Returns the hit/miss counters and how many responses are cached in memory and on disk.
+
+        """
+
+        with self._lock:
+            return {"hits": self.hits,
+                    "misses": self.misses,
+                    "memory_hits": self.memory_hits,
+                    "disk_hits": self.disk_hits,
+                    "evictions": self.evictions,
+                    "memory_entries": len(self._memory),
+                    "disk_entries": self._disk_entries}
+
+##-------------------start-of-clear()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def clear(self) -> None:
+
+        """
+
+        Removes every cached response, in memory and on disk. Counters are kept.
+
+        """
+
+        with self._lock:
+
+            self._memory.clear()
+
+            self._pending_writes.clear()
+            self._pending_accesses.clear()
+            self._pending_deletes.clear()
+
+            if(self._connection is not None):
+                self._connection.execute("DELETE FROM responses")
+                self._connection.commit()
+                self._disk_entries = 0
+
+##-------------------start-of-close()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def close(self) -> None:
+
+        with self._lock:
+
+            self._write_pending()
+
+            if(self._connection is not None):
+                self._connection.close()
+                self._connection = None
+
+        atexit.unregister(self.flush)
+
+##-------------------start-of-_is_live()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def _is_live(self, stored_at:float, now:float) -> bool:
+
+        return self._ttl is None or now - stored_at < self._ttl
+
+##-------------------start-of-_remember()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def _remember(self, key:str, response:typing.Any, stored_at:float) -> None:
+
+        if(self._max_memory_entries == 0):
+            return
+
+        self._memory[key] = (response, stored_at)
+        self._memory.move_to_end(key)
+
+        while(len(self._memory) > self._max_memory_entries):
+            self._memory.popitem(last=False)
+            self.evictions += 1
+
+##-------------------start-of-_get_from_disk()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def _get_from_disk(self, key:str, now:float) -> typing.Tuple[typing.Any, float] | None:
+
+        if(self._connection is None or key in self._pending_deletes):
+            return None
+
+        _row = self._pending_writes.get(key) or self._connection.execute("SELECT value, stored_at FROM responses WHERE key = ?", (key,)).fetchone()
+
+        if(_row is None):
+            return None
+
+        _value, _stored_at = _row
+
+        if(self._is_live(_stored_at, now)):
+
+            try:
+                _response = pickle.loads(_value)
+
+                if(key not in self._pending_writes):
+                    self._pending_accesses[key] = now
+                    self._flush_if_due()
+
+                return _response, _stored_at
+
+            ## written by an incompatible version of the provider sdk, treated as expired
+            except Exception:
+                pass
+
+        self._pending_writes.pop(key, None)
+        self._pending_accesses.pop(key, None)
+        self._pending_deletes.add(key)
+        self._disk_entries -= 1
+
+        self._flush_if_due()
+
+        return None
+
+##-------------------start-of-_flush_if_due()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def _flush_if_due(self) -> None:
+
+        if(len(self._pending_writes) + len(self._pending_accesses) + len(self._pending_deletes) >= self._flush_every or time.monotonic() - self._last_flush >= self._flush_interval):
+            self._write_pending()
+
+##-------------------start-of-_write_pending()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def _write_pending(self) -> None:
+
+        self._last_flush = time.monotonic()
+
+        if(self._connection is None or not (self._pending_writes or self._pending_accesses or self._pending_deletes)):
+            return
+
+        self._connection.executemany("DELETE FROM responses WHERE key = ?", [(_key,) for _key in self._pending_deletes])
+        self._connection.executemany("INSERT OR REPLACE INTO responses (key, value, stored_at, accessed_at) VALUES (?, ?, ?, ?)",
+                                     [(_key, _value, _stored_at, _stored_at) for _key, (_value, _stored_at) in self._pending_writes.items()])
+        self._connection.executemany("UPDATE responses SET accessed_at = ? WHERE key = ?", [(_accessed_at, _key) for _key, _accessed_at in self._pending_accesses.items()])
+        self._connection.commit()
+
+        self._pending_writes.clear()
+        self._pending_accesses.clear()
+        self._pending_deletes.clear()
+
+        if(self._max_disk_entries is not None and self._disk_entries > self._max_disk_entries):
+            self._evict_from_disk()
+
+##-------------------start-of-_evict_from_disk()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def _evict_from_disk(self) -> None:
+
+        assert self._connection is not None and self._max_disk_entries is not None
+
+        ## the running count can drift when a key is replaced, so recount before deleting anything
+        self._disk_entries = self._connection.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+        if(self._disk_entries <= self._max_disk_entries):
+            return
+
+        ## expired responses go first, then the least recently used, with some slack so this isn't done on every insert
+        if(self._ttl is not None):
+            self._connection.execute("DELETE FROM responses WHERE stored_at <= ?", (time.time() - self._ttl,))
+
+        _excess = self._connection.execute("SELECT COUNT(*) FROM responses").fetchone()[0] - self._max_disk_entries
+
+        if(_excess > 0):
+            _excess += self._max_disk_entries // 10
+            self._connection.execute("DELETE FROM responses WHERE key IN (SELECT key FROM responses ORDER BY accessed_at LIMIT ?)", (_excess,))
+
+        self._connection.commit()
+
+        _remaining = self._connection.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+        self.evictions += self._disk_entries - _remaining
+        self._disk_entries = _remaining
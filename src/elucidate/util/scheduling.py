@@ -0,0 +1,233 @@
+## Copyright 2024 Kakusui LLC (https://kakusui.org) (https://github.com/Kakusui) (https://github.com/Kakusui/Elucidate)
+## Use of this source code is governed by an GNU Lesser General Public License v2.1
+## license that can be found in the LICENSE file.
+
+## built-in imports
+import typing
+import asyncio
+import concurrent.futures
+
+## custom modules
+from .batching import BatchResults
+
+##-------------------start-of-_is_lazy_iterable()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+def _is_lazy_iterable(value:typing.Any) -> bool:
+
+    """
+
+    Returns whether value is an iterator or an async iterable, something that can only be read once and may not fit in memory. (E.g. a generator, a file, a DB cursor)
+
+    """
+
+    return isinstance(value, (typing.Iterator, typing.AsyncIterable))
+
+##-------------------start-of-_admit_lazily()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+def _admit_lazily(items:typing.Iterable[typing.Any] | typing.AsyncIterable[typing.Any],
+                  admit:typing.Callable[[typing.Any], typing.Awaitable[typing.Any]]
+                  ) -> typing.Iterator[typing.Awaitable[typing.Any]] | typing.AsyncIterator[typing.Awaitable[typing.Any]]:
+    
+    """
+
+    Maps admit over items without reading ahead. admit is only called for an item once the scheduler pulls it, so validation and message building happen per admitted item.
+
+    If admit raises, (E.g. a text is too long) that item's request raises it instead, so it fails like any other request rather than ending the iteration for every item after it.
+
+    Parameters:
+    items (iterable or async iterable) : The items to admit.
+    admit (callable) : Turns an item into its request.
+
+    Returns:
+    requests (iterator or async iterator) : The requests, in the same order as items.
+
+    """
+
+    def _admit_or_fail(_item:typing.Any) -> typing.Awaitable[typing.Any]:
+
+        try:
+            return admit(_item)
+
+        except Exception as _e:
+            return _raise(_e)
+
+    if(isinstance(items, typing.AsyncIterable)):
+
+        async def _admit_async() -> typing.AsyncIterator[typing.Awaitable[typing.Any]]:
+            async for _item in items:
+                yield _admit_or_fail(_item)
+
+        return _admit_async()
+
+    return (_admit_or_fail(_item) for _item in items)
+
+##-------------------start-of-_raise()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+async def _raise(error:Exception) -> typing.Any:
+
+    raise error
+
+##-------------------start-of-_iterate_as_completed()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+async def _iterate_as_completed(requests:typing.Iterable[typing.Awaitable[typing.Any]] | typing.AsyncIterable[typing.Awaitable[typing.Any]],
+                                transform:typing.Callable[[typing.Any], typing.Any] = lambda _result: _result,
+                                ordered:bool = False,
+                                window:int | None = None,
+                                return_exceptions:bool = False,
+                                on_close:typing.Callable[[], typing.Any] | None = None
+                                ) -> typing.AsyncIterator[typing.Tuple[int, typing.Any]]:
+
+    """
+
+    Runs the requests concurrently and yields (index, result) as each one finishes.
+
+    Finished results are handed off immediately rather than collected, so nothing is kept around once the consumer has it.
+
+    If a request raises, the exception propagates and the remaining requests are cancelled, same as breaking out of the loop early. Unless return_exceptions is True, then the exception is yielded in place of the result.
+
+    Parameters:
+    requests (iterable[awaitable] or async iterable[awaitable]) : The requests to run. The index is the request's position in this iterable.
+    transform (callable) : Applied to each result before it's yielded.
+    ordered (bool) : If True, results are yielded in index order, each as soon as every earlier index is done. Otherwise in completion order.
+    window (int or None) : The maximum number of requests admitted at a time. Results held back for ordering count against it, so memory stays O(window). Requests are only pulled from the iterable when there's room. If None, every request is admitted up front.
+    return_exceptions (bool) : Whether a failed request yields its exception instead of ending the iteration.
+    on_close (callable or None) : Called once the iteration ends, however it ends, after the remaining requests are cancelled. (E.g. to flush a journal)
+
+    Yields:
+    (int, any) : The request's index and its transformed result.
+
+    """
+
+    assert window is None or window >= 1, ValueError("window must be None or a positive integer.")
+
+    _source = requests.__aiter__() if isinstance(requests, typing.AsyncIterable) else iter(requests)
+    _exhausted = False
+
+    _tasks:typing.Dict[asyncio.Future, int] = {}
+    _admitted = 0
+
+    ## only used when ordered, results that finished ahead of an earlier index
+    _held_back:typing.Dict[int, typing.Any] = {}
+    _next_index = 0
+
+    try:
+
+        while(True):
+
+            while(not _exhausted and (window is None or len(_tasks) + len(_held_back) < window)):
+
+                try:
+                    _request = await _source.__anext__() if isinstance(_source, typing.AsyncIterator) else next(_source)
+
+                except (StopIteration, StopAsyncIteration):
+                    _exhausted = True
+                    break
+
+                _tasks[asyncio.ensure_future(_request)] = _admitted
+                _admitted += 1
+
+            if(not _tasks):
+                break
+
+            _done, _ = await asyncio.wait(_tasks, return_when=asyncio.FIRST_COMPLETED)
+
+            for _task in sorted(_done, key=_tasks.__getitem__):
+
+                _index = _tasks.pop(_task)
+
+                if(return_exceptions and _task.exception() is not None):
+                    _result = _task.exception()
+
+                else:
+                    _result = transform(_task.result())
+
+                if(not ordered):
+                    yield _index, _result
+                    continue
+
+                _held_back[_index] = _result
+
+            while(_next_index in _held_back):
+                yield _next_index, _held_back.pop(_next_index)
+                _next_index += 1
+
+    finally:
+        for _task in _tasks:
+            _task.cancel()
+
+        if(on_close is not None):
+            on_close()
+
+##-------------------start-of-_collect_by_index()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+async def _collect_by_index(stream:typing.AsyncIterator[typing.Tuple[int, typing.Any]]) -> typing.List[typing.Any]:
+
+    """
+
+    Collects the results of an unordered _iterate_as_completed() into a list in index order.
+
+    Every result is kept anyway, so there's no need for the stream to hold results back for ordering, which would count against its window and let one slow request stall admissions.
+
+    Parameters:
+    stream (async iterator) : The (index, result) pairs, in any order.
+
+    Returns:
+    results (list) : The results in index order.
+
+    """
+
+    _results:typing.Dict[int, typing.Any] = {}
+
+    async for _index, _result in stream:
+        _results[_index] = _result
+
+    return [_results[_index] for _index in range(len(_results))]
+
+##-------------------start-of-_map_in_threads()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+def _map_in_threads(function:typing.Callable[[typing.Any], typing.Any],
+                    items:typing.Sequence[typing.Any],
+                    max_workers:int
+                    ) -> BatchResults:
+
+    """
+
+    Calls function on every item on a thread pool of max_workers threads, so at most max_workers calls are in flight.
+
+    A failing call doesn't stop the others, its error is kept and the completed work is still returned.
+
+    Parameters:
+    function (callable) : Called with each item.
+    items (sequence) : The items.
+    max_workers (int) : The number of threads.
+
+    Returns:
+    results (BatchResults) : What function returned for every item in input order, None with an entry in errors for those that raised.
+
+    """
+
+    assert max_workers >= 1, ValueError("max_workers must be at least 1.")
+
+    _results:typing.List[typing.Any] = [None] * len(items)
+    _errors:typing.Dict[int, Exception] = {}
+
+    _executor = concurrent.futures.ThreadPoolExecutor(max_workers=min(max_workers, max(len(items), 1)), thread_name_prefix="elucidate")
+
+    try:
+        _futures = {_executor.submit(function, _item): _index for _index, _item in enumerate(items)}
+
+        for _future in concurrent.futures.as_completed(_futures):
+
+            _index = _futures[_future]
+
+            try:
+                _results[_index] = _future.result()
+
+            except Exception as _e:
+                _errors[_index] = _e
+
+    finally:
+        ## on KeyboardInterrupt and the like, don't start what hasn't started yet
+        _executor.shutdown(wait=True, cancel_futures=True)
+
+    return BatchResults(_results, _errors)
@@ -0,0 +1,279 @@
+## Copyright 2024 Kakusui LLC (https://kakusui.org) (https://github.com/Kakusui) (https://github.com/Kakusui/Elucidate)
+## Use of this source code is governed by an GNU Lesser General Public License v2.1
+## license that can be found in the LICENSE file.
+
+## built-in imports
+import typing
+import asyncio
+import inspect
+import json
+import time
+import re
+
+class EvaluationStream:
+
+    """
+
+    One evaluation, streamed as it's generated. Returned by ElucidateClient.evaluate_token_stream().
+
+    Iterate it with async for to get the evaluation a delta at a time as the model writes it, or await it to get the whole evaluation. The request is sent when either starts, and both can be done, in either order. Each delta is also passed to on_delta, if given, whether the stream is iterated or not.
+
+    Once it's done, text is the whole evaluation, and input_tokens and output_tokens are the usage the provider reported. For the json response type, json() parses it, and can be called while it's still streaming to get the fields received so far.
+
+    A response the response cache or a replaying cassette already has arrives as a single delta.
+
+    """
+
+##-------------------start-of-__init__()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def __init__(self,
+                 request:typing.Callable[["EvaluationStream"], typing.Awaitable[typing.Any]],
+                 on_delta:typing.Callable[[str], typing.Any] | None = None
+                 ) -> None:
+
+        """
+
+        Parameters:
+        request (callable) : Sends the request, pushing every delta into the stream it's given.
+        on_delta (callable or None) : Called with every delta as it arrives. Can be a coroutine function, it's awaited before the next delta is read.
+
+        """
+
+        self.text = ""
+        self.input_tokens:int | None = None
+        self.output_tokens:int | None = None
+
+        ## seconds from the stream starting, waits for rate limit budget and a concurrency slot included
+        self.time_to_first_token:float | None = None
+        self.duration:float | None = None
+
+        self._request = request
+        self._on_delta = on_delta
+
+        ## made when the stream starts, as they have to be made inside the event loop
+        self._task:asyncio.Task | None = None
+        self._deltas:asyncio.Queue[str | None] | None = None
+
+        self._iterated = False
+        self._started_at = 0.0
+
+##-------------------start-of-done---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    @property
+    def done(self) -> bool:
+
+        """
+
+        Whether the request has finished, successfully or not.
+
+        """
+
+        return self._task is not None and self._task.done()
+
+##-------------------start-of-usage---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    @property
+    def usage(self) -> typing.Dict[str, int | None]:
+
+        """
+
+        The input and output tokens the provider reported, None until it has.
+
+        """
+
+        return {"input_tokens": self.input_tokens, "output_tokens": self.output_tokens}
+
+##-------------------start-of-json()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def json(self) -> typing.Any:
+
+        """
+
+        Returns the evaluation parsed as JSON. While it's still streaming, whatever's still open in the text received so far is closed first, so a partial string value shows as far as it's arrived. (E.g. '{"revised": "Hel' gives {"revised": "Hel"})
+
+        Returns:
+        evaluation (any) : The parsed evaluation. None if nothing parseable has arrived yet.
+
+        """
+
+        if(self._task is not None and self._task.done() and not self._task.cancelled() and self._task.exception() is None):
+            return json.loads(self.text)
+
+        return _parse_partial_json(self.text)
+
+##-------------------start-of-cancel()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def cancel(self) -> None:
+
+        """
+
+        Stops the request, if it's still running. (E.g. when the reviewer moves on before the evaluation is done) Iterating or awaiting the stream then raises asyncio.CancelledError.
+
+        """
+
+        if(self._task is not None):
+            self._task.cancel()
+
+##-------------------start-of-__aiter__()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    async def __aiter__(self) -> typing.AsyncIterator[str]:
+
+        assert not self._iterated, RuntimeError("An EvaluationStream can only be iterated once.")
+
+        self._iterated = True
+
+        _task = self._start()
+
+        while(True):
+
+            _delta = await self._deltas.get() # type: ignore
+
+            if(_delta is None):
+                break
+
+            yield _delta
+
+        ## raises the request's error, if it failed
+        await _task
+
+##-------------------start-of-__await__()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def __await__(self) -> typing.Generator[typing.Any, None, str]:
+
+        return self._collect().__await__()
+
+##-------------------start-of-_collect()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    async def _collect(self) -> str:
+
+        await self._start()
+
+        return self.text
+
+##-------------------start-of-_start()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def _start(self) -> asyncio.Task:
+
+        if(self._task is None):
+            self._deltas = asyncio.Queue()
+            self._started_at = time.monotonic()
+            self._task = asyncio.ensure_future(self._run())
+
+        return self._task
+
+##-------------------start-of-_run()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    async def _run(self) -> None:
+
+        try:
+            await self._request(self)
+
+        finally:
+            self.duration = time.monotonic() - self._started_at
+            self._deltas.put_nowait(None) # type: ignore
+
+##-------------------start-of-_push()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    async def _push(self, delta:str) -> None:
+
+        """
+
+        Adds a delta of the evaluation. Called by the evaluators as it arrives.
+
+        """
+
+        if(not delta):
+            return
+
+        if(self.time_to_first_token is None):
+            self.time_to_first_token = time.monotonic() - self._started_at
+
+        self.text += delta
+        self._deltas.put_nowait(delta) # type: ignore
+
+        if(self._on_delta is not None):
+
+            _result = self._on_delta(delta)
+
+            if(inspect.isawaitable(_result)):
+                await _result
+
+##-------------------start-of-_finish()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def _finish(self, input_tokens:int, output_tokens:int) -> None:
+
+        """
+
+        Records the usage the provider reported, once the evaluation is complete.
+
+        """
+
+        self.input_tokens = input_tokens
+        self.output_tokens = output_tokens
+
+##-------------------start-of-_parse_partial_json()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+## a unicode escape cut off at the end of a string, which can't be closed as it is
+_incomplete_unicode_escape = re.compile(r"\\u[0-9a-fA-F]{0,3}$")
+
+def _parse_partial_json(text:str) -> typing.Any:
+
+    """
+
+    Parses the start of a JSON document, closing whatever's still open. If the end can't be closed as it is, (E.g. a key without its value) it's cut back to the last comma or opening bracket until it can.
+
+    Parameters:
+    text (string) : The start of the document.
+
+    Returns:
+    document (any) : The parsed document, None if no part of it could be parsed.
+
+    """
+
+    _closers:typing.List[str] = []
+    _in_string = False
+    _escaped = False
+
+    ## places the document can be cut back to, and what has to be closed there
+    _cuts:typing.List[typing.Tuple[int, str]] = []
+
+    for _index, _character in enumerate(text):
+
+        if(_in_string):
+
+            if(_escaped):
+                _escaped = False
+
+            elif(_character == "\\"):
+                _escaped = True
+
+            elif(_character == "\""):
+                _in_string = False
+
+        elif(_character == "\""):
+            _in_string = True
+
+        elif(_character in "{["):
+            _closers.append("}" if _character == "{" else "]")
+            _cuts.append((_index + 1, "".join(reversed(_closers))))
+
+        elif(_character in "}]" and _closers):
+            _closers.pop()
+
+        elif(_character == ","):
+            _cuts.append((_index, "".join(reversed(_closers))))
+
+    _end = text
+
+    if(_in_string):
+        _end = (text[:-1] if _escaped else _incomplete_unicode_escape.sub("", text)) + "\""
+
+    for _candidate in [_end + "".join(reversed(_closers)), *(text[:_cut] + _closing for _cut, _closing in reversed(_cuts))]:
+
+        try:
+            return json.loads(_candidate)
+
+        except ValueError:
+            continue
+
+    return None
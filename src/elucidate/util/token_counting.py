@@ -0,0 +1,325 @@
+## Copyright 2024 Kakusui LLC (https://kakusui.org) (https://github.com/Kakusui) (https://github.com/Kakusui/Elucidate)
+## Use of this source code is governed by an GNU Lesser General Public License v2.1
+## license that can be found in the LICENSE file.
+
+## built-in imports
+import typing
+import logging
+import hashlib
+import itertools
+import functools
+import threading
+
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+## third-party imports
+import tiktoken
+
+## custom modules
+from .imports.easytl_importer import MODEL_MAX_TOKENS, MODEL_COSTS, TooManyInputTokensException, ModelTranslationMessage, _update_model_name
+
+class TokenCounter:
+
+    """
+
+    Counts tokens the way Elucidate estimates them, remembering every count so texts that are validated, costed or evaluated again aren't tokenized twice.
+
+    Counts are memoized under a hash of the encoding and the text, so models that share a tokenizer share the memo and the texts themselves aren't kept. Encodings are loaded once per process. OpenAI models are counted with their own encoding. Gemini and Anthropic don't publish theirs, so they're estimated with cl100k_base, like EasyTL does.
+
+    count_many() counts a whole corpus at once. If processes is set, the texts it hasn't seen are fanned out over a process pool once there are more than process_threshold characters of them. As with any process pool, scripts need an if __name__ == "__main__" guard on platforms that spawn processes.
+
+    """
+
+    _default_max_entries:int = 250_000
+    _default_process_threshold:int = 1_000_000
+
+##-------------------start-of-__init__()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def __init__(self,
+                 max_entries:int = _default_max_entries,
+                 processes:int | None = None,
+                 process_threshold:int = _default_process_threshold
+                 ) -> None:
+
+        """
+
+        Parameters:
+        max_entries (int) : The number of counts remembered. The least recently used are evicted first.
+        processes (int or None) : How many processes count_many() can fan out over. None counts in this process.
+        process_threshold (int) : How many characters of uncounted text it takes for count_many() to use the process pool.
+
+        """
+
+        assert max_entries >= 0, ValueError("max_entries must be a non-negative integer.")
+        assert processes is None or processes >= 1, ValueError("processes must be None or a positive integer.")
+        assert process_threshold >= 0, ValueError("process_threshold must be a non-negative integer.")
+
+        self._max_entries = max_entries
+        self._processes = processes
+        self._process_threshold = process_threshold
+
+        self._memo:OrderedDict[bytes, int] = OrderedDict()
+        self._lock = threading.Lock()
+
+        ## started on the first corpus big enough to need it
+        self._executor:ProcessPoolExecutor | None = None
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+##-------------------start-of-count()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def count(self, text:str, model:str, service:typing.Literal["openai", "gemini", "anthropic"] = "openai") -> int:
+
+        """
+
+        Returns the number of tokens in text.
+
+        Parameters:
+        text (string) : The text to count.
+        model (string) : The model the text is for.
+        service (literal["openai", "gemini", "anthropic"]) : The service the model belongs to.
+
+        Returns:
+        num_tokens (int) : The number of tokens.
+
+        """
+
+        return self.count_many([text], model, service)[0]
+
+##-------------------start-of-count_many()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def count_many(self, texts:typing.Iterable[str], model:str, service:typing.Literal["openai", "gemini", "anthropic"] = "openai") -> typing.List[int]:
+
+        """
+
+        Returns the number of tokens in each text, in order. Texts that repeat are only counted once.
+
+        Parameters:
+        texts (iterable[string]) : The texts to count.
+        model (string) : The model the texts are for.
+        service (literal["openai", "gemini", "anthropic"]) : The service the model belongs to.
+
+        Returns:
+        num_tokens (list[int]) : The number of tokens in each text.
+
+        """
+
+        _encoding = _get_encoding(model, service)
+        _hash_key = _encoding.name.encode("utf-8")
+
+        _counts:typing.List[int] = []
+
+        ## the indices waiting on each uncounted text
+        _missing:typing.Dict[bytes, typing.List[int]] = {}
+        _missing_texts:typing.List[str] = []
+
+        with self._lock:
+
+            for _index, _text in enumerate(texts):
+
+                _key = hashlib.blake2b(_text.encode("utf-8", "surrogatepass"), digest_size=16, key=_hash_key).digest()
+                _count = self._memo.get(_key)
+
+                if(_count is not None):
+                    self._memo.move_to_end(_key)
+                    self.hits += 1
+
+                elif(_key in _missing):
+                    _missing[_key].append(_index)
+
+                else:
+                    _missing[_key] = [_index]
+                    _missing_texts.append(_text)
+                    self.misses += 1
+
+                _counts.append(_count or 0)
+
+        if(not _missing):
+            return _counts
+
+        _new_counts = self._count_uncached(_encoding, _missing_texts)
+
+        with self._lock:
+
+            for (_key, _indices), _count in zip(_missing.items(), _new_counts):
+
+                for _index in _indices:
+                    _counts[_index] = _count
+
+                self._remember(_key, _count)
+
+        return _counts
+
+##-------------------start-of-stats()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def stats(self) -> typing.Dict[str, int]:
+
+        """
+
+        Returns how many counts were served from the memo and how many had to be tokenized, and how many are remembered.
+
+        """
+
+        with self._lock:
+            return {"hits": self.hits,
+                    "misses": self.misses,
+                    "evictions": self.evictions,
+                    "entries": len(self._memo)}
+
+##-------------------start-of-clear()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def clear(self) -> None:
+
+        """
+
+        Forgets every count. Counters are kept.
+
+        """
+
+        with self._lock:
+            self._memo.clear()
+
+##-------------------start-of-close()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def close(self) -> None:
+
+        """
+
+        Shuts the process pool down, if one was started. It's started again if needed.
+
+        """
+
+        with self._lock:
+            _executor, self._executor = self._executor, None
+
+        if(_executor is not None):
+            _executor.shutdown()
+
+##-------------------start-of-_count_uncached()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def _count_uncached(self, encoding:tiktoken.Encoding, texts:typing.List[str]) -> typing.List[int]:
+
+        if(self._processes is None or self._processes == 1 or sum(map(len, texts)) < self._process_threshold):
+            return [len(encoding.encode_ordinary(_text)) for _text in texts]
+
+        with self._lock:
+
+            if(self._executor is None):
+                self._executor = ProcessPoolExecutor(self._processes)
+
+            _executor = self._executor
+
+        ## a few chunks per process, so one slow chunk doesn't hold the rest up
+        _chunk_size = -(-len(texts) // (self._processes * 4))
+        _chunks = [texts[_start:_start + _chunk_size] for _start in range(0, len(texts), _chunk_size)]
+
+        return list(itertools.chain.from_iterable(_executor.map(_count_tokens_in_process, itertools.repeat(encoding.name), _chunks)))
+
+##-------------------start-of-_remember()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def _remember(self, key:bytes, count:int) -> None:
+
+        if(self._max_entries == 0):
+            return
+
+        self._memo[key] = count
+        self._memo.move_to_end(key)
+
+        while(len(self._memo) > self._max_entries):
+            self._memo.popitem(last=False)
+            self.evictions += 1
+
+##-------------------start-of-_get_encoding()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+@functools.lru_cache(maxsize=None)
+def _get_encoding(model:str, service:str) -> tiktoken.Encoding:
+
+    """
+
+    Returns the encoding model is counted with. Failed loads aren't cached, so they're tried again next time.
+
+    """
+
+    if(service == "openai"):
+        return tiktoken.encoding_for_model(_update_model_name(model))
+
+    ## no local tokenizer exists for gemini or anthropic, so we'll do it openai style
+    return tiktoken.get_encoding("cl100k_base")
+
+##-------------------start-of-_count_tokens_in_process()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+def _count_tokens_in_process(encoding_name:str, texts:typing.List[str]) -> typing.List[int]:
+
+    """
+
+    Counts a chunk of texts in a pool process. tiktoken keeps the encoding loaded for the next chunk.
+
+    """
+
+    _encoding = tiktoken.get_encoding(encoding_name)
+
+    return [len(_encoding.encode_ordinary(_text)) for _text in texts]
+
+##-------------------start-of-_cost_per_token()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+def _cost_per_token(model:str) -> float:
+
+    """
+
+    Returns what a token costs with model, assuming as many tokens come back as are sent, like EasyTL does.
+
+    """
+
+    _cost_details = MODEL_COSTS.get(_update_model_name(model)) or MODEL_COSTS.get(model.removesuffix("-latest"))
+
+    assert _cost_details is not None, ValueError(f"Cost details not found for model: {model}.")
+
+    return (_cost_details["_input_cost"] + _cost_details["_output_cost"]) / 1000
+
+##-------------------start-of-_validate_text_length()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+def _validate_text_length(text:str | typing.Iterable[str] | ModelTranslationMessage | typing.Iterable[ModelTranslationMessage], model:str, service:str, counter:TokenCounter) -> None:
+
+    """
+
+    Validates the length of the input text, with the counts coming from counter. Every text is sent as its own request, so each is checked against the model's limit on its own.
+
+    Parameters:
+    text (string | typing.Iterable[string]) : The text to validate the length of.
+    model (string) : The model to validate the text length for.
+    service (string) : The service to validate the text length for.
+    counter (TokenCounter) : Counts the tokens.
+
+    """
+
+    try:
+
+        _max_tokens_allowed = MODEL_MAX_TOKENS.get(_update_model_name(model) if service == "openai" else model, {}).get("max_input_tokens")
+
+        ## silently return if the model is not in the list of models with a max token limit, there's nothing to count for
+        if(not _max_tokens_allowed):
+            return
+
+        _texts = [str(text)] if isinstance(text, (str, ModelTranslationMessage)) else [str(_text) for _text in text]
+
+        _num_tokens = max(counter.count_many(_texts, model, service), default=0)
+
+        if(_num_tokens <= _max_tokens_allowed):
+            return
+
+        ## we can do a hard error with openai since we can accurately count tokens
+        if(service == "openai"):
+            raise TooManyInputTokensException(f"Input text exceeds the maximum token limit of {model}.")
+
+        ## we can't accurately count tokens with gemini/anthropic, so we'll just do a warning
+        logging.warning(f"Input text may exceed the maximum token limit of {model}.")
+
+    except TooManyInputTokensException:
+        raise
+
+    ## soft error, the encodings have to be downloaded the first time, which isn't always possible
+    except Exception as e:
+        logging.error(f"Error validating text length: {str(e)}")
@@ -0,0 +1,121 @@
+## Copyright 2024 Kakusui LLC (https://kakusui.org) (https://github.com/Kakusui) (https://github.com/Kakusui/Elucidate)
+## Use of this source code is governed by an GNU Lesser General Public License v2.1
+## license that can be found in the LICENSE file.
+
+## built-in imports
+import typing
+
+## third-party imports
+import httpx2
+
+## custom modules
+from .classes import OpenAIHttpClient, AsyncOpenAIHttpClient, AnthropicHttpClient, AsyncAnthropicHttpClient
+
+class TransportOptions:
+
+    """
+
+    How the OpenAI and Anthropic clients connect. Passed to ElucidateClient() or set_credentials().
+
+    The defaults are the SDKs' own. The keep-alive pool should be at least as big as the semaphore (or the adaptive concurrency's max_limit), otherwise connections beyond it are closed after every request and opened again for the next one.
+
+    HTTP/2 needs the h2 package. With it every request shares one connection, so the pool size matters far less.
+
+    Gemini's gRPC channel already multiplexes its requests over one HTTP/2 connection, so these don't apply to it.
+
+    """
+
+##-------------------start-of-__init__()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def __init__(self,
+                 max_connections:int | None = 1000,
+                 max_keepalive_connections:int | None = 100,
+                 keepalive_expiry:float | None = 5.0,
+                 http2:bool = False,
+                 timeout:float | None = 600.0,
+                 connect_timeout:float | None = 5.0
+                 ) -> None:
+
+        """
+
+        Parameters:
+        max_connections (int or None) : The most connections open at once, requests past it wait for one to free up. None is unlimited.
+        max_keepalive_connections (int or None) : The most idle connections kept open for reuse. None is unlimited.
+        keepalive_expiry (float or None) : How long an idle connection is kept open, in seconds. None keeps it open until the provider closes it.
+        http2 (bool) : Whether to use HTTP/2 when the provider supports it.
+        timeout (float or None) : How long to wait for a response, or to write a request, in seconds. None waits forever.
+        connect_timeout (float or None) : How long to wait for a connection to be established, in seconds. None waits forever.
+
+        """
+
+        assert max_connections is None or max_connections >= 1, ValueError("max_connections must be None or at least 1.")
+        assert max_keepalive_connections is None or max_keepalive_connections >= 0, ValueError("max_keepalive_connections must be None or at least 0.")
+        assert keepalive_expiry is None or keepalive_expiry >= 0, ValueError("keepalive_expiry must be None or at least 0.")
+
+        self.max_connections = max_connections
+        self.max_keepalive_connections = max_keepalive_connections
+        self.keepalive_expiry = keepalive_expiry
+        self.http2 = http2
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+
+##-------------------start-of-_timeout()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def _timeout(self) -> httpx2.Timeout:
+
+        return httpx2.Timeout(self.timeout, connect=self.connect_timeout)
+
+##-------------------start-of-_build_http_clients()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def _build_http_clients(self, api_type:typing.Literal["openai", "anthropic"]) -> typing.Tuple[httpx2.Client, httpx2.AsyncClient]:
+
+        """
+
+        Makes the sync and async http clients for api_type's SDK clients. They're the SDK's own defaults with these options, so anything not set here behaves as it did.
+
+        Raises ImportError if http2 is set and h2 isn't installed.
+
+        """
+
+        _settings = {"limits": httpx2.Limits(max_connections=self.max_connections, max_keepalive_connections=self.max_keepalive_connections, keepalive_expiry=self.keepalive_expiry),
+                     "http2": self.http2,
+                     "timeout": self._timeout()}
+
+        if(api_type == "openai"):
+            return OpenAIHttpClient(**_settings), AsyncOpenAIHttpClient(**_settings)
+
+        return AnthropicHttpClient(**_settings), AsyncAnthropicHttpClient(**_settings)
+
+##-------------------start-of-_close_connections()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+def _close_connections(client:typing.Any) -> None:
+
+    """
+
+    Closes the connections a sync SDK client holds, leaving the client itself open. It connects again on its next request.
+
+    """
+
+    _http_client = client._client
+
+    for _transport in [_http_client._transport, *_http_client._mounts.values()]:
+
+        if(_transport is not None):
+            _transport.close()
+
+##-------------------start-of-_aclose_connections()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+async def _aclose_connections(client:typing.Any) -> None:
+
+    """
+
+    _close_connections() for an async SDK client.
+
+    """
+
+    _http_client = client._client
+
+    for _transport in [_http_client._transport, *_http_client._mounts.values()]:
+
+        if(_transport is not None):
+            await _transport.aclose()
@@ -0,0 +1,148 @@
+## Copyright 2024 Kakusui LLC (https://kakusui.org) (https://github.com/Kakusui) (https://github.com/Kakusui/Elucidate)
+## Use of this source code is governed by an GNU Lesser General Public License v2.1
+## license that can be found in the LICENSE file.
+
+## built-in imports
+import typing
+import threading
+import contextvars
+
+class TokenUsage:
+
+    """
+
+    Adds up the usage reported by responses, including the prompt cache reads and writes Anthropic reports when prompt caching is used.
+
+    """
+
+    _fields = ["input_tokens", "output_tokens", "cache_creation_input_tokens", "cache_read_input_tokens"]
+
+##-------------------start-of-__init__()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def __init__(self) -> None:
+
+        self.requests = 0
+
+        self.input_tokens = 0
+        self.output_tokens = 0
+        self.cache_creation_input_tokens = 0
+        self.cache_read_input_tokens = 0
+
+        ## sync evaluations can run on several threads
+        self._lock = threading.Lock()
+
+##-------------------start-of-record()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def record(self, usage:typing.Any) -> None:
+
+        """
+
+        Adds a response's usage. Fields the response doesn't report count as 0.
+
+        Parameters:
+        usage (any) : The response's usage object.
+
+        """
+
+        if(usage is None):
+            return
+
+        with self._lock:
+
+            self.requests += 1
+
+            for _field in self._fields:
+                setattr(self, _field, getattr(self, _field) + (getattr(usage, _field, 0) or 0))
+
+##-------------------start-of-hit_rate---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    @property
+    def hit_rate(self) -> float | None:
+
+        """
+
+        The fraction of input tokens that were read from the prompt cache, None if nothing was recorded yet.
+
+        """
+
+        _total = self.input_tokens + self.cache_creation_input_tokens + self.cache_read_input_tokens
+
+        return self.cache_read_input_tokens / _total if _total else None
+
+##-------------------start-of-as_dict()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    def as_dict(self) -> typing.Dict[str, typing.Any]:
+
+        with self._lock:
+            return {"requests": self.requests, **{_field: getattr(self, _field) for _field in self._fields}, "hit_rate": self.hit_rate}
+
+##-------------------start-of-attributes---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+## the usage of the evaluation call the current request belongs to, so calls running at the same time each count their own
+_call_usage:contextvars.ContextVar[TokenUsage | None] = contextvars.ContextVar("_call_usage", default=None)
+
+## the service and usage of the last call made in the current task or thread, so a caller gets its own call's usage back even while others run
+_last_call_usage:contextvars.ContextVar[typing.Tuple[typing.Any, TokenUsage] | None] = contextvars.ContextVar("_last_call_usage", default=None)
+
+##-------------------start-of-_start_call_usage()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+def _start_call_usage(service:typing.Any) -> TokenUsage:
+
+    """
+
+    Returns a TokenUsage for a new evaluation call or collected batch on service. It's the last call's for the caller's task or thread, and for service.
+
+    """
+
+    _usage = TokenUsage()
+
+    service._token_usage = _usage
+    _last_call_usage.set((service, _usage))
+
+    return _usage
+
+##-------------------start-of-_get_call_usage()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+def _get_call_usage(service:typing.Any) -> TokenUsage | None:
+
+    """
+
+    Returns the usage of the last call on service made in the current task or thread, or failing that, of the last call on service started anywhere.
+
+    """
+
+    _last = _last_call_usage.get()
+
+    if(_last is not None and _last[0] is service):
+        return _last[1]
+
+    return service._token_usage
+
+##-------------------start-of-_record_call_usage()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+def _record_call_usage(response:typing.Any) -> None:
+
+    """
+
+    Adds a response's usage to the TokenUsage of the evaluation call its request belongs to, if that call counts usage.
+
+    """
+
+    _usage = _call_usage.get()
+
+    if(_usage is not None):
+        _usage.record(getattr(response, "usage", None))
+
+##-------------------start-of-_with_call_usage()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+async def _with_call_usage(usage:TokenUsage, request:typing.Callable[[], typing.Awaitable[typing.Any]]) -> typing.Any:
+
+    """
+
+    Awaits request() with its usage counted in usage. Each request runs in a task of its own, so this only sets usage for that task, not for other calls running at the same time.
+
+    """
+
+    _call_usage.set(usage)
+
+    return await request()
@@ -0,0 +1,213 @@
+## Copyright 2024 Kakusui LLC (https://kakusui.org) (https://github.com/Kakusui) (https://github.com/Kakusui/Elucidate)
+## Use of this source code is governed by an GNU Lesser General Public License v2.1
+## license that can be found in the LICENSE file.
+
+## built-in libraries
+import asyncio
+import json
+import logging
+import os
+import sys
+import tempfile
+import typing
+
+## local stand-ins for the provider endpoints
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from mock_providers import MockProviderProcess
+from benchmark import make_client
+
+##-------------------start-of-attributes---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+texts = [f"Original text:\n文{_index}\n\nTranslated text:\nString {_index}" for _index in range(40)]
+
+## a model the token counter has no limit for, so validating texts never waits on tiktoken's download
+model = "mock-small"
+
+initial_limit = 16
+
+latency = 0.05
+
+##-------------------start-of-check_controller()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+def check_controller(state_directory:str, failures:typing.List[str]) -> None:
+
+    """
+
+    Checks the controller offline: successes grow the limit by about one per limit's worth, a rate limit error cuts it by backoff_factor once per cooldown, nearly spent rate limit headers hold it and spent ones cut it, congestion cuts it more gently, and the limit survives a save and load, clamped.
+
+    """
+
+    from elucidate import AdaptiveConcurrency
+
+    ## additive increase, each success adds 1/limit, so it takes just over a limit's worth to add one
+    _controller = AdaptiveConcurrency(initial_limit=initial_limit, latency_tolerance=None)
+
+    for _ in range(initial_limit + 1):
+        _controller.record_success(latency)
+
+    print(f"after {initial_limit + 1} successes: limit {_controller.limit}")
+
+    if(_controller.limit != initial_limit + 1):
+        failures.append(f"after {initial_limit + 1} successes the limit was {_controller.limit}, not {initial_limit + 1}")
+
+    ## multiplicative decrease, a burst of 429s from one window only counts once
+    _controller = AdaptiveConcurrency(initial_limit=initial_limit, backoff_factor=0.5)
+
+    _controller.record_rate_limit()
+    _controller.record_rate_limit()
+
+    print(f"after two 429s in a row: limit {_controller.limit}")
+
+    if(_controller.limit != initial_limit // 2):
+        failures.append(f"after two 429s in a row the limit was {_controller.limit}, not {initial_limit // 2}")
+
+    ## never below min_limit
+    _controller = AdaptiveConcurrency(initial_limit=2, min_limit=2)
+    _controller.record_rate_limit()
+
+    if(_controller.limit != 2):
+        failures.append(f"a 429 cut the limit to {_controller.limit}, below min_limit")
+
+    ## under a tenth of the window left holds, 2% or less cuts
+    _controller = AdaptiveConcurrency(initial_limit=initial_limit, latency_tolerance=None)
+    _controller.record_success(latency, {"x-ratelimit-remaining-requests": "5", "x-ratelimit-limit-requests": "100"})
+
+    if(_controller.state()["limit"] != initial_limit):
+        failures.append(f"with 5% of the window left the limit moved to {_controller.state()['limit']}, it wasn't held")
+
+    _controller.record_success(latency, {"anthropic-ratelimit-requests-remaining": "1", "anthropic-ratelimit-requests-limit": "100"})
+
+    if(_controller.limit != initial_limit // 2):
+        failures.append(f"with 1% of the window left the limit was {_controller.limit}, not {initial_limit // 2}")
+
+    ## latency past the tolerance cuts by (1 + backoff_factor) / 2
+    _controller = AdaptiveConcurrency(initial_limit=initial_limit, backoff_factor=0.5, latency_tolerance=2.0)
+    _controller.record_success(latency)
+
+    _limit = _controller.state()["limit"]
+
+    _controller.record_success(latency * 20)
+
+    if(_controller.state()["limit"] != _limit * 0.75):
+        failures.append(f"latency 20 times the best took the limit from {_limit} to {_controller.state()['limit']}, not {_limit * 0.75}")
+
+    ## a save and load round trip, and a warm start from state_path
+    _path = os.path.join(state_directory, "limit.json")
+
+    _controller = AdaptiveConcurrency(initial_limit=initial_limit)
+    _controller.record_rate_limit()
+    _controller.save(_path)
+
+    _warm = AdaptiveConcurrency(initial_limit=initial_limit, state_path=_path)
+
+    if(_warm.limit != initial_limit // 2):
+        failures.append(f"started from a saved limit of {initial_limit // 2} at {_warm.limit}")
+
+    _clamped = AdaptiveConcurrency(initial_limit=initial_limit, max_limit=4, state_path=_path)
+
+    if(_clamped.limit != 4):
+        failures.append(f"a saved limit of {initial_limit // 2} loaded as {_clamped.limit} under a max_limit of 4")
+
+    for _settings in [{"min_limit": 0}, {"min_limit": 5, "max_limit": 4}, {"backoff_factor": 1}, {"latency_tolerance": 1}]:
+
+        try:
+            AdaptiveConcurrency(**_settings)
+            failures.append(f"AdaptiveConcurrency took {_settings}")
+
+        except AssertionError as e:
+
+            if(not isinstance(e.args[0], ValueError)):
+                failures.append(f"AdaptiveConcurrency({_settings}) raised {e.args[0]!r}, not ValueError")
+
+##-------------------start-of-main()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+def main() -> int:
+
+    """
+
+    Checks the controller offline, then against the stand-in that a batch answered with 429s cuts the limit, that a clean batch never has more in flight than the limit and grows it, and that disabling saves the limit for the next controller at the same state_path.
+
+    """
+
+    ## tiktoken can't download its encodings without a network, which only matters for validating text length
+    logging.disable(logging.ERROR)
+
+    failures:typing.List[str] = []
+
+    with tempfile.TemporaryDirectory() as _directory:
+
+        check_controller(_directory, failures)
+
+        _state_path = os.path.join(_directory, "openai.json")
+
+        with MockProviderProcess() as server:
+
+            client = make_client(server)
+
+            async def _run() -> None:
+
+                _controller = client.enable_adaptive_concurrency("openai", initial_limit=initial_limit, state_path=_state_path)
+
+                ## every request rejected, the sdk's own retries included
+                server.configure(latency=latency, rate_limit_probability=1.0)
+
+                try:
+                    await client.openai_evaluate_async(texts[:4], model=model)
+                    failures.append("a batch answered only with 429s succeeded")
+
+                except Exception:
+                    pass
+
+                _cut = _controller.limit
+
+                print(f"after 429s: limit {_cut}, started at {initial_limit}, {server.stats()['rate_limited']} rate limited")
+
+                if(_cut >= initial_limit):
+                    failures.append(f"429s left the limit at {_cut}, it wasn't cut")
+
+                ## a clean batch is kept within the limit and grows it
+                server.configure(latency=latency, rate_limit_probability=0.0)
+
+                _results = await client.openai_evaluate_async(texts, model=model)
+                _stats = server.stats()
+
+                print(f"clean batch: at most {_stats['max_in_flight']} in flight, limit {_cut} grew to {_controller.limit}")
+
+                if(_results != texts):
+                    failures.append("the clean batch's results weren't the evaluations in input order")
+
+                if(_stats["max_in_flight"] > _controller.limit):
+                    failures.append(f"{_stats['max_in_flight']} requests were in flight at once over a limit of {_controller.limit}")
+
+                if(_controller.limit <= _cut):
+                    failures.append(f"a clean batch of {len(texts)} left the limit at {_controller.limit}, it didn't grow")
+
+                ## disabling saves, and the next controller starts where this one stopped
+                _learned = _controller.state()["limit"]
+
+                client.disable_adaptive_concurrency("openai")
+
+                with open(_state_path, "r", encoding="utf-8") as _file:
+                    _saved = json.load(_file)["limit"]
+
+                _next = client.enable_adaptive_concurrency("openai", initial_limit=initial_limit, state_path=_state_path)
+
+                print(f"saved limit {_saved}, next controller starts at {_next.limit}")
+
+                if(_saved != _learned or _next.limit != int(_learned)):
+                    failures.append(f"learned {_learned}, saved {_saved} and the next controller started at {_next.limit}")
+
+                client.disable_adaptive_concurrency("openai")
+
+            asyncio.run(_run())
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+
+    return 1 if failures else 0
+
+##-------------------end-of-main()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+if(__name__ == "__main__"):
+    sys.exit(main())
@@ -0,0 +1,154 @@
+## Copyright 2024 Kakusui LLC (https://kakusui.org) (https://github.com/Kakusui) (https://github.com/Kakusui/Elucidate)
+## Use of this source code is governed by an GNU Lesser General Public License v2.1
+## license that can be found in the LICENSE file.
+
+## built-in libraries
+import json
+import logging
+import os
+import sys
+import typing
+
+## local stand-ins for the provider endpoints
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from mock_providers import MockProviderProcess
+from benchmark import make_client
+
+##-------------------start-of-attributes---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+## what the stand-in does with texts containing each marker
+outcomes = {"ERRORED": "errored", "CANCELED": "canceled", "EXPIRED": "expired"}
+
+## uneven lengths, so the size limit splits them unevenly, and a marker on every seventh text
+texts = [f"Original text:\n文{_index}\n\nTranslated text:\nString {_index}{' padding' * (_index % 9 * 10)}" + (f" {list(outcomes)[_index // 7 % 3]}" if _index % 7 == 3 else "") for _index in range(23)]
+
+failed = {_index: _outcome for _index, _text in enumerate(texts) for _marker, _outcome in outcomes.items() if _marker in _text}
+
+max_requests_per_batch = 5
+
+## small enough for a few texts per batch
+max_batch_bytes = 6000
+
+##-------------------start-of-check_results()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+def check_results(name:str, client:typing.Any, batch_ids:typing.List[str], results:typing.Any, failures:typing.List[str]) -> None:
+
+    """
+
+    Checks the results are the evaluations in input order, with every failed text in errors, and that the custom_ids of the batches run across them in order.
+
+    """
+
+    _expected = [None if _index in failed else _text for _index, _text in enumerate(texts)]
+
+    if(list(results) != _expected):
+        failures.append(f"{name}: the results weren't the evaluations in input order, with None for the failed texts")
+
+    if(sorted(results.errors) != sorted(failed)):
+        failures.append(f"{name}: the errors were for {sorted(results.errors)}, not {sorted(failed)}")
+
+    for _index, _outcome in failed.items():
+
+        _message = str(results.errors.get(_index, ""))
+
+        if(("invalid_request_error" if _outcome == "errored" else _outcome) not in _message):
+            failures.append(f"{name}: text {_index} was {_outcome} but its error says {_message!r}")
+
+    if(results.batch_ids != batch_ids):
+        failures.append(f"{name}: the results came from {results.batch_ids}, not {batch_ids}")
+
+    ## every batch holds the next run of indices
+    _custom_ids = [sorted(int(_result.custom_id) for _result in client._anthropic_service._sync_client.messages.batches.results(_batch_id)) for _batch_id in batch_ids]
+
+    if([_index for _ids in _custom_ids for _index in _ids] != list(range(len(texts)))):
+        failures.append(f"{name}: the batches' custom_ids were {_custom_ids}, not the text indices split in order")
+
+##-------------------start-of-main()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+def main() -> int:
+
+    """
+
+    Submits texts that need several Message Batches, once over the request count limit and once over the size limit, and resumes them from a fresh client. Checks the chunks stay within the limits, and that succeeded, errored, canceled and expired results all map back to their texts.
+
+    """
+
+    ## tiktoken can't download its encodings without a network, which only matters for validating text length
+    logging.disable(logging.ERROR)
+
+    failures:typing.List[str] = []
+
+    with MockProviderProcess() as server:
+
+        import elucidate.evaluators.anthropic_batch_evaluator as anthropic_batch_evaluator
+
+        server.configure(batch_statuses=["in_progress", "in_progress", "ended"], batch_failures=outcomes)
+
+        ## over the request count limit
+        _client = make_client(server)
+        _batch_ids = _client.anthropic_evaluate_batch(texts, wait=False, max_requests_per_batch=max_requests_per_batch)
+
+        _chunks = anthropic_batch_evaluator._anthropic_build_batch_requests(_client._anthropic_service._build_evaluation_batches(texts), max_requests_per_batch=max_requests_per_batch, _protocol=_client._anthropic_service)
+
+        print(f"count limit: {len(texts)} texts in {len(_batch_ids)} batches of {[len(_chunk) for _chunk in _chunks]}")
+
+        if(len(_batch_ids) != -(-len(texts) // max_requests_per_batch) or any(len(_chunk) > max_requests_per_batch for _chunk in _chunks)):
+            failures.append(f"count limit: {len(texts)} texts went into batches of {[len(_chunk) for _chunk in _chunks]}, not batches of at most {max_requests_per_batch}")
+
+        _status = _client.anthropic_batch_status(_batch_ids)
+
+        if(_status != "in_progress"):
+            failures.append(f"count limit: the status after one retrieve was {_status}, not in_progress")
+
+        ## a fresh client, all it knows is the ids
+        _fresh = make_client(server)
+        _results = _fresh.anthropic_resume_batch(_batch_ids, poll_interval=0.01)
+
+        check_results("count limit", _fresh, _batch_ids, _results, failures)
+
+        if(_fresh.anthropic_batch_status(_batch_ids) != "ended"):
+            failures.append("count limit: the batches hadn't ended after resuming")
+
+        ## over the size limit, which is lowered so a few texts fill a batch
+        _max_bytes = anthropic_batch_evaluator._anthropic_batch_max_bytes
+        anthropic_batch_evaluator._anthropic_batch_max_bytes = max_batch_bytes
+
+        try:
+
+            _batch_ids = _client.anthropic_evaluate_batch(texts, wait=False)
+
+            _chunks = anthropic_batch_evaluator._anthropic_build_batch_requests(_client._anthropic_service._build_evaluation_batches(texts), _protocol=_client._anthropic_service)
+            _sizes = [sum(len(json.dumps(_request, default=str).encode("utf-8")) for _request in _chunk) for _chunk in _chunks]
+
+        finally:
+            anthropic_batch_evaluator._anthropic_batch_max_bytes = _max_bytes
+
+        print(f"size limit: {len(texts)} texts in {len(_batch_ids)} batches of {_sizes} bytes")
+
+        if(len(_batch_ids) != len(_chunks) or len(_chunks) < 2):
+            failures.append(f"size limit: {len(texts)} texts went into {len(_batch_ids)} batches, not split by size")
+
+        if(any(_size > max_batch_bytes * anthropic_batch_evaluator._anthropic_batch_byte_margin and len(_chunk) > 1 for _size, _chunk in zip(_sizes, _chunks))):
+            failures.append(f"size limit: batches of {_sizes} bytes went over {max_batch_bytes * anthropic_batch_evaluator._anthropic_batch_byte_margin:.0f}")
+
+        _fresh = make_client(server)
+        _results = _fresh.anthropic_resume_batch(_batch_ids, poll_interval=0.01)
+
+        check_results("size limit", _fresh, _batch_ids, _results, failures)
+
+        ## waiting submits and collects in one call
+        _results = make_client(server).anthropic_evaluate_batch(texts, max_requests_per_batch=max_requests_per_batch, poll_interval=0.01)
+
+        if(list(_results) != [None if _index in failed else _text for _index, _text in enumerate(texts)] or len(_results.batch_ids) != -(-len(texts) // max_requests_per_batch)):
+            failures.append("waiting: the results of several batches weren't the evaluations in input order")
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+
+    return 1 if failures else 0
+
+##-------------------end-of-main()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+if(__name__ == "__main__"):
+    sys.exit(main())
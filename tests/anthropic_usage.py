@@ -0,0 +1,102 @@
+## Copyright 2024 Kakusui LLC (https://kakusui.org) (https://github.com/Kakusui) (https://github.com/Kakusui/Elucidate)
+## Use of this source code is governed by an GNU Lesser General Public License v2.1
+## license that can be found in the LICENSE file.
+
+## built-in libraries
+import asyncio
+import logging
+import os
+import sys
+import typing
+
+## local stand-ins for the provider endpoints
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from mock_providers import MockProviderProcess
+from benchmark import make_client
+
+##-------------------start-of-attributes---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+## a model the token counter has no limit for, so validating texts never waits on tiktoken's download
+model = "claude-mock"
+
+## calls of different sizes, so a mix of their usage can't add up to either
+sizes = {"small": 3, "large": 11}
+
+texts = {_name: [f"Original text:\n文{_index}\n\nTranslated text:\n{_name} {_index}" for _index in range(_size)] for _name, _size in sizes.items()}
+
+##-------------------start-of-main()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+def main() -> int:
+
+    """
+
+    Runs Anthropic evaluation calls of different sizes at the same time on one client, and checks each gets the usage of its own requests back from get_anthropic_usage(), whether they're async or sync on threads.
+
+    """
+
+    ## tiktoken can't download its encodings without a network, which only matters for validating text length
+    logging.disable(logging.ERROR)
+
+    failures:typing.List[str] = []
+
+    with MockProviderProcess() as server:
+
+        client = make_client(server)
+
+        ## each call ends with its stand-in response's usage, one per text
+        async def _call(name:str, **kwargs) -> typing.Dict[str, typing.Any]:
+            await client.anthropic_evaluate_async(texts[name], model=model, cache_instructions=True, **kwargs)
+            return client.get_anthropic_usage()
+
+        async def _run() -> typing.List[typing.Dict[str, typing.Any]]:
+
+            ## both calls overlap, the lazy one runs as a stream of its own
+            return await asyncio.gather(_call("small"), _call("large", ingestion_window=2))
+
+        _usages = asyncio.run(_run())
+
+        print(f"async: {[_usage['requests'] for _usage in _usages]} requests counted for calls of {list(sizes.values())}")
+
+        for (_name, _size), _usage in zip(sizes.items(), _usages):
+
+            if(_usage["requests"] != _size):
+                failures.append(f"async: the {_name} call's usage counted {_usage['requests']} requests, not its {_size}")
+
+        ## outside the calls' tasks, the last one started
+        if(client.get_anthropic_usage()["requests"] not in sizes.values()):
+            failures.append(f"async: the client's usage counted {client.get_anthropic_usage()['requests']} requests, not one call's")
+
+        ## sync calls on their own threads, each with a thread pool of its own
+        import threading
+
+        _sync_usages:typing.Dict[str, typing.Dict[str, typing.Any]] = {}
+
+        def _sync_call(name:str) -> None:
+            client.anthropic_evaluate(texts[name], model=model, max_workers=4)
+            _sync_usages[name] = client.get_anthropic_usage()
+
+        _threads = [threading.Thread(target=_sync_call, args=(_name,)) for _name in sizes]
+
+        for _thread in _threads:
+            _thread.start()
+
+        for _thread in _threads:
+            _thread.join()
+
+        print(f"sync: {[_sync_usages[_name]['requests'] for _name in sizes]} requests counted for calls of {list(sizes.values())}")
+
+        for _name, _size in sizes.items():
+
+            if(_sync_usages[_name]["requests"] != _size):
+                failures.append(f"sync: the {_name} call's usage counted {_sync_usages[_name]['requests']} requests, not its {_size}")
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+
+    return 1 if failures else 0
+
+##-------------------end-of-main()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+if(__name__ == "__main__"):
+    sys.exit(main())
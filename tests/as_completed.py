@@ -0,0 +1,172 @@
+## Copyright 2024 Kakusui LLC (https://kakusui.org) (https://github.com/Kakusui) (https://github.com/Kakusui/Elucidate)
+## Use of this source code is governed by an GNU Lesser General Public License v2.1
+## license that can be found in the LICENSE file.
+
+## built-in libraries
+import asyncio
+import logging
+import os
+import sys
+import time
+import typing
+
+## local stand-ins for the provider endpoints
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from mock_providers import MockProviderProcess
+from benchmark import make_client
+
+##-------------------start-of-attributes---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+texts = [f"Original text:\n文{_index}\n\nTranslated text:\nString {_index}" for _index in range(20)]
+
+## a model the token counter has no limit for, so validating texts never waits on tiktoken's download
+model = "mock-small"
+
+concurrency = 4
+latency = 0.1
+
+## the first text takes this much longer than the rest, which all finish well within it, 19 texts 3 at a time
+head_delay = 1.0
+
+## how much longer than the head a lazily ingested list may take, much less than the 4 rounds the rest would need if they waited for the head
+margin = 0.25
+
+## the text whose request raises
+failing_index = 5
+
+passing = texts[:failing_index] + texts[failing_index + 1:]
+
+##-------------------start-of-slow_head()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+def slow_head(function:typing.Callable) -> typing.Callable:
+
+    """
+
+    A decorator that holds the first text's request back by head_delay, and fails the one at failing_index.
+
+    """
+
+    async def _decorated(instructions:typing.Any, prompt:typing.Any) -> typing.Any:
+
+        if(prompt.content == texts[0]):
+            await asyncio.sleep(head_delay)
+
+        if(prompt.content == texts[failing_index]):
+            raise ValueError("failed on purpose")
+
+        return await function(instructions, prompt)
+
+    return _decorated
+
+##-------------------start-of-main()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+def main() -> int:
+
+    """
+
+    Checks evaluate_stream() against the stand-in with a slow first text: unordered, results come as they finish without waiting on it, ordered, in input order, failures are yielded in place with return_exceptions and end the stream without, stopping early sends nothing more, and a lazily ingested list isn't held up by its head either.
+
+    """
+
+    ## tiktoken can't download its encodings without a network, which only matters for validating text length
+    logging.disable(logging.ERROR)
+
+    failures:typing.List[str] = []
+
+    with MockProviderProcess() as server:
+
+        client = make_client(server)
+
+        settings = {"model": model, "semaphore": concurrency, "decorator": slow_head}
+
+        server.configure(latency=latency)
+
+        async def _run() -> None:
+
+            for _ordered in [False, True]:
+
+                _name = "ordered" if _ordered else "unordered"
+
+                _start = time.monotonic()
+                _received:typing.List[typing.Tuple[int, typing.Any, float]] = []
+
+                async for _index, _result in client.evaluate_stream(texts, "openai", ordered=_ordered, return_exceptions=True, **settings):
+                    _received.append((_index, _result, time.monotonic() - _start))
+
+                _indices = [_index for _index, _, _ in _received]
+
+                print(f"{_name}: first result after {_received[0][2]:.3f}s, index {_indices[0]}, last index {_indices[-1]}")
+
+                if(sorted(_indices) != list(range(len(texts)))):
+                    failures.append(f"{_name}: yielded indices {_indices}, not each one once")
+
+                for _index, _result, _ in _received:
+
+                    if(_index == failing_index):
+
+                        if(not isinstance(_result, ValueError)):
+                            failures.append(f"{_name}: the failed text yielded {_result!r}, not its exception")
+
+                    elif(_result != texts[_index]):
+                        failures.append(f"{_name}: index {_index} yielded another text's evaluation")
+
+                if(_ordered and _indices != list(range(len(texts)))):
+                    failures.append(f"ordered: yielded indices {_indices}, not in input order")
+
+                if(not _ordered and (_indices[-1] != 0 or _received[0][2] >= head_delay)):
+                    failures.append(f"unordered: the first result came after {_received[0][2]:.3f}s and the head was yielded at position {_indices.index(0)}, the stream waited on the slow head")
+
+            ## without return_exceptions a failure ends the stream
+            try:
+
+                async for _ in client.evaluate_stream(texts, "openai", **settings):
+                    pass
+
+                failures.append("a failed text didn't end the stream")
+
+            except ValueError:
+                pass
+
+            ## the consumer stops early, nothing more is admitted
+            server.configure(latency=latency)
+
+            _stream = client.evaluate_stream(passing, "openai", **settings)
+
+            async for _ in _stream:
+                break
+
+            await _stream.aclose()
+            await asyncio.sleep(latency * 2)
+
+            print(f"stopped early: {server.stats()['requests']} requests of {len(passing)} sent")
+
+            if(server.stats()["requests"] > concurrency * 2):
+                failures.append(f"stopped early: {server.stats()['requests']} requests were sent after the consumer stopped, not just those already admitted")
+
+            ## a lazily ingested list keeps admitting while its head is slow
+            _start = time.monotonic()
+
+            _results = await client.openai_evaluate_async(iter(passing), **settings)
+
+            _elapsed = time.monotonic() - _start
+
+            print(f"lazy list: {len(_results)} evaluated in {_elapsed:.3f}s with a head taking {head_delay}s")
+
+            if(_results != passing):
+                failures.append("lazy list: the results weren't the evaluations in input order")
+
+            if(_elapsed >= head_delay + margin):
+                failures.append(f"lazy list: took {_elapsed:.3f}s, the rest waited on the slow head")
+
+        asyncio.run(_run())
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+
+    return 1 if failures else 0
+
+##-------------------end-of-main()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+if(__name__ == "__main__"):
+    sys.exit(main())
@@ -0,0 +1,334 @@
+## Copyright 2024 Kakusui LLC (https://kakusui.org) (https://github.com/Kakusui) (https://github.com/Kakusui/Elucidate)
+## Use of this source code is governed by an GNU Lesser General Public License v2.1
+## license that can be found in the LICENSE file.
+
+## built-in libraries
+import argparse
+import asyncio
+import functools
+import logging
+import json
+import math
+import os
+import sys
+import time
+
+## local stand-ins for the provider endpoints
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from mock_providers import MockProviderProcess
+
+##-------------------start-of-attributes---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+providers = ["openai", "anthropic", "gemini"]
+
+## requests in flight, the semaphore for the async paths and max_workers for the sync ones
+concurrency_levels = [4, 16, 64]
+
+## texts per call
+batch_sizes = [64, 256]
+
+## seconds every stand-in response takes in the gated runs, long enough that the client's own overhead at the highest concurrency level stays well below it
+server_latency = 0.1
+
+## throughput must be at least this share of what server_latency allows at a concurrency level, otherwise the run fails
+## low enough to hold on a noisy ci runner, high enough to catch requests being serialized or the concurrency limit being ignored (at most 0.25 at 4 in flight)
+## smaller slowdowns show up by comparing the --json output across commits
+min_efficiency = 0.35
+
+## above this the client's cpu (mostly the sdks building and parsing requests) bounds throughput on a ci runner rather than how elucidate schedules them, so higher levels are reported but not gated
+max_gated_concurrency = 16
+
+## the share of requests answered with a 429 in the rate limited runs, which are reported but not gated
+rate_limit_probability = 0.05
+
+##-------------------start-of-make_client()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+def make_client(server:MockProviderProcess):
+
+    """
+
+    Returns an ElucidateClient whose three services all talk to server.
+
+    """
+
+    ## the sdks read these when their clients are made
+    os.environ["OPENAI_BASE_URL"] = f"{server.url}/v1"
+    os.environ["ANTHROPIC_BASE_URL"] = server.url
+
+    from elucidate import ElucidateClient
+
+    client = ElucidateClient(openai_api_key="benchmark", gemini_api_key="benchmark", anthropic_api_key="benchmark")
+
+    ## gemini talks grpc and has no base url variable, its client is swapped for one on an insecure channel to the stand-in
+    import grpc
+    from google.ai.generativelanguage_v1beta.services.generative_service import GenerativeServiceClient, transports
+
+    client._gemini_service._client_manager.clients["generative"] = GenerativeServiceClient(transport=transports.GenerativeServiceGrpcTransport(channel=grpc.insecure_channel(server.grpc_address)))
+
+    ## the stand-in takes any key, so the probe requests are skipped
+    for _provider in providers:
+        client._credential_cache.mark_verified(_provider)
+
+    return client
+
+##-------------------start-of-retry()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+def retry(function):
+
+    """
+
+    Retries 429s, as a user's decorator would. The openai and anthropic sdks retry them themselves first.
+
+    """
+
+    def _is_rate_limit(_e:Exception) -> bool:
+        return getattr(_e, "status_code", None) == 429 or getattr(_e, "code", None) == 429
+
+    if(asyncio.iscoroutinefunction(function)):
+
+        @functools.wraps(function)
+        async def _retrying_async(*args, **kwargs):
+            for _attempt in range(5):
+                try:
+                    return await function(*args, **kwargs)
+                except Exception as _e:
+                    if(not _is_rate_limit(_e) or _attempt == 4):
+                        raise
+                    await asyncio.sleep(0.01)
+
+        return _retrying_async
+
+    @functools.wraps(function)
+    def _retrying(*args, **kwargs):
+        for _attempt in range(5):
+            try:
+                return function(*args, **kwargs)
+            except Exception as _e:
+                if(not _is_rate_limit(_e) or _attempt == 4):
+                    raise
+                time.sleep(0.01)
+
+    return _retrying
+
+##-------------------start-of-percentile()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+def percentile(values:list[float], share:float) -> float:
+
+    if(not values):
+        return float("nan")
+
+    _sorted = sorted(values)
+
+    return _sorted[min(len(_sorted) - 1, math.ceil(share * len(_sorted)) - 1)]
+
+##-------------------start-of-peak_rss_mb()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+def peak_rss_mb() -> float:
+
+    """
+
+    Returns the process's peak resident set size so far, in MB. NaN where the resource module isn't available. (Windows)
+
+    """
+
+    try:
+        import resource
+
+    except ImportError:
+        return float("nan")
+
+    _peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    ## bytes on macOS, kilobytes everywhere else
+    return _peak / (1024 * 1024) if sys.platform == "darwin" else _peak / 1024
+
+##-------------------start-of-Scenario---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+class Scenario:
+
+    """
+
+    One call to time: a provider, a path, a concurrency level, a batch size and how the stand-in behaves.
+
+    """
+
+    def __init__(self, provider:str, path:str, concurrency:int, batch_size:int, latency:str = "fixed", rate_limited:bool = False) -> None:
+
+        self.provider = provider
+        self.path = path
+        self.concurrency = concurrency
+        self.batch_size = batch_size
+        self.latency = latency
+        self.rate_limited = rate_limited
+
+    @property
+    def gated(self) -> bool:
+
+        ## the lognormal tail and 429 retries make the ideal throughput a guess, those runs are only reported
+        return self.latency == "fixed" and not self.rate_limited and self.concurrency <= max_gated_concurrency
+
+    @property
+    def name(self) -> str:
+        return f"{self.provider}/{self.path} c={self.concurrency} n={self.batch_size}{' lognormal' if self.latency != 'fixed' else ''}{' 429s' if self.rate_limited else ''}"
+
+    def configure(self, server:MockProviderProcess) -> None:
+
+        server.configure(latency=server_latency,
+                         latency_p99=server_latency * 5 if self.latency == "lognormal" else None,
+                         rate_limit_probability=rate_limit_probability if self.rate_limited else 0.0)
+
+    def kwargs(self) -> dict:
+
+        _kwargs:dict = {"semaphore": self.concurrency} if self.path == "async" else {"max_workers": self.concurrency}
+
+        if(self.rate_limited):
+            _kwargs["decorator"] = retry
+
+        return _kwargs
+
+##-------------------start-of-measure()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+def measure(scenario:Scenario, server_stats:dict, elapsed:float, latencies:list[float], retries:int) -> dict:
+
+    """
+
+    Returns the scenario's results.
+
+    """
+
+    _ideal_throughput = min(scenario.concurrency, scenario.batch_size) / server_latency
+    _throughput = scenario.batch_size / elapsed
+
+    return {"scenario": scenario.name,
+            "provider": scenario.provider,
+            "path": scenario.path,
+            "concurrency": scenario.concurrency,
+            "batch_size": scenario.batch_size,
+            "requests_per_second": _throughput,
+            "p50_latency": percentile(latencies, 0.5),
+            "p99_latency": percentile(latencies, 0.99),
+            "efficiency": _throughput / _ideal_throughput,
+            "max_in_flight": server_stats["max_in_flight"],
+            "rate_limited": server_stats["rate_limited"],
+            "retries": retries,
+            "peak_rss_mb": peak_rss_mb(),
+            "gated": scenario.gated}
+
+##-------------------start-of-main()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+def main() -> int:
+
+    global server_latency, min_efficiency
+
+    parser = argparse.ArgumentParser(description="Measures Elucidate's throughput against local stand-ins for the provider endpoints.")
+    parser.add_argument("--providers", nargs="+", choices=providers, default=providers)
+    parser.add_argument("--concurrency", nargs="+", type=int, default=concurrency_levels)
+    parser.add_argument("--batch-sizes", nargs="+", type=int, default=batch_sizes)
+    parser.add_argument("--latency", type=float, default=server_latency, help="Seconds every stand-in response takes.")
+    parser.add_argument("--min-efficiency", type=float, default=min_efficiency, help="Fail if a gated run's throughput is below this share of the ideal.")
+    parser.add_argument("--json", help="Also write the results to this file.")
+    arguments = parser.parse_args()
+
+    server_latency = arguments.latency
+    min_efficiency = arguments.min_efficiency
+
+    ## tiktoken can't fetch its encodings offline, the length check logs that and carries on
+    logging.disable(logging.ERROR)
+
+    from elucidate import Metrics
+
+    scenarios = [Scenario(_provider, _path, _concurrency, _batch_size)
+                 for _provider in arguments.providers
+                 for _path in ["async", "sync"]
+                 for _batch_size in arguments.batch_sizes
+                 for _concurrency in arguments.concurrency]
+
+    scenarios += [Scenario(_provider, "async", max(arguments.concurrency), max(arguments.batch_sizes), latency="lognormal") for _provider in arguments.providers]
+    scenarios += [Scenario(_provider, "async", max(arguments.concurrency), max(arguments.batch_sizes), rate_limited=True) for _provider in arguments.providers]
+
+    results = []
+    failures = []
+
+    with MockProviderProcess() as server:
+
+        client = make_client(server)
+
+        latencies:list[float] = []
+
+        def _record(_event:dict) -> None:
+            if(_event["type"] == "attempt" and _event["latency"] is not None):
+                latencies.append(_event["latency"])
+
+        def _run(scenario:Scenario, elapsed:float, metrics) -> None:
+
+            _retries = sum(_series["retries"] for _series in metrics.snapshot().values())
+            _result = measure(scenario, server.stats(), elapsed, latencies, _retries)
+
+            results.append(_result)
+
+            print(f"{_result['scenario']:<40} {_result['requests_per_second']:>8.1f} req/s  p50 {_result['p50_latency'] * 1000:>7.1f}ms  p99 {_result['p99_latency'] * 1000:>7.1f}ms  "
+                  f"efficiency {_result['efficiency']:.2f}  in flight {_result['max_in_flight']:>3}  429s {_result['rate_limited']:>3}  retries {_result['retries']:>3}  peak rss {_result['peak_rss_mb']:.0f}MB")
+
+            if(scenario.gated and _result["efficiency"] < min_efficiency):
+                failures.append(f"{scenario.name} ran at {_result['efficiency']:.2f} of the ideal throughput, the floor is {min_efficiency}")
+
+        def _prepare(scenario:Scenario):
+
+            _metrics = Metrics(callback=_record)
+
+            latencies.clear()
+            scenario.configure(server)
+            client.set_metrics(_metrics)
+
+            return [f"Original: text {_i}\nTranslation: text {_i}" for _i in range(scenario.batch_size)], _metrics
+
+        ## the first requests open the connections and warm the sdks up, so they're made before anything is timed
+        _warm_ups = [Scenario(_provider, _path, max(arguments.concurrency), max(arguments.concurrency)) for _provider in arguments.providers for _path in ["async", "sync"]]
+
+        ## all the async runs share one event loop, the sdk's async clients are bound to the loop they were first used in
+        async def _run_async() -> None:
+
+            ## grpc's async channels belong to the loop they're made in
+            import grpc
+            from google.ai.generativelanguage_v1beta.services.generative_service import GenerativeServiceAsyncClient, transports
+
+            client._gemini_service._client_manager.clients["generative_async"] = GenerativeServiceAsyncClient(transport=transports.GenerativeServiceGrpcAsyncIOTransport(channel=grpc.aio.insecure_channel(server.grpc_address)))
+
+            for scenario in [_scenario for _scenario in _warm_ups if _scenario.path == "async"]:
+                await client.evaluate_async(_prepare(scenario)[0], scenario.provider, **scenario.kwargs())
+
+            for scenario in [_scenario for _scenario in scenarios if _scenario.path == "async"]:
+
+                _texts, _metrics = _prepare(scenario)
+
+                _started_at = time.perf_counter()
+                await client.evaluate_async(_texts, scenario.provider, **scenario.kwargs())
+                _run(scenario, time.perf_counter() - _started_at, _metrics)
+
+        for scenario in [_scenario for _scenario in _warm_ups if _scenario.path == "sync"]:
+            client.evaluate(_prepare(scenario)[0], scenario.provider, **scenario.kwargs())
+
+        for scenario in [_scenario for _scenario in scenarios if _scenario.path == "sync"]:
+
+            _texts, _metrics = _prepare(scenario)
+
+            _started_at = time.perf_counter()
+            client.evaluate(_texts, scenario.provider, **scenario.kwargs())
+            _run(scenario, time.perf_counter() - _started_at, _metrics)
+
+        asyncio.run(_run_async())
+
+    if(arguments.json is not None):
+        with open(arguments.json, "w", encoding="utf-8") as _file:
+            json.dump(results, _file, indent=2)
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+
+    return 1 if failures else 0
+
+##-------------------end-of-main()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+if(__name__ == "__main__"):
+    sys.exit(main())
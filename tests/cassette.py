@@ -0,0 +1,174 @@
+## Copyright 2024 Kakusui LLC (https://kakusui.org) (https://github.com/Kakusui) (https://github.com/Kakusui/Elucidate)
+## Use of this source code is governed by an GNU Lesser General Public License v2.1
+## license that can be found in the LICENSE file.
+
+## built-in libraries
+import asyncio
+import logging
+import os
+import sys
+import tempfile
+import time
+import typing
+
+## local stand-ins for the provider endpoints
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from mock_providers import MockProviderProcess
+from benchmark import make_client
+
+##-------------------start-of-attributes---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+texts = [f"Original text:\n文{_index}\n\nTranslated text:\nString {_index}" for _index in range(10)]
+
+unrecorded_text = "Original text:\n新\n\nTranslated text:\nNew"
+
+## models the token counter has no limit for, so validating texts never waits on tiktoken's download
+models = {"openai": "mock-small", "anthropic": "claude-mock", "gemini": "gemini-1.5-flash"}
+
+## every request in flight at once, so a batch takes about one latency
+latency = 0.2
+
+## how far a replay at speed may be off the recording's time divided by it, either way
+tolerance = 0.1
+
+##-------------------start-of-main()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+def main() -> int:
+
+    """
+
+    Checks against the stand-in that a cassette records every provider's responses, and that replaying it gives the same results without sending a request or checking credentials, through the sync and async paths alike, waiting out the recorded latency divided by speed. A request that was never recorded raises CassetteMissException, or is kept in errors with max_workers.
+
+    """
+
+    from elucidate import Cassette, CassetteMissException
+
+    ## tiktoken can't download its encodings without a network, which only matters for validating text length
+    logging.disable(logging.ERROR)
+
+    failures:typing.List[str] = []
+
+    with tempfile.TemporaryDirectory() as _directory, MockProviderProcess() as server:
+
+        _path = os.path.join(_directory, "traffic.db")
+
+        client = make_client(server)
+
+        async def _run() -> None:
+
+            ## record, async for openai and sync for the other two
+            server.configure(latency=latency)
+
+            _cassette = Cassette(_path, mode="record")
+            client.set_cassette(_cassette)
+
+            _start = time.monotonic()
+            _recorded = {"openai": await client.openai_evaluate_async(texts, model=models["openai"], semaphore=len(texts))}
+            _recording_time = time.monotonic() - _start
+
+            _recorded |= {"anthropic": client.anthropic_evaluate(texts[:2], model=models["anthropic"]),
+                          "gemini": client.gemini_evaluate(texts[:2], model=models["gemini"])}
+
+            _cassette.close()
+
+            _sent = server.stats()["requests"]
+
+            print(f"recorded: {_cassette.stats()['recorded']} responses from {_sent} requests")
+
+            if(_cassette.stats()["recorded"] != len(texts) + 4 or _sent != len(texts) + 4):
+                failures.append(f"recorded {_cassette.stats()['recorded']} responses from {_sent} requests, not {len(texts) + 4}")
+
+            ## replay, right away, with no credentials checked
+            server.configure(latency=latency)
+            client._credential_cache.clear()
+
+            _cassette = Cassette(_path, mode="replay", speed=None)
+            client.set_cassette(_cassette)
+
+            _start = time.monotonic()
+
+            _replayed = {"openai": await client.openai_evaluate_async(texts, model=models["openai"], semaphore=len(texts)),
+                         "anthropic": client.anthropic_evaluate(texts[:2], model=models["anthropic"]),
+                         "gemini": client.gemini_evaluate(texts[:2], model=models["gemini"])}
+
+            _elapsed = time.monotonic() - _start
+
+            print(f"replayed at no speed limit: {_cassette.stats()['replayed']} responses in {_elapsed:.3f}s, {server.stats()['requests']} requests sent")
+
+            if(_replayed != _recorded):
+                failures.append("replaying gave different results than the recording")
+
+            if(server.stats()["requests"] != 0):
+                failures.append(f"replaying sent {server.stats()['requests']} requests")
+
+            if(_elapsed >= latency):
+                failures.append(f"replaying with speed=None took {_elapsed:.3f}s, the recorded latency was waited out")
+
+            ## traffic recorded async replays sync, the fingerprints are shared
+            if(client.openai_evaluate(texts[:3], model=models["openai"]) != texts[:3] or server.stats()["requests"] != 0):
+                failures.append("openai traffic recorded async didn't replay through openai_evaluate()")
+
+            ## a request that was never recorded
+            try:
+                client.openai_evaluate(unrecorded_text, model=models["openai"])
+                failures.append("an unrecorded request was answered")
+
+            except CassetteMissException:
+                pass
+
+            _results = client.openai_evaluate([texts[0], unrecorded_text], model=models["openai"], max_workers=2)
+
+            if(_results[0] != texts[0] or not isinstance(_results.errors.get(1), CassetteMissException)):
+                failures.append(f"with max_workers, an unrecorded request gave {_results!r}, not a CassetteMissException in errors")
+
+            _cassette.close()
+
+            ## at speed, the recorded latencies divided by it, so about as long as the openai batch took to record
+            for _speed in [1.0, 2.0]:
+
+                _cassette = Cassette(_path, mode="replay", speed=_speed)
+                client.set_cassette(_cassette)
+
+                _start = time.monotonic()
+                await client.openai_evaluate_async(texts, model=models["openai"], semaphore=len(texts))
+                _elapsed = time.monotonic() - _start
+
+                print(f"replayed at speed {_speed}: {_elapsed:.3f}s for a batch that took {_recording_time:.3f}s to record")
+
+                if(abs(_elapsed - _recording_time / _speed) > tolerance):
+                    failures.append(f"replaying at speed {_speed} took {_elapsed:.3f}s, not about {_recording_time / _speed:.3f}s")
+
+                _cassette.close()
+
+            ## back to the provider
+            client.set_cassette(None)
+            server.configure(latency=0.0)
+
+            await client.openai_evaluate_async(texts, model=models["openai"])
+
+            if(server.stats()["requests"] != len(texts)):
+                failures.append(f"after set_cassette(None), {server.stats()['requests']} requests were sent, not {len(texts)}")
+
+        asyncio.run(_run())
+
+    for _mode, _speed in [("stream", 1.0), ("record", 0), ("record", -1.0)]:
+
+        try:
+            Cassette(os.devnull, mode=_mode, speed=_speed) # type: ignore
+            failures.append(f"Cassette took mode={_mode} and speed={_speed}")
+
+        except AssertionError as e:
+
+            if(not isinstance(e.args[0], ValueError)):
+                failures.append(f"Cassette(mode={_mode}, speed={_speed}) raised {e.args[0]!r}, not ValueError")
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+
+    return 1 if failures else 0
+
+##-------------------end-of-main()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+if(__name__ == "__main__"):
+    sys.exit(main())
@@ -0,0 +1,245 @@
+## Copyright 2024 Kakusui LLC (https://kakusui.org) (https://github.com/Kakusui) (https://github.com/Kakusui/Elucidate)
+## Use of this source code is governed by an GNU Lesser General Public License v2.1
+## license that can be found in the LICENSE file.
+
+## built-in libraries
+import asyncio
+import logging
+import os
+import sys
+import time
+import typing
+
+## local stand-ins for the provider endpoints
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from mock_providers import MockProviderProcess
+from benchmark import make_client
+
+##-------------------start-of-attributes---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+paragraphs = 8
+
+source = "\n\n".join(f"第{_index}段落です。短い文がふたつあります。" for _index in range(paragraphs))
+translation = "\n\n".join(f"This is paragraph {_index}. It has two short sentences." for _index in range(paragraphs))
+
+## the same number of paragraphs on both sides, but a different number of sentences in one of them
+uneven_translation = translation.replace("This is paragraph 3.", "This is paragraph 3. It has a third sentence as well.")
+
+## a model the token counter estimates with cl100k_base and has no limit for
+model = "claude-mock"
+
+## tokens per chunk, a few paragraphs' worth of both sides
+token_budget = 80
+
+latency = 0.2
+
+## the paragraph whose chunk's request raises
+failing_paragraph = "paragraph 5."
+
+##-------------------start-of-count_characters()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+def count_characters(strings:typing.List[str]) -> typing.List[int]:
+
+    """
+
+    Counts a character as a token, so the chunking can be checked without a tokenizer.
+
+    """
+
+    return [len(_string) for _string in strings]
+
+##-------------------start-of-failing_chunk()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+def failing_chunk(function:typing.Callable) -> typing.Callable:
+
+    """
+
+    A decorator that fails the chunk holding failing_paragraph.
+
+    """
+
+    def _decorated(instructions:typing.Any, prompt:typing.Any) -> typing.Any:
+
+        if(failing_paragraph in prompt.content):
+            raise ValueError("failed on purpose")
+
+        return function(instructions, prompt)
+
+    return _decorated
+
+##-------------------start-of-check_chunking()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+def check_chunking(failures:typing.List[str]) -> None:
+
+    """
+
+    Checks the chunking offline, counting characters: split pieces join back into the text, chunks keep the source and translation of the same paragraphs together and stay within the budget, sides that don't line up are still cut into matching shares, chunks are spread over the slots but not made tiny, and stitching puts the evaluations back in order with a failed chunk failing its text.
+
+    """
+
+    from elucidate import BatchResults
+    from elucidate.util.chunking import _split_units, _boundaries, _chunk_sides, _chunk_budget, _stitch_evaluations
+
+    for _level, _boundary in enumerate(_boundaries):
+
+        _units = _split_units(translation, _boundary)
+
+        if("".join(_units) != translation or len(_units) < paragraphs):
+            failures.append(f"splitting at boundary {_level} gave {len(_units)} pieces that don't join back into the text")
+
+    _budget = sum(count_characters([source, translation])) // 3
+
+    _chunks = _chunk_sides([source, translation], _budget, count_characters)
+
+    print(f"chunking: {len(_chunks)} chunks of at most {max(sum(count_characters(_chunk)) for _chunk in _chunks)} characters for a budget of {_budget}")
+
+    if(len(_chunks) < 3 or any(sum(count_characters(_chunk)) > _budget for _chunk in _chunks)):
+        failures.append(f"chunking: {len(_chunks)} chunks, not at least 3 within a budget of {_budget}")
+
+    if(["".join(_side) for _side in zip(*_chunks)] != [source, translation]):
+        failures.append("chunking: the chunks' pieces don't join back into the source and translation")
+
+    for _source_piece, _translation_piece in _chunks:
+
+        _source_paragraphs = [_index for _index in range(paragraphs) if f"第{_index}段落" in _source_piece]
+        _translation_paragraphs = [_index for _index in range(paragraphs) if f"paragraph {_index}." in _translation_piece]
+
+        if(_source_paragraphs != _translation_paragraphs):
+            failures.append(f"chunking: a chunk held source paragraphs {_source_paragraphs} with translation paragraphs {_translation_paragraphs}")
+
+    ## a paragraph too big on its own falls back to sentences, the rest still line up by paragraph
+    _chunks = _chunk_sides([source, uneven_translation], _budget // 2, count_characters)
+
+    if(["".join(_side) for _side in zip(*_chunks)] != [source, uneven_translation] or len(_chunks) < 4):
+        failures.append(f"uneven chunking: {len(_chunks)} chunks that don't join back into the source and translation")
+
+    ## about a chunk per slot, but never smaller than the model needs for context, nor over the limit
+    for _oversize_tokens, _slots, _limit, _expected in [(100_000, 10, 50_000, 10_000), (100_000, 1_000, 50_000, 1024), (100_000, 1, 8_000, 8_000), (100, 10, 500, 500)]:
+
+        if(_chunk_budget(_oversize_tokens, _slots, _limit) != _expected):
+            failures.append(f"_chunk_budget({_oversize_tokens}, {_slots}, {_limit}) was {_chunk_budget(_oversize_tokens, _slots, _limit)}, not {_expected}")
+
+    ## stitched in order with the whitespace they were split at, a failed chunk fails its text
+    _error = ValueError("failed on purpose")
+
+    _results = _stitch_evaluations(BatchResults(["a", "b", "c", None, "e"], {3: _error}), [0, 0, 1, 2, 2], ["\n\n", "", "", "\n", ""], 3)
+
+    if(list(_results) != ["a\n\nb", "c", None] or _results.errors != {2: _error}):
+        failures.append(f"stitching gave {_results!r}, not ['a\\n\\nb', 'c', None] with the error for the third text")
+
+##-------------------start-of-main()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+def main() -> int:
+
+    """
+
+    Checks the chunking offline, then against the stand-in that a text over the token budget is sent as several requests whose evaluations are stitched back into one, that a text within it is sent whole, that the async version sends a text's chunks at once, and that with max_workers a failed chunk fails only its own text. The stand-in echoes, so a stitched evaluation is the text that went in. Counting tokens needs tiktoken's cl100k_base, so without a network and a cached copy the part against the stand-in is skipped.
+
+    """
+
+    import tiktoken
+
+    ## the sdks log the failed chunk's error
+    logging.disable(logging.ERROR)
+
+    failures:typing.List[str] = []
+
+    check_chunking(failures)
+
+    try:
+        tiktoken.get_encoding("cl100k_base")
+        _tokenizer = True
+
+    except Exception as e:
+        print(f"skipped against the stand-in: cl100k_base couldn't be loaded ({type(e).__name__})")
+        _tokenizer = False
+
+    if(_tokenizer):
+
+        with MockProviderProcess() as server:
+
+            client = make_client(server)
+
+            _pair_format = "{source}\n{translation}"
+
+            ## a string, and a pair, over the budget
+            _result = client.evaluate_chunked(translation, "anthropic", token_budget=token_budget, model=model)
+            _requests = server.stats()["requests"]
+
+            print(f"a string over the budget: {_requests} requests")
+
+            if(_result != translation or _requests < 2):
+                failures.append(f"a string over the budget was sent as {_requests} requests and stitched into {_result!r}, not the text")
+
+            server.configure()
+
+            _result = client.evaluate_chunked((source, translation), "anthropic", token_budget=token_budget, model=model, pair_format=_pair_format)
+            _requests = server.stats()["requests"]
+
+            print(f"a pair over the budget: {_requests} requests")
+
+            ## each chunk is echoed as its source paragraphs then their translations
+            _source_positions = [_result.find(f"第{_index}段落") for _index in range(paragraphs)]
+            _translation_positions = [_result.find(f"paragraph {_index}.") for _index in range(paragraphs)]
+
+            _in_order = -1 not in _source_positions + _translation_positions and _source_positions == sorted(_source_positions) and _translation_positions == sorted(_translation_positions)
+
+            if(_requests < 2 or not _in_order or any(_source_position > _translation_position for _source_position, _translation_position in zip(_source_positions, _translation_positions))):
+                failures.append(f"a pair over the budget was sent as {_requests} requests and stitched into {_result!r}, not every paragraph in order after its source")
+
+            ## within the budget, sent whole
+            server.configure()
+
+            _result = client.evaluate_chunked(translation, "anthropic", token_budget=10_000, model=model)
+
+            if(_result != translation or server.stats()["requests"] != 1):
+                failures.append(f"a text within the budget was sent as {server.stats()['requests']} requests")
+
+            ## async, every chunk at once
+            async def _run() -> None:
+
+                server.configure(latency=latency)
+
+                _start = time.monotonic()
+                _results = await client.evaluate_chunked_async([translation, translation], "anthropic", token_budget=token_budget, model=model, semaphore=100)
+                _elapsed = time.monotonic() - _start
+
+                _stats = server.stats()
+
+                print(f"async: {_stats['requests']} chunks in {_elapsed:.3f}s, at most {_stats['max_in_flight']} in flight")
+
+                if(_results != [translation, translation]):
+                    failures.append("async: the texts weren't stitched back together in input order")
+
+                if(_stats["max_in_flight"] != _stats["requests"] or _elapsed >= 2 * latency):
+                    failures.append(f"async: {_stats['requests']} chunks took {_elapsed:.3f}s with at most {_stats['max_in_flight']} in flight, they weren't sent at once")
+
+            asyncio.run(_run())
+
+            ## a failed chunk fails its own text only
+            server.configure()
+
+            _results = client.evaluate_chunked([translation, translation.replace(failing_paragraph, "paragraph five.")], "anthropic", token_budget=token_budget, model=model, max_workers=4, decorator=failing_chunk)
+
+            print(f"a failed chunk: results {[_result is not None for _result in _results]}, errors {_results.errors}")
+
+            if(_results[0] is not None or not isinstance(_results.errors.get(0), ValueError) or _results[1] != translation.replace(failing_paragraph, "paragraph five.")):
+                failures.append(f"a failed chunk gave {_results!r}, not its own text failed and the other stitched")
+
+            try:
+                client.evaluate_chunked(translation, "anthropic", token_budget=token_budget, model=model, response_type="raw")
+                failures.append("evaluate_chunked() took a response_type")
+
+            except AssertionError:
+                pass
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+
+    return 1 if failures else 0
+
+##-------------------end-of-main()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+if(__name__ == "__main__"):
+    sys.exit(main())
@@ -0,0 +1,222 @@
+## Copyright 2024 Kakusui LLC (https://kakusui.org) (https://github.com/Kakusui) (https://github.com/Kakusui/Elucidate)
+## Use of this source code is governed by an GNU Lesser General Public License v2.1
+## license that can be found in the LICENSE file.
+
+## built-in libraries
+import contextlib
+import io
+import json
+import logging
+import os
+import re
+import sys
+import tempfile
+import typing
+
+## local stand-ins for the provider endpoints
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from mock_providers import MockProviderProcess
+
+##-------------------start-of-attributes---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+template = "Original text:\n{source}\n\nTranslated text:\n{target}"
+
+## a model the token counter has no limit for, so validating texts never waits on tiktoken's download
+model = "mock-small"
+
+## JSONL lines, and what each should come out as, an evaluation or an error mentioning something, None for lines that are skipped
+jsonl = [('{"id": "a", "text": "plain text"}', {"id": "a", "evaluation": "plain text"}),
+         ('{"id": "b", "source": "文", "target": "Sentence"}', {"id": "b", "evaluation": template.format(source="文", target="Sentence")}),
+         ('', None),
+         ('{"id": "c", "source": "missing its target"}', {"id": "c", "error": "no text field, and no target field"}),
+         ('{"id": "d", "text": ', {"id": 5, "error": "isn't valid JSON"}),
+         ('   ', None),
+         ('[1, 2, 3]', {"id": 7, "error": "isn't a JSON object"}),
+         ('{"text": "no id, so the line number"}', {"id": 8, "evaluation": "no id, so the line number"}),
+         ('{"id": "e", "text": 42}', {"id": "e", "error": "isn't a string"}),
+         ('{"id": "f", "source": "最後", "target": "Last"}', {"id": "f", "evaluation": template.format(source="最後", target="Last")})]
+
+tsv = [("t1\t文\tSentence", {"id": "t1", "evaluation": template.format(source="文", target="Sentence")}),
+       ("源\tSource", {"id": 2, "evaluation": template.format(source="源", target="Source")}),
+       ("just the text", {"id": 3, "evaluation": "just the text"})]
+
+parallel = [("一", "One"), ("二", "Two"), ("", "Empty source"), ("四", "Four")]
+
+##-------------------start-of-run()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+def run(arguments:typing.List[str], output:str) -> typing.Tuple[int, typing.List[typing.Dict[str, typing.Any]], str]:
+
+    """
+
+    Runs the elucidate command in this process against the stand-in.
+
+    Returns:
+    exit_code (int) : What it returned.
+    records (list[dict]) : The output's records, in the order they were written.
+    progress (string) : The last progress line printed to stderr.
+
+    """
+
+    from elucidate.cli import main as elucidate_main
+
+    _stderr = io.StringIO()
+
+    with contextlib.redirect_stderr(_stderr):
+        _exit_code = elucidate_main(["run", *arguments, "-o", output, "--provider", "openai", "--api-key", "mock", "--model", model, "--concurrency", "4"])
+
+    with open(output, "r", encoding="utf-8") as _file:
+        _records = [json.loads(_line) for _line in _file]
+
+    return _exit_code, _records, _stderr.getvalue().strip().splitlines()[-1]
+
+##-------------------start-of-check_output()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+def check_output(name:str, records:typing.List[typing.Dict[str, typing.Any]], expected:typing.List[typing.Dict[str, typing.Any]], ordered:bool, failures:typing.List[str]) -> None:
+
+    """
+
+    Checks every expected record was written once, in input order if ordered, with errors mentioning what they should.
+
+    """
+
+    def _matches(_record:typing.Dict[str, typing.Any], _expected:typing.Dict[str, typing.Any]) -> bool:
+
+        if("evaluation" in _expected):
+            return _record == _expected
+
+        return set(_record) == {"id", "error"} and _record["id"] == _expected["id"] and _expected["error"] in _record["error"]
+
+    if(len(records) != len(expected)):
+        failures.append(f"{name}: wrote {len(records)} records, not {len(expected)}")
+        return
+
+    if(ordered):
+
+        for _record, _expected in zip(records, expected):
+
+            if(not _matches(_record, _expected)):
+                failures.append(f"{name}: wrote {_record} where {_expected} belongs")
+
+        return
+
+    for _expected in expected:
+
+        if(sum(_matches(_record, _expected) for _record in records) != 1):
+            failures.append(f"{name}: {_expected} wasn't written exactly once")
+
+##-------------------start-of-check_progress()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+def check_progress(name:str, progress:str, total:int, failed:int, failures:typing.List[str]) -> None:
+
+    """
+
+    Checks the final progress line counted every record, out of a total that left out the skipped lines.
+
+    """
+
+    _match = re.match(r"(\d+)/(\d+) evaluated, (\d+) failed", progress)
+
+    if(_match is None or [int(_group) for _group in _match.groups()] != [total, total, failed]):
+        failures.append(f"{name}: the progress ended at {progress!r}, not {total}/{total} evaluated, {failed} failed")
+
+##-------------------start-of-main()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+def main() -> int:
+
+    """
+
+    Runs the elucidate command end to end on JSONL, TSV and parallel files against the stand-in. Checks malformed lines get an error record without stopping the run, that --ordered writes everything in input order, and that the progress total only counts the lines that are read as records.
+
+    """
+
+    ## tiktoken can't download its encodings without a network, which only matters for validating text length
+    logging.disable(logging.ERROR)
+
+    failures:typing.List[str] = []
+
+    with MockProviderProcess() as server, tempfile.TemporaryDirectory() as directory:
+
+        ## the sdk reads this when its client is made
+        os.environ["OPENAI_BASE_URL"] = f"{server.url}/v1"
+
+        _output = os.path.join(directory, "output.jsonl")
+
+        ## JSONL, with the malformed lines and blank ones mixed in
+        _input = os.path.join(directory, "input.jsonl")
+
+        with open(_input, "w", encoding="utf-8") as _file:
+            _file.write("\n".join(_line for _line, _ in jsonl))
+
+        _expected = [_record for _, _record in jsonl if _record is not None]
+        _failed = sum("error" in _record for _record in _expected)
+
+        for _ordered in [False, True]:
+
+            _name = f"jsonl{' --ordered' if _ordered else ''}"
+
+            _exit_code, _records, _progress = run([_input] + (["--ordered"] if _ordered else []), _output)
+
+            print(f"{_name}: exit code {_exit_code}, {len(_records)} records, {_progress}")
+
+            if(_exit_code != 1):
+                failures.append(f"{_name}: exited with {_exit_code}, not 1 for the malformed lines")
+
+            check_output(_name, _records, _expected, _ordered, failures)
+            check_progress(_name, _progress, len(_expected), _failed, failures)
+
+        ## TSV, the id, source and target columns, or fewer
+        _input = os.path.join(directory, "input.tsv")
+
+        with open(_input, "w", encoding="utf-8") as _file:
+            _file.write("\n".join(_line for _line, _ in tsv) + "\n\n")
+
+        _exit_code, _records, _progress = run([_input, "--ordered"], _output)
+
+        print(f"tsv: exit code {_exit_code}, {len(_records)} records, {_progress}")
+
+        if(_exit_code != 0):
+            failures.append(f"tsv: exited with {_exit_code}, not 0")
+
+        check_output("tsv", _records, [_record for _, _record in tsv], True, failures)
+        check_progress("tsv", _progress, len(tsv), 0, failures)
+
+        ## parallel files, line by line, blank lines included
+        _source, _target = os.path.join(directory, "source.txt"), os.path.join(directory, "target.txt")
+
+        for _path, _side in [(_source, 0), (_target, 1)]:
+            with open(_path, "w", encoding="utf-8") as _file:
+                _file.write("\n".join(_pair[_side] for _pair in parallel))
+
+        _exit_code, _records, _progress = run([_source, "--target", _target], _output)
+
+        print(f"parallel: exit code {_exit_code}, {len(_records)} records, {_progress}")
+
+        if(_exit_code != 0):
+            failures.append(f"parallel: exited with {_exit_code}, not 0")
+
+        check_output("parallel", _records, [{"id": _index + 1, "evaluation": template.format(source=_source_line, target=_target_line)} for _index, (_source_line, _target_line) in enumerate(parallel)], False, failures)
+        check_progress("parallel", _progress, len(parallel), 0, failures)
+
+        ## a template that isn't source and target is refused before anything is read
+        try:
+
+            with contextlib.redirect_stderr(io.StringIO()):
+                run([_input, "--template", "{original} {translation}"], _output)
+
+            failures.append("a template with unknown fields was accepted")
+
+        except SystemExit as e:
+
+            if(e.code != 2):
+                failures.append(f"a template with unknown fields exited with {e.code}, not 2")
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+
+    return 1 if failures else 0
+
+##-------------------end-of-main()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+if(__name__ == "__main__"):
+    sys.exit(main())
@@ -0,0 +1,132 @@
+## Copyright 2024 Kakusui LLC (https://kakusui.org) (https://github.com/Kakusui) (https://github.com/Kakusui/Elucidate)
+## Use of this source code is governed by an GNU Lesser General Public License v2.1
+## license that can be found in the LICENSE file.
+
+## built-in libraries
+import asyncio
+import logging
+import os
+import sys
+
+## local stand-ins for the provider endpoints
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from mock_providers import MockProviderProcess
+from benchmark import make_client
+
+##-------------------start-of-attributes---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+## the semaphore, and the keep-alive pool sized to match it
+concurrency = 32
+
+## long enough that every request in a burst is in flight at once
+server_latency = 0.2
+
+## gemini's grpc channel is one connection whatever the pool, so only the http providers are counted
+providers = ["openai", "anthropic"]
+
+text = "Original text:\nこんにちは、世界。\n\nTranslated text:\nHello, world."
+
+##-------------------start-of-main()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+def main() -> int:
+
+    """
+
+    Warms up a pool as big as the semaphore, checks a burst after it opens no connections of its own, and that closing the client closes them all, without rebuilding its clients or touching the process-wide Gemini ones, and that it still works afterwards.
+
+    """
+
+    ## tiktoken can't download its encodings without a network, which only matters for validating text length
+    logging.disable(logging.ERROR)
+
+    failures = []
+
+    with MockProviderProcess() as server:
+
+        from elucidate import TransportOptions
+
+        client = make_client(server)
+
+        for provider in providers:
+            client.set_transport(provider, TransportOptions(max_keepalive_connections=concurrency, keepalive_expiry=30.0))
+
+        async def _run() -> None:
+
+            ## grpc's async channels belong to the loop they're made in
+            import grpc
+            from google.ai.generativelanguage_v1beta.services.generative_service import GenerativeServiceAsyncClient, transports
+
+            client._gemini_service._client_manager.clients["generative_async"] = GenerativeServiceAsyncClient(transport=transports.GenerativeServiceGrpcAsyncIOTransport(channel=grpc.aio.insecure_channel(server.grpc_address)))
+
+            from google.generativeai import client as genai_client
+
+            _process_wide_gemini_clients = dict(genai_client._client_manager.clients)
+            _sdk_clients = {provider: (client._get_service(provider)._sync_client, client._get_service(provider)._async_client) for provider in providers}
+
+            async with client:
+
+                await client.warmup("gemini")
+
+                for provider in providers:
+
+                    server.configure(latency=server_latency)
+
+                    await client.warmup(provider, connections=concurrency)
+
+                    ## every stats() call is a connection of its own, counted before it's answered
+                    _warmed = server.stats()["connections"] - 1
+
+                    await client.evaluate_async([text] * concurrency, provider, semaphore=concurrency)
+
+                    _stats = server.stats()
+                    _opened_by_burst = _stats["connections"] - 2 - _warmed
+
+                    print(f"{provider}: warmup opened {_warmed} connections, a burst of {concurrency} ({_stats['max_in_flight']} in flight) opened {_opened_by_burst} more")
+
+                    if(_warmed != concurrency):
+                        failures.append(f"{provider}'s warmup opened {_warmed} connections, not {concurrency}")
+
+                    if(_opened_by_burst != 0):
+                        failures.append(f"{provider}'s burst opened {_opened_by_burst} connections after warming up")
+
+            ## the server notices the clients hanging up a moment later
+            for _ in range(50):
+
+                _open = server.stats()["open_connections"] - 1
+
+                if(_open == 0):
+                    break
+
+                await asyncio.sleep(0.1)
+
+            print(f"{_open} connections open after closing the client")
+
+            if(_open != 0):
+                failures.append(f"{_open} connections were still open after closing the client")
+
+            ## closing only hangs up, the same sdk clients connect again for the next request
+            for provider in providers:
+
+                if((client._get_service(provider)._sync_client, client._get_service(provider)._async_client) != _sdk_clients[provider]):
+                    failures.append(f"closing the client rebuilt {provider}'s sdk clients")
+
+                if(await client.evaluate_async([text], provider) != [text]):
+                    failures.append(f"{provider} couldn't be used again after closing the client")
+
+            if(genai_client._client_manager.clients != _process_wide_gemini_clients):
+                failures.append("closing the client closed google.generativeai's process-wide gemini clients")
+
+            await client.aclose()
+
+        asyncio.run(_run())
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+
+    return 1 if failures else 0
+
+##-------------------end-of-main()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+if(__name__ == "__main__"):
+    sys.exit(main())
@@ -0,0 +1,155 @@
+## Copyright 2024 Kakusui LLC (https://kakusui.org) (https://github.com/Kakusui) (https://github.com/Kakusui/Elucidate)
+## Use of this source code is governed by an GNU Lesser General Public License v2.1
+## license that can be found in the LICENSE file.
+
+## built-in libraries
+import asyncio
+import logging
+import os
+import sys
+import time
+import typing
+
+## local stand-ins for the provider endpoints
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from mock_providers import MockProviderProcess
+from benchmark import make_client
+
+##-------------------start-of-attributes---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+text = "Original text:\nこんにちは、世界。\n\nTranslated text:\nHello, world."
+
+## a model the token counter has no limit for, so validating texts never waits on tiktoken's download
+model = "mock-small"
+
+## the model OpenAI's credential check sends its probe to
+probe_model = "gpt-3.5-turbo"
+
+ttl = 0.5
+
+calls = 5
+
+##-------------------start-of-probes()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+def probes(server:MockProviderProcess, evaluations:int) -> int:
+
+    """
+
+    Returns how many credential probes reached the stand-in since it was last configured, alongside evaluations requests of its own.
+
+    """
+
+    return server.stats()["requests"] - evaluations
+
+##-------------------start-of-main()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+def main() -> int:
+
+    """
+
+    Checks against the stand-in that a successful credential check is only repeated once its ttl has run out, that set_credentials() and a failed check aren't cached, that a ttl of 0 checks on every call and that verify_credentials() covers later calls.
+
+    """
+
+    ## tiktoken can't download its encodings without a network, which only matters for validating text length
+    logging.disable(logging.ERROR)
+
+    failures:typing.List[str] = []
+
+    with MockProviderProcess() as server:
+
+        client = make_client(server)
+
+        client._credential_cache.clear()
+        client.set_credential_cache_ttl(ttl)
+
+        ## one check for every call within the ttl, sync or async
+        server.configure()
+
+        for _ in range(calls):
+            client.openai_evaluate(text, model=model)
+
+        asyncio.run(client.openai_evaluate_async([text], model=model))
+
+        print(f"within the ttl: {probes(server, calls + 1)} probes for {calls + 1} calls")
+
+        if(probes(server, calls + 1) != 1):
+            failures.append(f"within the ttl: {probes(server, calls + 1)} probes were sent for {calls + 1} calls, not 1")
+
+        ## the ttl ran out
+        time.sleep(ttl)
+
+        server.configure()
+
+        client.openai_evaluate(text, model=model)
+        client.openai_evaluate(text, model=model)
+
+        if(probes(server, 2) != 1):
+            failures.append(f"after the ttl: {probes(server, 2)} probes were sent, not 1")
+
+        ## new credentials are checked again, however recent the last check
+        server.configure()
+
+        client.set_credentials("openai", "new key")
+        client.openai_evaluate(text, model=model)
+
+        if(probes(server, 1) != 1):
+            failures.append(f"after set_credentials(): {probes(server, 1)} probes were sent, not 1")
+
+        ## a failed check isn't cached, the next call checks again
+        client.set_credentials("openai", "bad key")
+
+        server.configure(failing=[probe_model])
+
+        try:
+            client.openai_evaluate(text, model=model)
+            failures.append("a call went ahead though its credential check failed")
+
+        except Exception:
+            pass
+
+        server.configure(failing=[])
+
+        client.openai_evaluate(text, model=model)
+
+        if(probes(server, 1) != 1 or not client._credential_cache.is_verified("openai")):
+            failures.append(f"after a failed check: {probes(server, 1)} probes were sent, not 1")
+
+        ## 0 checks on every call
+        client.set_credential_cache_ttl(0)
+        server.configure()
+
+        for _ in range(calls):
+            client.openai_evaluate(text, model=model)
+
+        print(f"ttl of 0: {probes(server, calls)} probes for {calls} calls")
+
+        if(probes(server, calls) != calls):
+            failures.append(f"ttl of 0: {probes(server, calls)} probes were sent for {calls} calls, not one each")
+
+        ## checked up front, then trusted
+        client.set_credential_cache_ttl(None)
+        client._credential_cache.clear()
+
+        _verified = client.verify_credentials(["openai"])
+
+        server.configure()
+
+        for _ in range(calls):
+            client.openai_evaluate(text, model=model)
+
+        print(f"verify_credentials(): {_verified}, then {probes(server, calls)} probes for {calls} calls")
+
+        if(_verified != {"openai": (True, None)} or probes(server, calls) != 0):
+            failures.append(f"verify_credentials() returned {_verified} and {probes(server, calls)} probes were sent after it, not 0")
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+
+    return 1 if failures else 0
+
+##-------------------end-of-main()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+if(__name__ == "__main__"):
+    sys.exit(main())
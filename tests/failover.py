@@ -0,0 +1,293 @@
+## Copyright 2024 Kakusui LLC (https://kakusui.org) (https://github.com/Kakusui) (https://github.com/Kakusui/Elucidate)
+## Use of this source code is governed by an GNU Lesser General Public License v2.1
+## license that can be found in the LICENSE file.
+
+## built-in libraries
+import asyncio
+import logging
+import os
+import sys
+import time
+import typing
+
+## local stand-ins for the provider endpoints
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from mock_providers import MockProviderProcess
+from benchmark import make_client
+
+##-------------------start-of-attributes---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+texts = [f"Original text:\n文{_index}\n\nTranslated text:\nString {_index}" for _index in range(40)]
+
+## a decorator turns the sdks' own retries off, so a 500 fails the request right away instead of after their backoff
+no_retries = {"decorator": lambda function: function, "semaphore": 4}
+
+## models the token counter has no limit for, so validating texts never waits on tiktoken's download, which can take seconds offline and would let the breakers half-open mid-run
+models = {"openai": "mock-small", "openai_backup": "mock-large", "anthropic": "claude-mock"}
+
+routes = [f"openai:{models['openai']}", f"anthropic:{models['anthropic']}"]
+
+## well over the time a run against the stand-in takes, 40 texts 4 at a time
+reset_timeout = 1.5
+
+## one at a time, so all but the first few of the queued texts wait longer than the threshold before they're sent, though none takes that long once it is
+queued_texts = 10
+queued_latency = 0.1
+slow_request_threshold = 0.35
+
+## long enough that the probe is still in flight when its job is cancelled
+probe_latency = 1.0
+cancel_after = 0.3
+
+##-------------------start-of-check_circuit_breaker()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+def check_circuit_breaker(failures:typing.List[str]) -> None:
+
+    """
+
+    Walks a CircuitBreaker through opening, half-opening, the single probe, closing, opening again and a released probe, and checks slow requests count as failures.
+
+    """
+
+    from elucidate import CircuitBreaker
+
+    _breaker = CircuitBreaker(failure_threshold=0.5, window_size=4, min_requests=4, reset_timeout=reset_timeout)
+
+    for _ in range(3):
+        _breaker.record_failure()
+
+    if(_breaker.state != "closed" or not _breaker.allow()):
+        failures.append("the breaker opened before min_requests had finished")
+
+    _breaker.record_success(0.01)
+
+    if(_breaker.state != "closed"):
+        failures.append("a success opened the breaker")
+
+    ## 3 of the last 4 failed, over the threshold
+    _breaker.record_failure()
+
+    if(_breaker.state != "open" or _breaker.allow() or _breaker.times_opened != 1):
+        failures.append(f"the breaker was {_breaker.state} after 3 failures in its window of 4, not open and refusing requests")
+
+    time.sleep(reset_timeout)
+
+    if(_breaker.state != "half_open"):
+        failures.append(f"the breaker was {_breaker.state} after reset_timeout, not half_open")
+
+    if([_breaker.allow(), _breaker.allow(), _breaker.allow()] != [True, False, False]):
+        failures.append("a half-open breaker let through more or less than a single probe")
+
+    _breaker.record_success(0.01)
+
+    if(_breaker.state != "closed" or _breaker.as_dict()["failure_rate"] != 0):
+        failures.append(f"a successful probe left the breaker {_breaker.as_dict()}, not closed with a fresh window")
+
+    for _ in range(4):
+        _breaker.record_failure()
+
+    time.sleep(reset_timeout)
+
+    _breaker.allow()
+    _breaker.record_failure()
+
+    if(_breaker.state != "open" or _breaker.allow() or _breaker.times_opened != 3):
+        failures.append(f"a failed probe left the breaker {_breaker.as_dict()}, not open again")
+
+    ## a probe given up without an outcome lets the next request probe instead
+    time.sleep(reset_timeout)
+
+    _probe = _breaker.allow()
+    _breaker.release()
+
+    if([_probe, _breaker.allow(), _breaker.allow()] != [True, True, False] or _breaker.state != "half_open"):
+        failures.append(f"a released probe left the breaker {_breaker.as_dict()}, not half-open with another probe let through")
+
+    ## slow successes count against the provider, fast ones don't
+    _breaker = CircuitBreaker(failure_threshold=0.5, window_size=4, min_requests=2, slow_request_threshold=0.5)
+
+    _breaker.record_success(0.1)
+    _breaker.record_success(0.2)
+
+    if(_breaker.state != "closed"):
+        failures.append("fast successes opened the breaker")
+
+    _breaker.record_success(2.0)
+    _breaker.record_success(3.0)
+
+    if(_breaker.state != "open"):
+        failures.append(f"two slow requests of four left the breaker {_breaker.state}, not open")
+
+    for _settings in [{"failure_threshold": 0}, {"min_requests": 30}, {"reset_timeout": -1}, {"slow_request_threshold": 0}]:
+
+        try:
+            CircuitBreaker(**_settings)
+            failures.append(f"CircuitBreaker took {_settings}")
+
+        except AssertionError as e:
+
+            if(not isinstance(e.args[0], ValueError)):
+                failures.append(f"CircuitBreaker({_settings}) raised {e.args[0]!r}, not ValueError")
+
+    print(f"circuit breaker: opened {_breaker.times_opened} times by slow requests")
+
+##-------------------start-of-main()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+def main() -> int:
+
+    """
+
+    Checks the circuit breaker offline, then evaluate_failover_async() against the stand-in: texts move on from a failing provider or model, served_by names the route that answered, the breaker cuts the failing provider off, and a probe after reset_timeout closes it again or reopens it. Also that time spent queued doesn't count towards slow_request_threshold, and that a cancelled probe doesn't leave the breaker refusing every request.
+
+    """
+
+    ## tiktoken can't download its encodings without a network, which only matters for validating text length
+    logging.disable(logging.ERROR)
+
+    failures:typing.List[str] = []
+
+    check_circuit_breaker(failures)
+
+    with MockProviderProcess() as server:
+
+        from elucidate import FailoverPolicy, CircuitOpenException
+
+        client = make_client(server)
+
+        async def _run() -> None:
+
+            ## a failing model moves on to the next model of the same provider
+            server.configure(failing=[models["openai"]])
+
+            ## the routes share openai's breaker, which mustn't open here, and can't with fewer failures than min_requests
+            _policy = FailoverPolicy([f"openai:{models['openai']}", f"openai:{models['openai_backup']}"], min_requests=len(texts) + 1, window_size=len(texts) + 1, failure_threshold=1.0)
+            _results = await client.evaluate_failover_async(texts, _policy, **no_retries)
+
+            print(f"failing model: {server.stats()['failed']} requests failed, served by {set(_results.served_by)}")
+
+            if(list(_results) != texts or _results.served_by != [f"openai:{models['openai_backup']}"] * len(texts) or _results.errors):
+                failures.append("failing model: the texts weren't all evaluated by the next model, in input order")
+
+            if(server.stats()["failed"] != len(texts)):
+                failures.append(f"failing model: {server.stats()['failed']} requests went to the failing model, not one per text")
+
+            ## a failing provider opens its breaker, and what's left goes straight to the next route
+            server.configure(failing=["openai"])
+
+            _policy = FailoverPolicy(routes, min_requests=4, window_size=10, failure_threshold=0.5, reset_timeout=reset_timeout)
+            _results = await client.evaluate_failover_async(texts, _policy, **no_retries)
+
+            _failed = server.stats()["failed"]
+
+            print(f"failing provider: {_failed} requests failed before the breaker opened, served by {set(_results.served_by)}")
+
+            if(list(_results) != texts or _results.served_by != [routes[1]] * len(texts) or _results.errors):
+                failures.append("failing provider: the texts weren't all evaluated by the next route, in input order")
+
+            if(_policy.stats()["openai"]["state"] != "open" or _policy.stats()["anthropic"]["state"] != "closed"):
+                failures.append(f"failing provider: the breakers were {_policy.stats()}, not openai open and anthropic closed")
+
+            if(_failed >= len(texts)):
+                failures.append(f"failing provider: all {_failed} texts were sent to openai, the breaker didn't cut it off")
+
+            ## still failing after reset_timeout, only the probe reaches it and the breaker opens again
+            await asyncio.sleep(reset_timeout)
+
+            server.configure(failing=["openai"])
+
+            _results = await client.evaluate_failover_async(texts, _policy, **no_retries)
+
+            print(f"failed probe: {server.stats()['failed']} requests failed, openai opened {_policy.stats()['openai']['times_opened']} times")
+
+            if(server.stats()["failed"] != 1 or _policy.stats()["openai"]["times_opened"] != 2 or _policy.stats()["openai"]["state"] != "open"):
+                failures.append(f"failed probe: {server.stats()['failed']} requests reached openai and its breaker is {_policy.stats()['openai']}, not a single probe reopening it")
+
+            if(list(_results) != texts or set(_results.served_by) != {routes[1]}):
+                failures.append("failed probe: the texts weren't all evaluated by the next route")
+
+            ## recovered, the probe closes the breaker and openai takes the traffic back
+            await asyncio.sleep(reset_timeout)
+
+            server.configure(failing=[])
+
+            _results = await client.evaluate_failover_async(texts, _policy, **no_retries)
+
+            _served_by_openai = _results.served_by.count(routes[0])
+
+            print(f"successful probe: {_served_by_openai} texts served by openai again")
+
+            if(_policy.stats()["openai"]["state"] != "closed" or _served_by_openai == 0):
+                failures.append(f"successful probe: openai's breaker is {_policy.stats()['openai']} and served {_served_by_openai} texts, not closed and serving again")
+
+            if(list(_results) != texts or _results.errors):
+                failures.append("successful probe: the texts weren't all evaluated, in input order")
+
+            ## every route failing leaves the texts as errors, with the last route's
+            server.configure(failing=["openai", "anthropic"])
+
+            _policy = FailoverPolicy(routes, min_requests=4, window_size=10)
+            _results = await client.evaluate_failover_async(texts[:10], _policy, **no_retries)
+
+            print(f"every route failing: {len(_results.errors)} errors")
+
+            if(list(_results) != [None] * 10 or _results.served_by != [None] * 10 or sorted(_results.errors) != list(range(10))):
+                failures.append("every route failing: the texts weren't all left as errors")
+
+            if(not any(isinstance(_error, CircuitOpenException) for _error in _results.errors.values())):
+                failures.append("every route failing: no text was refused by an open breaker")
+
+            ## waiting on the semaphore isn't the provider being slow, requests are timed from when they're sent
+            server.configure(failing=[], latency=queued_latency)
+
+            _policy = FailoverPolicy(routes, min_requests=4, window_size=queued_texts, slow_request_threshold=slow_request_threshold)
+            _results = await client.evaluate_failover_async(texts[:queued_texts], _policy, **{**no_retries, "semaphore": 1, "ingestion_window": queued_texts})
+
+            print(f"queued: openai's breaker is {_policy.stats()['openai']['state']} after {queued_texts} texts sent one at a time")
+
+            if(_policy.stats()["openai"]["state"] != "closed" or _results.served_by != [routes[0]] * queued_texts):
+                failures.append(f"queued: openai's breaker is {_policy.stats()['openai']} after requests that were only slow to be sent")
+
+            ## cancelled while its probe is in flight, the breaker lets the next request probe instead of refusing everything
+            server.configure(failing=["openai"], latency=0.0)
+
+            _policy = FailoverPolicy(routes, min_requests=4, window_size=10, reset_timeout=reset_timeout)
+            await client.evaluate_failover_async(texts, _policy, **no_retries)
+
+            await asyncio.sleep(reset_timeout)
+
+            server.configure(failing=[], latency=probe_latency)
+
+            _job = asyncio.ensure_future(client.evaluate_failover_async(texts, _policy, **no_retries))
+
+            await asyncio.sleep(cancel_after)
+
+            _job.cancel()
+
+            try:
+                await _job
+                failures.append("cancelled probe: the job finished before it could be cancelled")
+
+            except asyncio.CancelledError:
+                pass
+
+            _breaker = _policy.breakers["openai"]
+
+            print(f"cancelled probe: openai's breaker is {_breaker.state}")
+
+            if(_breaker.state != "half_open" or not _breaker.allow()):
+                failures.append(f"cancelled probe: openai's breaker is {_breaker.as_dict()} and refuses the next probe")
+
+            server.configure(latency=0.0)
+
+        asyncio.run(_run())
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+
+    return 1 if failures else 0
+
+##-------------------end-of-main()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+if(__name__ == "__main__"):
+    sys.exit(main())
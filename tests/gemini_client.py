@@ -0,0 +1,104 @@
+## Copyright 2024 Kakusui LLC (https://kakusui.org) (https://github.com/Kakusui) (https://github.com/Kakusui/Elucidate)
+## Use of this source code is governed by an GNU Lesser General Public License v2.1
+## license that can be found in the LICENSE file.
+
+## built-in libraries
+import asyncio
+import logging
+import os
+import sys
+import typing
+
+## local stand-ins for the provider endpoints
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from mock_providers import MockProviderProcess
+from benchmark import make_client
+
+##-------------------start-of-attributes---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+texts = [f"Original text:\n文{_index}\n\nTranslated text:\nString {_index}" for _index in range(20)]
+
+model = "gemini-1.5-flash"
+
+## long enough that every request the semaphore lets through is in flight at once
+concurrency = 4
+latency = 0.1
+
+##-------------------start-of-main()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+def main() -> int:
+
+    """
+
+    Checks against the stand-in that the Gemini model and generation config are built once and reused while the settings stay the same, rebuilt when they change, and that every request in a batch waits on the one semaphore.
+
+    """
+
+    ## tiktoken can't download its encodings without a network, which only matters for validating text length
+    logging.disable(logging.ERROR)
+
+    failures:typing.List[str] = []
+
+    with MockProviderProcess() as server:
+
+        client = make_client(server)
+        _service = client._gemini_service
+
+        ## the same settings text after text, sync
+        _results = [client.gemini_evaluate(_text, model=model) for _text in texts[:3]]
+        _model, _generation_config = _service._client, _service._generation_config
+
+        client.gemini_evaluate(texts[3], model=model)
+
+        if(_results != texts[:3] or _service._client is not _model or _service._generation_config is not _generation_config):
+            failures.append("sync: the model or generation config was rebuilt though the settings didn't change")
+
+        ## a setting changed, so both are rebuilt with it
+        client.gemini_evaluate(texts[0], model=model, temperature=0.2)
+
+        if(_service._client is _model or _service._generation_config.temperature != 0.2):
+            failures.append("sync: the model wasn't rebuilt when the temperature changed")
+
+        async def _run() -> None:
+
+            ## grpc's async channels belong to the loop they're made in
+            import grpc
+            from google.ai.generativelanguage_v1beta.services.generative_service import GenerativeServiceAsyncClient, transports
+
+            _service._client_manager.clients["generative_async"] = GenerativeServiceAsyncClient(transport=transports.GenerativeServiceGrpcAsyncIOTransport(channel=grpc.aio.insecure_channel(server.grpc_address)))
+
+            server.configure(latency=latency)
+
+            _results = await client.gemini_evaluate_async(texts, model=model, semaphore=concurrency)
+            _model = _service._client
+
+            _stats = server.stats()
+
+            print(f"async: {_stats['requests']} requests, at most {_stats['max_in_flight']} in flight with a semaphore of {concurrency}")
+
+            if(_results != texts):
+                failures.append("async: the results weren't the evaluations in input order")
+
+            if(_stats["max_in_flight"] != concurrency):
+                failures.append(f"async: {_stats['max_in_flight']} requests were in flight at once, not the semaphore's {concurrency}")
+
+            ## the batch after it reuses the model, async client attached
+            server.configure(latency=0.0)
+
+            await client.gemini_evaluate_async(texts, model=model, semaphore=concurrency)
+
+            if(_service._client is not _model or _service._client._async_client is None):
+                failures.append("async: the model was rebuilt between batches with the same settings")
+
+        asyncio.run(_run())
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+
+    return 1 if failures else 0
+
+##-------------------end-of-main()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+if(__name__ == "__main__"):
+    sys.exit(main())
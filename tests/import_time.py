@@ -0,0 +1,88 @@
+## Copyright 2024 Kakusui LLC (https://kakusui.org) (https://github.com/Kakusui) (https://github.com/Kakusui/Elucidate)
+## Use of this source code is governed by an GNU Lesser General Public License v2.1
+## license that can be found in the LICENSE file.
+
+## built-in libraries
+import subprocess
+import sys
+import json
+
+##-------------------start-of-attributes---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+## each import is timed in a fresh interpreter this many times and the fastest run is kept, the slower ones are noise from the machine
+runs = 5
+
+## seconds, generous enough for a slow CI runner
+bare_import_budget = 0.25
+
+## seconds elucidate may add on top of importing easytl, which imports every provider sdk itself
+full_import_overhead_budget = 0.5
+
+## none of these should be imported by `import elucidate` or by the cli before it has something to run
+provider_modules = ["easytl", "openai", "anthropic", "google.generativeai"]
+
+##-------------------start-of-time_import()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+def time_import(statement:str) -> tuple[float, list[str]]:
+
+    """
+
+    Times statement in fresh interpreters.
+
+    Returns the fastest time, and the provider modules the statement imported.
+
+    """
+
+    script = ("import time, sys, json\n"
+              "start = time.perf_counter()\n"
+              f"{statement}\n"
+              "elapsed = time.perf_counter() - start\n"
+              f"print(json.dumps([elapsed, [module for module in {provider_modules!r} if module in sys.modules]]))")
+
+    best = None
+
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, "-W", "ignore", "-c", script], capture_output=True, text=True, check=True).stdout
+        elapsed, loaded = json.loads(output.strip().splitlines()[-1])
+
+        best = elapsed if best is None else min(best, elapsed)
+
+    return best, loaded # type: ignore
+
+##-------------------start-of-main()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+def main() -> int:
+
+    failures = []
+
+    bare_time, bare_loaded = time_import("import elucidate")
+    print(f"import elucidate: {bare_time:.3f}s")
+
+    if(bare_loaded):
+        failures.append(f"import elucidate imported {', '.join(bare_loaded)}")
+
+    if(bare_time > bare_import_budget):
+        failures.append(f"import elucidate took {bare_time:.3f}s, the budget is {bare_import_budget}s")
+
+    cli_time, cli_loaded = time_import("from elucidate.cli import _build_parser; _build_parser()")
+    print(f"cli parser: {cli_time:.3f}s")
+
+    if(cli_loaded):
+        failures.append(f"building the cli parser imported {', '.join(cli_loaded)}")
+
+    easytl_time, _ = time_import("import easytl")
+    full_time, _ = time_import("from elucidate import Elucidate")
+    print(f"import easytl: {easytl_time:.3f}s, from elucidate import Elucidate: {full_time:.3f}s")
+
+    if(full_time - easytl_time > full_import_overhead_budget):
+        failures.append(f"from elucidate import Elucidate took {full_time - easytl_time:.3f}s more than import easytl, the budget is {full_import_overhead_budget}s")
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+
+    return 1 if failures else 0
+
+##-------------------end-of-main()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+if(__name__ == "__main__"):
+    sys.exit(main())
@@ -0,0 +1,195 @@
+## Copyright 2024 Kakusui LLC (https://kakusui.org) (https://github.com/Kakusui) (https://github.com/Kakusui/Elucidate)
+## Use of this source code is governed by an GNU Lesser General Public License v2.1
+## license that can be found in the LICENSE file.
+
+## built-in libraries
+import asyncio
+import logging
+import os
+import sqlite3
+import sys
+import tempfile
+import typing
+
+## local stand-ins for the provider endpoints
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from mock_providers import MockProviderProcess
+from benchmark import make_client
+
+##-------------------start-of-attributes---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+texts = [f"Original text:\n文{_index}\n\nTranslated text:\nString {_index}" for _index in range(20)]
+
+## a model the token counter has no limit for, so validating texts never waits on tiktoken's download
+settings = {"model": "mock-small", "semaphore": 5}
+
+## nothing is ever due on its own, so everything written is down to a flush at the end, a failure or a cancellation
+never = 3600
+
+## requests take this long, the job is cancelled once the first slots' worth have landed
+latency = 0.3
+cancel_after = 0.45
+
+##-------------------start-of-committed()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+def committed(path:str) -> int:
+
+    """
+
+    Returns how many evaluations are in the journal file, read on a connection of its own, so only what's committed is seen.
+
+    """
+
+    _connection = sqlite3.connect(path)
+
+    try:
+        return _connection.execute("SELECT COUNT(*) FROM evaluations").fetchone()[0]
+
+    finally:
+        _connection.close()
+
+##-------------------start-of-main()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+def main() -> int:
+
+    """
+
+    Checks against the stand-in that a rerun with the same journal only sends what didn't finish, that changed texts are sent again, and that the lazy, stream and cancelled paths write their records when they end rather than when the interpreter exits.
+
+    """
+
+    ## tiktoken can't download its encodings without a network, which only matters for validating text length
+    logging.disable(logging.ERROR)
+
+    failures:typing.List[str] = []
+
+    with MockProviderProcess() as server, tempfile.TemporaryDirectory() as directory:
+
+        from elucidate import EvaluationJournal
+
+        async def _run() -> None:
+
+            ## a whole job, then a rerun of it from a fresh client
+            _path = os.path.join(directory, "job.db")
+            _journal = EvaluationJournal(_path, flush_interval=never)
+
+            _first = await make_client(server).openai_evaluate_async(texts, journal=_journal, **settings)
+
+            if(_first != texts or committed(_path) != len(texts)):
+                failures.append(f"a whole job left {committed(_path)} of {len(texts)} records in the file")
+
+            _journal.close()
+
+            server.configure()
+
+            _journal = EvaluationJournal(_path, flush_interval=never)
+            _rerun = await make_client(server).openai_evaluate_async(texts, journal=_journal, **settings)
+
+            print(f"rerun: {server.stats()['requests']} requests, {_journal.stats()}")
+
+            if(_rerun != texts or server.stats()["requests"] != 0 or _journal.resumed != len(texts)):
+                failures.append(f"rerunning a finished job sent {server.stats()['requests']} requests and resumed {_journal.resumed}, not 0 and {len(texts)}")
+
+            ## the second half changed, so only it is sent
+            server.configure()
+
+            _changed = texts[:10] + [f"{_text} (revised)" for _text in texts[10:]]
+            _partial = await make_client(server).openai_evaluate_async(_changed, journal=_journal, **settings)
+
+            print(f"changed texts: {server.stats()['requests']} requests")
+
+            if(_partial != _changed or server.stats()["requests"] != 10):
+                failures.append(f"rerunning with 10 changed texts sent {server.stats()['requests']} requests, not 10")
+
+            _journal.close()
+
+            ## a lazily ingested job is written when it's collected
+            server.configure()
+
+            _path = os.path.join(directory, "lazy.db")
+            _journal = EvaluationJournal(_path, flush_interval=never)
+
+            _lazy = await make_client(server).openai_evaluate_async(iter(texts), journal=_journal, **settings)
+
+            print(f"lazy: {committed(_path)} records written")
+
+            if(_lazy != texts or committed(_path) != len(texts)):
+                failures.append(f"a lazily ingested job left {committed(_path)} of {len(texts)} records in the file, the rest waited for the interpreter to exit")
+
+            _journal.close()
+
+            ## a stream is written when it's exhausted, or when the consumer stops early
+            _client = make_client(server)
+
+            for _stop_after in [None, 5]:
+
+                _path = os.path.join(directory, f"stream-{_stop_after}.db")
+                _journal = EvaluationJournal(_path, flush_interval=never)
+
+                _stream = _client.evaluate_stream(texts, "openai", journal=_journal, **settings)
+                _received = 0
+
+                async for _ in _stream:
+
+                    _received += 1
+
+                    if(_received == _stop_after):
+                        break
+
+                await _stream.aclose()
+
+                print(f"stream stopped after {_stop_after}: {committed(_path)} records written for {_received} received")
+
+                if(committed(_path) < _received):
+                    failures.append(f"a stream stopped after {_received} results left {committed(_path)} records in the file")
+
+                _journal.close()
+
+            ## cancelled partway through, what finished is written, and a rerun only sends the rest
+            server.configure(latency=latency)
+
+            _path = os.path.join(directory, "cancelled.db")
+            _journal = EvaluationJournal(_path, flush_interval=never)
+
+            _job = asyncio.ensure_future(make_client(server).openai_evaluate_async(texts, journal=_journal, **settings))
+
+            await asyncio.sleep(cancel_after)
+
+            _job.cancel()
+
+            try:
+                await _job
+                failures.append("the job finished before it could be cancelled")
+
+            except asyncio.CancelledError:
+                pass
+
+            _written = committed(_path)
+            _stats = _journal.stats()
+
+            server.configure(latency=0.0)
+
+            _resumed = await make_client(server).openai_evaluate_async(texts, journal=_journal, **settings)
+
+            print(f"cancelled: {_written} records written, {_stats}, the rerun sent {server.stats()['requests']} requests")
+
+            if(_written == 0 or _written != _stats["recorded"] or _stats["pending"] != 0):
+                failures.append(f"cancelling left {_written} records in the file, not the {_stats['recorded']} that had finished")
+
+            if(_resumed != texts or server.stats()["requests"] != len(texts) - _written):
+                failures.append(f"the rerun after cancelling sent {server.stats()['requests']} requests, not the {len(texts) - _written} that hadn't finished")
+
+            _journal.close()
+
+        asyncio.run(_run())
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+
+    return 1 if failures else 0
+
+##-------------------end-of-main()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+if(__name__ == "__main__"):
+    sys.exit(main())
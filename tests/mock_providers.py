@@ -0,0 +1,719 @@
+## Copyright 2024 Kakusui LLC (https://kakusui.org) (https://github.com/Kakusui) (https://github.com/Kakusui/Elucidate)
+## Use of this source code is governed by an GNU Lesser General Public License v2.1
+## license that can be found in the LICENSE file.
+
+## built-in libraries
+import typing
+import threading
+import subprocess
+import urllib.request
+import random
+import time
+import json
+import math
+import sys
+import re
+
+from concurrent.futures import ThreadPoolExecutor
+from collections import deque
+from datetime import datetime, timezone, timedelta
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from email.parser import BytesParser
+from email.policy import HTTP
+
+##-------------------start-of-MockProviderServer---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+class MockProviderServer:
+
+    """
+
+    A local stand-in for the OpenAI, Anthropic and Gemini endpoints Elucidate calls, so evaluation can be driven offline.
+
+    Answers POST .../chat/completions, .../messages and .../models/<model>:generateContent in each provider's format, and Gemini's GenerateContent over gRPC at grpc_address, echoing the prompt back, after a delay drawn from the latency settings. Streamed requests, (OpenAI and Anthropic's "stream": true, and Gemini's StreamGenerateContent) get the echo back in stream_chunks pieces, spread over the delay. Reports usage, and OpenAI and Anthropic style rate limit headers counted against requests_per_minute. A rate_limit_probability share of requests is answered with a 429 instead, and those for a provider or model in failing with a 500. Packed prompts get a json answer per segment, less any packed_drop and packed_mangle asked for. GET .../models gets an empty model list.
+
+    OpenAI's Files and Batch API and Anthropic's Message Batches are answered too. A batch goes through batch_statuses, one status further on every retrieve, and once completed its output and error files hold a line per request, in reverse order as the real ones aren't in input order either. Requests whose prompt contains a batch_failures key end up in the error file. A message batch is in_progress until it reaches the last of batch_statuses, then ended, and its results come in reverse order too, those of requests matching batch_failures with the result type it maps them to.
+
+    The stats count requests, 429s, 500s and the most in flight at once, as well as connections opened and those still open, so connection reuse can be checked.
+
+    POST /_mock/config changes the settings and resets the stats, GET /_mock/stats returns them, so a server in another process (see MockProviderProcess) can be driven too.
+
+    """
+
+    def __init__(self,
+                 latency:float = 0.05,
+                 latency_p99:float | None = None,
+                 rate_limit_probability:float = 0.0,
+                 retry_after:float = 0.01,
+                 requests_per_minute:int = 10000,
+                 stream_chunks:int = 8,
+                 packed_drop:int = 0,
+                 packed_mangle:int = 0,
+                 batch_statuses:typing.List[str] = ["validating", "in_progress", "finalizing", "completed"],
+                 batch_failures:typing.Dict[str, str] = {},
+                 failing:typing.List[str] = [],
+                 seed:int | None = 0,
+                 port:int = 0
+                 ) -> None:
+
+        """
+
+        Parameters:
+        latency (float) : How long a response takes, in seconds. The median if latency_p99 is set.
+        latency_p99 (float or None) : If set, response times are lognormal with this 99th percentile, the long tail real providers have.
+        rate_limit_probability (float) : The share of requests answered with a 429.
+        retry_after (float) : The retry-after sent with a 429, in seconds.
+        requests_per_minute (int) : The limit the rate limit headers report.
+        stream_chunks (int) : How many pieces streamed responses come in.
+        packed_drop (int) : How many segments are left out of the end of every packed answer.
+        packed_mangle (int) : How many segments at the start of every packed answer get an id that wasn't asked for.
+        batch_statuses (list[string]) : The statuses a batch reports, its first when created, then one further on every retrieve, staying at the last. Batches keep the ones they were created with.
+        batch_failures (dict[string, string]) : Batched requests whose prompt contains a key fail. For OpenAI the value is the error message, for Anthropic the result type. (errored, canceled or expired)
+        failing (list[string]) : Providers ('openai', 'anthropic' or 'gemini') and models (E.g. 'gpt-4o-mini') whose requests are answered with a 500, or over gRPC an INTERNAL error.
+        seed (int or None) : Seeds the latency and 429 draws, so runs are comparable.
+        port (int) : The port to listen on. 0 picks a free one, see url.
+
+        """
+
+        self.requests = 0
+        self.rate_limited = 0
+        self.failed = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.connections = 0
+        self.open_connections = 0
+        self.batch_polls = 0
+
+        self._files:typing.Dict[str, bytes] = {}
+        self._batches:typing.Dict[str, typing.Dict[str, typing.Any]] = {}
+
+        self._recent:typing.Deque[float] = deque()
+        self._lock = threading.Lock()
+        self._random = random.Random(seed)
+
+        self.configure(latency=latency, latency_p99=latency_p99, rate_limit_probability=rate_limit_probability, retry_after=retry_after, requests_per_minute=requests_per_minute, stream_chunks=stream_chunks, packed_drop=packed_drop, packed_mangle=packed_mangle, batch_statuses=batch_statuses, batch_failures=batch_failures, failing=failing)
+
+        _server = self
+
+        class _Handler(BaseHTTPRequestHandler):
+
+            ## keep-alive, so the sdk connection pools are exercised like they are against the real endpoints
+            protocol_version = "HTTP/1.1"
+
+            ## headers and body are written separately, with nagle on every response would wait out the client's delayed ack
+            disable_nagle_algorithm = True
+
+            def log_message(self, *args) -> None:
+                pass
+
+            def setup(self) -> None:
+                super().setup()
+                _server._connection_opened()
+
+            def finish(self) -> None:
+                super().finish()
+                _server._connection_closed()
+
+            def do_GET(self) -> None:
+
+                if(self.path == "/_mock/stats"):
+                    self._send(200, _server.stats())
+
+                elif(re.search(r"/(batches|files)/", self.path)):
+                    _server._handle_batch(self, b"")
+
+                ## the model list, what warmup() sends
+                elif(self.path.split("?")[0].endswith("/models")):
+                    self._send(200, {"object": "list", "data": [], "has_more": False, "first_id": None, "last_id": None})
+
+                else:
+                    self._send(404, {"error": {"message": "not found"}})
+
+            def do_POST(self) -> None:
+
+                _raw = self.rfile.read(int(self.headers.get("content-length", 0)))
+
+                ## file uploads are multipart, not json
+                if(self.path.split("?")[0].endswith(("/files", "/batches"))):
+                    _server._handle_batch(self, _raw)
+                    return
+
+                _body = json.loads(_raw or b"{}")
+
+                if(self.path == "/_mock/config"):
+                    _server.configure(**_body)
+                    self._send(200, _server.stats())
+
+                else:
+                    _server._handle(self, _body)
+
+            def _send(self, status:int, payload:typing.Dict[str, typing.Any], headers:typing.Dict[str, str] = {}) -> None:
+                self._send_bytes(status, json.dumps(payload).encode(), "application/json", headers)
+
+            def _send_bytes(self, status:int, encoded:bytes, content_type:str, headers:typing.Dict[str, str] = {}) -> None:
+
+                self.send_response(status)
+                self.send_header("content-type", content_type)
+                self.send_header("content-length", str(len(encoded)))
+
+                for _name, _value in headers.items():
+                    self.send_header(_name, _value)
+
+                self.end_headers()
+                self.wfile.write(encoded)
+
+            def _send_events(self, events:typing.Iterable[typing.Tuple[str | None, typing.Dict[str, typing.Any] | str]], headers:typing.Dict[str, str] = {}) -> None:
+
+                ## server-sent events, chunked so the connection can be kept alive without knowing the length up front
+                self.send_response(200)
+                self.send_header("content-type", "text/event-stream")
+                self.send_header("transfer-encoding", "chunked")
+
+                for _name, _value in headers.items():
+                    self.send_header(_name, _value)
+
+                self.end_headers()
+
+                for _event, _data in events:
+
+                    _encoded = ((f"event: {_event}\n" if _event is not None else "") + f"data: {_data if isinstance(_data, str) else json.dumps(_data)}\n\n").encode()
+
+                    self.wfile.write(f"{len(_encoded):x}\r\n".encode() + _encoded + b"\r\n")
+                    self.wfile.flush()
+
+                self.wfile.write(b"0\r\n\r\n")
+
+        class _Server(ThreadingHTTPServer):
+
+            daemon_threads = True
+
+            ## the default backlog of 5 drops connections when a benchmark opens dozens at once
+            request_queue_size = 1024
+
+        self._httpd = _Server(("127.0.0.1", port), _Handler)
+
+        self.url = f"http://127.0.0.1:{self._httpd.server_address[1]}"
+
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+
+        ## gemini's async client has no rest transport, so it gets a grpc stand-in like the real endpoint
+        import grpc
+        import google.ai.generativelanguage as glm
+
+        def _generate_content(request:typing.Any, context:typing.Any) -> typing.Any:
+
+            _failing, _limited, _latency, _ = self._begin("gemini", request.model)
+
+            try:
+
+                if(_failing):
+                    context.abort(grpc.StatusCode.INTERNAL, "Internal error")
+
+                if(_limited):
+                    context.abort(grpc.StatusCode.RESOURCE_EXHAUSTED, "Rate limit reached")
+
+                time.sleep(_latency)
+
+                _text = self._answer(request.contents[-1].parts[-1].text)
+
+                return glm.GenerateContentResponse(candidates=[{"content": {"parts": [{"text": _text}], "role": "model"}, "finish_reason": 1, "index": 0}],
+                                                   usage_metadata={"prompt_token_count": len(_text) // 4 + 1, "candidates_token_count": len(_text) // 4 + 1, "total_token_count": len(_text) // 2 + 2})
+
+            finally:
+                self._end()
+
+        def _stream_generate_content(request:typing.Any, context:typing.Any) -> typing.Iterator[typing.Any]:
+
+            _failing, _limited, _latency, _ = self._begin("gemini", request.model)
+
+            try:
+
+                if(_failing):
+                    context.abort(grpc.StatusCode.INTERNAL, "Internal error")
+
+                if(_limited):
+                    context.abort(grpc.StatusCode.RESOURCE_EXHAUSTED, "Rate limit reached")
+
+                _text = request.contents[-1].parts[-1].text
+
+                for _piece in self._pieces(_text, _latency):
+                    yield glm.GenerateContentResponse(candidates=[{"content": {"parts": [{"text": _piece}], "role": "model"}, "index": 0}])
+
+                yield glm.GenerateContentResponse(candidates=[{"finish_reason": 1, "index": 0}],
+                                                  usage_metadata={"prompt_token_count": len(_text) // 4 + 1, "candidates_token_count": len(_text) // 4 + 1, "total_token_count": len(_text) // 2 + 2})
+
+            finally:
+                self._end()
+
+        self._grpc_server = grpc.server(ThreadPoolExecutor(max_workers=256))
+        self._grpc_server.add_generic_rpc_handlers([grpc.method_handlers_generic_handler("google.ai.generativelanguage.v1beta.GenerativeService",
+                                                    {"GenerateContent": grpc.unary_unary_rpc_method_handler(_generate_content,
+                                                                                                            request_deserializer=glm.GenerateContentRequest.deserialize,
+                                                                                                            response_serializer=glm.GenerateContentResponse.serialize),
+                                                     "StreamGenerateContent": grpc.unary_stream_rpc_method_handler(_stream_generate_content,
+                                                                                                                   request_deserializer=glm.GenerateContentRequest.deserialize,
+                                                                                                                   response_serializer=glm.GenerateContentResponse.serialize)})])
+
+        self.grpc_address = f"127.0.0.1:{self._grpc_server.add_insecure_port('127.0.0.1:0')}"
+
+    def __enter__(self) -> "MockProviderServer":
+
+        self._thread.start()
+        self._grpc_server.start()
+
+        return self
+
+    def __exit__(self, *args) -> None:
+
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        self._grpc_server.stop(None)
+
+    def configure(self, **settings:typing.Any) -> None:
+
+        """
+
+        Changes any of the settings __init__ takes, except seed and port, and resets the stats.
+
+        """
+
+        with self._lock:
+
+            for _name, _value in settings.items():
+                assert _name in ["latency", "latency_p99", "rate_limit_probability", "retry_after", "requests_per_minute", "stream_chunks", "packed_drop", "packed_mangle", "batch_statuses", "batch_failures", "failing"], ValueError(f"Unknown setting {_name}.")
+                setattr(self, _name, _value)
+
+            self.requests = 0
+            self.rate_limited = 0
+            self.failed = 0
+            self.max_in_flight = 0
+            self.connections = 0
+            self.batch_polls = 0
+
+    def stats(self) -> typing.Dict[str, int]:
+
+        with self._lock:
+            return {"requests": self.requests, "rate_limited": self.rate_limited, "failed": self.failed, "max_in_flight": self.max_in_flight, "connections": self.connections, "open_connections": self.open_connections, "batch_polls": self.batch_polls}
+
+    def _connection_opened(self) -> None:
+
+        with self._lock:
+            self.connections += 1
+            self.open_connections += 1
+
+    def _connection_closed(self) -> None:
+
+        with self._lock:
+            self.open_connections -= 1
+
+    def _draw_latency(self) -> float:
+
+        if(self.latency_p99 is None):
+            return self.latency
+
+        return self._random.lognormvariate(math.log(self.latency), math.log(self.latency_p99 / self.latency) / 2.326)
+
+    def _begin(self, provider:str, model:str) -> typing.Tuple[bool, bool, float, int]:
+
+        """
+
+        Counts a request in. Returns whether to answer it with a 500, or with a 429, how long to take otherwise, and the requests remaining this minute.
+
+        """
+
+        with self._lock:
+
+            self.requests += 1
+
+            ## gemini's model names come as models/<model>
+            _failing = provider in self.failing or model.removeprefix("models/") in self.failing
+
+            if(_failing):
+                self.failed += 1
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+
+            _now = time.monotonic()
+
+            self._recent.append(_now)
+
+            while(self._recent and _now - self._recent[0] > 60):
+                self._recent.popleft()
+
+            _remaining = max(self.requests_per_minute - len(self._recent), 0)
+            _limited = not _failing and self._random.random() < self.rate_limit_probability
+            _latency = self._draw_latency()
+
+            if(_limited):
+                self.rate_limited += 1
+
+        return _failing, _limited, _latency, _remaining
+
+    def _end(self) -> None:
+
+        with self._lock:
+            self.in_flight -= 1
+
+    def _handle(self, handler:typing.Any, body:typing.Dict[str, typing.Any]) -> None:
+
+        _path = handler.path.split("?")[0]
+
+        _provider = "openai" if _path.endswith("/chat/completions") else "anthropic" if _path.endswith("/messages") else "gemini"
+        _model = body.get("model") or _path.rpartition("/models/")[2].partition(":")[0]
+
+        _failing, _limited, _latency, _remaining = self._begin(_provider, _model)
+
+        try:
+
+            if(_failing):
+                handler._send(500, {"error": {"message": "Internal server error", "type": "server_error", "code": 500, "status": "INTERNAL"}})
+                return
+
+            if(_limited):
+                handler._send(429, {"error": {"message": "Rate limit reached", "type": "rate_limit_error", "code": 429, "status": "RESOURCE_EXHAUSTED"}},
+                              {"retry-after": str(self.retry_after), "retry-after-ms": str(int(self.retry_after * 1000))})
+                return
+
+            if(body.get("stream")):
+                self._handle_stream(handler, body, _path, _latency, _remaining)
+                return
+
+            time.sleep(_latency)
+
+            if(_path.endswith("/chat/completions")):
+                _text = self._answer(body["messages"][-1]["content"])
+                handler._send(200, {"id": "chatcmpl-mock", "object": "chat.completion", "created": int(time.time()), "model": body["model"],
+                                    "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": _text}}],
+                                    "usage": {"prompt_tokens": len(_text) // 4 + 1, "completion_tokens": len(_text) // 4 + 1, "total_tokens": len(_text) // 2 + 2}},
+                              {"x-ratelimit-limit-requests": str(self.requests_per_minute), "x-ratelimit-remaining-requests": str(_remaining), "x-ratelimit-reset-requests": "1s"})
+
+            elif(_path.endswith("/messages")):
+                _content = body["messages"][-1]["content"]
+                _text = self._answer(_content if isinstance(_content, str) else " ".join(_block.get("text", "") for _block in _content))
+                _reset = (datetime.now(timezone.utc) + timedelta(seconds=1)).isoformat().replace("+00:00", "Z")
+                handler._send(200, {"id": "msg_mock", "type": "message", "role": "assistant", "model": body["model"],
+                                    "content": [{"type": "text", "text": _text}], "stop_reason": "end_turn", "stop_sequence": None,
+                                    "usage": {"input_tokens": len(_text) // 4 + 1, "output_tokens": len(_text) // 4 + 1}},
+                              {"anthropic-ratelimit-requests-limit": str(self.requests_per_minute), "anthropic-ratelimit-requests-remaining": str(_remaining), "anthropic-ratelimit-requests-reset": _reset})
+
+            elif(_path.endswith(":generateContent")):
+                _text = self._answer(body["contents"][-1]["parts"][-1]["text"])
+                handler._send(200, {"candidates": [{"content": {"parts": [{"text": _text}], "role": "model"}, "finishReason": 1, "index": 0}],
+                                    "usageMetadata": {"promptTokenCount": len(_text) // 4 + 1, "candidatesTokenCount": len(_text) // 4 + 1, "totalTokenCount": len(_text) // 2 + 2}})
+
+            else:
+                handler._send(404, {"error": {"message": f"unknown endpoint {_path}"}})
+
+        finally:
+            self._end()
+
+    def _answer(self, prompt:str) -> str:
+
+        """
+
+        Returns the echo of prompt, or for a packed prompt (see ElucidateClient.evaluate_packed()) the json answer evaluating each of its segments, less packed_drop and packed_mangle.
+
+        """
+
+        try:
+            _segments = json.loads(prompt)["segments"]
+
+        except (ValueError, TypeError, KeyError):
+            return prompt
+
+        _evaluations = [{"id": _segment["id"], "evaluation": f"evaluated: {_segment['text']}"} for _segment in _segments]
+        _evaluations = _evaluations[:max(len(_evaluations) - self.packed_drop, 0)]
+
+        for _evaluation in _evaluations[:self.packed_mangle]:
+            _evaluation["id"] = f"mangled-{_evaluation['id']}"
+
+        return json.dumps({"evaluations": _evaluations}, ensure_ascii=False)
+
+    def _handle_batch(self, handler:typing.Any, body:bytes) -> None:
+
+        """
+
+        Answers the Files, Batch API and Message Batches routes, enough for a batch to be submitted, polled and collected.
+
+        """
+
+        _path = handler.path.split("?")[0]
+
+        with self._lock:
+
+            if(handler.command == "POST" and _path.endswith("/files")):
+
+                _file_id = f"file-mock-{len(self._files)}"
+                self._files[_file_id] = self._read_upload(handler.headers["content-type"], body)
+
+                handler._send(200, {"id": _file_id, "object": "file", "bytes": len(self._files[_file_id]), "created_at": int(time.time()), "filename": "batch.jsonl", "purpose": "batch", "status": "processed"})
+
+            elif(handler.command == "GET" and (_match := re.search(r"/files/([^/]+)/content$", _path))):
+                handler._send_bytes(200, self._files[_match.group(1)], "application/octet-stream")
+
+            elif(handler.command == "POST" and _path.endswith("/messages/batches")):
+
+                _batch_id = f"msgbatch_mock_{len(self._batches)}"
+
+                self._batches[_batch_id] = {"statuses": list(self.batch_statuses), "failures": dict(self.batch_failures), "polls": 0, "requests": json.loads(body)["requests"],
+                                            "batch": {"id": _batch_id, "type": "message_batch", "processing_status": "in_progress", "created_at": datetime.now(timezone.utc).isoformat().replace("+00:00", "Z"),
+                                                      "expires_at": (datetime.now(timezone.utc) + timedelta(days=1)).isoformat().replace("+00:00", "Z"), "ended_at": None, "archived_at": None,
+                                                      "cancel_initiated_at": None, "results_url": None, "request_counts": {"processing": 0, "succeeded": 0, "errored": 0, "canceled": 0, "expired": 0}}}
+
+                self._batches[_batch_id]["batch"]["request_counts"]["processing"] = len(self._batches[_batch_id]["requests"])
+
+                handler._send(200, self._batches[_batch_id]["batch"])
+
+            elif(handler.command == "GET" and (_match := re.search(r"/messages/batches/([^/]+)/results$", _path))):
+                handler._send_bytes(200, "".join(json.dumps(_result) + "\n" for _result in self._message_batch_results(self._batches[_match.group(1)])).encode(), "application/binary")
+
+            elif(handler.command == "GET" and (_match := re.search(r"/messages/batches/([^/]+)$", _path))):
+
+                self.batch_polls += 1
+
+                _batch = self._batches[_match.group(1)]
+                _batch["polls"] += 1
+
+                if(_batch["polls"] >= len(_batch["statuses"]) - 1 and _batch["batch"]["processing_status"] != "ended"):
+
+                    _counts = {"processing": 0, "succeeded": 0, "errored": 0, "canceled": 0, "expired": 0}
+
+                    for _result in self._message_batch_results(_batch):
+                        _counts[_result["result"]["type"]] += 1
+
+                    _batch["batch"].update(processing_status="ended", request_counts=_counts, ended_at=datetime.now(timezone.utc).isoformat().replace("+00:00", "Z"),
+                                           results_url=f"{self.url}/v1/messages/batches/{_batch['batch']['id']}/results")
+
+                handler._send(200, _batch["batch"])
+
+            elif(handler.command == "POST" and _path.endswith("/batches")):
+
+                _body = json.loads(body)
+                _batch_id = f"batch-mock-{len(self._batches)}"
+
+                self._batches[_batch_id] = {"statuses": list(self.batch_statuses), "failures": dict(self.batch_failures), "polls": 0,
+                                            "batch": {"id": _batch_id, "object": "batch", "endpoint": _body["endpoint"], "input_file_id": _body["input_file_id"], "completion_window": _body["completion_window"],
+                                                      "status": self.batch_statuses[0], "created_at": int(time.time()), "metadata": _body.get("metadata"), "output_file_id": None, "error_file_id": None}}
+
+                handler._send(200, self._batches[_batch_id]["batch"])
+
+            elif(handler.command == "GET" and (_match := re.search(r"/batches/([^/]+)$", _path))):
+
+                self.batch_polls += 1
+
+                _batch = self._batches[_match.group(1)]
+                _batch["polls"] += 1
+                _batch["batch"]["status"] = _batch["statuses"][min(_batch["polls"], len(_batch["statuses"]) - 1)]
+
+                if(_batch["batch"]["status"] == "completed" and _batch["batch"]["output_file_id"] is None):
+                    self._finish_batch(_batch)
+
+                handler._send(200, _batch["batch"])
+
+            else:
+                handler._send(404, {"error": {"message": f"unknown endpoint {_path}"}})
+
+    def _read_upload(self, content_type:str, body:bytes) -> bytes:
+
+        """
+
+        Returns the file in a multipart upload.
+
+        """
+
+        _message = BytesParser(policy=HTTP).parsebytes(f"content-type: {content_type}\r\n\r\n".encode() + body)
+
+        return next(_part.get_payload(decode=True) for _part in _message.iter_parts() if _part.get_filename()) # type: ignore
+
+    def _finish_batch(self, batch:typing.Dict[str, typing.Any]) -> None:
+
+        """
+
+        Writes a completed batch's output and error files, with a line per request of its input file in reverse order.
+
+        """
+
+        _output = []
+        _errors = []
+
+        for _line in reversed(self._files[batch["batch"]["input_file_id"]].decode().splitlines()):
+
+            if(not _line.strip()):
+                continue
+
+            _request = json.loads(_line)
+            _prompt = _request["body"]["messages"][-1]["content"]
+            _failure = next((_message for _key, _message in batch["failures"].items() if _key in _prompt), None)
+
+            if(_failure is not None):
+                _errors.append({"id": f"batch_req_{_request['custom_id']}", "custom_id": _request["custom_id"], "error": None,
+                                "response": {"status_code": 400, "request_id": "req_mock", "body": {"error": {"message": _failure, "type": "invalid_request_error"}}}})
+
+            else:
+                _text = self._answer(_prompt)
+                _output.append({"id": f"batch_req_{_request['custom_id']}", "custom_id": _request["custom_id"], "error": None,
+                                "response": {"status_code": 200, "request_id": "req_mock",
+                                             "body": {"id": "chatcmpl-mock", "object": "chat.completion", "created": int(time.time()), "model": _request["body"]["model"],
+                                                      "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": _text}}],
+                                                      "usage": {"prompt_tokens": len(_text) // 4 + 1, "completion_tokens": len(_text) // 4 + 1, "total_tokens": len(_text) // 2 + 2}}}})
+
+        for _name, _lines in [("output_file_id", _output), ("error_file_id", _errors)]:
+
+            if(_lines):
+                _file_id = f"file-mock-{len(self._files)}"
+                self._files[_file_id] = "".join(json.dumps(_record) + "\n" for _record in _lines).encode()
+                batch["batch"][_name] = _file_id
+
+        batch["batch"]["request_counts"] = {"total": len(_output) + len(_errors), "completed": len(_output), "failed": len(_errors)}
+
+    def _message_batch_results(self, batch:typing.Dict[str, typing.Any]) -> typing.List[typing.Dict[str, typing.Any]]:
+
+        """
+
+        Returns the result of every request in a message batch, in reverse order.
+
+        """
+
+        _results = []
+
+        for _request in reversed(batch["requests"]):
+
+            _content = _request["params"]["messages"][-1]["content"]
+            _prompt = _content if isinstance(_content, str) else " ".join(_block.get("text", "") for _block in _content)
+            _failure = next((_type for _key, _type in batch["failures"].items() if _key in _prompt), None)
+
+            if(_failure == "errored"):
+                _result = {"type": "errored", "error": {"type": "error", "error": {"type": "invalid_request_error", "message": "The request was rejected."}}}
+
+            elif(_failure is not None):
+                _result = {"type": _failure}
+
+            else:
+                _text = self._answer(_prompt)
+                _result = {"type": "succeeded", "message": {"id": "msg_mock", "type": "message", "role": "assistant", "model": _request["params"]["model"],
+                                                            "content": [{"type": "text", "text": _text}], "stop_reason": "end_turn", "stop_sequence": None,
+                                                            "usage": {"input_tokens": len(_text) // 4 + 1, "output_tokens": len(_text) // 4 + 1}}}
+
+            _results.append({"custom_id": _request["custom_id"], "result": _result})
+
+        return _results
+
+    def _pieces(self, text:str, latency:float) -> typing.Iterator[str]:
+
+        """
+
+        Yields text in stream_chunks pieces, each after its share of latency.
+
+        """
+
+        _count = max(min(self.stream_chunks, len(text)), 1)
+        _size = -(-len(text) // _count)
+
+        for _start in range(0, max(len(text), 1), max(_size, 1)):
+            time.sleep(latency / _count)
+            yield text[_start:_start + _size]
+
+    def _handle_stream(self, handler:typing.Any, body:typing.Dict[str, typing.Any], path:str, latency:float, remaining:int) -> None:
+
+        if(path.endswith("/chat/completions")):
+
+            _text = body["messages"][-1]["content"]
+            _chunk = {"id": "chatcmpl-mock", "object": "chat.completion.chunk", "created": int(time.time()), "model": body["model"]}
+
+            def _events() -> typing.Iterator[typing.Tuple[None, typing.Any]]:
+
+                for _piece in self._pieces(_text, latency):
+                    yield None, {**_chunk, "choices": [{"index": 0, "delta": {"role": "assistant", "content": _piece}, "finish_reason": None}]}
+
+                yield None, {**_chunk, "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]}
+
+                if(body.get("stream_options", {}).get("include_usage")):
+                    yield None, {**_chunk, "choices": [], "usage": {"prompt_tokens": len(_text) // 4 + 1, "completion_tokens": len(_text) // 4 + 1, "total_tokens": len(_text) // 2 + 2}}
+
+                yield None, "[DONE]"
+
+            handler._send_events(_events(), {"x-ratelimit-limit-requests": str(self.requests_per_minute), "x-ratelimit-remaining-requests": str(remaining), "x-ratelimit-reset-requests": "1s"})
+
+        elif(path.endswith("/messages")):
+
+            _content = body["messages"][-1]["content"]
+            _text = _content if isinstance(_content, str) else " ".join(_block.get("text", "") for _block in _content)
+            _reset = (datetime.now(timezone.utc) + timedelta(seconds=1)).isoformat().replace("+00:00", "Z")
+
+            def _events() -> typing.Iterator[typing.Tuple[str, typing.Any]]:
+
+                yield "message_start", {"type": "message_start", "message": {"id": "msg_mock", "type": "message", "role": "assistant", "model": body["model"], "content": [],
+                                                                             "stop_reason": None, "stop_sequence": None, "usage": {"input_tokens": len(_text) // 4 + 1, "output_tokens": 1}}}
+                yield "content_block_start", {"type": "content_block_start", "index": 0, "content_block": {"type": "text", "text": ""}}
+
+                for _piece in self._pieces(_text, latency):
+                    yield "content_block_delta", {"type": "content_block_delta", "index": 0, "delta": {"type": "text_delta", "text": _piece}}
+
+                yield "content_block_stop", {"type": "content_block_stop", "index": 0}
+                yield "message_delta", {"type": "message_delta", "delta": {"stop_reason": "end_turn", "stop_sequence": None}, "usage": {"output_tokens": len(_text) // 4 + 1}}
+                yield "message_stop", {"type": "message_stop"}
+
+            handler._send_events(_events(), {"anthropic-ratelimit-requests-limit": str(self.requests_per_minute), "anthropic-ratelimit-requests-remaining": str(remaining), "anthropic-ratelimit-requests-reset": _reset})
+
+        else:
+            handler._send(404, {"error": {"message": f"unknown streaming endpoint {path}"}})
+
+##-------------------start-of-MockProviderProcess---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+class MockProviderProcess:
+
+    """
+
+    Runs a MockProviderServer in its own interpreter, so serving responses doesn't compete with the client being measured for the GIL.
+
+    """
+
+    def __init__(self) -> None:
+
+        self._process = subprocess.Popen([sys.executable, __file__], stdout=subprocess.PIPE, text=True)
+
+        ## the child prints its addresses once it's listening
+        _line = self._process.stdout.readline() # type: ignore
+
+        assert _line.startswith("{"), RuntimeError("The mock provider server didn't start.")
+
+        _addresses = json.loads(_line)
+
+        self.url:str = _addresses["url"]
+        self.grpc_address:str = _addresses["grpc_address"]
+
+    def __enter__(self) -> "MockProviderProcess":
+        return self
+
+    def __exit__(self, *args) -> None:
+
+        self._process.terminate()
+        self._process.wait()
+
+    def configure(self, **settings:typing.Any) -> None:
+
+        """
+
+        See MockProviderServer.configure().
+
+        """
+
+        _request = urllib.request.Request(f"{self.url}/_mock/config", data=json.dumps(settings).encode(), headers={"content-type": "application/json"})
+
+        with urllib.request.urlopen(_request) as _response:
+            _response.read()
+
+    def stats(self) -> typing.Dict[str, int]:
+
+        with urllib.request.urlopen(f"{self.url}/_mock/stats") as _response:
+            return json.loads(_response.read())
+
+##-------------------start-of-main()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+if(__name__ == "__main__"):
+
+    with MockProviderServer() as server:
+
+        print(json.dumps({"url": server.url, "grpc_address": server.grpc_address}), flush=True)
+
+        ## serves until the parent terminates it
+        threading.Event().wait()
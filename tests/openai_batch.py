@@ -0,0 +1,162 @@
+## Copyright 2024 Kakusui LLC (https://kakusui.org) (https://github.com/Kakusui) (https://github.com/Kakusui/Elucidate)
+## Use of this source code is governed by an GNU Lesser General Public License v2.1
+## license that can be found in the LICENSE file.
+
+## built-in libraries
+import json
+import logging
+import os
+import sys
+import time
+import typing
+import urllib.request
+
+## local stand-ins for the provider endpoints
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from mock_providers import MockProviderProcess
+from benchmark import make_client
+
+##-------------------start-of-attributes---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+texts = [f"Original text:\n文{_index}\n\nTranslated text:\nString {_index}" + (" REJECT" if _index % 5 == 2 else "") for _index in range(12)]
+
+rejected = [_index for _index, _text in enumerate(texts) if "REJECT" in _text]
+
+failures_by_marker = {"REJECT": "The request was rejected."}
+
+## created, one retrieve for openai_batch_status(), then five more while resuming
+statuses = ["validating", "in_progress", "in_progress", "in_progress", "in_progress", "finalizing", "completed"]
+
+## the waits between the resume's polls are 0.2, 0.3, 0.3 and 0.3 seconds, 1.1 in all, where without the cap they'd add up to 1.625
+poll_interval = 0.2
+max_poll_interval = 0.3
+backoff_window = (1.1, 1.625)
+
+##-------------------start-of-main()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+def main() -> int:
+
+    """
+
+    Submits a batch without waiting, checks its status, then resumes it from a fresh client and checks the results and errors come back in input order. Also checks a batch that fails as a whole, one that times out and one not submitted by Elucidate.
+
+    """
+
+    ## tiktoken can't download its encodings without a network, which only matters for validating text length
+    logging.disable(logging.ERROR)
+
+    failures:typing.List[str] = []
+
+    with MockProviderProcess() as server:
+
+        from elucidate import BatchResults
+        from elucidate.exceptions import ElucidateException
+
+        server.configure(batch_statuses=statuses, batch_failures=failures_by_marker)
+
+        _batch_id = make_client(server).openai_evaluate_batch(texts, wait=False)
+
+        if(not isinstance(_batch_id, str)):
+            failures.append(f"wait=False returned {_batch_id!r}, not the batch id")
+
+        ## the uploaded file, a request per text with its index as custom_id
+        with urllib.request.urlopen(f"{server.url}/v1/files/file-mock-0/content") as _response:
+            _lines = [json.loads(_line) for _line in _response.read().decode().splitlines()]
+
+        if([_line["custom_id"] for _line in _lines] != [str(_index) for _index in range(len(texts))]):
+            failures.append("the uploaded file's custom_ids aren't the text indices in order")
+
+        if([_line["body"]["messages"][-1]["content"] for _line in _lines] != texts or any(_line["url"] != "/v1/chat/completions" for _line in _lines)):
+            failures.append("the uploaded file's requests aren't chat completions of the texts")
+
+        _status = make_client(server).openai_batch_status(_batch_id)
+
+        print(f"submitted {_batch_id}, status {_status}")
+
+        if(_status != "in_progress"):
+            failures.append(f"the status after one retrieve was {_status}, not in_progress")
+
+        ## a fresh client, all it knows is the id
+        _fresh = make_client(server)
+
+        _start = time.monotonic()
+        _results = _fresh.openai_resume_batch(_batch_id, poll_interval=poll_interval, max_poll_interval=max_poll_interval)
+        _elapsed = time.monotonic() - _start
+
+        _polls = server.stats()["batch_polls"]
+
+        print(f"resumed after {_polls} polls in {_elapsed:.2f}s, {len(_results.errors)} errors")
+
+        if(not isinstance(_results, BatchResults) or _results.batch_ids != [_batch_id]):
+            failures.append(f"resuming returned {_results!r}, not the BatchResults of {_batch_id}")
+
+        if(_polls != len(statuses) - 1):
+            failures.append(f"the batch was retrieved {_polls} times, not {len(statuses) - 1}")
+
+        if(not backoff_window[0] <= _elapsed < backoff_window[1]):
+            failures.append(f"resuming took {_elapsed:.2f}s, outside the {backoff_window} the capped backoff should take")
+
+        _expected = [None if _index in rejected else _text for _index, _text in enumerate(texts)]
+
+        if(list(_results) != _expected):
+            failures.append("the results weren't the evaluations in input order, with None for the rejected texts")
+
+        if(sorted(_results.errors) != rejected or not all("rejected" in str(_error) for _error in _results.errors.values())):
+            failures.append(f"the errors were {_results.errors}, not the rejections of {rejected}")
+
+        ## the response type goes with the batch's metadata
+        server.configure(batch_statuses=["validating", "completed"], batch_failures={})
+
+        _raw = make_client(server).openai_evaluate_batch(texts[:3], response_type="raw", poll_interval=0.01)
+
+        if(not all(hasattr(_result, "choices") for _result in _raw) or [_result.choices[0].message.content for _result in _raw] != texts[:3]):
+            failures.append(f"a raw batch returned {_raw!r}, not ChatCompletions of the texts")
+
+        ## a batch that fails as a whole has no files, every text gets an error
+        server.configure(batch_statuses=["validating", "failed"])
+
+        _failed = make_client(server).openai_evaluate_batch(texts[:4], poll_interval=0.01)
+
+        if(list(_failed) != [None] * 4 or sorted(_failed.errors) != [0, 1, 2, 3] or not all("'failed'" in str(_error) for _error in _failed.errors.values())):
+            failures.append(f"a failed batch returned {_failed!r}, not an error per text")
+
+        ## timing out leaves the batch running, so it can be resumed later
+        server.configure(batch_statuses=["validating", "in_progress"])
+
+        _client = make_client(server)
+        _running = _client.openai_evaluate_batch(texts[:2], wait=False)
+
+        try:
+            _client.openai_resume_batch(_running, poll_interval=0.05, timeout=0.3)
+            failures.append("resuming a batch that never finishes didn't time out")
+
+        except ElucidateException as e:
+            print(f"timed out: {e}")
+
+        if(_client.openai_batch_status(_running) != "in_progress"):
+            failures.append("the batch didn't keep running after the timeout")
+
+        ## without the metadata there's nothing to map the results back with
+        server.configure(batch_statuses=["completed"])
+
+        _foreign = _client._openai_service._sync_client.batches.create(input_file_id="file-mock-0", endpoint="/v1/chat/completions", completion_window="24h").id
+
+        try:
+            _client.openai_resume_batch(_foreign, poll_interval=0.01)
+            failures.append("a batch not submitted by openai_evaluate_batch() was resumed")
+
+        except AssertionError as e:
+
+            if(not isinstance(e.args[0], ElucidateException)):
+                failures.append(f"resuming a foreign batch raised {e.args[0]!r}, not ElucidateException")
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+
+    return 1 if failures else 0
+
+##-------------------end-of-main()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+if(__name__ == "__main__"):
+    sys.exit(main())
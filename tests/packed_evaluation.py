@@ -0,0 +1,250 @@
+## Copyright 2024 Kakusui LLC (https://kakusui.org) (https://github.com/Kakusui) (https://github.com/Kakusui/Elucidate)
+## Use of this source code is governed by an GNU Lesser General Public License v2.1
+## license that can be found in the LICENSE file.
+
+## built-in libraries
+import asyncio
+import json
+import logging
+import os
+import sys
+import typing
+
+## local stand-ins for the provider endpoints
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from mock_providers import MockProviderProcess
+from benchmark import make_client
+
+##-------------------start-of-attributes---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+## short segments of uneven length, so the packs come out uneven too
+segments = [f"Original text:\n文{_index}\n\nTranslated text:\nString {_index}{' padding' * (_index % 7)}" for _index in range(40)]
+
+token_budget = 120
+max_segments_per_request = 6
+max_retries = 2
+
+## the defaults, gpt-4 and gemini-pro, have no json mode
+models = {"openai": "gpt-4o-mini", "gemini": "gemini-1.5-flash"}
+
+## (packed_drop, packed_mangle) the stand-in answers with
+faults = [(0, 0), (1, 0), (0, 1), (1, 1)]
+
+##-------------------start-of-expected_run()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+def expected_run(drop:int, mangle:int) -> typing.Tuple[int, typing.List[int]]:
+
+    """
+
+    Works out what evaluate_packed() should do against the stand-in's faults, packing exactly as it does.
+
+    Returns:
+    requests (int) : How many requests it should send, packed and unpacked.
+    fallback (list[int]) : The segments it should end up evaluating on their own.
+
+    """
+
+    from elucidate.util.packing import _pack_segments
+
+    _requests = 0
+    _pending = list(range(len(segments)))
+
+    for _ in range(max_retries + 1):
+
+        if(not _pending):
+            break
+
+        _answered = set()
+
+        for _pack in _pack_segments([(_index, segments[_index]) for _index in _pending], token_budget, max_segments_per_request):
+            _requests += 1
+            _answered.update(_index for _index, _ in _pack[mangle:max(len(_pack) - drop, 0)])
+
+        _pending = [_index for _index in _pending if _index not in _answered]
+
+    return _requests + len(_pending), _pending
+
+##-------------------start-of-check_packing()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+def check_packing(failures:typing.List[str]) -> None:
+
+    """
+
+    Checks the packs keep every segment once, in order, within the budget and segment limit, and that an oversized segment goes on its own.
+
+    """
+
+    from elucidate.util.packing import _pack_segments
+    from elucidate.util.rate_limiter import _estimate_tokens
+
+    _oversized = "x " * 2000
+    _segments = list(enumerate(segments[:10] + [_oversized] + segments[10:20]))
+
+    _packs = _pack_segments(_segments, token_budget, max_segments_per_request)
+
+    if([_segment for _pack in _packs for _segment in _pack] != _segments):
+        failures.append("packing lost, repeated or reordered segments")
+
+    for _pack in _packs:
+
+        _tokens = sum(_estimate_tokens([json.dumps({"id": str(_index), "text": _text}, ensure_ascii=False)]) for _index, _text in _pack)
+
+        if(len(_pack) > max_segments_per_request):
+            failures.append(f"a pack held {len(_pack)} segments, over max_segments_per_request")
+
+        if(_tokens > token_budget and len(_pack) > 1):
+            failures.append(f"a pack of {len(_pack)} segments held {_tokens} tokens, over the budget of {token_budget}")
+
+    if([(10, _oversized)] not in _packs):
+        failures.append("the oversized segment wasn't packed on its own")
+
+    if(len(_pack_segments([(0, "a"), (1, "b"), (2, "c")], token_budget, 1)) != 3):
+        failures.append("max_segments_per_request=1 didn't give a pack per segment")
+
+    if(_pack_segments([], token_budget, max_segments_per_request) != []):
+        failures.append("packing nothing gave packs")
+
+    print(f"packing: {len(_segments)} segments into {len(_packs)} packs")
+
+##-------------------start-of-check_parsing()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+def check_parsing(failures:typing.List[str]) -> None:
+
+    """
+
+    Checks answers are split back by segment id, and that anything dropped, mangled or malformed is left out for a retry.
+
+    """
+
+    from elucidate.util.packing import _build_packed_prompt, _parse_packed_response
+
+    _pack = [(4, "four"), (7, "seven"), (9, "nine")]
+    _answer = {"evaluations": [{"id": "9", "evaluation": "E9"}, {"id": "4", "evaluation": "E4"}, {"id": "7", "evaluation": "E7"}]}
+
+    if(json.loads(_build_packed_prompt(_pack)) != {"segments": [{"id": "4", "text": "four"}, {"id": "7", "text": "seven"}, {"id": "9", "text": "nine"}]}):
+        failures.append("the packed prompt isn't the segments keyed by id")
+
+    _cases = {"out of order": (json.dumps(_answer), {4: "E4", 7: "E7", 9: "E9"}),
+              "parsed already": (_answer, {4: "E4", 7: "E7", 9: "E9"}),
+              "code fence": (f"```json\n{json.dumps(_answer)}\n```", {4: "E4", 7: "E7", 9: "E9"}),
+              "dropped": ({"evaluations": _answer["evaluations"][:2]}, {9: "E9", 4: "E4"}),
+              "unknown id": ({"evaluations": [{"id": "5", "evaluation": "E5"}, {"id": "7", "evaluation": "E7"}]}, {7: "E7"}),
+              "repeated id": ({"evaluations": [{"id": "7", "evaluation": "first"}, {"id": "7", "evaluation": "second"}]}, {7: "first"}),
+              "integer id": ({"evaluations": [{"id": 4, "evaluation": "E4"}]}, {4: "E4"}),
+              "blank or not a string": ({"evaluations": [{"id": "4", "evaluation": "  "}, {"id": "7", "evaluation": 7}, {"id": "9"}, "E9"]}, {}),
+              "no evaluations": ({"results": _answer["evaluations"]}, {}),
+              "not json": ("E4, E7 and E9", {}),
+              "not an object": ("[1, 2, 3]", {})}
+
+    for _name, (_response, _expected) in _cases.items():
+
+        _parsed = _parse_packed_response(_response, _pack)
+
+        if(_parsed != _expected):
+            failures.append(f"parsing a {_name} answer gave {_parsed}, not {_expected}")
+
+    print(f"parsing: {len(_cases)} answers")
+
+##-------------------start-of-main()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+def main() -> int:
+
+    """
+
+    Checks packing and parsing offline, then packed evaluation against the stand-in: that results come back in input order, and that segments it drops or mangles are repacked and then evaluated on their own after max_retries.
+
+    """
+
+    ## tiktoken can't download its encodings without a network, which only matters for validating text length
+    logging.disable(logging.ERROR)
+
+    failures:typing.List[str] = []
+
+    check_packing(failures)
+    check_parsing(failures)
+
+    with MockProviderProcess() as server:
+
+        from elucidate.exceptions import InvalidResponseFormatException
+
+        client = make_client(server)
+
+        ## the stand-in echoes unpacked prompts, so a fallback's result is the segment itself
+        def _check(provider:str, mode:str, drop:int, mangle:int, results:typing.Any) -> None:
+
+            _requests, _fallback = expected_run(drop, mangle)
+            _expected = [segments[_index] if _index in _fallback else f"evaluated: {segments[_index]}" for _index in range(len(segments))]
+            _sent = server.stats()["requests"]
+
+            print(f"{provider} {mode}, dropping {drop} and mangling {mangle}: {_sent} requests, {len(_fallback)} segments evaluated on their own")
+
+            if(results != _expected):
+                failures.append(f"{provider} {mode}, dropping {drop} and mangling {mangle}: results weren't the evaluations in input order")
+
+            if(_sent != _requests):
+                failures.append(f"{provider} {mode}, dropping {drop} and mangling {mangle}: sent {_sent} requests, not {_requests}")
+
+        for provider, model in models.items():
+
+            for drop, mangle in faults:
+
+                server.configure(packed_drop=drop, packed_mangle=mangle)
+
+                _results = client.evaluate_packed(segments, provider, token_budget=token_budget, max_segments_per_request=max_segments_per_request, max_retries=max_retries, model=model)
+
+                _check(provider, "sync", drop, mangle, _results)
+
+        async def _run() -> None:
+
+            ## grpc's async channels belong to the loop they're made in
+            import grpc
+            from google.ai.generativelanguage_v1beta.services.generative_service import GenerativeServiceAsyncClient, transports
+
+            client._gemini_service._client_manager.clients["generative_async"] = GenerativeServiceAsyncClient(transport=transports.GenerativeServiceGrpcAsyncIOTransport(channel=grpc.aio.insecure_channel(server.grpc_address)))
+
+            for provider, model in models.items():
+
+                for drop, mangle in faults:
+
+                    server.configure(packed_drop=drop, packed_mangle=mangle)
+
+                    _results = await client.evaluate_packed_async(segments, provider, token_budget=token_budget, max_segments_per_request=max_segments_per_request, max_retries=max_retries, model=model)
+
+                    _check(provider, "async", drop, mangle, _results)
+
+        asyncio.run(_run())
+
+        ## a single text comes back as a single result
+        server.configure(packed_drop=0, packed_mangle=0)
+
+        _single = client.evaluate_packed(segments[0], "openai", model=models["openai"])
+
+        if(_single != f"evaluated: {segments[0]}"):
+            failures.append(f"a single text came back as {_single!r}")
+
+        for provider in models:
+
+            server.configure()
+
+            try:
+                client.evaluate_packed(segments, provider)
+                failures.append(f"{provider}'s default model, which has no json mode, was accepted")
+
+            except AssertionError as e:
+
+                if(not isinstance(e.args[0], InvalidResponseFormatException)):
+                    failures.append(f"{provider}'s default model raised {e.args[0]!r}, not InvalidResponseFormatException")
+
+            if(server.stats()["requests"] != 0):
+                failures.append(f"{provider}'s default model was refused only after sending requests")
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+
+    return 1 if failures else 0
+
+##-------------------end-of-main()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+if(__name__ == "__main__"):
+    sys.exit(main())
@@ -0,0 +1,252 @@
+## Copyright 2024 Kakusui LLC (https://kakusui.org) (https://github.com/Kakusui) (https://github.com/Kakusui/Elucidate)
+## Use of this source code is governed by an GNU Lesser General Public License v2.1
+## license that can be found in the LICENSE file.
+
+## built-in libraries
+import asyncio
+import logging
+import os
+import sys
+import tempfile
+import typing
+
+## local stand-ins for the provider endpoints
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from mock_providers import MockProviderProcess
+from benchmark import make_client
+
+##-------------------start-of-attributes---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+texts = [f"Original text:\n文{_index}\n\nTranslated text:\nString {_index}" for _index in range(10)]
+
+## models the token counter has no limit for, so validating texts never waits on tiktoken's download
+model = "mock-small"
+failing_model = "mock-large"
+
+buckets = (0.01, 0.1, 1.0)
+
+##-------------------start-of-parse()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+def parse(exposition:str) -> typing.Dict[str, float]:
+
+    """
+
+    Returns every sample in a Prometheus text exposition, keyed by its name and labels as written.
+
+    """
+
+    _samples:typing.Dict[str, float] = {}
+
+    for _line in exposition.splitlines():
+
+        if(not _line or _line.startswith("#")):
+            continue
+
+        _key, _, _value = _line.rpartition(" ")
+        _samples[_key] = float(_value)
+
+    return _samples
+
+##-------------------start-of-retrying_once()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+def retrying_once(function:typing.Callable) -> typing.Callable:
+
+    """
+
+    A decorator that makes every request twice, as a retrying decorator would after a failure.
+
+    """
+
+    async def _decorated(instructions:typing.Any, prompt:typing.Any) -> typing.Any:
+
+        await function(instructions, prompt)
+
+        return await function(instructions, prompt)
+
+    return _decorated
+
+##-------------------start-of-check_exposition()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+def check_exposition(directory:str, failures:typing.List[str]) -> None:
+
+    """
+
+    Checks the exposition offline: histogram buckets are cumulative up to +Inf, sums and counters add up, label values are escaped, the callback gets every record, write_prometheus() writes the same text and bad buckets are refused.
+
+    """
+
+    from elucidate import Metrics
+
+    _records:typing.List[typing.Dict[str, typing.Any]] = []
+
+    _metrics = Metrics(buckets=buckets, callback=_records.append)
+
+    for _latency in [0.005, 0.05, 0.5, 5.0]:
+        _metrics.record_attempt("openai", model, queue_wait=0.0, delay=0.0, latency=_latency, input_tokens=3, output_tokens=2, error=None)
+
+    _metrics.record_attempt("openai", model, queue_wait=0.0, delay=0.25, latency=None, input_tokens=0, output_tokens=0, error=ValueError())
+    _metrics.record_request("openai", model, attempts=5, duration=6.0, error=ValueError())
+
+    _metrics.record_attempt("openai", "quoted \"model\"\nname", queue_wait=0.0, delay=0.0, latency=0.5, input_tokens=0, output_tokens=0, error=None)
+
+    _exposition = _metrics.to_prometheus()
+    _samples = parse(_exposition)
+
+    _labels = f"provider=\"openai\",model=\"{model}\""
+
+    _expected = {f"elucidate_request_latency_seconds_bucket{{{_labels},le=\"0.01\"}}": 1,
+                 f"elucidate_request_latency_seconds_bucket{{{_labels},le=\"0.1\"}}": 2,
+                 f"elucidate_request_latency_seconds_bucket{{{_labels},le=\"1.0\"}}": 3,
+                 f"elucidate_request_latency_seconds_bucket{{{_labels},le=\"+Inf\"}}": 4,
+                 f"elucidate_request_latency_seconds_count{{{_labels}}}": 4,
+                 f"elucidate_request_latency_seconds_sum{{{_labels}}}": 5.555,
+                 f"elucidate_request_duration_seconds_count{{{_labels}}}": 1,
+                 f"elucidate_attempts_total{{{_labels}}}": 5,
+                 f"elucidate_requests_total{{{_labels}}}": 1,
+                 f"elucidate_failed_requests_total{{{_labels}}}": 1,
+                 f"elucidate_retries_total{{{_labels}}}": 4,
+                 f"elucidate_delay_seconds_total{{{_labels}}}": 0.25,
+                 f"elucidate_input_tokens_total{{{_labels}}}": 12,
+                 f"elucidate_output_tokens_total{{{_labels}}}": 8,
+                 f"elucidate_errors_total{{{_labels},error=\"ValueError\"}}": 1,
+                 "elucidate_attempts_total{provider=\"openai\",model=\"quoted \\\"model\\\"\\nname\"}": 1}
+
+    for _key, _value in _expected.items():
+
+        if(_key not in _samples or abs(_samples[_key] - _value) > 1e-9):
+            failures.append(f"exposition: {_key} was {_samples.get(_key)}, not {_value}")
+
+    for _type in ["histogram", "counter"]:
+
+        if(f"# TYPE elucidate_{'request_latency_seconds' if _type == 'histogram' else 'requests_total'} {_type}" not in _exposition):
+            failures.append(f"exposition: no {_type} TYPE line")
+
+    if([_record["type"] for _record in _records] != ["attempt"] * 5 + ["request", "attempt"] or _records[4]["error"] != "ValueError"):
+        failures.append(f"the callback got {[(_record['type'], _record['error']) for _record in _records]}, not every record in order")
+
+    _path = os.path.join(directory, "elucidate.prom")
+
+    _metrics.write_prometheus(_path)
+
+    with open(_path, "r", encoding="utf-8") as _file:
+
+        if(_file.read() != _metrics.to_prometheus()):
+            failures.append("write_prometheus() wrote something other than to_prometheus()")
+
+    if(os.listdir(directory) != ["elucidate.prom"]):
+        failures.append(f"write_prometheus() left {os.listdir(directory)} behind")
+
+    _metrics.reset()
+
+    if(_metrics.snapshot() or "elucidate_attempts_total{" in _metrics.to_prometheus()):
+        failures.append("reset() didn't forget what was recorded")
+
+    for _buckets in [(), (1.0, 0.1)]:
+
+        try:
+            Metrics(buckets=_buckets)
+            failures.append(f"Metrics took buckets={_buckets}")
+
+        except AssertionError as e:
+
+            if(not isinstance(e.args[0], ValueError)):
+                failures.append(f"Metrics(buckets={_buckets}) raised {e.args[0]!r}, not ValueError")
+
+##-------------------start-of-main()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+def main() -> int:
+
+    """
+
+    Checks the exposition offline, then against the stand-in that a batch records a request and an attempt per text with the tokens the responses reported, that a retrying decorator's extra calls count as retries, that failed texts count as failed requests with their error class, and that set_metrics(None) stops recording.
+
+    """
+
+    from elucidate import Metrics
+
+    ## tiktoken can't download its encodings without a network, which only matters for validating text length
+    logging.disable(logging.ERROR)
+
+    failures:typing.List[str] = []
+
+    with tempfile.TemporaryDirectory() as _directory:
+        check_exposition(_directory, failures)
+
+    with MockProviderProcess() as server:
+
+        client = make_client(server)
+
+        _metrics = Metrics()
+        client.set_metrics(_metrics)
+
+        _labels = f"provider=\"openai\",model=\"{model}\""
+
+        ## the stand-in reports a quarter of the echoed text's length, plus one, as both input and output tokens
+        _tokens = sum(len(_text) // 4 + 1 for _text in texts)
+
+        async def _run() -> None:
+
+            await client.openai_evaluate_async(texts, model=model)
+
+            _samples = parse(_metrics.to_prometheus())
+
+            print(f"a batch of {len(texts)}: {_samples.get(f'elucidate_requests_total{{{_labels}}}')} requests, {_samples.get(f'elucidate_input_tokens_total{{{_labels}}}')} input tokens")
+
+            for _name, _value in [("elucidate_requests_total", len(texts)), ("elucidate_attempts_total", len(texts)), ("elucidate_retries_total", 0),
+                                  ("elucidate_request_latency_seconds_count", len(texts)), ("elucidate_input_tokens_total", _tokens), ("elucidate_output_tokens_total", _tokens)]:
+
+                if(_samples.get(f"{_name}{{{_labels}}}") != _value):
+                    failures.append(f"a batch of {len(texts)}: {_name} was {_samples.get(f'{_name}{{{_labels}}}')}, not {_value}")
+
+            ## every text sent twice by the decorator
+            _metrics.reset()
+
+            await client.openai_evaluate_async(texts, model=model, decorator=retrying_once)
+
+            _samples = parse(_metrics.to_prometheus())
+
+            if(_samples.get(f"elucidate_attempts_total{{{_labels}}}") != 2 * len(texts) or _samples.get(f"elucidate_retries_total{{{_labels}}}") != len(texts)):
+                failures.append(f"retrying once: {_samples.get(f'elucidate_attempts_total{{{_labels}}}')} attempts and {_samples.get(f'elucidate_retries_total{{{_labels}}}')} retries, not {2 * len(texts)} and {len(texts)}")
+
+            ## every text failing
+            server.configure(failing=[failing_model])
+
+            _results = client.openai_evaluate(texts, model=failing_model, max_workers=4)
+
+            server.configure(failing=[])
+
+            _failing_labels = f"provider=\"openai\",model=\"{failing_model}\""
+            _snapshot = _metrics.snapshot()[f"openai:{failing_model}"]
+
+            print(f"failing model: {_snapshot['failed_requests']} failed requests, errors {_snapshot['errors']}")
+
+            if(len(_results.errors) != len(texts) or _snapshot["failed_requests"] != len(texts) or sum(_snapshot["errors"].values()) != len(texts)):
+                failures.append(f"failing model: {_snapshot['failed_requests']} failed requests and errors {_snapshot['errors']} for {len(texts)} failed texts")
+
+            _error = type(_results.errors[0]).__name__
+
+            if(parse(_metrics.to_prometheus()).get(f"elucidate_errors_total{{{_failing_labels},error=\"{_error}\"}}") != len(texts)):
+                failures.append(f"failing model: elucidate_errors_total wasn't {len(texts)} for {_error}")
+
+            ## off
+            client.set_metrics(None)
+
+            _before = _metrics.to_prometheus()
+
+            await client.openai_evaluate_async(texts, model=model)
+
+            if(client.get_metrics() is not None or _metrics.to_prometheus() != _before):
+                failures.append("set_metrics(None) didn't stop recording")
+
+        asyncio.run(_run())
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+
+    return 1 if failures else 0
+
+##-------------------end-of-main()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+if(__name__ == "__main__"):
+    sys.exit(main())
@@ -0,0 +1,193 @@
+## Copyright 2024 Kakusui LLC (https://kakusui.org) (https://github.com/Kakusui) (https://github.com/Kakusui/Elucidate)
+## Use of this source code is governed by an GNU Lesser General Public License v2.1
+## license that can be found in the LICENSE file.
+
+## built-in libraries
+import asyncio
+import logging
+import os
+import sys
+import time
+import typing
+
+## local stand-ins for the provider endpoints
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from mock_providers import MockProviderProcess
+from benchmark import make_client
+
+##-------------------start-of-attributes---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+## a minute's budget goes out at once, every request or token after it refills at a 60th of the limit a second
+requests_per_minute = 600
+tokens_per_minute = 6000
+
+## how far a paced wait may be off the refill rate, either way
+tolerance = 0.15
+
+## a model the token counter has no limit for, so validating texts never waits on tiktoken's download
+model = "mock-small"
+
+## just over a minute's requests, so the last few are paced at a request a second, while the batch unpaced takes well under a second
+paced_requests_per_minute = 60
+extra_requests = 2
+
+text = "Original text:\n文\n\nTranslated text:\nString"
+
+##-------------------start-of-timed()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+def timed(function:typing.Callable[[], typing.Any]) -> float:
+
+    """
+
+    Returns how long function took to call, in seconds.
+
+    """
+
+    _start = time.monotonic()
+    function()
+
+    return time.monotonic() - _start
+
+##-------------------start-of-check_wait()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+def check_wait(name:str, waited:float, expected:float, failures:typing.List[str]) -> None:
+
+    print(f"{name}: waited {waited:.3f}s, expected {expected:.3f}s")
+
+    if(abs(waited - expected) > tolerance):
+        failures.append(f"{name}: waited {waited:.3f}s, not {expected:.3f}s")
+
+##-------------------start-of-check_limiter()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+def check_limiter(failures:typing.List[str]) -> None:
+
+    """
+
+    Checks the limiter offline: a minute's budget goes out at once, then requests and tokens are paced at the refill rate, and settling corrects the token budget both ways.
+
+    """
+
+    from elucidate.util.rate_limiter import RateLimiter
+
+    ## requests
+    _limiter = RateLimiter(requests_per_minute=requests_per_minute)
+
+    check_wait("a minute's requests", timed(lambda: [_limiter.acquire_sync(0) for _ in range(requests_per_minute)]), 0.0, failures)
+    check_wait("5 more requests", timed(lambda: [_limiter.acquire_sync(0) for _ in range(5)]), 5 * 60 / requests_per_minute, failures)
+
+    ## tokens, async
+    _limiter = RateLimiter(tokens_per_minute=tokens_per_minute)
+
+    async def _acquire(*amounts:int) -> None:
+        for _amount in amounts:
+            await _limiter.acquire(_amount)
+
+    check_wait("a minute's tokens", timed(lambda: asyncio.run(_acquire(tokens_per_minute))), 0.0, failures)
+    check_wait("50 more tokens", timed(lambda: asyncio.run(_acquire(50))), 50 * 60 / tokens_per_minute, failures)
+
+    ## a request estimated at the whole budget that used a 6th of it gives the rest back
+    _limiter = RateLimiter(tokens_per_minute=tokens_per_minute)
+
+    _limiter.acquire_sync(tokens_per_minute)
+    _limiter.settle(tokens_per_minute, tokens_per_minute // 6)
+
+    check_wait("after settling under the estimate", timed(lambda: _limiter.acquire_sync(tokens_per_minute // 2)), 0.0, failures)
+
+    ## one that used 50 more than estimated has to be paid back before the next request
+    _limiter = RateLimiter(tokens_per_minute=tokens_per_minute)
+
+    _limiter.acquire_sync(tokens_per_minute)
+    _limiter.settle(tokens_per_minute, tokens_per_minute + 50)
+
+    check_wait("after settling over the estimate", timed(lambda: _limiter.acquire_sync(50)), 100 * 60 / tokens_per_minute, failures)
+
+    ## unknown usage keeps the estimate
+    _limiter = RateLimiter(tokens_per_minute=tokens_per_minute)
+
+    _limiter.acquire_sync(tokens_per_minute)
+    _limiter.settle(tokens_per_minute, None)
+
+    check_wait("after settling without usage", timed(lambda: _limiter.acquire_sync(50)), 50 * 60 / tokens_per_minute, failures)
+
+    for _settings in [{"requests_per_minute": 0}, {"tokens_per_minute": -1}]:
+
+        try:
+            RateLimiter(**_settings)
+            failures.append(f"RateLimiter took {_settings}")
+
+        except AssertionError as e:
+
+            if(not isinstance(e.args[0], ValueError)):
+                failures.append(f"RateLimiter({_settings}) raised {e.args[0]!r}, not ValueError")
+
+##-------------------start-of-main()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+def main() -> int:
+
+    """
+
+    Checks the rate limiter offline, then against the stand-in that a batch over a model's requests per minute is paced at the refill rate, that only the limited model waits, and that removing the limit stops the pacing.
+
+    """
+
+    ## tiktoken can't download its encodings without a network, which only matters for validating text length
+    logging.disable(logging.ERROR)
+
+    failures:typing.List[str] = []
+
+    check_limiter(failures)
+
+    with MockProviderProcess() as server:
+
+        client = make_client(server)
+
+        _texts = [text] * (paced_requests_per_minute + extra_requests)
+
+        async def _run() -> None:
+
+            client.set_rate_limits("openai", requests_per_minute=paced_requests_per_minute, model=model)
+
+            _start = time.monotonic()
+            _results = await client.openai_evaluate_async(_texts, model=model, semaphore=len(_texts))
+
+            check_wait(f"{len(_texts)} requests at {paced_requests_per_minute} a minute", time.monotonic() - _start, extra_requests * 60 / paced_requests_per_minute, failures)
+
+            if(_results != _texts or server.stats()["requests"] != len(_texts)):
+                failures.append("the paced batch wasn't evaluated in full")
+
+            ## another model of the provider isn't limited
+            _start = time.monotonic()
+            await client.openai_evaluate_async(_texts, model="mock-large", semaphore=len(_texts))
+
+            _elapsed = time.monotonic() - _start
+
+            print(f"an unlimited model: took {_elapsed:.3f}s")
+
+            if(_elapsed >= 60 / paced_requests_per_minute):
+                failures.append(f"an unlimited model took {_elapsed:.3f}s, it was paced by another model's limit")
+
+            ## removed, the limited model isn't paced any more either
+            client.set_rate_limits("openai", model=model)
+
+            _start = time.monotonic()
+            await client.openai_evaluate_async(_texts, model=model, semaphore=len(_texts))
+
+            _elapsed = time.monotonic() - _start
+
+            print(f"after removing the limit: took {_elapsed:.3f}s")
+
+            if(_elapsed >= 60 / paced_requests_per_minute):
+                failures.append(f"after removing the limit the batch took {_elapsed:.3f}s, it was still paced")
+
+        asyncio.run(_run())
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+
+    return 1 if failures else 0
+
+##-------------------end-of-main()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+if(__name__ == "__main__"):
+    sys.exit(main())
@@ -0,0 +1,93 @@
+## Copyright 2024 Kakusui LLC (https://kakusui.org) (https://github.com/Kakusui) (https://github.com/Kakusui/Elucidate)
+## Use of this source code is governed by an GNU Lesser General Public License v2.1
+## license that can be found in the LICENSE file.
+
+## built-in libraries
+import logging
+import timeit
+import sys
+
+##-------------------start-of-attributes---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+## calls per timing, and timings per measurement, the fastest is kept
+number = 20000
+repeat = 5
+
+## building a request from the service's template must take at most this share of the time it takes with the template built again for every request
+## the template saves well over half on both providers, so this only fails if it stops being reused
+max_template_ratio = 0.75
+
+text = "Original text:\nこんにちは、世界。\n\nTranslated text:\nHello, world." * 4
+
+##-------------------start-of-time_per_call()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+def time_per_call(function) -> float:
+
+    """
+
+    Returns the fastest time function took per call, in microseconds.
+
+    """
+
+    return min(timeit.repeat(function, number=number, repeat=repeat)) / number * 1e6
+
+##-------------------start-of-main()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+def main() -> int:
+
+    """
+
+    Measures the client side cost of a request: building its arguments, and its key, which is all a response cache hit costs. Each is measured with the service's request template reused, as it is between settings changes, and built again for every request, which is what changing the settings or instructions between requests costs.
+
+    """
+
+    ## tiktoken can't download its encodings without a network, which only matters for validating text length
+    logging.disable(logging.ERROR)
+
+    from elucidate import ElucidateClient, ModelTranslationMessage, SystemTranslationMessage
+    from elucidate.evaluators.openai_evaluator import _openai_build_message_args, _openai_request_key
+    from elucidate.evaluators.anthropic_evaluator import _anthropic_build_message_args, _anthropic_request_key
+
+    client = ElucidateClient(openai_api_key="benchmark", anthropic_api_key="benchmark")
+
+    openai = client._openai_service
+    openai._set_attributes(model="gpt-4o", temperature=0.3, max_tokens=512, json_mode=True)
+
+    anthropic = client._anthropic_service
+    anthropic._set_attributes(model="claude-3-5-sonnet-20240620", temperature=0.3, max_tokens=512, json_mode=True)
+
+    instructions = SystemTranslationMessage("Please suggest a revised of the given text given it's original text and it's translation.")
+    prompt = ModelTranslationMessage(text)
+
+    cases = {"openai arguments": (openai, lambda: _openai_build_message_args(instructions, prompt, openai)),
+             "openai key": (openai, lambda: _openai_request_key(instructions, prompt, openai)),
+             ## the lazy paths wrap string instructions in a new SystemTranslationMessage for every text
+             "openai lazy arguments": (openai, lambda: _openai_build_message_args(*reversed(openai._build_evaluation_batches(text, instructions.content)[0]), openai)),
+             "anthropic arguments": (anthropic, lambda: _anthropic_build_message_args(anthropic._system, prompt, anthropic)),
+             "anthropic key": (anthropic, lambda: _anthropic_request_key(anthropic._system, prompt, anthropic))}
+
+    failures = []
+
+    for name, (service, function) in cases.items():
+
+        def rebuilt() -> None:
+            service._request_template = None
+            function()
+
+        reused_time = time_per_call(function)
+        rebuilt_time = time_per_call(rebuilt)
+
+        print(f"{name}: {reused_time:.2f}us with the template, {rebuilt_time:.2f}us building it every request")
+
+        if(reused_time > rebuilt_time * max_template_ratio):
+            failures.append(f"{name} took {reused_time / rebuilt_time:.2f} of the time with the template, the budget is {max_template_ratio}")
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+
+    return 1 if failures else 0
+
+##-------------------end-of-main()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+if(__name__ == "__main__"):
+    sys.exit(main())
@@ -0,0 +1,251 @@
+## Copyright 2024 Kakusui LLC (https://kakusui.org) (https://github.com/Kakusui) (https://github.com/Kakusui/Elucidate)
+## Use of this source code is governed by an GNU Lesser General Public License v2.1
+## license that can be found in the LICENSE file.
+
+## built-in libraries
+import asyncio
+import logging
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+import typing
+
+## local stand-ins for the provider endpoints
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from mock_providers import MockProviderProcess
+from benchmark import make_client
+
+##-------------------start-of-attributes---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+texts = [f"Original text:\n文{_index}\n\nTranslated text:\nString {_index}" for _index in range(20)]
+
+ttl = 0.3
+
+## each request takes this long at the stand-in, and with a request a minute and one slot at a time, a second uncached one couldn't go out for a minute
+latency = 0.2
+requests_per_minute = 1
+
+## repeats answered from the cache must all be back well within a single request's latency
+max_cached_run = latency
+
+##-------------------start-of-disk_rows()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+def disk_rows(path:str) -> typing.Dict[str, float]:
+
+    """
+
+    Returns the accessed_at of every response written to the SQLite file, read on a connection of its own, so only what's committed is seen.
+
+    """
+
+    _connection = sqlite3.connect(path)
+
+    try:
+        return dict(_connection.execute("SELECT key, accessed_at FROM responses").fetchall())
+
+    finally:
+        _connection.close()
+
+##-------------------start-of-check_memory()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+def check_memory(failures:typing.List[str]) -> None:
+
+    """
+
+    Checks the in-memory tier evicts the least recently used response, that responses expire after ttl, and the hit and miss counters.
+
+    """
+
+    from elucidate import ResponseCache
+
+    _cache = ResponseCache(max_memory_entries=2)
+
+    _cache.set("a", "A")
+    _cache.set("b", "B")
+
+    ## a is now the most recently used, so c pushes b out
+    _cache.get("a")
+    _cache.set("c", "C")
+
+    if([_cache.get(_key) for _key in "abc"] != ["A", None, "C"]):
+        failures.append("memory: the least recently used response wasn't the one evicted")
+
+    if(_cache.stats() != {"hits": 3, "misses": 1, "memory_hits": 3, "disk_hits": 0, "evictions": 1, "memory_entries": 2, "disk_entries": 0}):
+        failures.append(f"memory: the stats were {_cache.stats()}")
+
+    _cache = ResponseCache(ttl=ttl)
+
+    _cache.set("a", "A")
+
+    _fresh = _cache.get("a")
+    time.sleep(ttl)
+    _expired = _cache.get("a")
+
+    if(_fresh != "A" or _expired is not None or _cache.stats()["memory_entries"] != 0):
+        failures.append(f"memory: a response was {_fresh!r} before ttl and {_expired!r} after it, not served and then dropped")
+
+    _cache = ResponseCache(max_memory_entries=0)
+    _cache.set("a", "A")
+
+    if(_cache.get("a") is not None):
+        failures.append("memory: max_memory_entries=0 still kept a response")
+
+    print(f"memory: {_cache.stats()}")
+
+##-------------------start-of-check_disk()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+def check_disk(directory:str, failures:typing.List[str]) -> None:
+
+    """
+
+    Checks writes to the SQLite tier are buffered until a flush, that they survive a restart, that the least recently used responses are evicted from disk and that expired ones aren't served.
+
+    """
+
+    from elucidate import ResponseCache
+
+    _path = os.path.join(directory, "responses.db")
+
+    ## nothing is due on its own, so only flush() and close() write
+    _cache = ResponseCache(_path, max_memory_entries=0, flush_interval=3600)
+
+    for _index in range(10):
+        _cache.set(f"key {_index}", f"response {_index}")
+
+    if(disk_rows(_path)):
+        failures.append("disk: responses were committed on every miss instead of buffered")
+
+    if(_cache.get("key 3") != "response 3"):
+        failures.append("disk: a buffered response wasn't served before it was written")
+
+    _cache.flush()
+
+    if(len(disk_rows(_path)) != 10):
+        failures.append(f"disk: flush() wrote {len(disk_rows(_path))} responses, not 10")
+
+    _accessed_at = disk_rows(_path)["key 5"]
+
+    _cache.get("key 5")
+
+    if(disk_rows(_path)["key 5"] != _accessed_at):
+        failures.append("disk: a hit committed its access time instead of buffering it")
+
+    _cache.close()
+
+    if(disk_rows(_path)["key 5"] <= _accessed_at):
+        failures.append("disk: close() didn't write the buffered access time")
+
+    ## a fresh cache, all it has is the file
+    _cache = ResponseCache(_path, max_memory_entries=0, flush_every=1)
+
+    if(_cache.get("key 7") != "response 7" or _cache.stats()["disk_hits"] != 1):
+        failures.append("disk: a response wasn't served from the file after a restart")
+
+    _cache.close()
+
+    ## responses 0 to 9 were stored in order, 0 and 1 are read again, so the eviction takes the oldest of the rest
+    _cache = ResponseCache(_path, max_memory_entries=0, max_disk_entries=10, flush_every=1)
+
+    _cache.get("key 0")
+    _cache.get("key 1")
+
+    _cache.set("key 10", "response 10")
+
+    _kept = disk_rows(_path)
+
+    if(len(_kept) > 10 or "key 10" not in _kept or "key 0" not in _kept or "key 1" not in _kept or "key 2" in _kept):
+        failures.append(f"disk: eviction kept {sorted(_kept)}, not the most recently used")
+
+    if(_cache.stats()["evictions"] == 0 or _cache.stats()["disk_entries"] != len(_kept)):
+        failures.append(f"disk: the stats were {_cache.stats()} after evicting down to {len(_kept)}")
+
+    _cache.close()
+
+    ## expired responses aren't served, and are deleted from the file
+    _expiring_path = os.path.join(directory, "expiring.db")
+
+    _cache = ResponseCache(_expiring_path, max_memory_entries=0, ttl=ttl, flush_every=1)
+    _cache.set("a", "A")
+
+    time.sleep(ttl)
+
+    if(_cache.get("a") is not None or "a" in disk_rows(_expiring_path)):
+        failures.append("disk: an expired response was served or left in the file")
+
+    _cache.close()
+
+    print(f"disk: kept {len(_kept)} of 11 responses, {_cache.stats()}")
+
+##-------------------start-of-main()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+def main() -> int:
+
+    """
+
+    Checks the response cache's tiers offline, then against the stand-in that repeated requests are answered from the cache without a request, the semaphore or the rate limiter.
+
+    """
+
+    ## tiktoken can't download its encodings without a network, which only matters for validating text length
+    logging.disable(logging.ERROR)
+
+    failures:typing.List[str] = []
+
+    check_memory(failures)
+
+    with tempfile.TemporaryDirectory() as directory:
+
+        check_disk(directory, failures)
+
+        with MockProviderProcess() as server:
+
+            from elucidate import ResponseCache
+
+            _cache = ResponseCache(os.path.join(directory, "client.db"))
+
+            client = make_client(server)
+            client.set_response_cache(_cache)
+
+            server.configure(latency=latency)
+
+            async def _run() -> None:
+
+                _first = await client.openai_evaluate_async(texts, semaphore=len(texts), model="gpt-4o-mini")
+
+                if(_first != texts or server.stats()["requests"] != len(texts)):
+                    failures.append(f"the first run sent {server.stats()['requests']} requests for {len(texts)} texts")
+
+                ## one slot and a request a minute, anything that waited on either would take a minute
+                client.set_rate_limits("openai", requests_per_minute=requests_per_minute)
+
+                _start = time.monotonic()
+                _second = await client.openai_evaluate_async(texts, semaphore=1, model="gpt-4o-mini")
+                _elapsed = time.monotonic() - _start
+
+                print(f"repeats: {len(texts)} answered in {_elapsed:.3f}s with {server.stats()['requests'] - len(texts)} requests, {_cache.stats()}")
+
+                if(_second != texts or server.stats()["requests"] != len(texts)):
+                    failures.append("repeats weren't all answered from the cache")
+
+                if(_elapsed >= max_cached_run):
+                    failures.append(f"repeats took {_elapsed:.3f}s, they waited on the semaphore or the rate limiter")
+
+                if(_cache.stats()["hits"] != len(texts) or _cache.stats()["misses"] != len(texts)):
+                    failures.append(f"the cache counted {_cache.stats()}, not {len(texts)} misses then {len(texts)} hits")
+
+            asyncio.run(_run())
+
+            _cache.close()
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+
+    return 1 if failures else 0
+
+##-------------------end-of-main()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+if(__name__ == "__main__"):
+    sys.exit(main())
@@ -0,0 +1,152 @@
+## Copyright 2024 Kakusui LLC (https://kakusui.org) (https://github.com/Kakusui) (https://github.com/Kakusui/Elucidate)
+## Use of this source code is governed by an GNU Lesser General Public License v2.1
+## license that can be found in the LICENSE file.
+
+## built-in libraries
+import logging
+import os
+import sys
+import time
+import typing
+
+## local stand-ins for the provider endpoints
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from mock_providers import MockProviderProcess
+from benchmark import make_client
+
+##-------------------start-of-attributes---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+texts = [f"Original text:\n文{_index}\n\nTranslated text:\nString {_index}" for _index in range(20)]
+
+## models the token counter has no limit for, so validating texts never waits on tiktoken's download
+models = {"openai": "mock-small", "anthropic": "claude-mock", "gemini": "gemini-1.5-flash"}
+
+max_workers = 4
+latency = 0.1
+
+## how much longer than its rounds a pooled batch may take, well under what one at a time would need
+margin = 0.5
+
+## the text whose request raises
+failing_index = 5
+
+## earlier texts are held back longer, so they finish after later ones
+stagger = 0.01
+
+##-------------------start-of-staggered()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+def staggered(function:typing.Callable) -> typing.Callable:
+
+    """
+
+    A decorator that holds earlier texts back longer than later ones, and fails the one at failing_index.
+
+    """
+
+    def _decorated(instructions:typing.Any, prompt:typing.Any) -> typing.Any:
+
+        _index = texts.index(prompt.content)
+
+        time.sleep((len(texts) - _index) * stagger)
+
+        if(_index == failing_index):
+            raise ValueError("failed on purpose")
+
+        return function(instructions, prompt)
+
+    return _decorated
+
+##-------------------start-of-main()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+def main() -> int:
+
+    """
+
+    Checks against the stand-in that the sync evaluation functions with max_workers keep max_workers requests in flight and return a BatchResults in input order, that a failing text is None with its error kept while the rest still come back, that adaptive concurrency caps the pool, and that a max_workers under 1 is refused.
+
+    """
+
+    from elucidate import BatchResults
+
+    ## tiktoken can't download its encodings without a network, which only matters for validating text length
+    logging.disable(logging.ERROR)
+
+    failures:typing.List[str] = []
+
+    with MockProviderProcess() as server:
+
+        client = make_client(server)
+
+        _functions = {"openai": client.openai_evaluate, "anthropic": client.anthropic_evaluate, "gemini": client.gemini_evaluate}
+
+        ## every provider, max_workers in flight and input order
+        for _provider, _function in _functions.items():
+
+            server.configure(latency=latency)
+
+            _start = time.monotonic()
+            _results = _function(texts, model=models[_provider], max_workers=max_workers)
+            _elapsed = time.monotonic() - _start
+
+            _stats = server.stats()
+
+            print(f"{_provider}: {len(texts)} texts in {_elapsed:.3f}s, at most {_stats['max_in_flight']} in flight with {max_workers} workers")
+
+            if(not isinstance(_results, BatchResults) or list(_results) != texts or _results.errors):
+                failures.append(f"{_provider}: didn't return a BatchResults of the evaluations in input order")
+
+            if(_stats["max_in_flight"] != max_workers):
+                failures.append(f"{_provider}: {_stats['max_in_flight']} requests were in flight at once, not {max_workers}")
+
+            if(_elapsed >= len(texts) / max_workers * latency + margin):
+                failures.append(f"{_provider}: took {_elapsed:.3f}s, the texts weren't evaluated {max_workers} at a time")
+
+        ## finishing out of order, one failing
+        server.configure(latency=0.0)
+
+        _results = client.openai_evaluate(texts, model=models["openai"], max_workers=max_workers, decorator=staggered)
+
+        print(f"out of order: {len(_results.succeeded)} succeeded, errors at {sorted(_results.errors)}")
+
+        if(sorted(_results.errors) != [failing_index] or not isinstance(_results.errors[failing_index], ValueError)):
+            failures.append(f"out of order: the errors were {_results.errors!r}, not the one failing text's ValueError")
+
+        if(_results[failing_index] is not None):
+            failures.append(f"out of order: the failing text was {_results[failing_index]!r}, not None")
+
+        if(_results.succeeded != {_index: _text for _index, _text in enumerate(texts) if _index != failing_index}):
+            failures.append("out of order: the other texts' evaluations weren't kept in input order")
+
+        ## a learned limit under max_workers caps the pool
+        client.enable_adaptive_concurrency("openai", initial_limit=2)
+
+        server.configure(latency=latency)
+
+        _results = client.openai_evaluate(texts, model=models["openai"], max_workers=max_workers * 2)
+
+        print(f"adaptive concurrency: at most {server.stats()['max_in_flight']} in flight with {max_workers * 2} workers and a limit of 2")
+
+        if(list(_results) != texts or server.stats()["max_in_flight"] > 2):
+            failures.append(f"adaptive concurrency: {server.stats()['max_in_flight']} requests were in flight at once over a limit of 2")
+
+        client.disable_adaptive_concurrency("openai")
+
+        try:
+            client.openai_evaluate(texts, model=models["openai"], max_workers=0)
+            failures.append("max_workers=0 was taken")
+
+        except AssertionError as e:
+
+            if(not isinstance(e.args[0], ValueError)):
+                failures.append(f"max_workers=0 raised {e.args[0]!r}, not ValueError")
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+
+    return 1 if failures else 0
+
+##-------------------end-of-main()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+if(__name__ == "__main__"):
+    sys.exit(main())
@@ -0,0 +1,91 @@
+## Copyright 2024 Kakusui LLC (https://kakusui.org) (https://github.com/Kakusui) (https://github.com/Kakusui/Elucidate)
+## Use of this source code is governed by an GNU Lesser General Public License v2.1
+## license that can be found in the LICENSE file.
+
+## built-in libraries
+import asyncio
+import logging
+import os
+import sys
+
+## local stand-ins for the provider endpoints
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from mock_providers import MockProviderProcess
+from benchmark import make_client, providers
+
+##-------------------start-of-attributes---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+## seconds every stand-in response takes to generate, in stream_chunks pieces
+server_latency = 2.0
+stream_chunks = 8
+
+## the first delta has to arrive within this share of the whole generation, a stream that's buffered until the end arrives at 1.0
+## the stand-in's first piece lands at 1 / stream_chunks, so this leaves room for a slow runner
+max_first_token_share = 0.4
+
+text = "Original text:\nこんにちは、世界。今日はいい天気ですね。\n\nTranslated text:\nHello, world. It's nice weather today."
+
+##-------------------start-of-main()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+def main() -> int:
+
+    """
+
+    Streams an evaluation from every provider's stand-in, checking the first delta arrives long before the generation is done, and that the deltas add up to the evaluation the whole request gives, with its usage.
+
+    """
+
+    ## tiktoken can't download its encodings without a network, which only matters for validating text length
+    logging.disable(logging.ERROR)
+
+    failures = []
+
+    with MockProviderProcess() as server:
+
+        server.configure(latency=server_latency, stream_chunks=stream_chunks)
+
+        client = make_client(server)
+
+        async def _run() -> None:
+
+            ## grpc's async channels belong to the loop they're made in
+            import grpc
+            from google.ai.generativelanguage_v1beta.services.generative_service import GenerativeServiceAsyncClient, transports
+
+            client._gemini_service._client_manager.clients["generative_async"] = GenerativeServiceAsyncClient(transport=transports.GenerativeServiceGrpcAsyncIOTransport(channel=grpc.aio.insecure_channel(server.grpc_address)))
+
+            for provider in providers:
+
+                _whole = await client.evaluate_async(text, provider)
+
+                _deltas = []
+                _stream = client.evaluate_token_stream(text, provider)
+
+                async for _delta in _stream:
+                    _deltas.append(_delta)
+
+                _share = _stream.time_to_first_token / _stream.duration # type: ignore
+
+                print(f"{provider}: first token after {_stream.time_to_first_token * 1000:.0f}ms of {_stream.duration * 1000:.0f}ms ({_share:.2f}), {len(_deltas)} deltas, usage {_stream.usage}") # type: ignore
+
+                if(_share > max_first_token_share):
+                    failures.append(f"{provider}'s first token arrived at {_share:.2f} of the generation, the budget is {max_first_token_share}")
+
+                if("".join(_deltas) != _whole or _stream.text != _whole):
+                    failures.append(f"{provider}'s deltas don't add up to the whole evaluation")
+
+                if(not _stream.input_tokens or not _stream.output_tokens):
+                    failures.append(f"{provider}'s stream didn't report usage")
+
+        asyncio.run(_run())
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+
+    return 1 if failures else 0
+
+##-------------------end-of-main()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+if(__name__ == "__main__"):
+    sys.exit(main())
@@ -0,0 +1,212 @@
+## Copyright 2024 Kakusui LLC (https://kakusui.org) (https://github.com/Kakusui) (https://github.com/Kakusui/Elucidate)
+## Use of this source code is governed by an GNU Lesser General Public License v2.1
+## license that can be found in the LICENSE file.
+
+## built-in libraries
+import sys
+import typing
+
+##-------------------start-of-attributes---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+texts = [f"Original text:\n文{_index}\n\nTranslated text:\nString {_index}" for _index in range(12)]
+
+## all counted with cl100k_base, the only encoding this needs downloaded
+openai_model = "gpt-4"
+anthropic_model = "claude-3-haiku-20240307"
+
+instructions = "Please suggest a revised version of the given text."
+
+chunk_size = 5
+
+##-------------------start-of-check_counter()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+def check_counter(encoding:typing.Any, failures:typing.List[str]) -> None:
+
+    """
+
+    Checks that counts match tiktoken's, that a repeated text is only tokenized once within a call and across calls, that models sharing an encoding share the memo, that the least recently used counts are evicted past max_entries, and that the process pool counts the same as counting in process.
+
+    """
+
+    from elucidate import TokenCounter
+
+    _expected = [len(encoding.encode_ordinary(_text)) for _text in texts]
+
+    _counter = TokenCounter()
+
+    ## every text twice in one call, each tokenized once
+    _counts = _counter.count_many(texts + texts, openai_model, "openai")
+
+    print(f"count_many(): {_counter.stats()}")
+
+    if(_counts != _expected + _expected):
+        failures.append(f"count_many() counted {_counts}, not tiktoken's {_expected + _expected}")
+
+    if(_counter.stats() != {"hits": 0, "misses": len(texts), "evictions": 0, "entries": len(texts)}):
+        failures.append(f"counting each text twice in one call gave {_counter.stats()}, not a miss per text")
+
+    ## again, and for a model with the same encoding, all from the memo
+    _counter.count_many(texts, openai_model, "openai")
+    _counter.count(texts[0], anthropic_model, "anthropic")
+
+    if(_counter.stats()["hits"] != len(texts) + 1 or _counter.stats()["misses"] != len(texts)):
+        failures.append(f"counting the texts again gave {_counter.stats()}, they weren't served from the memo")
+
+    ## the least recently used go first
+    _counter = TokenCounter(max_entries=3)
+
+    _counter.count_many(texts[:3], openai_model)
+    _counter.count(texts[0], openai_model)
+    _counter.count(texts[3], openai_model)
+    _counter.count(texts[0], openai_model)
+    _counter.count(texts[1], openai_model)
+
+    if(_counter.stats() != {"hits": 2, "misses": 5, "evictions": 2, "entries": 3}):
+        failures.append(f"with max_entries=3 the stats were {_counter.stats()}, the least recently used count wasn't evicted first")
+
+    _counter = TokenCounter(max_entries=0)
+    _counter.count_many(texts[:2] * 2, openai_model)
+
+    if(_counter.stats()["entries"] != 0 or _counter.stats()["misses"] != 2):
+        failures.append(f"with max_entries=0 the stats were {_counter.stats()}, not nothing remembered")
+
+    _counter = TokenCounter()
+    _counter.count_many(texts, openai_model)
+    _counter.clear()
+    _counter.count_many(texts, openai_model)
+
+    if(_counter.stats()["misses"] != 2 * len(texts)):
+        failures.append(f"after clear() the stats were {_counter.stats()}, the counts were still remembered")
+
+    ## fanned out over a pool for any amount of text
+    _counter = TokenCounter(processes=2, process_threshold=0)
+
+    try:
+        _counts = _counter.count_many(texts, anthropic_model, "anthropic")
+
+        if(_counts != _expected or _counter._executor is None):
+            failures.append(f"the process pool counted {_counts}, not {_expected}")
+
+        _counter.close()
+
+        if(_counter._executor is not None):
+            failures.append("close() didn't shut the process pool down")
+
+    finally:
+        _counter.close()
+
+    for _settings in [{"max_entries": -1}, {"processes": 0}, {"process_threshold": -1}]:
+
+        try:
+            TokenCounter(**_settings)
+            failures.append(f"TokenCounter took {_settings}")
+
+        except AssertionError as e:
+
+            if(not isinstance(e.args[0], ValueError)):
+                failures.append(f"TokenCounter({_settings}) raised {e.args[0]!r}, not ValueError")
+
+##-------------------start-of-check_cost_stream()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+def check_cost_stream(encoding:typing.Any, failures:typing.List[str]) -> None:
+
+    """
+
+    Checks that calculate_cost_stream() yields each text's tokens with the instructions, and the running totals, that it only pulls a chunk at a time from the texts, that calculate_cost() agrees with its last yield, and that both count through the client's TokenCounter.
+
+    """
+
+    from elucidate import ElucidateClient, TokenCounter
+    from elucidate.util.token_counting import _cost_per_token
+
+    _counter = TokenCounter()
+
+    client = ElucidateClient(token_counter=_counter)
+
+    _instruction_tokens = len(encoding.encode_ordinary(instructions))
+    _expected = [len(encoding.encode_ordinary(_text)) + _instruction_tokens for _text in texts]
+
+    _pulled:typing.List[str] = []
+
+    def _texts() -> typing.Iterator[str]:
+        for _text in texts:
+            _pulled.append(_text)
+            yield _text
+
+    _stream = client.calculate_cost_stream(_texts(), "openai", openai_model, instructions, chunk_size=chunk_size)
+
+    _first = next(_stream)
+
+    if(len(_pulled) != chunk_size):
+        failures.append(f"the first yield pulled {len(_pulled)} texts, not a chunk of {chunk_size}")
+
+    _yielded = [_first, *_stream]
+
+    _cost_per_model_token = _cost_per_token(openai_model)
+
+    _tokens = [_num_tokens for _num_tokens, _, _, _ in _yielded]
+
+    print(f"calculate_cost_stream(): {len(_tokens)} texts, {_yielded[-1][2]} tokens, {_yielded[-1][3]:.6f} in total")
+
+    if(_tokens != _expected):
+        failures.append(f"calculate_cost_stream() yielded {_tokens} tokens, not {_expected}")
+
+    if(_yielded[-1][2] != sum(_expected) or abs(_yielded[-1][3] - sum(_expected) * _cost_per_model_token) > 1e-9):
+        failures.append(f"calculate_cost_stream() ended at {_yielded[-1][2]} tokens costing {_yielded[-1][3]}, not {sum(_expected)} costing {sum(_expected) * _cost_per_model_token}")
+
+    if(any(abs(_cost - _num_tokens * _cost_per_model_token) > 1e-12 for _num_tokens, _cost, _, _ in _yielded)):
+        failures.append("calculate_cost_stream() yielded a cost that wasn't its tokens times the model's cost per token")
+
+    ## the same texts again, all from the client's counter
+    _misses = _counter.stats()["misses"]
+
+    _num_tokens, _cost, _model = client.calculate_cost(texts, "openai", openai_model, instructions)
+
+    if((_num_tokens, _model) != (sum(_expected), openai_model) or abs(_cost - _yielded[-1][3]) > 1e-9):
+        failures.append(f"calculate_cost() gave {(_num_tokens, _cost, _model)}, not what calculate_cost_stream() ended at")
+
+    if(_counter.stats()["misses"] != _misses):
+        failures.append(f"calculate_cost() tokenized {_counter.stats()['misses'] - _misses} texts calculate_cost_stream() had already counted")
+
+    try:
+        next(client.calculate_cost_stream(texts, "openai", openai_model, chunk_size=0))
+        failures.append("calculate_cost_stream() took a chunk_size of 0")
+
+    except AssertionError as e:
+
+        if(not isinstance(e.args[0], ValueError)):
+            failures.append(f"a chunk_size of 0 raised {e.args[0]!r}, not ValueError")
+
+##-------------------start-of-main()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+def main() -> int:
+
+    """
+
+    Checks the TokenCounter's memo and process pool, and calculate_cost_stream(). tiktoken has to download cl100k_base the first time, so without a network and a cached copy there's nothing to count with and the checks are skipped.
+
+    """
+
+    import tiktoken
+
+    failures:typing.List[str] = []
+
+    try:
+        _encoding = tiktoken.get_encoding("cl100k_base")
+
+    except Exception as e:
+        print(f"skipped: cl100k_base couldn't be loaded ({type(e).__name__})")
+        return 0
+
+    check_counter(_encoding, failures)
+    check_cost_stream(_encoding, failures)
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+
+    return 1 if failures else 0
+
+##-------------------end-of-main()---------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+if(__name__ == "__main__"):
+    sys.exit(main())